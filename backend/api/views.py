@@ -8,6 +8,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.shortcuts import render
 from django.utils import timezone
 from drf_spectacular.utils import extend_schema
+from messaging.branding import get_branding
 from messaging.models import Message
 from rest_framework import status
 from rest_framework.permissions import AllowAny
@@ -51,9 +52,7 @@ class IdentityView(APIView):
         },
     )
     def get(self, request):
-        from users.models import Organisation  # local import to avoid cycles
-
-        main_org = Organisation.objects.filter(is_main=True).first()
+        main_org = get_branding().organisation
         return Response(
             {
                 "product": "hcw",
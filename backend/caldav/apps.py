@@ -5,3 +5,6 @@ class CaldavConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "caldav"
     verbose_name = "CalDAV"
+
+    def ready(self):
+        from . import signals
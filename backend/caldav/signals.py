@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from consultations.models import Appointment, AppointmentStatus, Participant
+from dav.models import SyncCollection
+from dav.sync import record_changes
+
+
+def _record_appointment(appointment, extra=None):
+    """Record a change of ``appointment`` in the calendar of its participants.
+
+    The event is gone from a participant's calendar once they are removed or
+    the appointment is cancelled.
+    """
+    cancelled = appointment.status == AppointmentStatus.cancelled
+    users = {
+        user_id: cancelled or not is_active
+        for user_id, is_active in Participant.objects.filter(
+            appointment_id=appointment.pk
+        ).values_list("user_id", "is_active")
+    }
+    users.update(extra or {})
+    record_changes(SyncCollection.calendar, appointment.pk, users)
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_calendar_change(sender, instance, **kwargs):
+    _record_appointment(instance)
+
+
+@receiver(post_save, sender=Participant)
+def participant_calendar_change(sender, instance, **kwargs):
+    # The attendee list is part of every participant's copy of the event.
+    _record_appointment(instance.appointment)
+
+
+@receiver(post_delete, sender=Participant)
+def participant_calendar_delete(sender, instance, **kwargs):
+    try:
+        appointment = Appointment.objects.get(pk=instance.appointment_id)
+    except Appointment.DoesNotExist:
+        # Cascade from the appointment deletion.
+        record_changes(
+            SyncCollection.calendar, instance.appointment_id, {instance.user_id: True}
+        )
+        return
+    _record_appointment(appointment, extra={instance.user_id: True})
@@ -0,0 +1,106 @@
+import base64
+from datetime import timedelta
+from xml.etree import ElementTree as ET
+
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from rest_framework.test import APIClient
+
+from consultations.models import Appointment, AppointmentStatus, Participant
+from users.models import DAVAppPassword, User
+
+DAV = "DAV:"
+
+SYNC_BODY = """<?xml version="1.0" encoding="utf-8"?>
+<D:sync-collection xmlns:D="DAV:">
+  <D:sync-token>{token}</D:sync-token>
+  <D:sync-level>1</D:sync-level>
+  <D:prop><D:getetag/></D:prop>
+</D:sync-collection>"""
+
+
+class CalDAVSyncTests(TenantTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="doc@example.com")
+        password = DAVAppPassword.objects.create(user=self.user, label="phone")
+        credentials = base64.b64encode(
+            f"{self.user.email}:{password.token}".encode()
+        ).decode()
+        self.client = APIClient()
+        self.auth = {"HTTP_AUTHORIZATION": f"Basic {credentials}"}
+        # Changes are recorded once the transaction commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.appointment = self._appointment()
+
+    def _appointment(self):
+        appointment = Appointment.objects.create(
+            created_by=self.user,
+            scheduled_at=timezone.now() + timedelta(days=1),
+            status=AppointmentStatus.scheduled,
+        )
+        Participant.objects.create(appointment=appointment, user=self.user)
+        return appointment
+
+    def _request(self, method, body="", **extra):
+        return self.client.generic(
+            method, "/dav/calendar/", body, content_type="application/xml",
+            **self.auth, **extra,
+        )
+
+    def _ctag(self):
+        response = self._request("PROPFIND", HTTP_DEPTH="0")
+        root = ET.fromstring(response.content)
+        return root.find(".//{http://calendarserver.org/ns/}getctag").text
+
+    def _sync(self, token=""):
+        response = self._request("REPORT", SYNC_BODY.format(token=token))
+        self.assertEqual(response.status_code, 207, response.content)
+        root = ET.fromstring(response.content)
+        responses = {
+            el.find(f"{{{DAV}}}href").text: el.find(f".//{{{DAV}}}status").text
+            for el in root.findall(f"{{{DAV}}}response")
+        }
+        return responses, root.find(f"{{{DAV}}}sync-token").text
+
+    def test_ctag_is_stable_until_a_change(self):
+        ctag = self._ctag()
+        self.assertEqual(self._ctag(), ctag)
+
+        self.appointment.title = "Follow-up"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.appointment.save()
+        self.assertNotEqual(self._ctag(), ctag)
+
+    def test_sync_collection_returns_only_changes(self):
+        responses, token = self._sync()
+        self.assertEqual(len(responses), 1)
+
+        responses, token = self._sync(token)
+        self.assertEqual(responses, {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            added = self._appointment()
+            self.appointment.status = AppointmentStatus.cancelled
+            self.appointment.save()
+
+        responses, _ = self._sync(token)
+        statuses = {href.split("@")[0].rsplit("-", 1)[-1]: status for href, status in responses.items()}
+        self.assertEqual(statuses[str(added.pk)], "HTTP/1.1 200 OK")
+        self.assertEqual(statuses[str(self.appointment.pk)], "HTTP/1.1 404 Not Found")
+
+    def test_uncommitted_change_is_not_skipped(self):
+        _, token = self._sync()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.appointment.title = "Follow-up"
+            self.appointment.save()
+        # A token handed out before the change commits still gets it.
+        responses, token = self._sync(token)
+        self.assertEqual(responses, {})
+        for callback in callbacks:
+            callback()
+        responses, _ = self._sync(token)
+        self.assertEqual(len(responses), 1)
+
+    def test_invalid_sync_token_is_refused(self):
+        response = self._request("REPORT", SYNC_BODY.format(token="bogus"))
+        self.assertEqual(response.status_code, 403)
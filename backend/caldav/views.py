@@ -1,10 +1,10 @@
-import base64
 import uuid
 from datetime import timedelta
 from xml.etree import ElementTree as ET
 from zoneinfo import ZoneInfo
 
 from django.conf import settings
+from django.db.models import Max, Prefetch
 from django.http import HttpResponse
 from django.utils import timezone
 from django.utils.decorators import method_decorator
@@ -12,7 +12,10 @@ from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 
 from consultations.models import Appointment, AppointmentStatus, Participant
-from users.models import User, DAVAppPassword
+from dav import sync
+from dav.auth import get_user_from_request
+from dav.models import SyncCollection
+from users.models import User
 
 DAV = "DAV:"
 CALDAV = "urn:ietf:params:xml:ns:caldav"
@@ -31,6 +34,15 @@ def _fmt(dt):
     return dt.astimezone(ZoneInfo("UTC")).strftime("%Y%m%dT%H%M%SZ")
 
 
+def _active_participants(appointment):
+    participants = getattr(appointment, "active_participants", None)
+    if participants is None:
+        participants = appointment.participant_set.filter(
+            is_active=True
+        ).select_related("user")
+    return participants
+
+
 def _appointment_to_vcalendar(appointment):
     end_at = appointment.end_expected_at or (
         appointment.scheduled_at + timedelta(hours=1)
@@ -74,7 +86,7 @@ def _appointment_to_vcalendar(appointment):
     if organizer_email:
         lines.append(f"ORGANIZER;CN={organizer_name}:mailto:{organizer_email}")
 
-    for participant in appointment.participant_set.filter(is_active=True).select_related("user"):
+    for participant in _active_participants(appointment):
         user = participant.user
         if not user or not user.email:
             continue
@@ -153,23 +165,7 @@ def _parse_ics_datetime(value):
 
 def _get_user_from_request(request):
     """Authenticate via Basic Auth with email:password or DAVAppPassword."""
-    from django.contrib.auth import authenticate
-
-    auth_header = request.META.get("HTTP_AUTHORIZATION", "")
-    if not auth_header.startswith("Basic "):
-        return None
-    try:
-        decoded = base64.b64decode(auth_header[6:]).decode("utf-8")
-        username, _, password = decoded.partition(":")
-        if not password:
-            return None
-    except Exception:
-        return None
-    
-    user = authenticate(request, username=username, password=password)
-    if user:
-        return user
-    return DAVAppPassword.authenticate(username, password)
+    return get_user_from_request(request)
 
 
 def _require_auth(request):
@@ -198,6 +194,43 @@ def _get_user_appointments(user):
     )
 
 
+def _with_calendar_data(appointments):
+    """Prefetch what ``_appointment_to_vcalendar`` reads, in one query."""
+    return appointments.prefetch_related(
+        Prefetch(
+            "participant_set",
+            queryset=Participant.objects.filter(is_active=True).select_related("user"),
+            to_attr="active_participants",
+        )
+    )
+
+
+def _calendar_ctag(user):
+    """Collection tag: changes whenever an event of the calendar does.
+
+    The latest ``updated_at`` alone would miss removals, which only show up
+    in the change log.
+    """
+    last_updated = _get_user_appointments(user).order_by().aggregate(
+        last=Max("updated_at")
+    )["last"]
+    last_change = sync.latest_change_id(user, SyncCollection.calendar)
+    return f"{int(last_updated.timestamp()) if last_updated else 0}-{last_change}"
+
+
+def _appointment_id_from_filename(filename):
+    """Appointment id of a CalDAV resource name (appointment-123@domain.ics)."""
+    if not filename:
+        return None
+    uid_part = filename.replace(".ics", "").split("@")[0]
+    if not uid_part.startswith("appointment-"):
+        return None
+    try:
+        return int(uid_part.replace("appointment-", ""))
+    except ValueError:
+        return None
+
+
 def _appointment_etag(appointment):
     # Use updated_at so any change (title rename, status, participants, ...)
     # invalidates the etag and triggers a re-fetch by CalDAV clients.
@@ -205,9 +238,13 @@ def _appointment_etag(appointment):
     return f'"{appointment.pk}-{int(ref.timestamp())}"'
 
 
-def _href_for_appointment(appointment):
+def _href_for_appointment_id(appointment_id):
     domain = getattr(settings, "SITE_DOMAIN", "hcw.local")
-    return f"/dav/calendar/appointment-{appointment.pk}@{domain}.ics"
+    return f"/dav/calendar/appointment-{appointment_id}@{domain}.ics"
+
+
+def _href_for_appointment(appointment):
+    return _href_for_appointment_id(appointment.pk)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -267,9 +304,20 @@ class CalDAVCalendarView(View):
         ET.SubElement(prop, _tag(CALDAV, "supported-calendar-component-set")).append(
             _make_comp("VEVENT")
         )
-        ET.SubElement(prop, _tag(CS, "getctag")).text = str(
-            int(timezone.now().timestamp())
+        ET.SubElement(prop, _tag(CS, "getctag")).text = _calendar_ctag(user)
+        ET.SubElement(prop, _tag(DAV, "sync-token")).text = sync.make_token(
+            sync.latest_change_id(user, SyncCollection.calendar)
         )
+        reports = ET.SubElement(prop, _tag(DAV, "supported-report-set"))
+        for report_ns, report_name in (
+            (CALDAV, "calendar-multiget"),
+            (CALDAV, "calendar-query"),
+            (DAV, "sync-collection"),
+        ):
+            supported = ET.SubElement(reports, _tag(DAV, "supported-report"))
+            ET.SubElement(supported, _tag(DAV, "report")).append(
+                ET.Element(_tag(report_ns, report_name))
+            )
 
         ET.SubElement(propstat, _tag(DAV, "status")).text = "HTTP/1.1 200 OK"
 
@@ -307,40 +355,91 @@ class CalDAVCalendarView(View):
         if err:
             return err
 
-        appointments = _get_user_appointments(user)
-
-        # Parse request body for calendar-multiget
-        requested_hrefs = set()
+        root = None
         try:
-            body = request.body
-            if body:
-                root = ET.fromstring(body)
-                for href_el in root.findall(f".//{_tag(DAV, 'href')}"):
-                    if href_el.text:
-                        requested_hrefs.add(href_el.text.strip())
+            if request.body:
+                root = ET.fromstring(request.body)
         except ET.ParseError:
             pass
 
+        if root is not None and root.tag == _tag(DAV, "sync-collection"):
+            return self._sync_collection(user, root)
+
+        appointments = _get_user_appointments(user)
+
+        # calendar-multiget: only load the requested resources
+        if root is not None and root.tag == _tag(CALDAV, "calendar-multiget"):
+            ids = set()
+            for href_el in root.findall(f".//{_tag(DAV, 'href')}"):
+                if href_el.text:
+                    appt_id = _appointment_id_from_filename(
+                        href_el.text.strip().rstrip("/").rsplit("/", 1)[-1]
+                    )
+                    if appt_id:
+                        ids.add(appt_id)
+            appointments = appointments.filter(pk__in=ids)
+
         multistatus = ET.Element(_tag(DAV, "multistatus"))
+        for appt in _with_calendar_data(appointments):
+            self._add_data_response(multistatus, appt, calendar_data=True)
+        return _multistatus_response(multistatus)
 
-        for appt in appointments:
-            href = _href_for_appointment(appt)
-            if requested_hrefs and href not in requested_hrefs:
-                continue
+    def _sync_collection(self, user, root):
+        """RFC 6578 sync-collection: the events changed since the sync token.
 
-            resp = ET.SubElement(multistatus, _tag(DAV, "response"))
-            ET.SubElement(resp, _tag(DAV, "href")).text = href
-            propstat = ET.SubElement(resp, _tag(DAV, "propstat"))
-            prop = ET.SubElement(propstat, _tag(DAV, "prop"))
+        Without a token every event is listed; with one, only the events
+        changed since, and a 404 entry for those gone from the calendar.
+        """
+        token = sync.parse_sync_collection(root)
+        calendar_data = root.find(f".//{_tag(CALDAV, 'calendar-data')}") is not None
 
-            ET.SubElement(prop, _tag(DAV, "getetag")).text = _appointment_etag(appt)
-            caldata = ET.SubElement(prop, _tag(CALDAV, "calendar-data"))
-            caldata.text = _appointment_to_vcalendar(appt)
+        appointments = _get_user_appointments(user)
+        if calendar_data:
+            appointments = _with_calendar_data(appointments)
 
-            ET.SubElement(propstat, _tag(DAV, "status")).text = "HTTP/1.1 200 OK"
+        multistatus = ET.Element(_tag(DAV, "multistatus"))
+        if not token:
+            last_change = sync.latest_change_id(user, SyncCollection.calendar)
+            for appt in appointments:
+                self._add_data_response(multistatus, appt, calendar_data)
+        else:
+            change_id = sync.parse_token(token)
+            if change_id is None:
+                return sync.invalid_token_response()
+            changes, last_change = sync.changes_since(
+                user, SyncCollection.calendar, change_id
+            )
+            found = set()
+            if changes:
+                for appt in appointments.filter(pk__in=changes.keys()):
+                    found.add(appt.pk)
+                    self._add_data_response(multistatus, appt, calendar_data)
+            for appt_id in changes.keys() - found:
+                resp = ET.SubElement(multistatus, _tag(DAV, "response"))
+                ET.SubElement(resp, _tag(DAV, "href")).text = (
+                    _href_for_appointment_id(appt_id)
+                )
+                ET.SubElement(resp, _tag(DAV, "status")).text = "HTTP/1.1 404 Not Found"
 
+        ET.SubElement(multistatus, _tag(DAV, "sync-token")).text = sync.make_token(
+            last_change
+        )
         return _multistatus_response(multistatus)
 
+    def _add_data_response(self, multistatus, appointment, calendar_data):
+        resp = ET.SubElement(multistatus, _tag(DAV, "response"))
+        ET.SubElement(resp, _tag(DAV, "href")).text = _href_for_appointment(appointment)
+        propstat = ET.SubElement(resp, _tag(DAV, "propstat"))
+        prop = ET.SubElement(propstat, _tag(DAV, "prop"))
+
+        ET.SubElement(prop, _tag(DAV, "getetag")).text = _appointment_etag(appointment)
+        if calendar_data:
+            ET.SubElement(prop, _tag(CALDAV, "calendar-data")).text = (
+                _appointment_to_vcalendar(appointment)
+            )
+
+        ET.SubElement(propstat, _tag(DAV, "status")).text = "HTTP/1.1 200 OK"
+
     def _get(self, request, **kwargs):
         user, err = _require_auth(request)
         if err:
@@ -349,7 +448,7 @@ class CalDAVCalendarView(View):
         filename = kwargs.get("filename")
         if not filename:
             # Return full calendar as ICS
-            appointments = _get_user_appointments(user)
+            appointments = _with_calendar_data(_get_user_appointments(user))
             lines = [
                 "BEGIN:VCALENDAR",
                 "VERSION:2.0",
@@ -411,7 +510,9 @@ class CalDAVCalendarView(View):
             appointment.scheduled_at = dtstart
             if dtend:
                 appointment.end_expected_at = dtend
-            appointment.save(update_fields=["title", "scheduled_at", "end_expected_at"])
+            appointment.save(
+                update_fields=["title", "scheduled_at", "end_expected_at", "updated_at"]
+            )
 
             self._sync_participants(appointment, user, attendees)
 
@@ -455,7 +556,7 @@ class CalDAVCalendarView(View):
             return HttpResponse(status=404)
 
         appointment.status = AppointmentStatus.cancelled
-        appointment.save(update_fields=["status"])
+        appointment.save(update_fields=["status", "updated_at"])
         return HttpResponse(status=204)
 
     def _sync_participants(self, appointment, current_user, attendees):
@@ -518,20 +619,8 @@ class CalDAVCalendarView(View):
 
     def _find_appointment(self, user, filename):
         """Find an appointment by its CalDAV filename."""
-        # filename: appointment-123@domain.ics
-        if not filename:
-            return None
-        name = filename.replace(".ics", "")
-        # Extract appointment ID from UID format
-        parts = name.split("@")
-        if not parts:
-            return None
-        uid_part = parts[0]  # appointment-123
-        if not uid_part.startswith("appointment-"):
-            return None
-        try:
-            appt_id = int(uid_part.replace("appointment-", ""))
-        except (ValueError, IndexError):
+        appt_id = _appointment_id_from_filename(filename)
+        if not appt_id:
             return None
 
         return (
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class CarddavConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "carddav"
-    verbose_name = "CardDAV"
\ No newline at end of file
+    verbose_name = "CardDAV"
+
+    def ready(self):
+        from . import signals
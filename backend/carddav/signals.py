@@ -0,0 +1,81 @@
+"""Address book membership changes.
+
+Sync tokens of the address book carry an ``updated_at`` watermark, which
+misses contacts entering or leaving an address book without being updated:
+a practitioner deleted, a patient moved to another practitioner, a
+participation making a practitioner visible to a patient or no longer. Those
+refuse the tokens issued so far, for the audience whose address books they
+change (or only for the users concerned, for participations), and clients
+do a full sync.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from consultations.models import Participant
+from dav.sync import reset_addressbook
+from users.models import Organisation, User
+
+PRACTITIONER, PATIENT = "practitioner", "patient"
+
+# Fields deciding in which address books a user appears.
+USER_MEMBERSHIP_FIELDS = {"created_by", "is_practitioner"}
+
+
+def _changed(instance, fields, update_fields):
+    """Whether ``instance`` is about to change one of ``fields`` in the DB."""
+    if update_fields is not None and not fields & set(update_fields):
+        return False
+    attnames = [instance._meta.get_field(field).attname for field in fields]
+    stored = type(instance).objects.filter(pk=instance.pk).values(*attnames).first()
+    return stored is not None and any(
+        stored[attname] != getattr(instance, attname) for attname in attnames
+    )
+
+
+@receiver(pre_save, sender=User)
+def user_membership_change(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    if _changed(instance, USER_MEMBERSHIP_FIELDS, update_fields):
+        reset_addressbook(PRACTITIONER, PATIENT)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    reset_addressbook(PRACTITIONER, PATIENT)
+
+
+def _participation_users(participant):
+    """Users whose address book a participation change can alter.
+
+    A patient sees the practitioners they share an appointment with, so only
+    the address books of the appointment's participants change.
+    """
+    users = set(
+        Participant.objects.filter(
+            appointment_id=participant.appointment_id
+        ).values_list("user_id", flat=True)
+    )
+    users.add(participant.user_id)
+    return users
+
+
+@receiver(pre_save, sender=Participant)
+def participation_change(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.pk is None or _changed(instance, {"is_active"}, update_fields):
+        reset_addressbook(users=_participation_users(instance))
+
+
+@receiver(post_delete, sender=Participant)
+def participation_deleted(sender, instance, **kwargs):
+    reset_addressbook(users=_participation_users(instance))
+
+
+@receiver(post_save, sender=Organisation)
+@receiver(post_delete, sender=Organisation)
+def organisation_change(sender, instance, **kwargs):
+    # The ORG line of the members' vCards changes without bumping them.
+    reset_addressbook(PRACTITIONER, PATIENT)
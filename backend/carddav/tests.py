@@ -0,0 +1,159 @@
+import base64
+from datetime import timedelta
+from unittest import mock
+from xml.etree import ElementTree as ET
+
+from django.core.cache import cache
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from rest_framework.test import APIClient
+
+from consultations.models import Appointment, Participant
+from users.models import DAVAppPassword, Organisation, User
+
+DAV = "DAV:"
+CARDDAV = "urn:ietf:params:xml:ns:carddav"
+
+MULTIGET_BODY = """<?xml version="1.0" encoding="utf-8"?>
+<C:addressbook-multiget xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:carddav">
+  <D:prop><D:getetag/><C:address-data/></D:prop>
+  {hrefs}
+</C:addressbook-multiget>"""
+
+SYNC_BODY = """<?xml version="1.0" encoding="utf-8"?>
+<D:sync-collection xmlns:D="DAV:">
+  <D:sync-token>{token}</D:sync-token>
+  <D:sync-level>1</D:sync-level>
+  <D:prop><D:getetag/></D:prop>
+</D:sync-collection>"""
+
+
+@mock.patch("carddav.views.SYNC_TOKEN_OVERLAP", timedelta(0))
+class CardDAVReportTests(TenantTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="doc@example.com", is_practitioner=True
+        )
+        self.colleagues = [
+            User.objects.create_user(
+                email=f"colleague{i}@example.com", is_practitioner=True
+            )
+            for i in range(3)
+        ]
+        password = DAVAppPassword.objects.create(user=self.user, label="phone")
+        credentials = base64.b64encode(
+            f"{self.user.email}:{password.token}".encode()
+        ).decode()
+        self.client = APIClient()
+        self.auth = {"HTTP_AUTHORIZATION": f"Basic {credentials}"}
+
+    def tearDown(self):
+        cache.clear()
+
+    def _report(self, body):
+        response = self.client.generic(
+            "REPORT", "/dav/addressbook/", body, content_type="application/xml",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 207, response.content)
+        root = ET.fromstring(response.content)
+        responses = {
+            el.find(f"{{{DAV}}}href").text: el.find(f".//{{{DAV}}}status").text
+            for el in root.findall(f"{{{DAV}}}response")
+        }
+        token = root.find(f"{{{DAV}}}sync-token")
+        return responses, token.text if token is not None else None
+
+    def _href(self, user):
+        return f"/dav/addressbook/practitioner-{user.pk}.vcf"
+
+    def test_multiget_returns_requested_contacts_only(self):
+        wanted = self.colleagues[0]
+        responses, _ = self._report(
+            MULTIGET_BODY.format(hrefs=f"<D:href>{self._href(wanted)}</D:href>")
+        )
+        self.assertEqual(list(responses), [self._href(wanted)])
+
+    def test_sync_collection_returns_updated_contacts(self):
+        responses, token = self._report(SYNC_BODY.format(token=""))
+        self.assertEqual(len(responses), len(self.colleagues))
+
+        updated, removed = self.colleagues[0], self.colleagues[1]
+        updated.job_title = "Cardiologist"
+        updated.save()
+        removed.is_active = False
+        removed.save()
+
+        responses, _ = self._report(SYNC_BODY.format(token=token))
+        self.assertEqual(
+            responses,
+            {
+                self._href(updated): "HTTP/1.1 200 OK",
+                self._href(removed): "HTTP/1.1 404 Not Found",
+            },
+        )
+
+    def _sync_status(self, token):
+        response = self.client.generic(
+            "REPORT", "/dav/addressbook/", SYNC_BODY.format(token=token),
+            content_type="application/xml", **self.auth,
+        )
+        return response.status_code
+
+    def test_deleted_contact_refuses_older_tokens(self):
+        _, token = self._report(SYNC_BODY.format(token=""))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.colleagues[0].delete()
+
+        self.assertEqual(self._sync_status(token), 403)
+        responses, token = self._report(SYNC_BODY.format(token=""))
+        self.assertNotIn(self._href(self.colleagues[0]), responses)
+        self.assertEqual(self._sync_status(token), 207)
+
+    def test_organisation_rename_refuses_older_tokens(self):
+        organisation = Organisation.objects.create(name="Clinic")
+        User.objects.filter(pk=self.colleagues[0].pk).update(
+            main_organisation=organisation
+        )
+        _, token = self._report(SYNC_BODY.format(token=""))
+        with self.captureOnCommitCallbacks(execute=True):
+            organisation.name = "Hospital"
+            organisation.save()
+
+        self.assertEqual(self._sync_status(token), 403)
+
+    def test_unrelated_user_save_keeps_tokens(self):
+        _, token = self._report(SYNC_BODY.format(token=""))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.colleagues[0].job_title = "Surgeon"
+            self.colleagues[0].save()
+
+        self.assertEqual(self._sync_status(token), 207)
+
+    def _appointment(self, *users):
+        appointment = Appointment.objects.create(
+            created_by=self.user, scheduled_at=timezone.now() + timedelta(days=1)
+        )
+        for user in users:
+            Participant.objects.create(appointment=appointment, user=user)
+        return appointment
+
+    def test_participation_only_refuses_tokens_of_its_participants(self):
+        patient = User.objects.create_user(email="pat@example.com")
+        other_patient = User.objects.create_user(email="other@example.com")
+        appointment = self._appointment(patient, self.colleagues[0])
+        password = DAVAppPassword.objects.create(user=patient, label="phone")
+        credentials = base64.b64encode(
+            f"{patient.email}:{password.token}".encode()
+        ).decode()
+        self.auth = {"HTTP_AUTHORIZATION": f"Basic {credentials}"}
+        _, token = self._report(SYNC_BODY.format(token=""))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._appointment(other_patient, self.colleagues[1])
+        self.assertEqual(self._sync_status(token), 207)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Participant.objects.create(appointment=appointment, user=self.colleagues[2])
+        self.assertEqual(self._sync_status(token), 403)
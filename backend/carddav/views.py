@@ -1,44 +1,43 @@
-import base64
+import hashlib
 import uuid
+from datetime import datetime, timedelta
 from xml.etree import ElementTree as ET
+from zoneinfo import ZoneInfo
 
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Max
 from django.http import HttpResponse
 from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 
-from users.models import User, DAVAppPassword
+from dav import sync
+from dav.auth import get_user_from_request
+from users.models import User
 
 DAV = "DAV:"
 CARDDAV = "urn:ietf:params:xml:ns:carddav"
 
 NSMAP = {"D": DAV, "C": CARDDAV}
 
+# Rendered vCards are keyed on the contact's updated_at and organisation name,
+# so an edited contact is never served stale.
+VCARD_CACHE_TIMEOUT = 60 * 60
+# A sync token covers changes up to this long before it was issued, so rows
+# committed late with an earlier updated_at are still picked up next time.
+SYNC_TOKEN_OVERLAP = timedelta(minutes=1)
+
 
 def _tag(ns, local):
     return f"{{{ns}}}{local}"
 
 def _get_user_from_request(request):
     """Authenticate via Basic Auth with email:password or DAVAppPassword."""
-    from django.contrib.auth import authenticate
+    return get_user_from_request(request)
 
-    auth_header = request.META.get("HTTP_AUTHORIZATION", "")
-    if not auth_header.startswith("Basic "):
-        return None
-    try:
-        decoded = base64.b64decode(auth_header[6:]).decode("utf-8")
-        username, _, password = decoded.partition(":")
-        if not password:
-            return None
-    except Exception:
-        return None
-    
-    user = authenticate(request, username=username, password=password)
-    if user:
-        return user
-    return DAVAppPassword.authenticate(username, password)
 
 def _require_auth(request):
     """Return user or an HTTP 401 response."""
@@ -95,35 +94,102 @@ def _user_etag(user):
     ref = user.updated_at or user.date_joined
     return f'"{user.pk}-{int(ref.timestamp())}"'
 
+def _vcard_cache_key(user):
+    ref = user.updated_at or user.date_joined
+    organisation = ""
+    if user.main_organisation_id:
+        organisation = hashlib.md5(
+            user.main_organisation.name.encode(), usedforsecurity=False
+        ).hexdigest()
+    return (
+        f"carddav:vcard:{connection.schema_name}:{user.pk}:"
+        f"{int(ref.timestamp() * 1_000_000)}:{organisation}"
+    )
+
+def _cached_vcards(contacts):
+    """Return ``{pk: vcard}``, rendering only the vCards not cached yet."""
+    keys = {_vcard_cache_key(contact): contact for contact in contacts}
+    cached = cache.get_many(keys.keys())
+    missing = {
+        key: _user_to_vcard(contact)
+        for key, contact in keys.items()
+        if key not in cached
+    }
+    if missing:
+        cache.set_many(missing, VCARD_CACHE_TIMEOUT)
+    return {
+        contact.pk: cached.get(key) or missing[key]
+        for key, contact in keys.items()
+    }
+
 def _href_for_user(user):
     role = "practitioner" if user.is_practitioner else "patient"
     return f"/dav/addressbook/{role}-{user.pk}.vcf"
 
-def _get_visible_contacts(user):
+def _contact_pk_from_filename(filename):
+    """Contact pk of a CardDAV resource name (patient-42.vcf, practitioner-7.vcf)."""
+    if not filename:
+        return None
+    name = filename.replace(".vcf", "")
+    for prefix in ("patient-", "practitioner-"):
+        if name.startswith(prefix):
+            try:
+                return int(name[len(prefix):])
+            except ValueError:
+                return None
+    return None
+
+def _audience(user):
+    return "practitioner" if user.is_practitioner else "patient"
+
+def _addressbook_ctag(user):
+    """Collection tag: the latest contact update, the contact count and the
+    last membership change.
+
+    Contacts entering or leaving the address book do not bump the
+    ``updated_at`` of any remaining contact.
+    """
+    stats = _get_visible_contacts(user).order_by().aggregate(
+        last=Max("updated_at"), count=Count("pk")
+    )
+    last = int(stats["last"].timestamp()) if stats["last"] else 0
+    reset_at = sync.addressbook_reset_at(_audience(user), user.pk)
+    return f"{last}-{stats['count']}-{reset_at}"
+
+def _get_visible_contacts(user, include_inactive=False):
     """
     Return the queryset of users visible to the authenticated user.
     - Practitioners see their patients (created_by=user) and fellow practitioners.
     - Patients see the practitioners they have had appointments with.
+
+    ``include_inactive`` keeps deactivated users, so a sync can report them
+    as removed.
     """
+    active = {} if include_inactive else {"is_active": True}
     if user.is_practitioner:
         patients = User.objects.filter(
-            is_active=True,
             is_practitioner=False,
             created_by=user,
+            **active,
         ).select_related("main_organisation")
         practitioners = User.objects.filter(
-            is_active=True,
             is_practitioner=True,
+            **active,
         ).exclude(pk=user.pk).select_related("main_organisation")
         return (patients | practitioners).distinct()
     else:
         return User.objects.filter(
-            is_active=True,
             is_practitioner=True,
             appointments_participating__participant__user=user,
             appointments_participating__participant__is_active=True,
+            **active,
         ).select_related("main_organisation").distinct()
 
+def _sync_token():
+    """Sync token whose watermark is now, minus ``SYNC_TOKEN_OVERLAP``."""
+    watermark = timezone.now() - SYNC_TOKEN_OVERLAP
+    return sync.make_token(int(watermark.timestamp() * 1_000_000))
+
 def _make_href(path):
     el = ET.Element(_tag(DAV, "href"))
     el.text = path
@@ -187,15 +253,27 @@ class CardDAVAddressbookView(View):
 
         user_name = f"{user.first_name} {user.last_name}".strip() or user.email
         ET.SubElement(prop, _tag(DAV, "displayname")).text = f"HCW - {user_name}"
-        ET.SubElement(prop, _tag(DAV, "getctag")).text = str(
-            int(timezone.now().timestamp())
-        )
+        ET.SubElement(prop, _tag(DAV, "getctag")).text = _addressbook_ctag(user)
+        ET.SubElement(prop, _tag(DAV, "sync-token")).text = _sync_token()
+        reports = ET.SubElement(prop, _tag(DAV, "supported-report-set"))
+        for report_ns, report_name in (
+            (CARDDAV, "addressbook-multiget"),
+            (CARDDAV, "addressbook-query"),
+            (DAV, "sync-collection"),
+        ):
+            supported = ET.SubElement(reports, _tag(DAV, "supported-report"))
+            ET.SubElement(supported, _tag(DAV, "report")).append(
+                ET.Element(_tag(report_ns, report_name))
+            )
 
         ET.SubElement(propstat, _tag(DAV, "status")).text = "HTTP/1.1 200 OK"
 
         # Child resources
         if depth != "0":
-            contacts = _get_visible_contacts(user)
+            # Only what the href and etag need: no vCard is rendered here.
+            contacts = _get_visible_contacts(user).select_related(None).only(
+                "pk", "is_practitioner", "updated_at", "date_joined"
+            )
             for contact in contacts:
                 self._add_resource_response(multistatus, contact)
 
@@ -227,40 +305,99 @@ class CardDAVAddressbookView(View):
         if err:
             return err
 
-        contacts = _get_visible_contacts(user)
-
-        # Parse request body for addressbook-multiget
-        requested_hrefs = set()
+        root = None
         try:
-            body = request.body
-            if body:
-                root = ET.fromstring(body)
-                for href_el in root.findall(f".//{_tag(DAV, 'href')}"):
-                    if href_el.text:
-                        requested_hrefs.add(href_el.text.strip())
+            if request.body:
+                root = ET.fromstring(request.body)
         except ET.ParseError:
             pass
 
+        if root is not None and root.tag == _tag(DAV, "sync-collection"):
+            return self._sync_collection(user, root)
+
+        contacts = _get_visible_contacts(user)
+
+        # addressbook-multiget: only load the requested resources
+        if root is not None and root.tag == _tag(CARDDAV, "addressbook-multiget"):
+            pks = set()
+            for href_el in root.findall(f".//{_tag(DAV, 'href')}"):
+                if href_el.text:
+                    pk = _contact_pk_from_filename(
+                        href_el.text.strip().rstrip("/").rsplit("/", 1)[-1]
+                    )
+                    if pk:
+                        pks.add(pk)
+            contacts = contacts.filter(pk__in=pks)
+
         multistatus = ET.Element(_tag(DAV, "multistatus"))
+        self._add_data_responses(multistatus, list(contacts), address_data=True)
+        return _multistatus_response(multistatus)
 
-        for contact in contacts:
-            href = _href_for_user(contact)
-            if requested_hrefs and href not in requested_hrefs:
-                continue
+    def _sync_collection(self, user, root):
+        """RFC 6578 sync-collection: the contacts updated since the sync token.
+
+        The token carries an ``updated_at`` watermark. Contacts updated after
+        it are listed if still visible, and reported as removed (404)
+        otherwise. Tokens issued before the last membership change of the
+        address book (see carddav.signals) are refused, so the client does
+        a full sync.
+        """
+        token = sync.parse_sync_collection(root)
+        address_data = root.find(f".//{_tag(CARDDAV, 'address-data')}") is not None
+        # Before issuing the new token, which must not predate it.
+        reset_at = sync.addressbook_reset_at(_audience(user), user.pk)
+        new_token = _sync_token()
+
+        multistatus = ET.Element(_tag(DAV, "multistatus"))
+        if not token:
+            self._add_data_responses(
+                multistatus, list(_get_visible_contacts(user)), address_data
+            )
+        else:
+            watermark = sync.parse_token(token)
+            if watermark is None:
+                return sync.invalid_token_response()
+            issued_at = watermark + int(SYNC_TOKEN_OVERLAP.total_seconds() * 1_000_000)
+            if issued_at < reset_at:
+                return sync.invalid_token_response()
+            since = datetime.fromtimestamp(watermark / 1_000_000, ZoneInfo("UTC"))
+            changed = list(
+                _get_visible_contacts(user, include_inactive=True).filter(
+                    updated_at__gt=since
+                )
+            )
+            self._add_data_responses(
+                multistatus,
+                [contact for contact in changed if contact.is_active],
+                address_data,
+            )
+            for contact in changed:
+                if not contact.is_active:
+                    resp = ET.SubElement(multistatus, _tag(DAV, "response"))
+                    ET.SubElement(resp, _tag(DAV, "href")).text = _href_for_user(contact)
+                    ET.SubElement(resp, _tag(DAV, "status")).text = (
+                        "HTTP/1.1 404 Not Found"
+                    )
+
+        ET.SubElement(multistatus, _tag(DAV, "sync-token")).text = new_token
+        return _multistatus_response(multistatus)
 
+    def _add_data_responses(self, multistatus, contacts, address_data):
+        vcards = _cached_vcards(contacts) if address_data else {}
+        for contact in contacts:
             resp = ET.SubElement(multistatus, _tag(DAV, "response"))
-            ET.SubElement(resp, _tag(DAV, "href")).text = href
+            ET.SubElement(resp, _tag(DAV, "href")).text = _href_for_user(contact)
             propstat = ET.SubElement(resp, _tag(DAV, "propstat"))
             prop = ET.SubElement(propstat, _tag(DAV, "prop"))
 
             ET.SubElement(prop, _tag(DAV, "getetag")).text = _user_etag(contact)
-            carddata = ET.SubElement(prop, _tag(CARDDAV, "address-data"))
-            carddata.text = _user_to_vcard(contact)
+            if address_data:
+                ET.SubElement(prop, _tag(CARDDAV, "address-data")).text = (
+                    vcards[contact.pk]
+                )
 
             ET.SubElement(propstat, _tag(DAV, "status")).text = "HTTP/1.1 200 OK"
 
-        return _multistatus_response(multistatus)
-
     def _get(self, request, **kwargs):
         user, err = _require_auth(request)
         if err:
@@ -274,7 +411,7 @@ class CardDAVAddressbookView(View):
         if not contact:
             return HttpResponse(status=404)
 
-        vcard = _user_to_vcard(contact)
+        vcard = _cached_vcards([contact])[contact.pk]
         response = HttpResponse(vcard, content_type="text/vcard; charset=utf-8")
         response["ETag"] = _user_etag(contact)
         return response
@@ -284,21 +421,8 @@ class CardDAVAddressbookView(View):
         Find a contact by its CardDAV filename.
         filename format: patient-42.vcf or practitioner-7.vcf
         """
-        if not filename:
-            return None
-        name = filename.replace(".vcf", "")
-        if name.startswith("patient-"):
-            role = "patient"
-            pk_str = name.replace("patient-", "")
-        elif name.startswith("practitioner-"):
-            role = "practitioner"
-            pk_str = name.replace("practitioner-", "")
-        else:
-            return None
-
-        try:
-            pk = int(pk_str)
-        except ValueError:
+        pk = _contact_pk_from_filename(filename)
+        if not pk:
             return None
 
         contacts = _get_visible_contacts(user)
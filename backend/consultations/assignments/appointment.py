@@ -1,9 +1,11 @@
+from collections import Counter
 from datetime import timedelta
 from zoneinfo import ZoneInfo
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 
+from ..availability import AvailabilityEngine
 from . import AssignmentException, BaseAssignmentHandler
 
 User = get_user_model()
@@ -61,132 +63,64 @@ class AssignmentHandler(BaseAssignmentHandler):
             return None
 
         # Find doctors with the required specialty
-        doctors = User.objects.filter(specialities=self.request.reason.speciality)
+        doctors = list(
+            User.objects.filter(specialities=self.request.reason.speciality)
+        )
 
-        if not doctors.exists():
+        if not doctors:
             return None
 
-        available_doctors = []
-        for doctor in doctors:
-            if self._is_doctor_available(doctor):
-                # Convert requested datetime to doctor's timezone to get the correct date
-                doctor_timezone = doctor.timezone or settings.TIME_ZONE
-                doctor_tz = ZoneInfo(doctor_timezone)
-                requested_datetime_in_doctor_tz = self.request.expected_at.astimezone(
-                    doctor_tz
-                )
-                request_date = requested_datetime_in_doctor_tz.date()
-
-                # Count appointments on the requested day. Includes the ones
-                # already held earlier today: they consumed the doctor's time
-                # just the same.
-                appointment_count = Appointment.objects.filter(
-                    consultation__owned_by=doctor,
-                    scheduled_at__date=request_date,
-                    status__in=[
-                        AppointmentStatus.scheduled,
-                        AppointmentStatus.completed,
-                    ],
-                ).count()
-
-                available_doctors.append((doctor, appointment_count))
+        engine = AvailabilityEngine(doctors, self.request.reason.duration)
+        available_doctors = [
+            doctor
+            for doctor in doctors
+            if self._is_doctor_available(doctor, engine=engine)
+        ]
 
         if not available_doctors:
             return None
 
+        # Count appointments on the requested day, in each doctor's timezone.
+        # Includes the ones already held earlier today: they consumed the
+        # doctor's time just the same.
+        requested_dates = {
+            doctor.pk: self.request.expected_at.astimezone(
+                ZoneInfo(doctor.timezone or settings.TIME_ZONE)
+            ).date()
+            for doctor in available_doctors
+        }
+        appointments = Appointment.objects.filter(
+            consultation__owned_by__in=available_doctors,
+            scheduled_at__date__in=set(requested_dates.values()),
+            status__in=[
+                AppointmentStatus.scheduled,
+                AppointmentStatus.completed,
+            ],
+        ).values_list("consultation__owned_by_id", "scheduled_at__date")
+        appointment_counts = Counter(
+            owner_id
+            for owner_id, scheduled_date in appointments
+            if requested_dates[owner_id] == scheduled_date
+        )
+
         # Return doctor with fewest appointments
-        available_doctors.sort(key=lambda x: x[1])
-        return available_doctors[0][0]
+        return min(available_doctors, key=lambda d: appointment_counts[d.pk])
 
-    def _is_doctor_available(self, doctor):
+    def _is_doctor_available(self, doctor, engine=None):
         """
         Check if a doctor is available at the requested time.
 
         Args:
             doctor: User instance of the doctor
+            engine: AvailabilityEngine shared across several doctors, so their
+                booking slots and appointments are loaded once
 
         Returns:
             bool: True if doctor is available, False otherwise
         """
-        from ..models import Appointment, AppointmentStatus, BookingSlot
-
-        # Convert requested datetime to doctor's timezone for comparison
-        # BookingSlot times are in the doctor's local timezone
-        requested_datetime = self.request.expected_at
-        doctor_timezone = doctor.timezone or settings.TIME_ZONE
-        doctor_tz = ZoneInfo(doctor_timezone)
-
-        # Convert to doctor's timezone for date/time extraction
-        requested_datetime_in_doctor_tz = requested_datetime.astimezone(doctor_tz)
-        requested_date = requested_datetime_in_doctor_tz.date()
-        requested_time = requested_datetime_in_doctor_tz.time()
-
-        # Get doctor's booking slots
-        booking_slots = BookingSlot.objects.filter(user=doctor)
-
-        # Check if any booking slot covers the requested time
-        for slot in booking_slots:
-            # Check if slot is valid for the requested date
-            if slot.valid_until and slot.valid_until <= requested_date:
-                continue
-
-            # Check day of week
-            weekday = requested_date.weekday()
-            day_enabled = self._is_day_enabled(slot, weekday)
-
-            if not day_enabled:
-                continue
-
-            # Check if time is within working hours
-            if not (slot.start_time <= requested_time <= slot.end_time):
-                continue
-
-            # Check break times
-            if (
-                slot.start_break
-                and slot.end_break
-                and slot.start_break <= requested_time <= slot.end_break
-            ):
-                continue
-
-            # Check for conflicts with existing appointments
-            end_time = requested_datetime + timedelta(
-                minutes=self.request.reason.duration
-            )
-
-            conflicts = Appointment.objects.filter(
-                consultation__owned_by=doctor,
-                scheduled_at__lt=end_time,
-                end_expected_at__gt=requested_datetime,
-                status=AppointmentStatus.scheduled,
-            ).exists()
-
-            if not conflicts:
-                return True
-
-        return False
-
-    def _is_day_enabled(self, slot, weekday):
-        """
-        Check if a booking slot is enabled for the given weekday.
-
-        Args:
-            slot: BookingSlot instance
-            weekday: Day of week (0=Monday, 6=Sunday)
-
-        Returns:
-            bool: True if day is enabled
-        """
-        day_mapping = {
-            0: slot.monday,
-            1: slot.tuesday,
-            2: slot.wednesday,
-            3: slot.thursday,
-            4: slot.friday,
-            5: slot.saturday,
-            6: slot.sunday,
-        }
-        return day_mapping.get(weekday, False)
+        if engine is None:
+            engine = AvailabilityEngine([doctor], self.request.reason.duration)
+        return engine.is_available(doctor, self.request.expected_at)
 
     def _create_appointment(self, consultation, doctor):
         """
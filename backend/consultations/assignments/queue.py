@@ -1,6 +1,4 @@
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
-from core.channel_groups import user_group
+from core.fanout import publish_to_users
 
 from . import BaseAssignmentHandler
 
@@ -43,10 +41,6 @@ class AssignmentHandler(BaseAssignmentHandler):
         if not consultation.group:
             return
 
-        channel_layer = get_channel_layer()
-        if not channel_layer:
-            return
-
         requester = self.request.created_by
         requester_name = ""
         if requester:
@@ -64,5 +58,6 @@ class AssignmentHandler(BaseAssignmentHandler):
             },
         }
 
-        for user in consultation.group.users.all():
-            async_to_sync(channel_layer.group_send)(user_group(user.pk), payload)
+        publish_to_users(
+            consultation.group.users.values_list("pk", flat=True), payload
+        )
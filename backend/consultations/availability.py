@@ -0,0 +1,306 @@
+"""Practitioner availability engine.
+
+The availability of a practitioner on a day is the working time described by
+their ``BookingSlot`` rows minus the time already taken by their appointments.
+Busy time is kept as a sorted list of merged intervals so a candidate slot is
+checked with a bisect instead of a scan over every appointment.
+
+The free slots of a (practitioner, day, duration) are cached. Entries are
+invalidated through a per-practitioner version, bumped by the signals whenever
+one of their booking slots, appointments or consultations changes, so an edit
+only drops the cache of the practitioner it concerns.
+"""
+
+import logging
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+AVAILABILITY_CACHE_TIMEOUT = 60 * 60
+# Upper bound of grid steps walked in one booking slot, as a guard against
+# misconfigured slots (same bound as the former inline loop).
+MAX_SLOT_ITERATIONS = 200
+
+
+def _current_schema() -> str:
+    return getattr(getattr(connection, "tenant", None), "schema_name", None) or "public"
+
+
+def _version_cache_key(practitioner_id) -> str:
+    return f"availability:version:{_current_schema()}:{practitioner_id}"
+
+
+def _slots_cache_key(practitioner_id, version, tz_name, day, duration) -> str:
+    return (
+        f"availability:slots:{_current_schema()}:{practitioner_id}:"
+        f"{version}:{tz_name}:{day.isoformat()}:{duration}"
+    )
+
+
+def invalidate_practitioner(practitioner_id):
+    """Drop every cached availability day of a practitioner."""
+    if not practitioner_id:
+        return
+    key = _version_cache_key(practitioner_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # No version yet: any value differing from the default 0 will do.
+        cache.set(key, 1, None)
+
+
+def is_day_enabled(booking_slot, weekday):
+    """Whether a booking slot is open on ``weekday`` (0=Monday, 6=Sunday)."""
+    return (
+        booking_slot.monday,
+        booking_slot.tuesday,
+        booking_slot.wednesday,
+        booking_slot.thursday,
+        booking_slot.friday,
+        booking_slot.saturday,
+        booking_slot.sunday,
+    )[weekday]
+
+
+def is_slot_open_on(booking_slot, day):
+    if booking_slot.valid_until and booking_slot.valid_until <= day:
+        return False
+    return is_day_enabled(booking_slot, day.weekday())
+
+
+def has_break(booking_slot):
+    return bool(
+        booking_slot.start_break
+        and booking_slot.end_break
+        and booking_slot.start_break < booking_slot.end_break
+    )
+
+
+def grid_slots(booking_slot, day, duration):
+    """Yield the (start_time, end_time) candidate slots of a booking slot.
+
+    Slots are laid on a grid of ``duration`` minutes from the slot start; a
+    slot overlapping the break restarts the grid at the end of the break.
+    """
+    if booking_slot.start_time >= booking_slot.end_time:
+        return
+    if not is_slot_open_on(booking_slot, day):
+        return
+
+    current_time = booking_slot.start_time
+    end_time = booking_slot.end_time
+    step = timedelta(minutes=duration)
+
+    for _ in range(MAX_SLOT_ITERATIONS):
+        if current_time >= end_time:
+            return
+        slot_end_datetime = datetime.combine(day, current_time) + step
+        if slot_end_datetime.date() != day:
+            return
+        slot_end_time = slot_end_datetime.time()
+        if slot_end_time > end_time:
+            return
+
+        if (
+            has_break(booking_slot)
+            and current_time < booking_slot.end_break
+            and slot_end_time > booking_slot.start_break
+        ):
+            if booking_slot.end_break >= end_time:
+                return
+            current_time = booking_slot.end_break
+            continue
+
+        yield current_time, slot_end_time
+        current_time = slot_end_time
+
+
+def merge_intervals(intervals):
+    """Sort and merge overlapping (start, end) intervals."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def overlaps(busy, start, end):
+    """Whether [start, end) overlaps any interval of the merged ``busy`` list."""
+    # Merged intervals have increasing ends too, so the first interval ending
+    # after ``start`` is the only candidate.
+    index = bisect_right(busy, (start, start))
+    if index and busy[index - 1][1] > start:
+        return True
+    return index < len(busy) and busy[index][0] < end
+
+
+def practitioner_tz_name(practitioner):
+    return practitioner.timezone or settings.TIME_ZONE
+
+
+class AvailabilityEngine:
+    """Free/busy computation for a set of practitioners and a slot duration.
+
+    Booking slots and appointments are loaded once for every practitioner,
+    with one query each, instead of once per practitioner and per slot.
+    """
+
+    def __init__(self, practitioners, duration):
+        self.practitioners = {p.pk: p for p in practitioners}
+        self.duration = duration
+        self._booking_slots = None
+        self._busy = None
+        self._conflicts = None
+        self._busy_range = None
+
+    def _load_booking_slots(self, practitioner_ids):
+        from .models import BookingSlot
+
+        booking_slots = defaultdict(list)
+        for booking_slot in BookingSlot.objects.filter(user_id__in=practitioner_ids):
+            booking_slots[booking_slot.user_id].append(booking_slot)
+        return booking_slots
+
+    def _load_busy(self, practitioner_ids, start_day, end_day):
+        """Merged busy and conflicting intervals per practitioner for
+        [start_day, end_day].
+
+        Busy intervals hide grid slots: held appointments still occupy their
+        slot, so completed ones count too, and an appointment without an
+        expected end lasts one slot. Conflicts block an assignment: only
+        scheduled appointments with an expected end, as assignment always
+        did. The range is padded by a day on each side so appointments
+        crossing midnight in the practitioner's timezone are caught.
+        """
+        from .models import Appointment, AppointmentStatus
+
+        utc = ZoneInfo("UTC")
+        range_start = datetime.combine(start_day - timedelta(days=1), datetime.min.time(), utc)
+        range_end = datetime.combine(end_day + timedelta(days=2), datetime.min.time(), utc)
+        appointments = Appointment.objects.filter(
+            consultation__owned_by_id__in=practitioner_ids,
+            scheduled_at__gte=range_start,
+            scheduled_at__lt=range_end,
+            status__in=[AppointmentStatus.scheduled, AppointmentStatus.completed],
+        ).values_list(
+            "consultation__owned_by_id", "scheduled_at", "end_expected_at", "status"
+        )
+
+        intervals = defaultdict(list)
+        conflicts = defaultdict(list)
+        for owner_id, scheduled_at, end_expected_at, status in appointments:
+            end = end_expected_at or scheduled_at + timedelta(minutes=self.duration)
+            intervals[owner_id].append((scheduled_at, end))
+            if status == AppointmentStatus.scheduled and end_expected_at:
+                conflicts[owner_id].append((scheduled_at, end_expected_at))
+        return (
+            {pid: merge_intervals(items) for pid, items in intervals.items()},
+            {pid: merge_intervals(items) for pid, items in conflicts.items()},
+        )
+
+    def _ensure_loaded(self, days):
+        start_day, end_day = min(days), max(days)
+        if self._booking_slots is None:
+            self._booking_slots = self._load_booking_slots(list(self.practitioners))
+        if (
+            self._busy is None
+            or start_day < self._busy_range[0]
+            or end_day > self._busy_range[1]
+        ):
+            self._busy, self._conflicts = self._load_busy(
+                list(self.practitioners), start_day, end_day
+            )
+            self._busy_range = (start_day, end_day)
+
+    def _compute_free_slots(self, practitioner, day):
+        tz = ZoneInfo(practitioner_tz_name(practitioner))
+        busy = self._busy.get(practitioner.pk, [])
+        free = set()
+        for booking_slot in self._booking_slots.get(practitioner.pk, []):
+            for start_time, end_time in grid_slots(booking_slot, day, self.duration):
+                start = datetime.combine(day, start_time, tz)
+                if not overlaps(busy, start, start + timedelta(minutes=self.duration)):
+                    free.add((start_time, end_time))
+        return sorted(free)
+
+    def free_slots(self, days):
+        """Return ``{(practitioner_id, day): [(start_time, end_time), ...]}``.
+
+        Times are naive, in the practitioner's timezone. Cached days are read
+        with one ``get_many``; only the missing ones are computed.
+        """
+        days = list(days)
+        if not days or not self.practitioners:
+            return {}
+
+        version_keys = {_version_cache_key(pid): pid for pid in self.practitioners}
+        versions = {
+            version_keys[key]: value
+            for key, value in cache.get_many(version_keys.keys()).items()
+        }
+
+        keys = {}
+        for pid, practitioner in self.practitioners.items():
+            tz_name = practitioner_tz_name(practitioner)
+            for day in days:
+                key = _slots_cache_key(
+                    pid, versions.get(pid, 0), tz_name, day, self.duration
+                )
+                keys[key] = (pid, day)
+
+        cached = cache.get_many(keys.keys())
+        result = {keys[key]: value for key, value in cached.items()}
+
+        missing = {key: target for key, target in keys.items() if key not in cached}
+        if missing:
+            self._ensure_loaded([day for _, day in missing.values()])
+            computed = {}
+            for key, (pid, day) in missing.items():
+                slots = self._compute_free_slots(self.practitioners[pid], day)
+                computed[key] = slots
+                result[(pid, day)] = slots
+            cache.set_many(computed, AVAILABILITY_CACHE_TIMEOUT)
+
+        return result
+
+    def is_available(self, practitioner, start):
+        """Whether ``practitioner`` can take an appointment starting at ``start``.
+
+        The start must fall within the working hours of one of their booking
+        slots (outside the break) and the appointment must not overlap
+        another scheduled one.
+        """
+        local_start = start.astimezone(ZoneInfo(practitioner_tz_name(practitioner)))
+        day, requested_time = local_start.date(), local_start.time()
+        self._ensure_loaded([day])
+
+        in_working_hours = False
+        for booking_slot in self._booking_slots.get(practitioner.pk, []):
+            if not is_slot_open_on(booking_slot, day):
+                continue
+            if not booking_slot.start_time <= requested_time <= booking_slot.end_time:
+                continue
+            if (
+                booking_slot.start_break
+                and booking_slot.end_break
+                and booking_slot.start_break <= requested_time <= booking_slot.end_break
+            ):
+                continue
+            in_working_hours = True
+            break
+
+        if not in_working_hours:
+            return False
+
+        conflicts = self._conflicts.get(practitioner.pk, [])
+        return not overlaps(conflicts, start, start + timedelta(minutes=self.duration))
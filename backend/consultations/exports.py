@@ -0,0 +1,208 @@
+"""Consultation PDF exports, rendered in the background and kept in storage.
+
+Rendering a long consultation takes seconds and holds every message and
+image in memory, so it is done by the ``export_consultation_pdf`` task. The
+PDF is written to a temporary file and saved to the default storage under a
+name derived from the consultation's last modification (and from the
+organisation whose branding it carries); as long as nothing changes, every
+download streams that file without rendering again. Saving a new version
+deletes the older ones, and deleting the consultation deletes them all.
+
+Pending and failed renders are tracked in the cache. ``stream_zip`` bundles
+stored exports into a ZIP archive produced chunk by chunk.
+"""
+
+import hashlib
+import io
+import tempfile
+import zipfile
+
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import Count, Max
+from django.utils.text import slugify
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+EXPORT_STATUS_TIMEOUT = 60 * 60
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+def _export_dir(consultation_pk, schema_name=None):
+    schema_name = schema_name or connection.schema_name
+    return f"{schema_name}/exports/consultations/{consultation_pk}"
+
+
+def delete_exports(consultation_pk, keep=None, schema_name=None):
+    """Delete the stored exports of a consultation, except ``keep``."""
+    directory = _export_dir(consultation_pk, schema_name)
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for filename in files:
+        name = f"{directory}/{filename}"
+        if name != keep:
+            default_storage.delete(name)
+            cache.delete(_status_key(name))
+
+
+def export_name(consultation, organisation):
+    """Storage name of the export matching the current state of the data.
+
+    The version is the latest modification of the consultation and of its
+    appointments, messages and reminders. Row counts are part of it so that
+    a deleted appointment or reminder, which leaves no timestamp behind,
+    still changes it.
+    """
+    appointments = consultation.appointments.aggregate(
+        last=Max("updated_at"),
+        count=Count("pk", distinct=True),
+        participants=Count("participant"),
+    )
+    messages = consultation.messages.aggregate(last=Max("updated_at"))
+    reminders = consultation.reminders.aggregate(
+        last=Max("updated_at"), count=Count("pk")
+    )
+    stamps = [
+        consultation.updated_at,
+        appointments.pop("last"),
+        messages["last"],
+        reminders.pop("last"),
+    ]
+    parts = [max(s for s in stamps if s).isoformat(), appointments, reminders]
+    if organisation:
+        parts += [
+            organisation.pk,
+            organisation.name,
+            organisation.primary_color_practitioner,
+            organisation.footer_practitioner,
+            organisation.logo_color.name if organisation.logo_color else "",
+        ]
+    version = hashlib.sha256(repr(parts).encode()).hexdigest()[:20]
+    return f"{_export_dir(consultation.pk)}/{version}.pdf"
+
+
+def download_filename(consultation):
+    filename = f"consultation_{consultation.pk}"
+    title_slug = slugify(consultation.title or "")
+    if title_slug:
+        filename += f"_{title_slug}"
+    return f"{filename}.pdf"
+
+
+def _status_key(name):
+    return f"consultations:pdf-export:{name}"
+
+
+def export_status(name):
+    """READY, PENDING, FAILED, or None when no export was requested."""
+    status = cache.get(_status_key(name))
+    if status != READY and default_storage.exists(name):
+        status = READY
+        cache.set(_status_key(name), READY, EXPORT_STATUS_TIMEOUT)
+    return status
+
+
+def request_export(consultation, organisation, name):
+    """Enqueue the render of ``name`` unless it is already stored or pending."""
+    from .tasks import export_consultation_pdf
+
+    status = export_status(name)
+    if status is not None:
+        return status
+    if cache.add(_status_key(name), PENDING, EXPORT_STATUS_TIMEOUT):
+        export_consultation_pdf.delay(
+            consultation.pk, organisation.pk if organisation else None, name
+        )
+    return PENDING
+
+
+def clear_failure(name):
+    """Forget a failed render so that the next request enqueues it again."""
+    cache.delete(_status_key(name))
+
+
+def render_export(consultation, organisation, name):
+    """Render the PDF of ``consultation`` and save it under ``name``."""
+    from .pdf_export import generate_consultation_pdf
+
+    if default_storage.exists(name):
+        cache.set(_status_key(name), READY, EXPORT_STATUS_TIMEOUT)
+        return
+
+    appointments = (
+        consultation.appointments.all()
+        .prefetch_related("participant_set__user")
+        .select_related("created_by")
+        .order_by("scheduled_at")
+    )
+    messages = (
+        consultation.messages.filter(deleted_at__isnull=True)
+        .select_related("created_by")
+        .order_by("created_at")
+    )
+    reminders = (
+        consultation.reminders.all()
+        .select_related("recipient", "created_by")
+        .order_by("scheduled_at")
+    )
+
+    try:
+        with tempfile.TemporaryFile() as output:
+            generate_consultation_pdf(
+                consultation=consultation,
+                appointments=appointments,
+                messages=messages,
+                reminders=reminders,
+                organisation=organisation,
+                output=output,
+            )
+            output.seek(0)
+            default_storage.save(name, File(output, name=name))
+    except Exception:
+        cache.set(_status_key(name), FAILED, EXPORT_STATUS_TIMEOUT)
+        raise
+    cache.set(_status_key(name), READY, EXPORT_STATUS_TIMEOUT)
+    # Older versions hold outdated medical data and are never served again.
+    delete_exports(consultation.pk, keep=name)
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only stream collecting what ``zipfile`` writes until drained."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(entries):
+    """Yield a ZIP archive of ``(filename, storage name)`` entries in chunks.
+
+    Only one chunk of one export is held in memory at a time.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as archive:
+        for filename, name in entries:
+            with default_storage.open(name, "rb") as source:
+                with archive.open(filename, "w", force_zip64=True) as target:
+                    while chunk := source.read(EXPORT_CHUNK_SIZE):
+                        target.write(chunk)
+                        yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
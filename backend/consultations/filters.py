@@ -1,37 +1,27 @@
 import django_filters
-from datetime import datetime
-from zoneinfo import ZoneInfo
 from .models import (
     Consultation,
     Appointment,
     ConsultationReadStatus,
-    Message,
     Reminder,
     Request,
 )
 from .utils import appointment_active_q
-from django.db.models import Exists, OuterRef, Subquery, Value
-from django.db.models.functions import Coalesce
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
 
-EPOCH = datetime(1970, 1, 1, tzinfo=ZoneInfo("UTC"))
-
 
 def has_unread_messages(user):
     """Exists() subquery: the consultation has at least one message unread by
-    ``user`` (created after the user's last read, by someone else, not deleted).
+    ``user``, read from the user's unread counter (see consultations.unread).
     Mirrors annotate_unread_count() in views.py.
     """
-    last_read_sq = ConsultationReadStatus.objects.filter(
-        consultation=OuterRef("pk"),
-        user=user,
-    ).values("last_read_at")[:1]
     return Exists(
-        Message.objects.filter(
+        ConsultationReadStatus.objects.filter(
             consultation=OuterRef("pk"),
-            deleted_at__isnull=True,
-            created_at__gt=Coalesce(Subquery(last_read_sq), Value(EPOCH)),
-        ).exclude(created_by=user)
+            user=user,
+            unread_count__gt=0,
+        )
     )
 
 
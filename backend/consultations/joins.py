@@ -0,0 +1,77 @@
+"""Join fast path for calls.
+
+Clients call the join endpoints again on every reconnect, so a flaky network
+on one side of a call used to issue a new media token, broadcast
+"participant joined" and post a system message to the chat each time.
+
+- The join info (media server URL and token) issued to a user for a room is
+  reused while the room stays on the same server and the token keeps enough
+  validity (``join_info_ttl`` of the media server manager).
+- Presence is kept per room and user: only a join of someone not already in
+  the call, or a leave of someone who is, is announced. Presence expires after
+  ``CALL_PRESENCE_TTL`` seconds without a join, so a user whose client never
+  called leave is announced again when coming back later.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.fanout import publish_to_users
+
+
+def _info_key(room_uuid, user_pk) -> str:
+    return f"join:info:{room_uuid}:{user_pk}"
+
+
+def _presence_key(room_uuid, user_pk) -> str:
+    return f"join:presence:{room_uuid}:{user_pk}"
+
+
+def join_info(server, room_uuid, user, build) -> dict:
+    """Join info of ``user`` for the room, reused across reconnects.
+
+    ``build`` issues new info on ``server``. Info issued by another server
+    (the room was moved off an unhealthy one) is never reused.
+    """
+    ttl = server.instance.join_info_ttl
+    if not ttl:
+        return build()
+    key = _info_key(room_uuid, user.pk)
+    session = cache.get(key)
+    if session and session["server"] == server.pk:
+        return session["info"]
+    info = build()
+    cache.set(key, {"server": server.pk, "info": info}, timeout=ttl)
+    return info
+
+
+def mark_joined(room_uuid, user_pk) -> bool:
+    """Record that the user is in the call; True when they were not yet."""
+    key = _presence_key(room_uuid, user_pk)
+    if cache.add(key, True, timeout=settings.CALL_PRESENCE_TTL):
+        return True
+    cache.touch(key, settings.CALL_PRESENCE_TTL)
+    return False
+
+
+def mark_left(room_uuid, user_pk) -> bool:
+    """Record that the user left the call; True when they were in it."""
+    return cache.delete(_presence_key(room_uuid, user_pk))
+
+
+def announce(appointment, user, state, participant_user_ids):
+    """Send the ``participant_joined``/``participant_left`` event of ``user``
+    to the other participants, in one hop once the transaction commits."""
+    publish_to_users(
+        (pk for pk in participant_user_ids if pk != user.pk),
+        {
+            "type": "appointment",
+            "consultation_id": appointment.consultation_id,
+            "appointment_id": appointment.pk,
+            "state": state,
+            "data": {
+                "user_id": user.pk,
+                "user_name": user.name or user.email,
+            },
+        },
+    )
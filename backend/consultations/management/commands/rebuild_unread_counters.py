@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from consultations import unread
+from consultations.models import Consultation
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-user unread message counters from the messages "
+        "(run per tenant, e.g. through all_tenants_command)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--consultation", type=int, action="append", dest="consultations",
+            help="Only rebuild this consultation (can be repeated)",
+        )
+
+    def handle(self, *args, **options):
+        consultations = Consultation.objects.all()
+        if options["consultations"]:
+            consultations = consultations.filter(pk__in=options["consultations"])
+
+        updated = unread.rebuild(consultations)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {updated} unread counters"))
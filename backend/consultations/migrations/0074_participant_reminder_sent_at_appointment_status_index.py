@@ -0,0 +1,27 @@
+# Generated by Django 5.2.11 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0073_customfield_name_ar_queue_name_ar_reason_name_ar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participant',
+            name='first_reminder_sent_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='first reminder sent at'),
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='last_reminder_sent_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='last reminder sent at'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'scheduled_at'], name='appt_status_sched_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.11 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+
+def rebuild_unread_counts(apps, schema_editor):
+    """Populate unread_count for existing read statuses from their messages."""
+    from consultations import unread
+    from consultations.models import Consultation
+
+    unread.rebuild(Consultation.objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consultations', '0074_participant_reminder_sent_at_appointment_status_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consultationreadstatus',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='unread count'),
+        ),
+        migrations.RunPython(rebuild_unread_counts, migrations.RunPython.noop),
+    ]
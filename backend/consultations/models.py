@@ -181,6 +181,9 @@ class Consultation(models.Model):
             "Hidden from native API; exposed only via FHIR identifier array."
         ),
     )
+    # Lets list endpoints prefetch custom field values; also drops them with
+    # the consultation.
+    custom_field_values = GenericRelation("CustomFieldValue")
 
     objects = ConsultationManager()
 
@@ -290,6 +293,10 @@ class Appointment(models.Model):
                 fields=["updated_at", "scheduled_at"],
                 name="appt_updat_sched_idx",
             ),
+            models.Index(
+                fields=["status", "scheduled_at"],
+                name="appt_status_sched_idx",
+            ),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -369,6 +376,12 @@ class Participant(models.Model):
         blank=True,
         help_text=_("First time this participant actually joined the call."),
     )
+    first_reminder_sent_at = models.DateTimeField(
+        _("first reminder sent at"), null=True, blank=True
+    )
+    last_reminder_sent_at = models.DateTimeField(
+        _("last reminder sent at"), null=True, blank=True
+    )
 
     @property
     def status(self):
@@ -532,6 +545,7 @@ class ConsultationReadStatus(models.Model):
         verbose_name=_("user"),
     )
     last_read_at = models.DateTimeField(_("last read at"))
+    unread_count = models.PositiveIntegerField(_("unread count"), default=0)
 
     class Meta:
         verbose_name = _("consultation read status")
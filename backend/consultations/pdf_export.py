@@ -167,6 +167,18 @@ MAX_IMAGE_WIDTH = 120 * mm
 MAX_IMAGE_HEIGHT = 80 * mm
 
 
+def _image_source(field_file):
+    """Local path of an image file, or its content when the storage is remote."""
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        with field_file.open("rb") as f:
+            return io.BytesIO(f.read())
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    return path
+
+
 def _get_attachment_image(attachment):
     if not attachment:
         return None
@@ -174,10 +186,7 @@ def _get_attachment_image(attachment):
         ext = os.path.splitext(attachment.name)[1].lower()
         if ext not in IMAGE_EXTENSIONS:
             return None
-        path = attachment.path
-        if not os.path.exists(path):
-            return None
-        img = Image(path)
+        img = Image(_image_source(attachment))
         iw, ih = img.drawWidth, img.drawHeight
         if iw > MAX_IMAGE_WIDTH:
             ratio = MAX_IMAGE_WIDTH / iw
@@ -196,9 +205,10 @@ def _get_attachment_image(attachment):
 
 
 def generate_consultation_pdf(
-    consultation, appointments, messages, organisation, reminders=None
+    consultation, appointments, messages, organisation, reminders=None, output=None
 ):
-    buffer = io.BytesIO()
+    """Render the consultation report into ``output`` (a new BytesIO if None)."""
+    buffer = io.BytesIO() if output is None else output
     primary_color = organisation.primary_color_practitioner if organisation else None
     styles = _build_styles(primary_color)
 
@@ -467,7 +477,7 @@ def _add_messages(elements, styles, messages):
         elements.append(Paragraph("No messages", styles["InfoValue"]))
         return
 
-    for msg in messages:
+    for msg in messages.iterator(chunk_size=200):
         author = _format_user(msg.created_by)
         time_str = _format_datetime(msg.created_at)
         edited = " (edited)" if msg.is_edited else ""
@@ -0,0 +1,144 @@
+"""Delivery of appointment recordings from the LiveKit S3 bucket.
+
+A single S3 client, with its connection pool, is shared by every request and
+task of the process (boto3 clients are thread-safe). Recordings are either
+redirected to a short-lived presigned URL, once Django has checked access
+(``RECORDING_DELIVERY = "redirect"``), or proxied with support for ``Range``
+and ``If-Range`` so that video players can seek without downloading the
+file from the start.
+"""
+
+import re
+import threading
+from datetime import datetime, timezone
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+
+RECORDING_CHUNK_SIZE = 256 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def s3_client():
+    """The process-wide client of the recordings bucket."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = boto3.session.Session().client(
+                    "s3",
+                    endpoint_url=settings.LIVEKIT_S3_ENDPOINT_URL,
+                    aws_access_key_id=settings.LIVEKIT_S3_ACCESS_KEY,
+                    aws_secret_access_key=settings.LIVEKIT_S3_SECRET_KEY,
+                    region_name=settings.LIVEKIT_S3_REGION,
+                    config=Config(
+                        signature_version="s3v4",
+                        max_pool_connections=settings.RECORDING_S3_MAX_POOL_CONNECTIONS,
+                        retries={"max_attempts": 3, "mode": "standard"},
+                    ),
+                )
+    return _client
+
+
+def _requested_range(request):
+    """The single byte range asked for, as an S3 ``Range``, or None.
+
+    Multiple ranges are not supported; the whole file is sent instead, as
+    RFC 9110 allows.
+    """
+    match = _RANGE_RE.match(request.META.get("HTTP_RANGE", "").strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if start and end and int(end) < int(start):
+        return None
+    return f"bytes={start}-{end}"
+
+
+def _if_range_conditions(request):
+    """``get_object`` preconditions that make the range valid, per If-Range."""
+    if_range = request.META.get("HTTP_IF_RANGE", "").strip()
+    if not if_range:
+        return {}
+    if if_range.startswith(('"', "W/")):
+        return {"IfMatch": if_range}
+    timestamp = parse_http_date_safe(if_range)
+    if timestamp is None:
+        return None
+    return {"IfUnmodifiedSince": datetime.fromtimestamp(timestamp, tz=timezone.utc)}
+
+
+def _error_code(error):
+    return error.response.get("Error", {}).get("Code")
+
+
+def _iter_body(body):
+    try:
+        yield from body.iter_chunks(chunk_size=RECORDING_CHUNK_SIZE)
+    finally:
+        body.close()
+
+
+def serve_recording(request, key):
+    """Response delivering the recording stored under ``key``."""
+    client = s3_client()
+    filename = key.split("/")[-1]
+    disposition = f'attachment; filename="{filename}"'
+
+    if settings.RECORDING_DELIVERY == "redirect":
+        url = client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": settings.LIVEKIT_S3_BUCKET_NAME,
+                "Key": key,
+                "ResponseContentDisposition": disposition,
+            },
+            ExpiresIn=settings.RECORDING_PRESIGNED_URL_TTL,
+        )
+        return HttpResponseRedirect(url)
+
+    params = {"Bucket": settings.LIVEKIT_S3_BUCKET_NAME, "Key": key}
+    byte_range = _requested_range(request)
+    conditions = _if_range_conditions(request) if byte_range else {}
+    if byte_range and conditions is not None:
+        params.update(conditions, Range=byte_range)
+
+    try:
+        obj = client.get_object(**params)
+    except ClientError as e:
+        code = _error_code(e)
+        if code == "PreconditionFailed":
+            # If-Range did not match: the whole current file is sent.
+            params = {"Bucket": params["Bucket"], "Key": key}
+            obj = client.get_object(**params)
+        elif code == "InvalidRange":
+            head = client.head_object(Bucket=params["Bucket"], Key=key)
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{head['ContentLength']}"
+            return response
+        else:
+            raise
+
+    response = StreamingHttpResponse(
+        _iter_body(obj["Body"]),
+        status=206 if "ContentRange" in obj else 200,
+        content_type=obj.get("ContentType", "video/mp4"),
+    )
+    response["Content-Disposition"] = disposition
+    response["Content-Length"] = obj["ContentLength"]
+    response["Accept-Ranges"] = "bytes"
+    if "ContentRange" in obj:
+        response["Content-Range"] = obj["ContentRange"]
+    if obj.get("ETag"):
+        response["ETag"] = obj["ETag"]
+    if obj.get("LastModified"):
+        response["Last-Modified"] = http_date(obj["LastModified"].timestamp())
+    return response
@@ -7,12 +7,13 @@ logger = logging.getLogger(__name__)
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 from users.models import CommunicationMethod, Language, Speciality
+from users.services import user_online_service
 
 from .models import (
     Appointment,
@@ -31,6 +32,7 @@ from .models import (
     Request,
     Type,
 )
+from .unread import last_read_at
 
 User = get_user_model()
 
@@ -94,12 +96,20 @@ class CustomFieldsMixin(serializers.Serializer):
             ret["_custom_fields_data"] = write_serializer.validated_data
         return ret
 
-    def to_representation(self, instance):
-        ret = super().to_representation(instance)
+    def _get_custom_field_values(self, instance):
+        # Read from the prefetch cache when the queryset prefetched the
+        # `custom_field_values` generic relation (see
+        # ConsultationSerializer.prefetch_queryset).
+        if "custom_field_values" in getattr(instance, "_prefetched_objects_cache", {}):
+            return instance.custom_field_values.all()
         ct = self._get_content_type(instance.__class__)
-        values = CustomFieldValue.objects.filter(
+        return CustomFieldValue.objects.filter(
             content_type=ct, object_id=instance.pk
         ).select_related("custom_field")
+
+    def to_representation(self, instance):
+        ret = super().to_representation(instance)
+        values = self._get_custom_field_values(instance)
         ret["custom_fields"] = CustomFieldValueReadSerializer(values, many=True).data
         return ret
 
@@ -122,6 +132,15 @@ class ConsultationSpecialitySerializer(serializers.ModelSerializer):
         fields = ["id", "name"]
 
 
+class OnlineStatusListSerializer(serializers.ListSerializer):
+    """List serializer resolving ``is_online`` for the whole list at once."""
+
+    def to_representation(self, data):
+        iterable = data.all() if hasattr(data, "all") else data
+        users = user_online_service.prime_users(list(iterable))
+        return [self.child.to_representation(user) for user in users]
+
+
 class ConsultationUserSerializer(serializers.ModelSerializer):
     specialities = ConsultationSpecialitySerializer(many=True, read_only=True)
     is_online = serializers.BooleanField(read_only=True)
@@ -146,6 +165,7 @@ class ConsultationUserSerializer(serializers.ModelSerializer):
             "public_key_fingerprint",
         ]
         read_only_field = fields
+        list_serializer_class = OnlineStatusListSerializer
 
 
 class QueueSerializer(serializers.ModelSerializer):
@@ -204,6 +224,11 @@ class ParticipantReadSerializer(serializers.ModelSerializer):
         """
         if not obj.user_id or not obj.appointment.consultation_id:
             return False
+        appointment = obj.appointment
+        if Appointment.consultation.is_cached(appointment):
+            direct_keys = getattr(appointment.consultation, "_direct_keys", None)
+            if direct_keys is not None:
+                return any(key.user_id == obj.user_id for key in direct_keys)
         from .models import ConsultationKey
 
         return ConsultationKey.objects.filter(
@@ -439,6 +464,85 @@ class ConsultationSerializer(CustomFieldsMixin, serializers.ModelSerializer):
             data.pop("notes", None)
         return data
 
+    @classmethod
+    def prefetch_queryset(cls, queryset, user):
+        """Load everything the serializer reads for a page in a fixed number
+        of queries, whatever the page size.
+
+        The serializer methods read these prefetches when present and fall
+        back to per-object queries otherwise (e.g. nested serializers).
+        """
+        from .models import ConsultationKey, QueueMembership
+        from .utils import appointment_active_q
+
+        user_prefetches = ("specialities", "languages")
+        participants = Participant.objects.select_related("user").prefetch_related(
+            *(f"user__{name}" for name in user_prefetches)
+        )
+        appointments = (
+            Appointment.objects.exclude(status=AppointmentStatus.cancelled)
+            .select_related("created_by")
+            .prefetch_related(
+                *(f"created_by__{name}" for name in user_prefetches),
+                Prefetch("participant_set", queryset=participants),
+            )
+            .order_by("scheduled_at")
+        )
+        member_queue_ids = QueueMembership.objects.filter(user=user).values("queue_id")
+
+        return queryset.select_related(
+            "created_by", "owned_by", "beneficiary", "group"
+        ).prefetch_related(
+            *(
+                f"{relation}__{name}"
+                for relation in ("created_by", "owned_by", "beneficiary", "group__users")
+                for name in user_prefetches
+            ),
+            Prefetch(
+                "appointments",
+                queryset=appointments.filter(appointment_active_q()),
+                to_attr="_active_appointments",
+            ),
+            Prefetch(
+                "appointments",
+                queryset=appointments.filter(scheduled_at__gte=timezone.now()),
+                to_attr="_upcoming_appointments",
+            ),
+            Prefetch(
+                "keys",
+                queryset=ConsultationKey.objects.filter(
+                    Q(user=user) | Q(queue_id__in=member_queue_ids)
+                ),
+                to_attr="_visible_keys",
+            ),
+            Prefetch(
+                "keys",
+                queryset=ConsultationKey.objects.filter(user__isnull=False).only(
+                    "id", "consultation_id", "user_id"
+                ),
+                to_attr="_direct_keys",
+            ),
+            Prefetch(
+                "custom_field_values",
+                queryset=CustomFieldValue.objects.select_related("custom_field"),
+            ),
+        )
+
+    def _queue_envelopes(self, user):
+        """``{queue_id: encrypted_queue_private_key}`` for the user's queue
+        memberships, loaded once per serialization and shared by every item."""
+        envelopes = self.context.get("_queue_envelopes")
+        if envelopes is None:
+            from .models import QueueMembership
+
+            envelopes = dict(
+                QueueMembership.objects.filter(user=user).values_list(
+                    "queue_id", "encrypted_queue_private_key"
+                )
+            )
+            self.context["_queue_envelopes"] = envelopes
+        return envelopes
+
     def get_keys(self, obj):
         """Return the ConsultationKey rows the current user can use to
         decrypt the consultation: their own direct envelope, plus any
@@ -447,20 +551,14 @@ class ConsultationSerializer(CustomFieldsMixin, serializers.ModelSerializer):
         request = self.context.get("request")
         if not request or not request.user.is_authenticated:
             return []
-        from .models import QueueMembership
 
         user_pk = request.user.pk
-        member_queue_ids = list(
-            QueueMembership.objects.filter(user=request.user).values_list(
-                "queue_id", flat=True
-            )
-        )
-        keys_qs = obj.keys.filter(
-            Q(user_id=user_pk)
-            | Q(queue_id__in=member_queue_ids)
-        )
+        envelopes = self._queue_envelopes(request.user)
+        keys = getattr(obj, "_visible_keys", None)
+        if keys is None:
+            keys = obj.keys.filter(Q(user_id=user_pk) | Q(queue_id__in=list(envelopes)))
         result = []
-        for key in keys_qs:
+        for key in keys:
             entry = {
                 "encrypted_private_key": key.encrypted_private_key,
                 "pubkey_fingerprint": key.pubkey_fingerprint,
@@ -469,17 +567,8 @@ class ConsultationSerializer(CustomFieldsMixin, serializers.ModelSerializer):
                 entry["user_id"] = key.user_id
             if key.queue_id:
                 entry["queue_id"] = key.queue_id
-                membership = (
-                    QueueMembership.objects.filter(
-                        queue_id=key.queue_id, user=request.user
-                    )
-                    .only("encrypted_queue_private_key")
-                    .first()
-                )
-                if membership and membership.encrypted_queue_private_key:
-                    entry["queue_membership_envelope"] = (
-                        membership.encrypted_queue_private_key
-                    )
+                if envelopes.get(key.queue_id):
+                    entry["queue_membership_envelope"] = envelopes[key.queue_id]
             result.append(entry)
         return result
 
@@ -571,12 +660,16 @@ class ConsultationSerializer(CustomFieldsMixin, serializers.ModelSerializer):
 
     def get_next_appointment(self, obj):
         """Get the next non-cancelled appointment for this consultation."""
-        next_appt = (
-            obj.appointments.exclude(status=AppointmentStatus.cancelled)
-            .filter(scheduled_at__gte=timezone.now())
-            .order_by("scheduled_at")
-            .first()
-        )
+        if hasattr(obj, "_upcoming_appointments"):
+            upcoming = obj._upcoming_appointments
+            next_appt = upcoming[0] if upcoming else None
+        else:
+            next_appt = (
+                obj.appointments.exclude(status=AppointmentStatus.cancelled)
+                .filter(scheduled_at__gte=timezone.now())
+                .order_by("scheduled_at")
+                .first()
+            )
 
         if next_appt:
             return AppointmentSerializer(next_appt, context=self.context).data
@@ -584,13 +677,16 @@ class ConsultationSerializer(CustomFieldsMixin, serializers.ModelSerializer):
 
     def get_appointments(self, obj):
         """Get all non-cancelled appointments still within the active window."""
-        from .utils import appointment_active_q
+        if hasattr(obj, "_active_appointments"):
+            appts = obj._active_appointments
+        else:
+            from .utils import appointment_active_q
 
-        appts = (
-            obj.appointments.exclude(status=AppointmentStatus.cancelled)
-            .filter(appointment_active_q())
-            .order_by("scheduled_at")
-        )
+            appts = (
+                obj.appointments.exclude(status=AppointmentStatus.cancelled)
+                .filter(appointment_active_q())
+                .order_by("scheduled_at")
+            )
         return AppointmentSerializer(appts, many=True, context=self.context).data
 
     def get_unread_count(self, obj):
@@ -605,20 +701,12 @@ class ConsultationSerializer(CustomFieldsMixin, serializers.ModelSerializer):
         read_status = ConsultationReadStatus.objects.filter(
             consultation=obj, user=request.user
         ).first()
-        qs = obj.messages.exclude(created_by=request.user).filter(deleted_at__isnull=True)
-        if read_status:
-            qs = qs.filter(created_at__gt=read_status.last_read_at)
-        return qs.count()
+        return read_status.unread_count if read_status else 0
 
     def get_last_read_at(self, obj):
         if hasattr(obj, "_last_read_at"):
-            val = obj._last_read_at
-            # EPOCH means never read
-            from datetime import datetime
-            from zoneinfo import ZoneInfo
-            if val and val > datetime(1970, 1, 2, tzinfo=ZoneInfo("UTC")):
-                return val.isoformat()
-            return None
+            val = last_read_at(obj._last_read_at)
+            return val.isoformat() if val else None
         request = self.context.get("request")
         if not request or not request.user.is_authenticated:
             return None
@@ -626,9 +714,8 @@ class ConsultationSerializer(CustomFieldsMixin, serializers.ModelSerializer):
         read_status = ConsultationReadStatus.objects.filter(
             consultation=obj, user=request.user
         ).first()
-        if read_status:
-            return read_status.last_read_at.isoformat()
-        return None
+        val = last_read_at(read_status.last_read_at) if read_status else None
+        return val.isoformat() if val else None
 
 
 class AppointmentSerializer(serializers.ModelSerializer):
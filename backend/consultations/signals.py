@@ -1,20 +1,21 @@
 import logging
 
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
-from core.channel_groups import user_group
+from core.fanout import publish_to_users
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
-from django.db import transaction
+from django.db import connection, transaction
 from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 from messaging.models import Message as NotificationMessage
 from users.services import user_online_service
 
+from . import exports, unread
+from .availability import invalidate_practitioner
 from .models import (
     Appointment,
     AppointmentStatus,
+    BookingSlot,
     Consultation,
     Message,
     Participant,
@@ -86,18 +87,14 @@ def consultation_saved(sender, instance: Consultation, created, **kwargs):
     """
     Whenever a Consultation is created/updated, broadcast it over Channels.
     """
-    channel_layer = get_channel_layer()
-
-    # Send notifications to each user
-    for user_pk in get_users_to_notification_consultation(instance):
-        async_to_sync(channel_layer.group_send)(
-            user_group(user_pk),
-            {
-                "type": "consultation",
-                "consultation_id": instance.pk,
-                "state": "created" if created else "updated",
-            },
-        )
+    publish_to_users(
+        get_users_to_notification_consultation(instance),
+        {
+            "type": "consultation",
+            "consultation_id": instance.pk,
+            "state": "created" if created else "updated",
+        },
+    )
 
 
 @receiver(post_save, sender=Message)
@@ -105,54 +102,61 @@ def message_saved(sender, instance: Message, created, **kwargs):
     """
     Whenever a Message is saved, broadcast it over Channels and send external notifications to offline users.
     """
-    channel_layer = get_channel_layer()
+    users_to_notify = get_users_to_notification_consultation(instance.consultation)
+
+    if created:
+        # System messages count as unread for everyone.
+        unread.message_created(instance, users_to_notify)
 
     # Don't send message if only system message
     if not instance.created_by:
         return
 
-    # Send notifications to each user
-    for user_pk in get_users_to_notification_consultation(instance.consultation):
-        # Send WebSocket notification (including to the message creator for multi-tab sync)
-        async_to_sync(channel_layer.group_send)(
-            user_group(user_pk),
-            {
-                "type": "message",
-                "consultation_id": instance.consultation.pk,
-                "message_id": instance.pk,
-                "data": ConsultationMessageSerializer(instance).data,
-                "state": "created" if created else "updated",
-            },
-        )
+    # Send WebSocket notification to each user (including to the message
+    # creator for multi-tab sync)
+    publish_to_users(
+        users_to_notify,
+        {
+            "type": "message",
+            "consultation_id": instance.consultation.pk,
+            "message_id": instance.pk,
+            "data": ConsultationMessageSerializer(instance).data,
+            "state": "created" if created else "updated",
+        },
+    )
 
-        # Skip external notifications for the message creator
-        if instance.created_by and instance.created_by.pk == user_pk:
+    if not created:
+        return
+
+    # Send external notification to offline users (skipping the message
+    # creator). Presence is resolved for every recipient in one call.
+    recipients = users_to_notify - {instance.created_by.pk}
+    offline_pks = recipients - user_online_service.online_user_ids(recipients)
+    if not offline_pks:
+        return
+
+    content_type = ContentType.objects.get_for_model(instance)
+    for user_to_notify in User.objects.filter(pk__in=offline_pks):
+        # Skip if we already sent a notification since the user's last login
+        # (avoid spamming offline users with repeated notifications)
+        if (
+            user_to_notify.last_login
+            and user_to_notify.last_notification
+            and user_to_notify.last_notification > user_to_notify.last_login
+        ):
             continue
 
-        # Send external notification if user is offline and message is newly created
-        if created and not user_online_service.is_user_online(user_pk):
-            user_to_notify = User.objects.get(pk=user_pk)
-
-            # Skip if we already sent a notification since the user's last login
-            # (avoid spamming offline users with repeated notifications)
-            if (
-                user_to_notify.last_login
-                and user_to_notify.last_notification
-                and user_to_notify.last_notification > user_to_notify.last_login
-            ):
-                continue
-
-            user_to_notify.last_notification = timezone.now()
-            user_to_notify.save(update_fields=["last_notification"])
-
-            # Create notification message
-            NotificationMessage.objects.create(
-                template_system_name="new_message_notification",
-                sent_to=user_to_notify,
-                sent_by=instance.created_by,
-                content_type=ContentType.objects.get_for_model(instance),
-                object_id=instance.pk,
-            )
+        user_to_notify.last_notification = timezone.now()
+        user_to_notify.save(update_fields=["last_notification"])
+
+        # Create notification message
+        NotificationMessage.objects.create(
+            template_system_name="new_message_notification",
+            sent_to=user_to_notify,
+            sent_by=instance.created_by,
+            content_type=content_type,
+            object_id=instance.pk,
+        )
 
 
 @receiver(post_save, sender=Appointment)
@@ -161,8 +165,6 @@ def appointment_saved(sender, instance: Appointment, created, **kwargs):
     Whenever an Appointment is created/updated, broadcast it over Channels
     to consultation users and appointment participants.
     """
-    channel_layer = get_channel_layer()
-
     users_to_notify = set()
 
     # Add consultation users
@@ -172,37 +174,77 @@ def appointment_saved(sender, instance: Appointment, created, **kwargs):
         )
 
     # Add appointment participants
-    for participant in instance.participant_set.filter(
-        is_active=True, user__isnull=False
-    ):
-        users_to_notify.add(participant.user.pk)
-
-    consultation_pk = instance.consultation.pk if instance.consultation else None
-
-    for user_pk in users_to_notify:
-        async_to_sync(channel_layer.group_send)(
-            user_group(user_pk),
-            {
-                "type": "appointment",
-                "consultation_id": consultation_pk,
-                "appointment_id": instance.pk,
-                "state": "created" if created else "updated",
-            },
+    users_to_notify.update(
+        instance.participant_set.filter(
+            is_active=True, user__isnull=False
+        ).values_list("user_id", flat=True)
+    )
+
+    publish_to_users(
+        users_to_notify,
+        {
+            "type": "appointment",
+            "consultation_id": instance.consultation.pk if instance.consultation else None,
+            "appointment_id": instance.pk,
+            "state": "created" if created else "updated",
+        },
+    )
+
+
+@receiver(post_save, sender=BookingSlot)
+@receiver(post_delete, sender=BookingSlot)
+def booking_slot_changed(sender, instance: BookingSlot, **kwargs):
+    """Drop the cached availability of the slot's practitioner."""
+    # Only once committed: a reader in between would otherwise cache the
+    # old rows under the new version and offer a booked slot as free.
+    practitioner_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_practitioner(practitioner_id))
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def appointment_availability_changed(sender, instance: Appointment, **kwargs):
+    """Drop the cached availability of the practitioner owning the appointment."""
+    if instance.consultation_id:
+        owner_id = (
+            Consultation.objects.filter(pk=instance.consultation_id)
+            .values_list("owned_by_id", flat=True)
+            .first()
         )
+        transaction.on_commit(lambda: invalidate_practitioner(owner_id))
+
+
+@receiver(post_save, sender=Consultation)
+def consultation_availability_changed(sender, instance: Consultation, **kwargs):
+    """An ownership change moves the consultation's appointments to another
+    practitioner's calendar."""
+    old_owner_id = getattr(instance, "_old_owned_by_id", None)
+    owner_id = instance.owned_by_id
+    if old_owner_id != owner_id:
+        transaction.on_commit(lambda: invalidate_practitioner(old_owner_id))
+        transaction.on_commit(lambda: invalidate_practitioner(owner_id))
 
 
 @receiver(post_delete, sender=Consultation)
 def consultation_deleted(sender, instance, **kwargs):
-    channel_layer = get_channel_layer()
-    for user_pk in get_users_to_notification_consultation(instance):
-        async_to_sync(channel_layer.group_send)(
-            user_group(user_pk),
-            {
-                "type": "consultation",
-                "consultation_id": instance.pk,
-                "state": "deleted",
-            },
-        )
+    publish_to_users(
+        get_users_to_notification_consultation(instance),
+        {
+            "type": "consultation",
+            "consultation_id": instance.pk,
+            "state": "deleted",
+        },
+    )
+
+
+@receiver(post_delete, sender=Consultation)
+def consultation_exports_deleted(sender, instance, **kwargs):
+    """Delete the stored PDF exports with the consultation, auto-delete
+    sweep included: they hold its medical data."""
+    consultation_pk, schema_name = instance.pk, connection.schema_name
+    transaction.on_commit(
+        lambda: exports.delete_exports(consultation_pk, schema_name=schema_name)
+    )
 
 
 @receiver(post_save, sender=Request)
@@ -264,6 +306,16 @@ def appointment_previous_scheduled_at(sender, instance, **kwargs):
             pass
 
 
+@receiver(post_save, sender=Appointment)
+def appointment_reschedule_reminders(sender, instance, created, **kwargs):
+    """A rescheduled appointment gets its reminders sent again."""
+    if created or not instance.previous_scheduled_at:
+        return
+    Participant.objects.filter(appointment=instance).update(
+        first_reminder_sent_at=None, last_reminder_sent_at=None
+    )
+
+
 @receiver(post_save, sender=Participant)
 def participant_cancelling(sender, instance: Participant, **kwargs):
     if not instance.is_active:
@@ -285,19 +337,22 @@ def participant_cancelling(sender, instance: Participant, **kwargs):
 def track_beneficiary_change(sender, instance: Consultation, **kwargs):
     """
     Track if beneficiary is being added or changed on a consultation.
-    Store the old beneficiary ID for comparison in post_save.
+    Store the old beneficiary and owner IDs for comparison in post_save.
     Also track closed_at transition to release the media server pin.
     """
     if instance.pk:
         try:
             old_consultation = Consultation.objects.get(pk=instance.pk)
             instance._old_beneficiary_id = old_consultation.beneficiary_id
+            instance._old_owned_by_id = old_consultation.owned_by_id
             instance._was_closed = old_consultation.closed_at is not None
         except Consultation.DoesNotExist:
             instance._old_beneficiary_id = None
+            instance._old_owned_by_id = None
             instance._was_closed = False
     else:
         instance._old_beneficiary_id = None
+        instance._old_owned_by_id = None
         instance._was_closed = False
 
 
@@ -1,22 +1,22 @@
 import logging
-from datetime import timedelta
+from datetime import datetime, timedelta
 
-import boto3
-from asgiref.sync import async_to_sync
 from botocore.exceptions import ClientError
-from core.celery import app
-from core.channel_groups import user_group
-from channels.layers import get_channel_layer
+from core.celery import app, for_each_tenant, tenant_task
+from core.fanout import publish_to_users
 from constance import config
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection, transaction
 from django.db.models import Count, Q
 from django.utils import timezone
 from messaging.models import Message
-from django_tenants.utils import get_tenant_model, tenant_context
+from messaging.tasks import create_messages
 
 from .assignments import AssignmentManager
+from .recordings import s3_client
 from .models import (
     Appointment,
     AppointmentRecording,
@@ -81,26 +81,34 @@ def handle_invites(appointment_id):
         "Do nothing"
         return
 
-    for participant in participants:
-        if not participant.is_active:
-            template_system_name = "appointment_cancelled"
-
+    content_type = ContentType.objects.get_for_model(Participant)
+    messages = []
+    notified_pks = []
+    for participant in participants.select_related("user"):
         # Don't notify creator
-        if appointment.created_by == participant.user:
+        if appointment.created_by_id == participant.user_id:
             continue
 
-        message = Message.objects.create(
-            communication_method=participant.user.communication_method,
-            recipient_phone=participant.user.mobile_phone_number,
-            recipient_email=participant.user.email,
-            sent_to=participant.user,
-            sent_by=appointment.created_by,
-            template_system_name=template_system_name,
-            content_type=ContentType.objects.get_for_model(participant),
-            object_id=participant.pk,
+        messages.append(
+            Message(
+                communication_method=participant.user.communication_method,
+                recipient_phone=participant.user.mobile_phone_number,
+                recipient_email=participant.user.email,
+                sent_to=participant.user,
+                sent_by=appointment.created_by,
+                template_system_name=(
+                    template_system_name
+                    if participant.is_active
+                    else "appointment_cancelled"
+                ),
+                content_type=content_type,
+                object_id=participant.pk,
+            )
         )
-        participant.is_notified = True
-        participant.save(update_fields=["is_notified"])
+        notified_pks.append(participant.pk)
+
+    create_messages(messages)
+    Participant.objects.filter(pk__in=notified_pks).update(is_notified=True)
 
 
 @app.task
@@ -119,47 +127,114 @@ def notify_ongoing_appointment_invite(appointment_id, user_ids):
         is_invited=True,
     ).select_related("user")
 
+    content_type = ContentType.objects.get_for_model(Participant)
+    messages = []
+    notified_pks = []
     for participant in participants:
         # Don't notify creator
-        if appointment.created_by == participant.user:
+        if appointment.created_by_id == participant.user_id:
             continue
 
-        Message.objects.create(
-            communication_method=participant.user.communication_method,
-            recipient_phone=participant.user.mobile_phone_number,
-            recipient_email=participant.user.email,
-            sent_to=participant.user,
-            sent_by=appointment.created_by,
-            template_system_name="invitation_to_ongoing_appointment",
-            content_type=ContentType.objects.get_for_model(participant),
-            object_id=participant.pk,
+        messages.append(
+            Message(
+                communication_method=participant.user.communication_method,
+                recipient_phone=participant.user.mobile_phone_number,
+                recipient_email=participant.user.email,
+                sent_to=participant.user,
+                sent_by=appointment.created_by,
+                template_system_name="invitation_to_ongoing_appointment",
+                content_type=content_type,
+                object_id=participant.pk,
+            )
         )
-        # Mark as notified so the scheduled-invite flow doesn't send a second,
-        # contradictory message for the same appointment.
-        participant.is_notified = True
-        participant.save(update_fields=["is_notified"])
+        notified_pks.append(participant.pk)
+
+    create_messages(messages)
+    # Mark as notified so the scheduled-invite flow doesn't send a second,
+    # contradictory message for the same appointment.
+    Participant.objects.filter(pk__in=notified_pks).update(is_notified=True)
 
 
 @app.task
 def handle_reminders():
+    # Resolved once here and handed to every tenant, so a subtask that waits
+    # in the queue still looks at the minute the beat fired for.
     now = timezone.now().replace(second=0, microsecond=0)
-    TenantModel = get_tenant_model()
-    for tenant in TenantModel.objects.exclude(schema_name='public'):
-        with tenant_context(tenant):
-            for reminder in ["appointment_first_reminder", "appointment_last_reminder"]:
-                reminder_datetime = now + timedelta(minutes=int(getattr(config, reminder)))
-                for appointment in Appointment.objects.filter(
-                    scheduled_at=reminder_datetime, status=AppointmentStatus.scheduled
-                ):
-                    for participant in Participant.objects.filter(
-                        appointment=appointment, is_active=True
-                    ):
-                        Message.objects.create(
-                            sent_to=participant.user,
-                            template_system_name=reminder,
-                            content_type=ContentType.objects.get_for_model(participant),
-                            object_id=participant.pk,
-                        )
+    for_each_tenant(handle_reminders_for_tenant, now.isoformat())
+
+
+# Reminder template -> Participant field recording when it went out.
+APPOINTMENT_REMINDERS = {
+    "appointment_first_reminder": "first_reminder_sent_at",
+    "appointment_last_reminder": "last_reminder_sent_at",
+}
+# How far back a run catches up on reminders missed while the beat was down.
+# Older reminders are dropped: a reminder hours late is worse than none.
+REMINDER_MAX_CATCH_UP = timedelta(hours=1)
+
+
+def _reminder_watermark_key() -> str:
+    return f"reminders:watermark:{connection.schema_name}"
+
+
+@tenant_task()
+def handle_reminders_for_tenant(now=None):
+    """Send the appointment reminders that fell due since the previous run.
+
+    A reminder is due at ``scheduled_at - offset``. Each run covers the
+    ``(watermark, now]`` window, the watermark being the ``now`` of the
+    previous run, so a missed beat is caught up instead of silently skipped.
+    Without a watermark (first run, flushed cache) only the last minute is
+    covered, as the exact-minute matching used to.
+
+    Sent reminders are stamped on the participant in the same transaction as
+    their messages, and rows are claimed with ``SKIP LOCKED``: overlapping
+    windows, retries or concurrent workers never send one twice, and a
+    rescheduled appointment gets its reminders again (see signals).
+    """
+    if now is None:
+        now = timezone.now().replace(second=0, microsecond=0)
+    else:
+        now = datetime.fromisoformat(now)
+
+    watermark = cache.get(_reminder_watermark_key())
+    since = max(watermark or now - timedelta(minutes=1), now - REMINDER_MAX_CATCH_UP)
+    if since >= now:
+        return
+
+    content_type = ContentType.objects.get_for_model(Participant)
+    messages = []
+    with transaction.atomic():
+        for reminder, sent_field in APPOINTMENT_REMINDERS.items():
+            offset = timedelta(minutes=int(getattr(config, reminder)))
+            participants = list(
+                Participant.objects.select_for_update(skip_locked=True, of=("self",))
+                .filter(
+                    appointment__scheduled_at__gt=since + offset,
+                    appointment__scheduled_at__lte=now + offset,
+                    appointment__status=AppointmentStatus.scheduled,
+                    is_active=True,
+                    **{f"{sent_field}__isnull": True},
+                )
+                .select_related("user")
+            )
+            if not participants:
+                continue
+            Participant.objects.filter(
+                pk__in=[participant.pk for participant in participants]
+            ).update(**{sent_field: now})
+            messages.extend(
+                Message(
+                    sent_to=participant.user,
+                    template_system_name=reminder,
+                    content_type=content_type,
+                    object_id=participant.pk,
+                )
+                for participant in participants
+            )
+        create_messages(messages)
+
+    cache.set(_reminder_watermark_key(), now, timeout=None)
 
 
 @app.task
@@ -177,45 +252,58 @@ def handle_custom_reminders():
     (SMS/email/WhatsApp). Recurring reminders are rescheduled in place until
     their occurrence count is exhausted.
     """
+    # Resolved once here and handed to every tenant, so a subtask that waits
+    # in the queue still looks at the minute the beat fired for.
     now = timezone.now().replace(second=0, microsecond=0)
-    TenantModel = get_tenant_model()
-    for tenant in TenantModel.objects.exclude(schema_name="public"):
-        with tenant_context(tenant):
-            from .models import Reminder
+    for_each_tenant(handle_custom_reminders_for_tenant, now.isoformat())
 
-            due = Reminder.objects.filter(
-                is_active=True, next_run_at__isnull=False, next_run_at__lte=now
-            )
-            for reminder in due:
-                # Catch up every occurrence that should already have been sent
-                # (e.g. after downtime), one Message per missed occurrence.
-                while (
-                    reminder.is_active
-                    and reminder.next_run_at is not None
-                    and reminder.next_run_at <= now
-                ):
-                    occurrence_at = reminder.next_run_at
-                    Message.objects.create(
-                        sent_to=reminder.recipient,
-                        sent_by=reminder.created_by,
-                        template_system_name="reminder",
-                        content_type=ContentType.objects.get_for_model(reminder),
-                        object_id=reminder.pk,
-                        # No communication_method: the recipient's channel decides.
-                    )
-                    reminder.occurrences_sent += 1
-                    reminder.last_sent_at = occurrence_at
-                    nxt = reminder.compute_next_run_at()
-                    reminder.is_active = nxt is not None
-                    reminder.next_run_at = nxt
-                reminder.save(
-                    update_fields=[
-                        "occurrences_sent",
-                        "last_sent_at",
-                        "next_run_at",
-                        "is_active",
-                    ]
+
+@tenant_task()
+def handle_custom_reminders_for_tenant(now=None):
+    if now is None:
+        now = timezone.now().replace(second=0, microsecond=0)
+    else:
+        now = datetime.fromisoformat(now)
+    from .models import Reminder
+
+    due = Reminder.objects.filter(
+        is_active=True, next_run_at__isnull=False, next_run_at__lte=now
+    ).select_related("recipient", "created_by")
+    content_type = ContentType.objects.get_for_model(Reminder)
+    messages = []
+    for reminder in due:
+        # Catch up every occurrence that should already have been sent
+        # (e.g. after downtime), one Message per missed occurrence.
+        while (
+            reminder.is_active
+            and reminder.next_run_at is not None
+            and reminder.next_run_at <= now
+        ):
+            occurrence_at = reminder.next_run_at
+            messages.append(
+                Message(
+                    sent_to=reminder.recipient,
+                    sent_by=reminder.created_by,
+                    template_system_name="reminder",
+                    content_type=content_type,
+                    object_id=reminder.pk,
+                    # No communication_method: the recipient's channel decides.
                 )
+            )
+            reminder.occurrences_sent += 1
+            reminder.last_sent_at = occurrence_at
+            nxt = reminder.compute_next_run_at()
+            reminder.is_active = nxt is not None
+            reminder.next_run_at = nxt
+        reminder.save(
+            update_fields=[
+                "occurrences_sent",
+                "last_sent_at",
+                "next_run_at",
+                "is_active",
+            ]
+        )
+    create_messages(messages)
 
 
 @app.task(
@@ -244,17 +332,8 @@ def check_recording_ready(self, recording_id):
         return
 
     # Check if file exists in S3
-    s3 = boto3.client(
-        "s3",
-        endpoint_url=settings.LIVEKIT_S3_ENDPOINT_URL,
-        aws_access_key_id=settings.LIVEKIT_S3_ACCESS_KEY,
-        aws_secret_access_key=settings.LIVEKIT_S3_SECRET_KEY,
-        region_name=settings.LIVEKIT_S3_REGION,
-        config=boto3.session.Config(signature_version="s3v4"),
-    )
-
     try:
-        s3.head_object(Bucket=settings.LIVEKIT_S3_BUCKET_NAME, Key=recording.filepath)
+        s3_client().head_object(Bucket=settings.LIVEKIT_S3_BUCKET_NAME, Key=recording.filepath)
     except ClientError as e:
         if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
             logger.info(f"Recording {recording.filepath} not in S3 yet, retrying...")
@@ -276,81 +355,98 @@ def check_recording_ready(self, recording_id):
     recording.save(update_fields=["message"])
 
     # WebSocket notification
-    channel_layer = get_channel_layer()
-    message_data = ConsultationMessageSerializer(message).data
-    for user_pk in get_users_to_notification_consultation(appointment.consultation):
-        async_to_sync(channel_layer.group_send)(
-            user_group(user_pk),
-            {
-                "type": "message",
-                "event": "message",
-                "consultation_id": appointment.consultation.pk,
-                "message_id": message.id,
-                "state": "created",
-                "data": message_data,
-            },
-        )
+    publish_to_users(
+        get_users_to_notification_consultation(appointment.consultation),
+        {
+            "type": "message",
+            "event": "message",
+            "consultation_id": appointment.consultation.pk,
+            "message_id": message.id,
+            "state": "created",
+            "data": ConsultationMessageSerializer(message).data,
+        },
+    )
 
     logger.info(
         f"Recording message created for AppointmentRecording {recording_id}: message {message.id}"
     )
 
 
+@app.task
+def export_consultation_pdf(consultation_id, organisation_id, name):
+    """Render the PDF export of a consultation into storage (see exports)."""
+    from users.models import Organisation
+
+    from .exports import render_export
+
+    try:
+        consultation = Consultation.objects.select_related(
+            "created_by", "owned_by", "beneficiary", "group"
+        ).get(pk=consultation_id)
+    except Consultation.DoesNotExist:
+        logger.warning(f"Consultation {consultation_id} not found for PDF export")
+        return
+    organisation = Organisation.objects.filter(pk=organisation_id).first()
+    render_export(consultation, organisation, name)
+
+
 @app.task
 def auto_delete_closed_consultations():
-    TenantModel = get_tenant_model()
-    for tenant in TenantModel.objects.exclude(schema_name='public'):
-        with tenant_context(tenant):
-            hours = int(config.consultation_auto_delete_hours)
-            if hours == 0:
-                logger.info("Auto-delete of closed consultations is disabled (0 hours)")
-                continue
+    for_each_tenant(auto_delete_closed_consultations_for_tenant)
 
-            now = timezone.now()
-            cutoff = now - timedelta(hours=hours)
-            qs = Consultation.objects.filter(closed_at__isnull=False, closed_at__lte=cutoff)
-            count, _ = qs.delete()
-            logger.info(f"Auto-deleted {count} closed consultation(s) older than {hours}h")
-
-            # Belt-and-suspenders: temporary consultations that somehow stayed
-            # open past the join window are also dropped once their effective
-            # end + call_limit + auto_delete_hours has elapsed. Only when
-            # auto-close is enabled; otherwise temporaries are meant to persist
-            # until closed manually, so we leave them untouched.
-            if not config.auto_close_temporary_consultations:
-                continue
-            join_limit = int(config.call_limit_join_minutes)
-            default_duration = int(config.default_appointment_duration_in_minutes)
-            delete_threshold = timedelta(hours=hours)
 
-            temp_qs = Consultation.objects.filter(
-                temporary=True, closed_at__isnull=True
+@tenant_task()
+def auto_delete_closed_consultations_for_tenant():
+    hours = int(config.consultation_auto_delete_hours)
+    if hours == 0:
+        logger.info("Auto-delete of closed consultations is disabled (0 hours)")
+        return
+
+    now = timezone.now()
+    cutoff = now - timedelta(hours=hours)
+    qs = Consultation.objects.filter(closed_at__isnull=False, closed_at__lte=cutoff)
+    count, _ = qs.delete()
+    logger.info(f"Auto-deleted {count} closed consultation(s) older than {hours}h")
+
+    # Belt-and-suspenders: temporary consultations that somehow stayed
+    # open past the join window are also dropped once their effective
+    # end + call_limit + auto_delete_hours has elapsed. Only when
+    # auto-close is enabled; otherwise temporaries are meant to persist
+    # until closed manually, so we leave them untouched.
+    if not config.auto_close_temporary_consultations:
+        return
+    join_limit = int(config.call_limit_join_minutes)
+    default_duration = int(config.default_appointment_duration_in_minutes)
+    delete_threshold = timedelta(hours=hours)
+
+    temp_qs = Consultation.objects.filter(
+        temporary=True, closed_at__isnull=True
+    )
+    temp_deleted = 0
+    for consultation in temp_qs:
+        appt = (
+            consultation.appointments.exclude(
+                status=AppointmentStatus.cancelled
             )
-            temp_deleted = 0
-            for consultation in temp_qs:
-                appt = (
-                    consultation.appointments.exclude(
-                        status=AppointmentStatus.cancelled
-                    )
-                    .order_by("-scheduled_at")
-                    .first()
-                )
-                if appt:
-                    end = appt.end_expected_at or (
-                        appt.scheduled_at + timedelta(minutes=default_duration)
-                    )
-                    expires_at = end + timedelta(minutes=join_limit)
-                else:
-                    expires_at = consultation.created_at
-
-                if now >= expires_at + delete_threshold:
-                    consultation.delete()
-                    temp_deleted += 1
-
-            if temp_deleted:
-                logger.info(
-                    f"Auto-deleted {temp_deleted} unclosed temporary consultation(s) past auto-delete threshold"
-                )
+            .order_by("-scheduled_at")
+            .first()
+        )
+        if appt:
+            end = appt.end_expected_at or (
+                appt.scheduled_at + timedelta(minutes=default_duration)
+            )
+            expires_at = end + timedelta(minutes=join_limit)
+        else:
+            expires_at = consultation.created_at
+
+        if now >= expires_at + delete_threshold:
+            consultation.delete()
+            temp_deleted += 1
+
+    if temp_deleted:
+        logger.info(
+            f"Auto-deleted {temp_deleted} unclosed temporary consultation(s) past auto-delete threshold"
+        )
 
 
 @app.task
@@ -365,45 +461,47 @@ def auto_close_temporary_consultations():
     `scheduled_at + default_appointment_duration_in_minutes`. The consultation
     is closed once `now >= effective_end + call_limit_join_minutes`.
     """
-    TenantModel = get_tenant_model()
-    for tenant in TenantModel.objects.exclude(schema_name="public"):
-        with tenant_context(tenant):
-            if not config.auto_close_temporary_consultations:
-                continue
-            now = timezone.now()
-            join_limit = int(config.call_limit_join_minutes)
-            default_duration = int(config.default_appointment_duration_in_minutes)
+    for_each_tenant(auto_close_temporary_consultations_for_tenant)
+
 
-            qs = Consultation.objects.filter(
-                temporary=True, closed_at__isnull=True
+@tenant_task()
+def auto_close_temporary_consultations_for_tenant():
+    if not config.auto_close_temporary_consultations:
+        return
+    now = timezone.now()
+    join_limit = int(config.call_limit_join_minutes)
+    default_duration = int(config.default_appointment_duration_in_minutes)
+
+    qs = Consultation.objects.filter(
+        temporary=True, closed_at__isnull=True
+    )
+    closed = 0
+    for consultation in qs:
+        appt = (
+            consultation.appointments.exclude(
+                status=AppointmentStatus.cancelled
             )
-            closed = 0
-            for consultation in qs:
-                appt = (
-                    consultation.appointments.exclude(
-                        status=AppointmentStatus.cancelled
-                    )
-                    .order_by("-scheduled_at")
-                    .first()
-                )
-                if not appt:
-                    consultation.closed_at = now
-                    consultation.save(update_fields=["closed_at"])
-                    closed += 1
-                    continue
-
-                end = appt.end_expected_at or (
-                    appt.scheduled_at + timedelta(minutes=default_duration)
-                )
-                if now >= end + timedelta(minutes=join_limit):
-                    consultation.closed_at = now
-                    consultation.save(update_fields=["closed_at"])
-                    closed += 1
-
-            if closed:
-                logger.info(
-                    f"Auto-closed {closed} temporary consultation(s) past join window"
-                )
+            .order_by("-scheduled_at")
+            .first()
+        )
+        if not appt:
+            consultation.closed_at = now
+            consultation.save(update_fields=["closed_at"])
+            closed += 1
+            continue
+
+        end = appt.end_expected_at or (
+            appt.scheduled_at + timedelta(minutes=default_duration)
+        )
+        if now >= end + timedelta(minutes=join_limit):
+            consultation.closed_at = now
+            consultation.save(update_fields=["closed_at"])
+            closed += 1
+
+    if closed:
+        logger.info(
+            f"Auto-closed {closed} temporary consultation(s) past join window"
+        )
 
 
 @app.task
@@ -418,60 +516,62 @@ def resolve_appointment_outcomes():
     overwritten. In-person appointments have no join step and are left alone:
     they are qualified manually.
     """
-    TenantModel = get_tenant_model()
-    for tenant in TenantModel.objects.exclude(schema_name="public"):
-        with tenant_context(tenant):
-            if not config.enable_appointment_outcome_detection:
-                continue
+    for_each_tenant(resolve_appointment_outcomes_for_tenant)
 
-            now = timezone.now()
-            trailing = timedelta(minutes=int(config.call_limit_join_minutes))
-            lookback = timedelta(days=int(config.appointment_outcome_lookback_days))
-            default_duration = int(config.default_appointment_duration_in_minutes)
-
-            # scheduled_at is a necessary (not sufficient) bound, kept so the
-            # query stays indexed; the real end is re-checked per row below
-            # because end_expected_at can push it much further out.
-            qs = Appointment.objects.filter(
-                status=AppointmentStatus.scheduled,
-                type=Type.online,
-                scheduled_at__isnull=False,
-                scheduled_at__lte=now - trailing,
-                scheduled_at__gte=now - lookback,
-            ).annotate(
-                active_count=Count(
-                    "participant", filter=Q(participant__is_active=True)
-                ),
-                arrived_count=Count(
-                    "participant",
-                    filter=Q(
-                        participant__is_active=True,
-                        participant__arrived_at__isnull=False,
-                    ),
-                ),
-            )
 
-            completed = noshow = 0
-            for appointment in qs.iterator():
-                end = appointment.end_expected_at or (
-                    appointment.scheduled_at + timedelta(minutes=default_duration)
-                )
-                if now < end + trailing:
-                    continue
-
-                # Two attendees mean the consultation happened; fall back to the
-                # roster size so a one-participant appointment isn't doomed.
-                threshold = min(2, appointment.active_count) or 1
-                if appointment.arrived_count >= threshold:
-                    appointment.status = AppointmentStatus.completed
-                    completed += 1
-                else:
-                    appointment.status = AppointmentStatus.noshow
-                    noshow += 1
-                appointment.save(update_fields=["status", "updated_at"])
-
-            if completed or noshow:
-                logger.info(
-                    f"Appointment outcomes ({tenant.schema_name}): "
-                    f"{completed} completed, {noshow} no-show"
-                )
+@tenant_task()
+def resolve_appointment_outcomes_for_tenant():
+    if not config.enable_appointment_outcome_detection:
+        return
+
+    now = timezone.now()
+    trailing = timedelta(minutes=int(config.call_limit_join_minutes))
+    lookback = timedelta(days=int(config.appointment_outcome_lookback_days))
+    default_duration = int(config.default_appointment_duration_in_minutes)
+
+    # scheduled_at is a necessary (not sufficient) bound, kept so the
+    # query stays indexed; the real end is re-checked per row below
+    # because end_expected_at can push it much further out.
+    qs = Appointment.objects.filter(
+        status=AppointmentStatus.scheduled,
+        type=Type.online,
+        scheduled_at__isnull=False,
+        scheduled_at__lte=now - trailing,
+        scheduled_at__gte=now - lookback,
+    ).annotate(
+        active_count=Count(
+            "participant", filter=Q(participant__is_active=True)
+        ),
+        arrived_count=Count(
+            "participant",
+            filter=Q(
+                participant__is_active=True,
+                participant__arrived_at__isnull=False,
+            ),
+        ),
+    )
+
+    completed = noshow = 0
+    for appointment in qs.iterator():
+        end = appointment.end_expected_at or (
+            appointment.scheduled_at + timedelta(minutes=default_duration)
+        )
+        if now < end + trailing:
+            continue
+
+        # Two attendees mean the consultation happened; fall back to the
+        # roster size so a one-participant appointment isn't doomed.
+        threshold = min(2, appointment.active_count) or 1
+        if appointment.arrived_count >= threshold:
+            appointment.status = AppointmentStatus.completed
+            completed += 1
+        else:
+            appointment.status = AppointmentStatus.noshow
+            noshow += 1
+        appointment.save(update_fields=["status", "updated_at"])
+
+    if completed or noshow:
+        logger.info(
+            f"Appointment outcomes ({connection.schema_name}): "
+            f"{completed} completed, {noshow} no-show"
+        )
@@ -514,19 +514,16 @@ class ScheduledFilterUnreadTest(TenantTestCase):
 
     def test_marking_read_returns_to_scheduled(self):
         """After the read status catches up, it goes back to Planifié."""
-        from .models import ConsultationReadStatus
-
         self.Message.objects.create(
             consultation=self.consultation,
             created_by=self.patient,
             content="Hello doctor",
         )
         # Practitioner reads the consultation.
-        ConsultationReadStatus.objects.update_or_create(
-            consultation=self.consultation,
-            user=self.practitioner,
-            defaults={"last_read_at": timezone.now()},
+        resp = self.client.post(
+            f"/api/consultations/{self.consultation.id}/mark_read/"
         )
+        self.assertEqual(resp.status_code, 200, resp.content)
         self.assertIn(self.consultation.id, self._ids(scheduled=True))
         self.assertNotIn(self.consultation.id, self._ids(scheduled=False))
 
@@ -15,13 +15,14 @@ from consultations.models import (
     ParticipantStatus,
     Type,
 )
-from consultations.tasks import resolve_appointment_outcomes
+from consultations.tasks import resolve_appointment_outcomes_for_tenant
 from users.models import User
 
 
 def _mocked_server():
     """Stand-in for a reachable media server pinned to the room."""
     server = MagicMock()
+    server.instance.join_info_ttl = 0
     server.instance.appointment_participant_info.return_value = {
         "provider": "livekit",
         "url": "wss://example.test",
@@ -160,7 +161,7 @@ class ResolveOutcomesTaskTests(_OutcomeBase):
         now = timezone.now()
         Participant.objects.filter(appointment=appointment).update(arrived_at=now)
 
-        resolve_appointment_outcomes()
+        resolve_appointment_outcomes_for_tenant()
 
         appointment.refresh_from_db()
         self.assertEqual(appointment.status, AppointmentStatus.completed)
@@ -170,7 +171,7 @@ class ResolveOutcomesTaskTests(_OutcomeBase):
         self.doc_participant.arrived_at = timezone.now()
         self.doc_participant.save(update_fields=["arrived_at"])
 
-        resolve_appointment_outcomes()
+        resolve_appointment_outcomes_for_tenant()
 
         appointment.refresh_from_db()
         self.assertEqual(appointment.status, AppointmentStatus.noshow)
@@ -178,7 +179,7 @@ class ResolveOutcomesTaskTests(_OutcomeBase):
     def test_no_arrival_is_a_noshow(self):
         appointment = self._appointment(when=self._past())
 
-        resolve_appointment_outcomes()
+        resolve_appointment_outcomes_for_tenant()
 
         appointment.refresh_from_db()
         self.assertEqual(appointment.status, AppointmentStatus.noshow)
@@ -190,7 +191,7 @@ class ResolveOutcomesTaskTests(_OutcomeBase):
         self.doc_participant.arrived_at = timezone.now()
         self.doc_participant.save(update_fields=["arrived_at"])
 
-        resolve_appointment_outcomes()
+        resolve_appointment_outcomes_for_tenant()
 
         appointment.refresh_from_db()
         self.assertEqual(appointment.status, AppointmentStatus.completed)
@@ -199,7 +200,7 @@ class ResolveOutcomesTaskTests(_OutcomeBase):
         # Ends in 25 min, so the join window is nowhere near closed.
         appointment = self._appointment(when=timezone.now() - timedelta(minutes=5))
 
-        resolve_appointment_outcomes()
+        resolve_appointment_outcomes_for_tenant()
 
         appointment.refresh_from_db()
         self.assertEqual(appointment.status, AppointmentStatus.scheduled)
@@ -210,7 +211,7 @@ class ResolveOutcomesTaskTests(_OutcomeBase):
             end_expected_at=timezone.now() + timedelta(hours=2),
         )
 
-        resolve_appointment_outcomes()
+        resolve_appointment_outcomes_for_tenant()
 
         appointment.refresh_from_db()
         self.assertEqual(appointment.status, AppointmentStatus.scheduled)
@@ -220,7 +221,7 @@ class ResolveOutcomesTaskTests(_OutcomeBase):
             when=self._past(), appointment_type=Type.inperson
         )
 
-        resolve_appointment_outcomes()
+        resolve_appointment_outcomes_for_tenant()
 
         appointment.refresh_from_db()
         self.assertEqual(appointment.status, AppointmentStatus.scheduled)
@@ -235,7 +236,7 @@ class ResolveOutcomesTaskTests(_OutcomeBase):
             with self.subTest(status=initial):
                 appointment = self._appointment(when=self._past(), status=initial)
 
-                resolve_appointment_outcomes()
+                resolve_appointment_outcomes_for_tenant()
 
                 appointment.refresh_from_db()
                 self.assertEqual(appointment.status, initial)
@@ -243,7 +244,7 @@ class ResolveOutcomesTaskTests(_OutcomeBase):
     def test_outside_lookback_window_is_ignored(self):
         appointment = self._appointment(when=timezone.now() - timedelta(days=30))
 
-        resolve_appointment_outcomes()
+        resolve_appointment_outcomes_for_tenant()
 
         appointment.refresh_from_db()
         self.assertEqual(appointment.status, AppointmentStatus.scheduled)
@@ -251,11 +252,11 @@ class ResolveOutcomesTaskTests(_OutcomeBase):
     def test_second_run_is_idempotent(self):
         appointment = self._appointment(when=self._past())
 
-        resolve_appointment_outcomes()
+        resolve_appointment_outcomes_for_tenant()
         appointment.refresh_from_db()
         first_update = appointment.updated_at
 
-        resolve_appointment_outcomes()
+        resolve_appointment_outcomes_for_tenant()
         appointment.refresh_from_db()
         self.assertEqual(appointment.status, AppointmentStatus.noshow)
         self.assertEqual(appointment.updated_at, first_update)
@@ -264,7 +265,7 @@ class ResolveOutcomesTaskTests(_OutcomeBase):
     def test_disabled_is_a_noop(self):
         appointment = self._appointment(when=self._past())
 
-        resolve_appointment_outcomes()
+        resolve_appointment_outcomes_for_tenant()
 
         appointment.refresh_from_db()
         self.assertEqual(appointment.status, AppointmentStatus.scheduled)
@@ -341,7 +342,7 @@ class SetStatusActionTests(_OutcomeBase):
             self._url(appointment), {"status": "completed"}, format="json"
         )
 
-        resolve_appointment_outcomes()
+        resolve_appointment_outcomes_for_tenant()
 
         appointment.refresh_from_db()
         self.assertEqual(appointment.status, AppointmentStatus.completed)
@@ -0,0 +1,148 @@
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django_tenants.test.cases import TenantTestCase
+
+from consultations.availability import AvailabilityEngine, merge_intervals, overlaps
+from consultations.models import (
+    Appointment,
+    AppointmentStatus,
+    BookingSlot,
+    Consultation,
+)
+from users.models import User
+
+UTC = ZoneInfo("UTC")
+# A Monday, far enough in the future for slots not to be in the past.
+DAY = date(2036, 3, 17)
+
+
+def _at(hour, minute=0):
+    return datetime.combine(DAY, time(hour, minute), UTC)
+
+
+class IntervalHelpersTests(SimpleTestCase):
+    def test_merge_joins_overlapping_and_adjacent(self):
+        merged = merge_intervals([(_at(10), _at(11)), (_at(9), _at(10)), (_at(14), _at(15))])
+        self.assertEqual(merged, [(_at(9), _at(11)), (_at(14), _at(15))])
+
+    def test_overlaps(self):
+        busy = merge_intervals([(_at(9), _at(10)), (_at(14), _at(15))])
+        self.assertTrue(overlaps(busy, _at(9, 30), _at(10, 30)))
+        self.assertTrue(overlaps(busy, _at(13, 30), _at(14, 30)))
+        self.assertFalse(overlaps(busy, _at(10), _at(11)))
+        self.assertFalse(overlaps(busy, _at(8), _at(9)))
+
+
+class AvailabilityEngineTests(TenantTestCase):
+    def setUp(self):
+        cache.clear()
+        self.doctor = User.objects.create_user(
+            email="doctor@example.com", is_practitioner=True, timezone="UTC"
+        )
+        BookingSlot.objects.create(
+            created_by=self.doctor,
+            user=self.doctor,
+            start_time=time(9),
+            end_time=time(11),
+            start_break=None,
+            end_break=None,
+            monday=True,
+            tuesday=False,
+            wednesday=False,
+            thursday=False,
+            friday=False,
+            saturday=False,
+            sunday=False,
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def _free(self):
+        engine = AvailabilityEngine([self.doctor], 30)
+        return engine.free_slots([DAY])[(self.doctor.pk, DAY)]
+
+    def test_grid_slots_without_appointments(self):
+        self.assertEqual(
+            self._free(),
+            [
+                (time(9), time(9, 30)),
+                (time(9, 30), time(10)),
+                (time(10), time(10, 30)),
+                (time(10, 30), time(11)),
+            ],
+        )
+
+    def test_appointment_removes_slot_and_invalidates_cache(self):
+        self.assertEqual(len(self._free()), 4)
+
+        consultation = Consultation.objects.create(
+            created_by=self.doctor, owned_by=self.doctor
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Appointment.objects.create(
+                consultation=consultation,
+                created_by=self.doctor,
+                scheduled_at=_at(9, 30),
+                end_expected_at=_at(9, 30) + timedelta(minutes=30),
+                status=AppointmentStatus.scheduled,
+            )
+
+        self.assertNotIn((time(9, 30), time(10)), self._free())
+
+    def test_is_available(self):
+        engine = AvailabilityEngine([self.doctor], 30)
+        self.assertTrue(engine.is_available(self.doctor, _at(9)))
+        self.assertFalse(engine.is_available(self.doctor, _at(12)))
+        self.assertFalse(
+            engine.is_available(self.doctor, _at(9) + timedelta(days=1))
+        )
+
+    def test_cache_is_invalidated_on_commit_only(self):
+        self.assertEqual(len(self._free()), 4)
+        with self.captureOnCommitCallbacks() as callbacks:
+            BookingSlot.objects.filter(user=self.doctor).delete()
+            self.assertEqual(len(self._free()), 4)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._free(), [])
+
+    def test_assignment_conflicts_are_scheduled_appointments_only(self):
+        """Completed appointments and ones without an expected end hide grid
+        slots but, as before the engine, don't block an assignment."""
+        consultation = Consultation.objects.create(
+            created_by=self.doctor, owned_by=self.doctor
+        )
+        Appointment.objects.create(
+            consultation=consultation,
+            created_by=self.doctor,
+            scheduled_at=_at(9),
+            end_expected_at=_at(9, 30),
+            status=AppointmentStatus.completed,
+        )
+        Appointment.objects.create(
+            consultation=consultation,
+            created_by=self.doctor,
+            scheduled_at=_at(10),
+            status=AppointmentStatus.scheduled,
+        )
+
+        engine = AvailabilityEngine([self.doctor], 30)
+        self.assertTrue(engine.is_available(self.doctor, _at(9)))
+        self.assertTrue(engine.is_available(self.doctor, _at(10)))
+        self.assertEqual(
+            self._free(), [(time(9, 30), time(10)), (time(10, 30), time(11))]
+        )
+
+        Appointment.objects.create(
+            consultation=consultation,
+            created_by=self.doctor,
+            scheduled_at=_at(10, 30),
+            end_expected_at=_at(11),
+            status=AppointmentStatus.scheduled,
+        )
+        engine = AvailabilityEngine([self.doctor], 30)
+        self.assertFalse(engine.is_available(self.doctor, _at(10, 30)))
@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from rest_framework.test import APIClient
+
+from consultations.models import (
+    Appointment,
+    AppointmentStatus,
+    Consultation,
+    ConsultationKey,
+    CustomField,
+    CustomFieldModel,
+    CustomFieldType,
+    CustomFieldValue,
+    Participant,
+)
+from users.models import User
+
+
+class ConsultationListQueryCountTests(TenantTestCase):
+    """The consultation list runs a fixed number of queries per page."""
+
+    def setUp(self):
+        self.practitioner = User.objects.create_user(
+            email="doc@example.com", is_practitioner=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.practitioner)
+        self.custom_field = CustomField.objects.create(
+            name="Insurance",
+            field_type=CustomFieldType.short_text,
+            target_model=CustomFieldModel.consultation,
+        )
+        self.content_type = ContentType.objects.get_for_model(Consultation)
+        self.count = 0
+
+    def _add_consultations(self, count):
+        for _ in range(count):
+            self.count += 1
+            patient = User.objects.create_user(email=f"pat{self.count}@example.com")
+            consultation = Consultation.objects.create(
+                created_by=self.practitioner,
+                owned_by=self.practitioner,
+                beneficiary=patient,
+                title=f"Consultation {self.count}",
+            )
+            appointment = Appointment.objects.create(
+                consultation=consultation,
+                created_by=self.practitioner,
+                scheduled_at=timezone.now() + timedelta(days=1),
+                status=AppointmentStatus.scheduled,
+            )
+            for user in (self.practitioner, patient):
+                Participant.objects.create(appointment=appointment, user=user)
+            ConsultationKey.objects.create(
+                consultation=consultation,
+                user=patient,
+                encrypted_private_key="patient-envelope",
+                pubkey_fingerprint="f" * 64,
+            )
+            ConsultationKey.objects.create(
+                consultation=consultation,
+                user=self.practitioner,
+                encrypted_private_key="practitioner-envelope",
+                pubkey_fingerprint="e" * 64,
+            )
+            CustomFieldValue.objects.create(
+                custom_field=self.custom_field,
+                content_type=self.content_type,
+                object_id=consultation.pk,
+                value="ACME",
+            )
+
+    def _list(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("consultation-list"))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self._add_consultations(2)
+        # One-off queries of the first request (constance defaults, content
+        # types) are not part of the comparison.
+        self._list()
+        response, small_page = self._list()
+        self.assertEqual(len(response.data["results"]), 2)
+
+        self._add_consultations(5)
+        response, large_page = self._list()
+        self.assertEqual(len(response.data["results"]), 7)
+
+        self.assertEqual(small_page, large_page)
+
+    def test_prefetched_payload(self):
+        self._add_consultations(1)
+        response, _ = self._list()
+        item = response.data["results"][0]
+
+        self.assertEqual(
+            [key["encrypted_private_key"] for key in item["keys"]],
+            ["practitioner-envelope"],
+        )
+        self.assertEqual(item["custom_fields"][0]["value"], "ACME")
+        self.assertEqual(item["next_appointment"]["id"], item["appointments"][0]["id"])
+        participants = item["appointments"][0]["participants"]
+        self.assertEqual(len(participants), 2)
+        self.assertTrue(all(p["has_consultation_key"] for p in participants))
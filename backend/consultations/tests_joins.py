@@ -0,0 +1,109 @@
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from rest_framework.test import APIClient
+
+from consultations.models import Appointment, Consultation, Message, Participant
+from users.models import User
+
+
+def _server(pk=1):
+    """Stand-in for a media server issuing a new token on every call."""
+    server = MagicMock()
+    server.pk = pk
+    server.instance.join_info_ttl = 3600
+    server.instance.appointment_participant_info.side_effect = lambda *args: {
+        "provider": "livekit",
+        "url": "wss://example.test",
+        "token": f"jwt-{server.instance.appointment_participant_info.call_count}",
+        "room": "room",
+    }
+    return server
+
+
+class JoinStormTests(TenantTestCase):
+    def setUp(self):
+        self.practitioner = User.objects.create_user(
+            email="doc@example.com", is_practitioner=True
+        )
+        self.patient = User.objects.create_user(email="pat@example.com")
+        consultation = Consultation.objects.create(
+            title="Follow-up",
+            created_by=self.practitioner,
+            beneficiary=self.patient,
+        )
+        self.appointment = Appointment.objects.create(
+            created_by=self.practitioner,
+            consultation=consultation,
+            scheduled_at=timezone.now() + timedelta(minutes=5),
+        )
+        for user in (self.practitioner, self.patient):
+            Participant.objects.create(appointment=self.appointment, user=user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.practitioner)
+        self.join_url = reverse("appointment-join", kwargs={"pk": self.appointment.pk})
+        self.leave_url = reverse(
+            "appointment-leave", kwargs={"pk": self.appointment.pk}
+        )
+
+    def _events(self, event):
+        return Message.objects.filter(
+            consultation=self.appointment.consultation, event=event
+        ).count()
+
+    def _join(self, server):
+        with patch(
+            "consultations.views.Server.get_or_pin_for_room", return_value=server
+        ), patch("consultations.joins.publish_to_users") as publish:
+            response = self.client.get(self.join_url)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response, publish
+
+    def test_rejoin_reuses_token_and_is_announced_once(self):
+        server = _server()
+        first, publish = self._join(server)
+        self.assertEqual(publish.call_count, 1)
+        self.assertEqual(list(publish.call_args.args[0]), [self.patient.pk])
+
+        second, publish = self._join(server)
+        self.assertEqual(second.data, first.data)
+        publish.assert_not_called()
+        self.assertEqual(server.instance.appointment_participant_info.call_count, 1)
+        self.assertEqual(self._events("participant_joined"), 1)
+
+    def test_token_is_not_reused_across_servers(self):
+        self._join(_server(pk=1))
+        # The room was moved to another server.
+        server = _server(pk=2)
+        self._join(server)
+        self.assertEqual(server.instance.appointment_participant_info.call_count, 1)
+        self.assertEqual(self._events("participant_joined"), 1)
+
+    def test_leave_is_announced_once_per_presence(self):
+        self._join(_server())
+        self.client.post(self.leave_url)
+        self.client.post(self.leave_url)
+        self.assertEqual(self._events("participant_left"), 1)
+
+        # Back after leaving: a new presence.
+        self._join(_server())
+        self.assertEqual(self._events("participant_joined"), 2)
+
+    def test_rejoin_only_reads(self):
+        server = _server()
+        with CaptureQueriesContext(connection) as first:
+            self._join(server)
+        with CaptureQueriesContext(connection) as rejoin:
+            self._join(server)
+        writes = [
+            query["sql"]
+            for query in rejoin.captured_queries
+            if query["sql"].startswith(("INSERT", "UPDATE"))
+        ]
+        self.assertEqual(writes, [])
+        self.assertLess(len(rejoin), len(first))
@@ -0,0 +1,152 @@
+import io
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from django.urls import reverse
+from django_tenants.test.cases import TenantTestCase
+from rest_framework.test import APIClient
+
+from consultations import exports
+from consultations.models import Consultation, Message
+from consultations.tasks import export_consultation_pdf
+from users.models import User
+
+
+def _render_now(consultation_id, organisation_id, name):
+    export_consultation_pdf(consultation_id, organisation_id, name)
+
+
+class ConsultationPdfExportTests(TenantTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.practitioner = User.objects.create_user(
+            email="doc@example.com", is_practitioner=True
+        )
+        self.patient = User.objects.create_user(email="pat@example.com")
+        self.consultation = Consultation.objects.create(
+            title="Follow-up",
+            beneficiary=self.patient,
+            created_by=self.practitioner,
+            owned_by=self.practitioner,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.practitioner)
+        self.url = reverse("consultation-export-pdf", args=[self.consultation.pk])
+
+    def test_export_is_rendered_in_background_then_downloaded(self):
+        with mock.patch.object(export_consultation_pdf, "delay") as delay:
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(response.data["status"], exports.PENDING)
+            # A second request while pending does not enqueue again.
+            self.client.get(self.url)
+        delay.assert_called_once()
+
+        _render_now(*delay.call_args.args)
+        status_url = reverse(
+            "consultation-export-pdf-status", args=[self.consultation.pk]
+        )
+        self.assertEqual(self.client.get(status_url).data["status"], exports.READY)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertIn(
+            f"consultation_{self.consultation.pk}_follow-up.pdf",
+            response["Content-Disposition"],
+        )
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+    def test_new_message_invalidates_export(self):
+        name = exports.export_name(self.consultation, None)
+        self.assertEqual(name, exports.export_name(self.consultation, None))
+        Message.objects.create(
+            consultation=self.consultation, created_by=self.patient, content="Hi"
+        )
+        self.assertNotEqual(name, exports.export_name(self.consultation, None))
+
+    def _render(self):
+        name = exports.export_name(self.consultation, None)
+        exports.render_export(self.consultation, None, name)
+        return name
+
+    def test_new_version_deletes_older_ones(self):
+        old = self._render()
+        Message.objects.create(
+            consultation=self.consultation, created_by=self.patient, content="Hi"
+        )
+        new = self._render()
+
+        self.assertFalse(default_storage.exists(old))
+        self.assertTrue(default_storage.exists(new))
+
+    def test_deleting_consultation_deletes_exports(self):
+        name = self._render()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.consultation.delete()
+        self.assertFalse(default_storage.exists(name))
+
+    def test_failed_export_is_reported_and_retried(self):
+        with mock.patch.object(export_consultation_pdf, "delay") as delay:
+            self.client.get(self.url)
+            with mock.patch(
+                "consultations.pdf_export.generate_consultation_pdf",
+                side_effect=RuntimeError,
+            ):
+                with self.assertRaises(RuntimeError):
+                    _render_now(*delay.call_args.args)
+
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 500)
+            self.assertEqual(response.data["status"], exports.FAILED)
+
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 202)
+        self.assertEqual(delay.call_count, 2)
+
+    def test_zip_export_streams_every_pdf(self):
+        other = Consultation.objects.create(
+            beneficiary=self.patient,
+            created_by=self.practitioner,
+            owned_by=self.practitioner,
+        )
+        url = reverse("consultation-export-zip")
+        body = {"consultations": [self.consultation.pk, other.pk]}
+
+        with mock.patch.object(
+            export_consultation_pdf, "delay", side_effect=_render_now
+        ):
+            response = self.client.post(url, body, format="json")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(
+            sorted(response.data["pending"]), sorted(body["consultations"])
+        )
+
+        response = self.client.post(url, body, format="json")
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(
+            sorted(archive.namelist()),
+            sorted(
+                [
+                    f"consultation_{self.consultation.pk}_follow-up.pdf",
+                    f"consultation_{other.pk}.pdf",
+                ]
+            ),
+        )
+        for filename in archive.namelist():
+            self.assertTrue(archive.read(filename).startswith(b"%PDF"))
+
+    def test_zip_export_validates_ids(self):
+        url = reverse("consultation-export-zip")
+        response = self.client.post(url, {"consultations": "all"}, format="json")
+        self.assertEqual(response.status_code, 400)
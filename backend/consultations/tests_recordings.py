@@ -0,0 +1,112 @@
+import io
+from datetime import datetime, timezone
+from unittest import mock
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+from django.test import override_settings
+from django.urls import reverse
+from django_tenants.test.cases import TenantTestCase
+from rest_framework.test import APIClient
+
+from consultations.models import Consultation, Message
+from users.models import User
+
+VIDEO = bytes(range(256)) * 4
+
+
+def _object(data, content_range=None):
+    obj = {
+        "Body": StreamingBody(io.BytesIO(data), len(data)),
+        "ContentLength": len(data),
+        "ContentType": "video/mp4",
+        "ETag": '"abc"',
+        "LastModified": datetime(2026, 1, 1, tzinfo=timezone.utc),
+    }
+    if content_range:
+        obj["ContentRange"] = content_range
+    return obj
+
+
+def _error(code):
+    return ClientError({"Error": {"Code": code}}, "GetObject")
+
+
+class RecordingDeliveryTests(TenantTestCase):
+    def setUp(self):
+        # Class-level override_settings is not applied on TenantTestCase.
+        settings_override = override_settings(RECORDING_DELIVERY="proxy")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.practitioner = User.objects.create_user(
+            email="doc@example.com", is_practitioner=True
+        )
+        self.other = User.objects.create_user(
+            email="other@example.com", is_practitioner=True
+        )
+        consultation = Consultation.objects.create(
+            created_by=self.practitioner, owned_by=self.practitioner
+        )
+        self.message = Message.objects.create(
+            consultation=consultation,
+            created_by=self.practitioner,
+            recording_url="recordings/room/video.mp4",
+        )
+        self.url = reverse("message-download-recording", args=[self.message.pk])
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.practitioner)
+
+        patcher = mock.patch("consultations.recordings.s3_client")
+        self.s3 = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_full_download(self):
+        self.s3.get_object.return_value = _object(VIDEO)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), VIDEO)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertNotIn("Range", self.s3.get_object.call_args.kwargs)
+
+    def test_range_is_forwarded_with_206(self):
+        self.s3.get_object.return_value = _object(
+            VIDEO[100:200], content_range=f"bytes 100-199/{len(VIDEO)}"
+        )
+        response = self.client.get(self.url, HTTP_RANGE="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 100-199/{len(VIDEO)}")
+        self.assertEqual(response["Content-Length"], "100")
+        self.assertEqual(self.s3.get_object.call_args.kwargs["Range"], "bytes=100-199")
+
+    def test_stale_if_range_sends_whole_file(self):
+        self.s3.get_object.side_effect = [_error("PreconditionFailed"), _object(VIDEO)]
+        response = self.client.get(
+            self.url, HTTP_RANGE="bytes=100-", HTTP_IF_RANGE='"old"'
+        )
+        self.assertEqual(response.status_code, 200)
+        first, second = self.s3.get_object.call_args_list
+        self.assertEqual(first.kwargs["IfMatch"], '"old"')
+        self.assertNotIn("Range", second.kwargs)
+
+    def test_unsatisfiable_range(self):
+        self.s3.get_object.side_effect = _error("InvalidRange")
+        self.s3.head_object.return_value = {"ContentLength": len(VIDEO)}
+        response = self.client.get(self.url, HTTP_RANGE="bytes=5000-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(VIDEO)}")
+
+    @override_settings(RECORDING_DELIVERY="redirect")
+    def test_redirect_to_presigned_url(self):
+        self.s3.generate_presigned_url.return_value = "https://s3.example/signed"
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], "https://s3.example/signed")
+        self.s3.get_object.assert_not_called()
+
+    def test_access_is_checked_before_s3(self):
+        self.client.force_authenticate(user=self.other)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 404)
+        self.s3.get_object.assert_not_called()
+        self.s3.generate_presigned_url.assert_not_called()
@@ -3,13 +3,25 @@ from unittest.mock import patch
 from zoneinfo import ZoneInfo
 
 from constance.test import override_config
+from django.core.cache import cache
 from django.urls import reverse
 from django.utils import timezone
 from django_tenants.test.cases import TenantTestCase
 from rest_framework.test import APIClient
 
-from consultations.models import Consultation, RecurrencePeriod, Reminder
-from consultations.tasks import handle_custom_reminders
+from consultations.models import (
+    Appointment,
+    AppointmentStatus,
+    Consultation,
+    Participant,
+    RecurrencePeriod,
+    Reminder,
+)
+from consultations.tasks import (
+    _reminder_watermark_key,
+    handle_custom_reminders_for_tenant,
+    handle_reminders_for_tenant,
+)
 from messaging.models import Message
 from users.models import User
 
@@ -280,7 +292,7 @@ class ReminderTaskTests(_ReminderBase):
         )
         self.assertEqual(reminder.next_run_at, now)
 
-        handle_custom_reminders()
+        handle_custom_reminders_for_tenant()
 
         msg = Message.objects.get(sent_to=self.patient)
         # The Message is rendered through the "reminder" template, with the
@@ -307,7 +319,7 @@ class ReminderTaskTests(_ReminderBase):
             scheduled_at=now,
         )
 
-        handle_custom_reminders()
+        handle_custom_reminders_for_tenant()
 
         msg = Message.objects.get(sent_to=self.patient)
         # Subject is prefixed with "Reminder:" and carries the title.
@@ -332,7 +344,7 @@ class ReminderTaskTests(_ReminderBase):
             scheduled_at=now,
         )
 
-        handle_custom_reminders()
+        handle_custom_reminders_for_tenant()
 
         msg = Message.objects.get(sent_to=self.patient)
         self.assertEqual(msg.render_subject, "Reminder: Standalone title")
@@ -355,7 +367,7 @@ class ReminderTaskTests(_ReminderBase):
         )
 
         # Occurrence 1 (today)
-        handle_custom_reminders()
+        handle_custom_reminders_for_tenant()
         reminder.refresh_from_db()
         self.assertEqual(reminder.occurrences_sent, 1)
         self.assertEqual(reminder.next_run_at, now + timedelta(days=1))
@@ -364,7 +376,7 @@ class ReminderTaskTests(_ReminderBase):
         # Occurrence 2 (+1 day): advance the matched minute
         reminder.next_run_at = now
         reminder.save(update_fields=["next_run_at"])
-        handle_custom_reminders()
+        handle_custom_reminders_for_tenant()
         reminder.refresh_from_db()
         self.assertEqual(reminder.occurrences_sent, 2)
         self.assertEqual(reminder.next_run_at, now + timedelta(days=1))
@@ -373,7 +385,7 @@ class ReminderTaskTests(_ReminderBase):
         # Occurrence 3 (last): schedule exhausted afterwards
         reminder.next_run_at = now
         reminder.save(update_fields=["next_run_at"])
-        handle_custom_reminders()
+        handle_custom_reminders_for_tenant()
         reminder.refresh_from_db()
         self.assertEqual(reminder.occurrences_sent, 3)
         self.assertFalse(reminder.is_active)
@@ -392,7 +404,7 @@ class ReminderTaskTests(_ReminderBase):
         )
         self.assertEqual(reminder.next_run_at, past)
 
-        handle_custom_reminders()
+        handle_custom_reminders_for_tenant()
 
         self.assertEqual(Message.objects.filter(sent_to=self.patient).count(), 1)
         reminder.refresh_from_db()
@@ -421,7 +433,7 @@ class ReminderTaskTests(_ReminderBase):
             recurrence_count=10,
         )
 
-        handle_custom_reminders()
+        handle_custom_reminders_for_tenant()
 
         # Occurrences at start, +1d, +2d, +3d (all in the past) -> 4 messages;
         # the 5th (+4d, ~12h in the future) is not yet due.
@@ -433,6 +445,76 @@ class ReminderTaskTests(_ReminderBase):
         self.assertGreater(reminder.next_run_at, timezone.now())
 
 
+@override_config(appointment_first_reminder=60, appointment_last_reminder=10)
+class AppointmentReminderTaskTests(_ReminderBase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.now = timezone.now().replace(second=0, microsecond=0)
+        self.consultation = Consultation.objects.create(
+            created_by=self.practitioner, owned_by=self.practitioner
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def _appointment(self, scheduled_at):
+        appointment = Appointment.objects.create(
+            consultation=self.consultation,
+            created_by=self.practitioner,
+            scheduled_at=scheduled_at,
+            status=AppointmentStatus.scheduled,
+        )
+        participant = Participant.objects.create(
+            appointment=appointment, user=self.patient
+        )
+        return appointment, participant
+
+    def _reminders(self, template):
+        return Message.objects.filter(
+            sent_to=self.patient, template_system_name=template
+        )
+
+    def test_due_reminder_is_sent_once(self):
+        _, participant = self._appointment(self.now + timedelta(minutes=60))
+
+        handle_reminders_for_tenant(self.now.isoformat())
+        handle_reminders_for_tenant(self.now.isoformat())
+
+        self.assertEqual(self._reminders("appointment_first_reminder").count(), 1)
+        participant.refresh_from_db()
+        self.assertEqual(participant.first_reminder_sent_at, self.now)
+        self.assertIsNone(participant.last_reminder_sent_at)
+
+    def test_missed_beats_are_caught_up(self):
+        self._appointment(self.now + timedelta(minutes=57))
+        cache.set(_reminder_watermark_key(), self.now - timedelta(minutes=5))
+
+        handle_reminders_for_tenant(self.now.isoformat())
+
+        self.assertEqual(self._reminders("appointment_first_reminder").count(), 1)
+        self.assertEqual(cache.get(_reminder_watermark_key()), self.now)
+
+    def test_reminder_outside_window_is_not_sent(self):
+        self._appointment(self.now + timedelta(minutes=57))
+
+        # No watermark: only the last minute is covered.
+        handle_reminders_for_tenant(self.now.isoformat())
+
+        self.assertFalse(self._reminders("appointment_first_reminder").exists())
+
+    def test_reschedule_resets_sent_state(self):
+        appointment, participant = self._appointment(self.now + timedelta(minutes=10))
+        handle_reminders_for_tenant(self.now.isoformat())
+        self.assertEqual(self._reminders("appointment_last_reminder").count(), 1)
+
+        appointment.scheduled_at = self.now + timedelta(days=1)
+        appointment.save()
+
+        participant.refresh_from_db()
+        self.assertIsNone(participant.last_reminder_sent_at)
+
+
 class ReminderOccurrenceTests(_ReminderBase):
     def _mk(self, **kw):
         defaults = dict(
@@ -0,0 +1,84 @@
+from django.test import RequestFactory
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+
+from consultations import unread
+from consultations.models import Consultation, ConsultationReadStatus, Message
+from consultations.serializers import ConsultationSerializer
+from consultations.views import annotate_unread_count
+from users.models import User
+
+
+class UnreadCounterTests(TenantTestCase):
+    def setUp(self):
+        self.practitioner = User.objects.create_user(
+            email="doc@example.com", is_practitioner=True
+        )
+        self.patient = User.objects.create_user(email="pat@example.com")
+        self.consultation = Consultation.objects.create(
+            beneficiary=self.patient,
+            created_by=self.practitioner,
+            owned_by=self.practitioner,
+        )
+
+    def _count(self, user):
+        return annotate_unread_count(
+            Consultation.objects.filter(pk=self.consultation.pk), user
+        ).get()._unread_count
+
+    def _message(self, author, content="Hello"):
+        return Message.objects.create(
+            consultation=self.consultation, created_by=author, content=content
+        )
+
+    def test_new_message_increments_other_recipients(self):
+        self._message(self.patient)
+        self._message(self.patient)
+        self.assertEqual(self._count(self.practitioner), 2)
+        self.assertEqual(self._count(self.patient), 0)
+
+    def test_system_message_counts_for_everyone(self):
+        self._message(None)
+        self.assertEqual(self._count(self.practitioner), 1)
+        self.assertEqual(self._count(self.patient), 1)
+
+    def test_mark_read_resets(self):
+        self._message(self.patient)
+        unread.mark_read(self.consultation, self.practitioner)
+        self.assertEqual(self._count(self.practitioner), 0)
+        self._message(self.patient)
+        self.assertEqual(self._count(self.practitioner), 1)
+
+    def test_soft_delete_decrements_unread_only(self):
+        message = self._message(self.patient)
+        message.deleted_at = timezone.now()
+        message.save()
+        unread.message_deleted(message)
+        self.assertEqual(self._count(self.practitioner), 0)
+
+        message = self._message(self.patient)
+        unread.mark_read(self.consultation, self.practitioner)
+        unread.message_deleted(message)
+        self.assertEqual(self._count(self.practitioner), 0)
+
+    def test_rebuild_matches_messages(self):
+        self._message(self.patient)
+        self._message(self.practitioner)
+        ConsultationReadStatus.objects.all().delete()
+
+        unread.rebuild(Consultation.objects.all())
+
+        self.assertEqual(self._count(self.practitioner), 1)
+        self.assertEqual(self._count(self.patient), 1)
+
+    def test_never_read_is_null_without_annotation(self):
+        self._message(self.patient)
+        request = RequestFactory().get("/")
+        request.user = self.practitioner
+        serializer = ConsultationSerializer(context={"request": request})
+
+        self.assertIsNone(serializer.get_last_read_at(self.consultation))
+        self.assertEqual(serializer.get_unread_count(self.consultation), 1)
+
+        unread.mark_read(self.consultation, self.practitioner)
+        self.assertIsNotNone(serializer.get_last_read_at(self.consultation))
@@ -0,0 +1,119 @@
+"""Per-user unread message counters.
+
+Counting the unread messages of every consultation of a list with a
+``COUNT(...) FILTER`` over the messages join grows with the chat history of
+the page. The count is instead kept on the ``ConsultationReadStatus`` row of
+each (consultation, user) pair:
+
+- a new message increments the counter of every recipient but its author;
+- a soft-deleted message decrements the counter of the recipients that had
+  not read it yet;
+- ``mark_read`` resets the counter along with ``last_read_at``.
+
+A recipient without a read status yet gets a row with ``last_read_at`` at
+``EPOCH``, which the list annotation already reads as "never read". The
+``rebuild_unread_counters`` command recomputes every counter from the
+messages, should they ever drift.
+"""
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=ZoneInfo("UTC"))
+
+
+def last_read_at(value):
+    """``last_read_at`` as exposed by the API: None for a never read ``EPOCH``."""
+    return value if value and value > EPOCH else None
+
+
+def _ensure_statuses(consultation_id, user_pks):
+    from .models import ConsultationReadStatus
+
+    ConsultationReadStatus.objects.bulk_create(
+        [
+            ConsultationReadStatus(
+                consultation_id=consultation_id, user_id=pk, last_read_at=EPOCH
+            )
+            for pk in user_pks
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def message_created(message, user_pks):
+    """Increment the counters of ``user_pks`` for a new message.
+
+    Rows are created first with a conflict-ignoring insert, so two messages
+    saved concurrently never lose an increment.
+    """
+    from .models import ConsultationReadStatus
+
+    user_pks = {pk for pk in user_pks if pk and pk != message.created_by_id}
+    if not user_pks:
+        return
+    _ensure_statuses(message.consultation_id, user_pks)
+    ConsultationReadStatus.objects.filter(
+        consultation_id=message.consultation_id, user_id__in=user_pks
+    ).update(unread_count=F("unread_count") + 1)
+
+
+def message_deleted(message):
+    """Decrement the counters of the users who had not read ``message``."""
+    from .models import ConsultationReadStatus
+
+    statuses = ConsultationReadStatus.objects.filter(
+        consultation_id=message.consultation_id,
+        last_read_at__lt=message.created_at,
+        unread_count__gt=0,
+    )
+    if message.created_by_id:
+        statuses = statuses.exclude(user_id=message.created_by_id)
+    statuses.update(unread_count=F("unread_count") - 1)
+
+
+def mark_read(consultation, user):
+    """Record that ``user`` has read every message of ``consultation``."""
+    from .models import ConsultationReadStatus
+
+    ConsultationReadStatus.objects.update_or_create(
+        consultation=consultation,
+        user=user,
+        defaults={"last_read_at": timezone.now(), "unread_count": 0},
+    )
+
+
+def rebuild(consultations):
+    """Recompute the counters of ``consultations`` from their messages.
+
+    Missing rows are created for the current recipients of each consultation
+    that has messages, then every counter is set with a single UPDATE.
+    Returns the number of read statuses updated.
+    """
+    from .models import ConsultationReadStatus, Message
+    from .signals import get_users_to_notification_consultation
+
+    for consultation in consultations.filter(messages__isnull=False).distinct().iterator():
+        _ensure_statuses(
+            consultation.pk, get_users_to_notification_consultation(consultation)
+        )
+
+    unread = (
+        Message.objects.filter(
+            consultation=OuterRef("consultation"),
+            deleted_at__isnull=True,
+            created_at__gt=OuterRef("last_read_at"),
+        )
+        .exclude(created_by=OuterRef("user"))
+        .order_by()
+        .values("consultation")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    return ConsultationReadStatus.objects.filter(
+        consultation__in=consultations
+    ).update(unread_count=Coalesce(Subquery(unread), Value(0)))
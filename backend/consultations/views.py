@@ -4,10 +4,10 @@ import logging
 from zoneinfo import ZoneInfo
 import uuid
 
-import boto3
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from core.channel_groups import user_group
+from core.fanout import publish_to_users
 from core.mixins import CreatedByMixin
 from django.conf import settings
 from constance import config
@@ -16,20 +16,19 @@ from django.db import models, transaction
 from django.db.models import (
     BooleanField,
     Case,
-    Count,
     Exists,
     F,
+    FilteredRelation,
     OuterRef,
     Q,
-    Subquery,
     Value,
     When,
 )
 from django.db.models.functions import Coalesce
-from django.http import HttpResponse, StreamingHttpResponse
+from django.core.files.storage import default_storage
+from django.http import FileResponse, StreamingHttpResponse
 from django.utils import timezone
 from django.utils.dateparse import parse_date
-from django.utils.text import slugify
 from django.utils.translation import gettext as _, gettext_lazy
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import (
@@ -46,7 +45,11 @@ from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from users.geo import bounds_q, parse_bounds
 
+from . import exports, joins, unread
+from .unread import EPOCH
+from .availability import AvailabilityEngine
 from .fhir import AppointmentFhirMapper, EncounterFhirMapper, PrescriptionFhirMapper
 from fhir_server.mixins import FhirViewSetMixin
 from .filters import AppointmentFilter, ConsultationFilter, ReminderFilter
@@ -56,7 +59,6 @@ from .models import (
     BookingSlot,
     Consultation,
     CustomField,
-    ConsultationReadStatus,
     Message,
     Participant,
     Prescription,
@@ -68,6 +70,7 @@ from .models import (
     Type,
 )
 from .paginations import ConsultationPagination
+from .recordings import serve_recording
 from .permissions import IsPractitioner
 from .serializers import (
     AppointmentAddParticipantsSerializer,
@@ -93,6 +96,8 @@ User = get_user_model()
 
 logger = logging.getLogger(__name__)
 
+EXPORT_ZIP_MAX_CONSULTATIONS = 100
+
 
 @dataclass
 class Slot:
@@ -106,29 +111,23 @@ class Slot:
     user_last_name: str
 
 
-EPOCH = datetime(1970, 1, 1, tzinfo=ZoneInfo("UTC"))
-
-
 def annotate_unread_count(queryset, user):
-    """Annotate a Consultation queryset with _unread_count for the given user."""
-    read_status_sq = ConsultationReadStatus.objects.filter(
-        consultation=models.OuterRef("pk"),
-        user=user,
-    ).values("last_read_at")[:1]
+    """Annotate a Consultation queryset with _unread_count for the given user.
 
+    The count is read from the user's ConsultationReadStatus counter (see
+    consultations.unread) through a single LEFT JOIN on its unique
+    (consultation, user) index.
+    """
     return queryset.annotate(
+        _read_status=FilteredRelation(
+            "read_statuses", condition=Q(read_statuses__user=user)
+        ),
         _last_read_at=Coalesce(
-            Subquery(read_status_sq),
+            F("_read_status__last_read_at"),
             Value(EPOCH),
             output_field=models.DateTimeField(),
         ),
-        _unread_count=Count(
-            "messages",
-            filter=Q(messages__created_at__gt=F("_last_read_at"))
-            & ~Q(messages__created_by=user)
-            & Q(messages__deleted_at__isnull=True),
-            distinct=True,
-        ),
+        _unread_count=Coalesce(F("_read_status__unread_count"), Value(0)),
     )
 
 
@@ -207,17 +206,17 @@ class ConsultationViewSet(FhirViewSetMixin, CreatedByMixin, viewsets.ModelViewSe
             ).distinct()
         qs = annotate_unread_count(qs, user)
         qs = annotate_unassigned_request(qs)
+        # Only the serialized actions use the prefetched relations; the
+        # others (join, mark_read, exports...) just need the object.
+        if self.action in ("list", "retrieve"):
+            qs = ConsultationSerializer.prefetch_queryset(qs, user)
         return qs
 
     @action(detail=True, methods=["post"])
     def mark_read(self, request, pk=None):
         """Mark all messages in a consultation as read for the current user."""
         consultation = self.get_object()
-        ConsultationReadStatus.objects.update_or_create(
-            consultation=consultation,
-            user=request.user,
-            defaults={"last_read_at": timezone.now()},
-        )
+        unread.mark_read(consultation, request.user)
         return Response({"status": "ok"})
 
     @action(detail=True, methods=["post"], url_path="sync-consultation-keys")
@@ -489,55 +488,116 @@ class ConsultationViewSet(FhirViewSetMixin, CreatedByMixin, viewsets.ModelViewSe
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @extend_schema(
-        responses={200: {"type": "string", "format": "binary"}},
-        description="Export consultation data as a PDF document.",
+        responses={
+            200: {"type": "string", "format": "binary"},
+            202: {"type": "object", "properties": {"status": {"type": "string"}}},
+        },
+        description=(
+            "Export consultation data as a PDF document. The PDF is rendered in "
+            "the background: until it is ready the response is 202 with its "
+            "status, and the same URL then downloads it."
+        ),
     )
     @action(detail=True, methods=["get"], url_path="export/pdf")
     def export_pdf(self, request, pk=None):
-        from .pdf_export import generate_consultation_pdf
-
         consultation = self.get_object()
+        name = exports.export_name(consultation, request.user.main_organisation)
+
+        export_status = exports.export_status(name)
+        if export_status == exports.READY:
+            return FileResponse(
+                default_storage.open(name, "rb"),
+                as_attachment=True,
+                filename=exports.download_filename(consultation),
+                content_type="application/pdf",
+            )
+        if export_status == exports.FAILED:
+            exports.clear_failure(name)
+            return Response(
+                {"status": exports.FAILED, "error": _("The PDF export failed.")},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
 
-        appointments = (
-            consultation.appointments.all()
-            .prefetch_related("participant_set__user")
-            .select_related("created_by")
-            .order_by("scheduled_at")
+        export_status = exports.request_export(
+            consultation, request.user.main_organisation, name
         )
+        return Response({"status": export_status}, status=status.HTTP_202_ACCEPTED)
 
-        messages = (
-            consultation.messages.filter(deleted_at__isnull=True)
-            .select_related("created_by")
-            .order_by("created_at")
-        )
+    @extend_schema(
+        responses={200: {"type": "object", "properties": {"status": {"type": "string"}}}},
+        description=(
+            "Status of the PDF export of the consultation in its current state: "
+            "ready, pending, failed, or null when none was requested."
+        ),
+    )
+    @action(detail=True, methods=["get"], url_path="export/pdf/status")
+    def export_pdf_status(self, request, pk=None):
+        consultation = self.get_object()
+        name = exports.export_name(consultation, request.user.main_organisation)
+        return Response({"status": exports.export_status(name)})
 
-        reminders = (
-            consultation.reminders.all()
-            .select_related("recipient", "created_by")
-            .order_by("scheduled_at")
-        )
+    @extend_schema(
+        request={
+            "application/json": {
+                "type": "object",
+                "properties": {
+                    "consultations": {"type": "array", "items": {"type": "integer"}}
+                },
+            }
+        },
+        responses={
+            200: {"type": "string", "format": "binary"},
+            202: {"type": "object", "properties": {"pending": {"type": "array"}}},
+        },
+        description=(
+            "Export several consultations as one ZIP archive of PDFs. Missing "
+            "exports are rendered in the background and listed with a 202; "
+            "once all are ready the archive is streamed."
+        ),
+    )
+    @action(detail=False, methods=["post"], url_path="export/zip")
+    def export_zip(self, request):
+        ids = request.data.get("consultations")
+        if (
+            not isinstance(ids, list)
+            or not ids
+            or len(ids) > EXPORT_ZIP_MAX_CONSULTATIONS
+            or not all(isinstance(pk, int) for pk in ids)
+        ):
+            return Response(
+                {
+                    "error": _(
+                        "Provide a list of at most %(max)s consultation ids."
+                    ) % {"max": EXPORT_ZIP_MAX_CONSULTATIONS}
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         organisation = request.user.main_organisation
+        consultations = self.get_queryset().filter(pk__in=ids).order_by("pk")
+        entries, pending = [], []
+        for consultation in consultations:
+            name = exports.export_name(consultation, organisation)
+            export_status = exports.export_status(name)
+            if export_status == exports.FAILED:
+                exports.clear_failure(name)
+            if export_status != exports.READY:
+                exports.request_export(consultation, organisation, name)
+                pending.append(consultation.pk)
+            entries.append((exports.download_filename(consultation), name))
+
+        if not entries:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        if pending:
+            return Response(
+                {"status": exports.PENDING, "pending": pending},
+                status=status.HTTP_202_ACCEPTED,
+            )
 
-        pdf_buffer = generate_consultation_pdf(
-            consultation=consultation,
-            appointments=appointments,
-            messages=messages,
-            reminders=reminders,
-            organisation=organisation,
-        )
-
-        title_slug = slugify(consultation.title or "")
-        filename = f"consultation_{consultation.pk}"
-        if title_slug:
-            filename += f"_{title_slug}"
-        filename += ".pdf"
-
-        response = HttpResponse(
-            pdf_buffer.read(),
-            content_type="application/pdf",
+        response = StreamingHttpResponse(
+            exports.stream_zip(entries), content_type="application/zip"
         )
-        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        response["Content-Disposition"] = 'attachment; filename="consultations.zip"'
         return response
 
 
@@ -588,13 +648,16 @@ class AppointmentViewSet(FhirViewSetMixin, viewsets.ModelViewSet):
         from users.services import visible_practitioner_ids
 
         visible_ids = visible_practitioner_ids(user)
-        return Appointment.objects.filter(
+        queryset = Appointment.objects.filter(
             Q(participant__user=user, participant__is_active=True)
             | Q(created_by=user)
             | Q(consultation__in=Consultation.objects.accessible_by(user))
             | Q(created_by_id__in=visible_ids)
             | Q(participant__user_id__in=visible_ids, participant__is_active=True)
         ).distinct()
+        if self.action in ("join", "leave"):
+            queryset = queryset.select_related("consultation")
+        return queryset
 
     @extend_schema(
         responses={
@@ -626,13 +689,16 @@ class AppointmentViewSet(FhirViewSetMixin, viewsets.ModelViewSet):
     def join(self, request, pk=None):
         """Join consultation call"""
         appointment = self.get_object()
+        participant_user_ids = list(
+            appointment.participant_set.filter(is_active=True).values_list(
+                "user_id", flat=True
+            )
+        )
         # Only participants may join: the read scope of get_queryset is wider
         # (creator, visible practitioners), but attendance is what decides
         # whether the appointment took place, so joining implies being on the
         # roster. A practitioner who wants in adds themselves as a participant.
-        if not appointment.participant_set.filter(
-            user=request.user, is_active=True
-        ).exists():
+        if request.user.pk not in participant_user_ids:
             return Response(
                 {
                     "detail": _(
@@ -676,11 +742,21 @@ class AppointmentViewSet(FhirViewSetMixin, viewsets.ModelViewSet):
                 status=status.HTTP_503_SERVICE_UNAVAILABLE,
             )
 
-        call_info = server.instance.appointment_participant_info(appointment, request.user)
+        # `join` is called again on every reconnect: the media token is
+        # reused and only an actual arrival is recorded and announced.
+        call_info = joins.join_info(
+            server,
+            appointment.room_uuid,
+            request.user,
+            lambda: server.instance.appointment_participant_info(
+                appointment, request.user
+            ),
+        )
+        if not joins.mark_joined(appointment.room_uuid, request.user.pk):
+            return Response(call_info)
 
-        # The participant actually joined the call: record their arrival once.
-        # `join` is called again on every reconnect, so keep the first arrival
-        # and stay on a single UPDATE that doesn't fan out through post_save.
+        # The participant actually joined the call: record their arrival once,
+        # with a single UPDATE that doesn't fan out through post_save.
         Participant.objects.filter(
             appointment=appointment,
             user=request.user,
@@ -688,27 +764,9 @@ class AppointmentViewSet(FhirViewSetMixin, viewsets.ModelViewSet):
             arrived_at__isnull=True,
         ).update(arrived_at=timezone.now())
 
-        # Send websocket notification to all active participants except the user who joined
-        channel_layer = get_channel_layer()
-        active_participants = appointment.participant_set.filter(is_active=True)
-
-        for participant in active_participants:
-            if participant.user.pk == request.user.pk:
-                continue
-
-            async_to_sync(channel_layer.group_send)(
-                user_group(participant.user.pk),
-                {
-                    "type": "appointment",
-                    "consultation_id": appointment.consultation.pk if appointment.consultation else None,
-                    "appointment_id": appointment.pk,
-                    "state": "participant_joined",
-                    "data": {
-                        "user_id": request.user.pk,
-                        "user_name": request.user.name or request.user.email,
-                    },
-                },
-            )
+        joins.announce(
+            appointment, request.user, "participant_joined", participant_user_ids
+        )
 
         # Create a system message for participant joined
         # The message_saved signal will automatically send WebSocket notifications
@@ -736,6 +794,11 @@ class AppointmentViewSet(FhirViewSetMixin, viewsets.ModelViewSet):
         if appointment.consultation.closed_at:
             return Response({"detail": _("Left successfully")})
 
+        # Only announce a participant who was in the call: repeated leaves
+        # of a flapping client are not.
+        if not joins.mark_left(appointment.room_uuid, request.user.pk):
+            return Response({"detail": _("Left successfully")})
+
         # Créer message système "participant left"
         user_name = request.user.name or request.user.email
         Message.objects.create(
@@ -746,26 +809,14 @@ class AppointmentViewSet(FhirViewSetMixin, viewsets.ModelViewSet):
         )
 
         # Notifier les autres participants via WebSocket
-        channel_layer = get_channel_layer()
-        active_participants = appointment.participant_set.filter(is_active=True)
-
-        for participant in active_participants:
-            if participant.user.pk == request.user.pk:
-                continue
-
-            async_to_sync(channel_layer.group_send)(
-                user_group(participant.user.pk),
-                {
-                    "type": "appointment",
-                    "consultation_id": appointment.consultation.pk,
-                    "appointment_id": appointment.pk,
-                    "state": "participant_left",
-                    "data": {
-                        "user_id": request.user.pk,
-                        "user_name": user_name,
-                    },
-                },
-            )
+        joins.announce(
+            appointment,
+            request.user,
+            "participant_left",
+            appointment.participant_set.filter(is_active=True).values_list(
+                "user_id", flat=True
+            ),
+        )
 
         return Response({"detail": _("Left successfully")})
 
@@ -1193,7 +1244,6 @@ class AppointmentViewSet(FhirViewSetMixin, viewsets.ModelViewSet):
             )
         )
 
-        channel_layer = get_channel_layer()
         payload = {
             "type": "appointment",
             "consultation_id": (
@@ -1206,8 +1256,7 @@ class AppointmentViewSet(FhirViewSetMixin, viewsets.ModelViewSet):
                 "user_name": target_user.name or target_user.email,
             },
         }
-        for user_pk in recipient_pks:
-            async_to_sync(channel_layer.group_send)(user_group(user_pk), payload)
+        publish_to_users(recipient_pks, payload)
 
     def _is_doctor(self, user, consultation, appointment=None):
         """Check if user is a doctor (in Queue group)"""
@@ -1527,147 +1576,35 @@ class ReasonSlotsView(APIView):
         practitioners = list(practitioners_query)
         if not practitioners:
             return Response([], status=status.HTTP_200_OK)
+        practitioners_by_id = {p.id: p for p in practitioners}
 
         dates = [from_date + timedelta(days=i) for i in range(15)]
 
-        booking_slots = BookingSlot.objects.filter(
-            user__in=practitioners
-        ).select_related("user")
-
-        end_date = from_date + timedelta(days=15)
-        # Held appointments still occupy their slot, so they must keep it busy.
-        existing_appointments = Appointment.objects.filter(
-            scheduled_at__date__gte=from_date,
-            scheduled_at__date__lt=end_date,
-            status__in=[AppointmentStatus.scheduled, AppointmentStatus.completed],
-        ).select_related("consultation")
-
-        appointment_lookup = {}
-        for apt in existing_appointments:
-            consultation = apt.consultation
-            if consultation and consultation.owned_by:
-                practitioner_id = consultation.owned_by.id
-                apt_start = apt.scheduled_at
-                apt_end = apt.end_expected_at or (
-                    apt_start + timedelta(minutes=reason.duration)
-                )
-
-                if practitioner_id not in appointment_lookup:
-                    appointment_lookup[practitioner_id] = []
-                appointment_lookup[practitioner_id].append((apt_start, apt_end))
+        engine = AvailabilityEngine(practitioners, reason.duration)
+        free_slots = engine.free_slots(dates)
+        now = timezone.now()
 
         available_slots = []
-        seen_slots = set()
-
         for practitioner in practitioners:
-            practitioner_slots = booking_slots.filter(user=practitioner)
-
-            for booking_slot in practitioner_slots:
-                if booking_slot.start_time >= booking_slot.end_time:
-                    continue
-
-                for target_date in dates:
-                    if (
-                        booking_slot.valid_until
-                        and booking_slot.valid_until <= target_date
-                    ):
+            # Use doctor's timezone for slot times
+            doctor_tz = ZoneInfo(practitioner.timezone or settings.TIME_ZONE)
+            for target_date in dates:
+                for start_time, end_time in free_slots.get((practitioner.id, target_date), []):
+                    # Skip slots in the past
+                    if datetime.combine(target_date, start_time, doctor_tz) <= now:
                         continue
-
-                    weekday = target_date.weekday()
-                    day_enabled = (
-                        (weekday == 0 and booking_slot.monday)
-                        or (weekday == 1 and booking_slot.tuesday)
-                        or (weekday == 2 and booking_slot.wednesday)
-                        or (weekday == 3 and booking_slot.thursday)
-                        or (weekday == 4 and booking_slot.friday)
-                        or (weekday == 5 and booking_slot.saturday)
-                        or (weekday == 6 and booking_slot.sunday)
-                    )
-
-                    if not day_enabled:
-                        continue
-
-                    current_time = booking_slot.start_time
-                    end_time = booking_slot.end_time
-                    slot_duration_delta = timedelta(minutes=reason.duration)
-
-                    iteration_count = 0
-                    max_iterations = 200
-
-                    while current_time < end_time:
-                        iteration_count += 1
-                        if iteration_count > max_iterations:
-                            break
-
-                        current_datetime = datetime.combine(target_date, current_time)
-                        slot_end_datetime = current_datetime + slot_duration_delta
-
-                        if slot_end_datetime.date() != target_date:
-                            break
-
-                        slot_end_time = slot_end_datetime.time()
-
-                        if slot_end_time > end_time:
-                            break
-
-                        if (
-                            booking_slot.start_break
-                            and booking_slot.end_break
-                            and booking_slot.start_break < booking_slot.end_break
-                        ):
-                            if (
-                                current_time < booking_slot.end_break
-                                and slot_end_time > booking_slot.start_break
-                            ):
-                                if booking_slot.end_break < end_time:
-                                    current_time = booking_slot.end_break
-                                else:
-                                    break
-                                continue
-
-                        # Use doctor's timezone for slot times
-                        doctor_timezone = practitioner.timezone or settings.TIME_ZONE
-                        doctor_tz = ZoneInfo(doctor_timezone)
-                        slot_start_aware = current_datetime.replace(tzinfo=doctor_tz)
-                        slot_end_aware = slot_end_datetime.replace(tzinfo=doctor_tz)
-
-                        # Skip slots in the past
-                        if slot_start_aware <= timezone.now():
-                            current_time = slot_end_time
-                            continue
-
-                        slot_conflicts = False
-                        practitioner_appointments = appointment_lookup.get(
-                            practitioner.id, []
+                    available_slots.append(
+                        Slot(
+                            date=target_date,
+                            start_time=start_time,
+                            end_time=end_time,
+                            duration=reason.duration,
+                            user_id=practitioner.id,
+                            user_email=practitioner.email,
+                            user_first_name=practitioner.first_name or "",
+                            user_last_name=practitioner.last_name or "",
                         )
-
-                        for apt_start, apt_end in practitioner_appointments:
-                            if (
-                                slot_start_aware < apt_end
-                                and slot_end_aware > apt_start
-                            ):
-                                slot_conflicts = True
-                                break
-
-                        if not slot_conflicts:
-                            slot_key = (target_date, current_time, practitioner.id)
-
-                            if slot_key not in seen_slots:
-                                seen_slots.add(slot_key)
-                                available_slots.append(
-                                    Slot(
-                                        date=target_date,
-                                        start_time=current_time,
-                                        end_time=slot_end_time,
-                                        duration=reason.duration,
-                                        user_id=practitioner.id,
-                                        user_email=practitioner.email,
-                                        user_first_name=practitioner.first_name or "",
-                                        user_last_name=practitioner.last_name or "",
-                                    )
-                                )
-
-                        current_time = slot_end_time
+                    )
 
         # Convert slots to patient's timezone
         if request.user.is_authenticated:
@@ -1683,7 +1620,7 @@ class ReasonSlotsView(APIView):
         slots_data = []
         for slot in available_slots:
             # Get the practitioner for this slot to know their timezone
-            practitioner = next(p for p in practitioners if p.id == slot.user_id)
+            practitioner = practitioners_by_id[slot.user_id]
             doctor_timezone = practitioner.timezone or settings.TIME_ZONE
             doctor_tz = ZoneInfo(doctor_timezone)
 
@@ -1765,6 +1702,13 @@ class MessageViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     http_method_names = ["post", "patch", "delete", "head", "options"]
 
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        # GET is only open for recording downloads (video players fetch the
+        # URL directly), not for listing or retrieving messages.
+        if request.method == "GET" and self.action == "download_recording":
+            return self.download_recording(request, *args, **kwargs)
+        return super().http_method_not_allowed(request, *args, **kwargs)
+
     def get_queryset(self):
         user = self.request.user
         if not user.is_authenticated:
@@ -1828,13 +1772,16 @@ class MessageViewSet(viewsets.ModelViewSet):
         instance.attachment = None
         instance.deleted_at = timezone.now()
         instance.save()
+        unread.message_deleted(instance)
 
         serializer = self.get_serializer(instance)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-    @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated])
+    @action(
+        detail=True, methods=["get", "post"], permission_classes=[IsAuthenticated]
+    )
     def download_recording(self, request, pk=None):
-        """Download recording from S3 through proxy"""
+        """Download recording from S3, by presigned redirect or Range-aware proxy"""
         message = self.get_object()
 
         # Check if message has a recording
@@ -1845,35 +1792,9 @@ class MessageViewSet(viewsets.ModelViewSet):
             )
 
         try:
-            # Initialize S3 client
-            s3_client = boto3.client(
-                "s3",
-                endpoint_url=settings.LIVEKIT_S3_ENDPOINT_URL,
-                aws_access_key_id=settings.LIVEKIT_S3_ACCESS_KEY,
-                aws_secret_access_key=settings.LIVEKIT_S3_SECRET_KEY,
-            )
-
-            # Get file from S3 using recording_url as the key
-            response = s3_client.get_object(
-                Bucket=settings.LIVEKIT_S3_BUCKET_NAME, Key=message.recording_url
-            )
-
-            # Extract filename from S3 key
-            filename = message.recording_url.split("/")[-1]
-
-            # Stream the file back to the user
-            streaming_response = StreamingHttpResponse(
-                response["Body"].iter_chunks(chunk_size=8192),
-                content_type=response.get("ContentType", "video/mp4"),
-            )
-            streaming_response["Content-Disposition"] = (
-                f'attachment; filename="{filename}"'
-            )
-            streaming_response["Content-Length"] = response.get("ContentLength", 0)
-
-            return streaming_response
-
+            return serve_recording(request, message.recording_url)
         except Exception as e:
+            logger.exception("Failed to serve recording of message %s", message.pk)
             return Response(
                 {"error": f"Failed to download recording: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1942,7 +1863,7 @@ class DashboardPractitionerView(APIView):
                 ).data,
                 "upcoming_total": upcoming_total,
                 "overdue_consultations": ConsultationSerializer(
-                    overdue_qs[:5],
+                    ConsultationSerializer.prefetch_queryset(overdue_qs, user)[:5],
                     many=True,
                     context=ctx,
                 ).data,
@@ -2030,32 +1951,15 @@ class ReasonViewSet(viewsets.ReadOnlyModelViewSet):
             qs = qs.filter(user_assignee__main_organisation_id=organisation)
 
         # Bounding box filter: lat_min, lat_max, lng_min, lng_max
-        lat_min = self.request.query_params.get("lat_min")
-        lat_max = self.request.query_params.get("lat_max")
-        lng_min = self.request.query_params.get("lng_min")
-        lng_max = self.request.query_params.get("lng_max")
-        if all(v is not None for v in (lat_min, lat_max, lng_min, lng_max)):
-            try:
-                lat_min_f = float(lat_min)
-                lat_max_f = float(lat_max)
-                lng_min_f = float(lng_min)
-                lng_max_f = float(lng_max)
-            except (ValueError, TypeError):
-                return qs
-
-            # Filter in Python since location is a plain text "lat,lng" field
-            ids = []
-            for reason in qs.filter(
-                user_assignee__main_organisation__location__isnull=False,
-            ).exclude(user_assignee__main_organisation__location=""):
-                loc = reason.user_assignee.main_organisation.location
-                try:
-                    lat, lng = (float(x) for x in loc.split(","))
-                    if lat_min_f <= lat <= lat_max_f and lng_min_f <= lng <= lng_max_f:
-                        ids.append(reason.id)
-                except (ValueError, AttributeError):
-                    continue
-            qs = qs.filter(id__in=ids)
+        bounds = parse_bounds(self.request.query_params)
+        if bounds is not None:
+            qs = qs.filter(
+                bounds_q(
+                    bounds,
+                    "user_assignee__main_organisation__latitude",
+                    "user_assignee__main_organisation__longitude",
+                )
+            )
 
         return qs
 
@@ -1,9 +1,16 @@
 from tenant_schemas_celery.app import CeleryApp as TenantAwareCeleryApp
+from celery.signals import task_postrun, task_prerun
+import functools
+import logging
 import os
+import time
+import uuid
 from django.conf import settings
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
+logger = logging.getLogger(__name__)
+
 
 # Create default Celery app
 app = TenantAwareCeleryApp()
@@ -17,3 +24,125 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 # files and registers any tasks it finds in them. We can import the
 # tasks files some other way if we prefer.
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
+
+
+# Every task reads the constance settings from one snapshot per tenant, like
+# requests do (see core.constance_backend).
+_pinned_config = {}
+
+
+@task_prerun.connect
+def _pin_config(task_id=None, **kwargs):
+    from core.constance_backend import pinned_config
+
+    pin = pinned_config()
+    pin.__enter__()
+    _pinned_config[task_id] = pin
+
+
+@task_postrun.connect
+def _unpin_config(task_id=None, **kwargs):
+    pin = _pinned_config.pop(task_id, None)
+    if pin is not None:
+        pin.__exit__(None, None, None)
+
+
+# Per-tenant fan-out for periodic sweeps.
+#
+# A beat task that loops over every tenant runs them serially in one worker:
+# one slow tenant delays all the others, and with enough tenants an
+# every-minute sweep overlaps its own next run. Instead the beat task only
+# enqueues one subtask per tenant (``for_each_tenant``); tenant_schemas_celery
+# stamps each subtask with the schema active when it is sent, so the workers
+# run them in parallel, each inside its own tenant. ``tenant_task`` guards the
+# subtask with a per-tenant lock so a run that outlives the beat interval is
+# not started twice, and logs how long each tenant took.
+
+DEFAULT_TENANT_LOCK_TIMEOUT = 10 * 60
+
+
+def _current_schema() -> str:
+    from django.db import connection
+
+    return getattr(getattr(connection, "tenant", None), "schema_name", None) or "public"
+
+
+def for_each_tenant(task, *args, **kwargs):
+    """Enqueue ``task`` once per tenant, in that tenant's schema."""
+    from django_tenants.utils import get_tenant_model, tenant_context
+
+    TenantModel = get_tenant_model()
+    count = 0
+    for tenant in TenantModel.objects.exclude(schema_name="public"):
+        with tenant_context(tenant):
+            task.apply_async(args=args, kwargs=kwargs)
+        count += 1
+    logger.debug("Dispatched %s to %d tenant(s)", task.name, count)
+    return count
+
+
+def tenant_task(lock_timeout=DEFAULT_TENANT_LOCK_TIMEOUT, **options):
+    """Register a per-tenant sweep body as a Celery task.
+
+    The task is skipped when the same task still runs for the same tenant.
+    The lock expires after ``lock_timeout`` seconds so a killed worker cannot
+    block a tenant forever; a run outliving it only releases its own lock.
+    The duration of every run is logged and kept in the cache under
+    ``tenant_task_stats_key``.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            from django.core.cache import cache
+
+            schema_name = _current_schema()
+            name = f"{func.__module__}.{func.__name__}"
+            lock_key = tenant_task_lock_key(name, schema_name)
+            # Identifies this run's lock: once it has expired, a newer run may
+            # hold the key, and must keep it.
+            token = uuid.uuid4().hex
+            if not cache.add(lock_key, token, timeout=lock_timeout):
+                logger.warning(
+                    "Skipping %s for tenant %s: previous run still in progress",
+                    name,
+                    schema_name,
+                )
+                return None
+
+            started = time.monotonic()
+            failed = False
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                if cache.get(lock_key) == token:
+                    cache.delete(lock_key)
+                duration = time.monotonic() - started
+                cache.set(
+                    tenant_task_stats_key(name, schema_name),
+                    {"duration": duration, "failed": failed, "finished_at": time.time()},
+                    timeout=None,
+                )
+                log = logger.warning if duration > lock_timeout else logger.info
+                log(
+                    "%s for tenant %s %s in %.3fs",
+                    name,
+                    schema_name,
+                    "failed" if failed else "finished",
+                    duration,
+                )
+
+        return app.task(**options)(run)
+
+    return decorator
+
+
+def tenant_task_lock_key(name, schema_name) -> str:
+    return f"tenant-task:lock:{schema_name}:{name}"
+
+
+def tenant_task_stats_key(name, schema_name) -> str:
+    return f"tenant-task:stats:{schema_name}:{name}"
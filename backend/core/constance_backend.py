@@ -0,0 +1,130 @@
+"""Constance database backend serving reads from an in-process snapshot.
+
+The stock ``DatabaseBackend`` runs one query per ``config.<key>`` read, and
+hot paths read many keys per request. This backend loads all the keys of a
+tenant in one query and keeps them in a per-process snapshot, so a read is a
+dict lookup.
+
+Every write bumps a per-tenant version counter in the cache (Redis). A
+process reloads the snapshot of a tenant when that version moved; it checks
+the version at most every ``CONSTANCE_SNAPSHOT_MAX_AGE`` seconds, and once
+at the start of every pinned block (``pinned_config``). Requests and Celery
+tasks run pinned, so they see the current settings and one consistent set of
+values for their whole duration. Writes made by the process itself are
+visible immediately.
+"""
+
+import contextlib
+import contextvars
+import time
+
+from constance.backends.database import DatabaseBackend
+from constance.codecs import loads
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+# Tenant-scoped through django_tenants.cache.make_key.
+VERSION_CACHE_KEY = "constance:version"
+
+_snapshots = {}  # schema -> (version, checked_at, values)
+
+# Within a pinned block: schema -> values seen by that block.
+_pinned = contextvars.ContextVar("constance_pinned", default=None)
+
+
+def _schema():
+    return getattr(connection, "schema_name", None) or "public"
+
+
+def _current_version():
+    return cache.get(VERSION_CACHE_KEY)
+
+
+def bump_version():
+    """Invalidate the snapshots of the current tenant in every process."""
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        if not cache.add(VERSION_CACHE_KEY, 1, timeout=None):
+            cache.incr(VERSION_CACHE_KEY)
+
+
+def _update_snapshot(schema, key, value):
+    """Apply a write of this process to its snapshot and pinned values."""
+    entry = _snapshots.get(schema)
+    if entry is not None:
+        entry[2][key] = value
+    pinned = _pinned.get()
+    if pinned is not None and schema in pinned:
+        pinned[schema][key] = value
+
+
+def reset_snapshots():
+    """Drop every snapshot of this process (tests roll back without signals)."""
+    _snapshots.clear()
+
+
+@contextlib.contextmanager
+def pinned_config():
+    """Serve every constance read of the block from one snapshot per tenant.
+
+    The version is checked on the first read of each tenant in the block,
+    regardless of ``CONSTANCE_SNAPSHOT_MAX_AGE``. Nested blocks share the
+    outer block's snapshots.
+    """
+    if _pinned.get() is not None:
+        yield
+        return
+    token = _pinned.set({})
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class SnapshotDatabaseBackend(DatabaseBackend):
+    def _load(self, schema, version):
+        values = dict(super().mget(settings.CONSTANCE_CONFIG.keys()))
+        _snapshots[schema] = (version, time.monotonic(), values)
+        return values
+
+    def _snapshot(self, schema, force_check=False):
+        entry = _snapshots.get(schema)
+        now = time.monotonic()
+        if entry is not None:
+            version, checked_at, values = entry
+            if not force_check and now - checked_at < settings.CONSTANCE_SNAPSHOT_MAX_AGE:
+                return values
+            current = _current_version()
+            if current == version:
+                _snapshots[schema] = (version, now, values)
+                return values
+            return self._load(schema, current)
+        return self._load(schema, _current_version())
+
+    def values(self):
+        """All the stored values of the current tenant, by key."""
+        schema = _schema()
+        pinned = _pinned.get()
+        if pinned is None:
+            return self._snapshot(schema)
+        if schema not in pinned:
+            pinned[schema] = self._snapshot(schema, force_check=True)
+        return pinned[schema]
+
+    def get(self, key):
+        return self.values().get(key)
+
+    def clear(self, sender, instance, created, **kwargs):
+        # Connected to post_save of the Constance model, so this runs for
+        # ``set`` as well as for rows saved directly, including the defaults
+        # constance stores on the first read of a key. The snapshot is
+        # updated in place rather than reloaded; other processes reload once
+        # the new value is committed.
+        super().clear(sender, instance, created, **kwargs)
+        key = instance.key
+        if key.startswith(self._prefix):
+            key = key[len(self._prefix):]
+        _update_snapshot(_schema(), key, loads(instance.value))
+        transaction.on_commit(bump_version)
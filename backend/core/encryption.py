@@ -181,8 +181,9 @@ def provision_consultation_keypair(
         unwrap via their existing QueueMembership envelope.
     """
     from consultations.models import ConsultationKey
+    from encryption_admin.keypool import take_rsa_keypair
 
-    private_pem, public_pem = generate_rsa_keypair()
+    private_pem, public_pem = take_rsa_keypair()
     public_pem_str = public_pem.decode("utf-8")
 
     consultation.is_encrypted = True
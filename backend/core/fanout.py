@@ -0,0 +1,70 @@
+"""Fan-out of one Channels event to many groups.
+
+Signals, views and tasks notify every user of a consultation. Calling
+``async_to_sync(channel_layer.group_send)`` once per user costs one event-loop
+hop and one blocking Redis publish per recipient, inside the save. ``publish``
+sends the event to every group concurrently from a single hop, and defers it
+until the surrounding transaction commits so receivers never fetch rows that
+are not visible yet.
+"""
+
+import asyncio
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from .channel_groups import user_group
+
+logger = logging.getLogger(__name__)
+
+
+async def _group_send_each(channel_layer, events):
+    results = await asyncio.gather(
+        *(channel_layer.group_send(group, message) for group, message in events),
+        return_exceptions=True,
+    )
+    for (group, message), result in zip(events, results):
+        if isinstance(result, Exception):
+            logger.error("Failed to send %s event to %s: %s", message.get("type"), group, result)
+
+
+def send_each_now(events):
+    """Send every ``(group, message)`` pair concurrently, in one event-loop hop."""
+    events = list(events)
+    if not events:
+        return
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    async_to_sync(_group_send_each)(channel_layer, events)
+
+
+def send_now(groups, message):
+    """Send ``message`` to every group concurrently, in one event-loop hop."""
+    send_each_now((group, message) for group in dict.fromkeys(groups))
+
+
+def publish(groups, message):
+    """Send ``message`` to every group once the current transaction commits.
+
+    Outside of an atomic block the event is sent immediately.
+    """
+    groups = list(groups)
+    transaction.on_commit(lambda: send_now(groups, message))
+
+
+def publish_each(events):
+    """Send distinct ``(group, message)`` pairs once the transaction commits."""
+    events = list(events)
+    transaction.on_commit(lambda: send_each_now(events))
+
+
+def publish_to_users(user_pks, message, schema_name=None):
+    """``publish`` to the personal group of each user of ``user_pks``.
+
+    Group names are resolved right away, while the connection is still bound
+    to the tenant the event belongs to.
+    """
+    publish([user_group(pk, schema_name) for pk in user_pks if pk], message)
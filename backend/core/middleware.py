@@ -82,3 +82,20 @@ class TimezoneMiddleware:
         timezone.deactivate()
 
         return response
+
+
+class ConstanceSnapshotMiddleware:
+    """
+    Serves every constance read of the request from one settings snapshot.
+
+    See core.constance_backend.pinned_config.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from core.constance_backend import pinned_config
+
+        with pinned_config():
+            return self.get_response(request)
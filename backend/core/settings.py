@@ -64,6 +64,12 @@ EMAIL_USE_SSL = os.getenv("EMAIL_USE_SSL", False)
 EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", False)
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
+EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", 30))
+# The SMTP connection of a worker is reused across emails (see
+# messaging.providers.email.SharedConnection) until it has been idle this
+# many seconds or has sent this many emails.
+EMAIL_CONNECTION_IDLE_TIMEOUT = int(os.getenv("EMAIL_CONNECTION_IDLE_TIMEOUT", 30))
+EMAIL_CONNECTION_MAX_MESSAGES = int(os.getenv("EMAIL_CONNECTION_MAX_MESSAGES", 100))
 
 # Clamav Antivirus
 if os.getenv("CLAMD_SOCKET"):
@@ -153,6 +159,7 @@ MIDDLEWARE = [
     "core.middleware.MaintenanceMiddleware",
     "core.healthcheck.HealthCheckMiddleware",
     "django_tenants.middleware.main.TenantMainMiddleware",
+    "core.middleware.ConstanceSnapshotMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
@@ -221,7 +228,10 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,
 }
 
-CONSTANCE_BACKEND = "constance.backends.database.DatabaseBackend"
+CONSTANCE_BACKEND = "core.constance_backend.SnapshotDatabaseBackend"
+# Seconds a process serves a tenant's settings snapshot outside of a request
+# or task before checking whether it was changed.
+CONSTANCE_SNAPSHOT_MAX_AGE = float(os.getenv("CONSTANCE_SNAPSHOT_MAX_AGE", 5))
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -354,6 +364,8 @@ FHIR_MAX_COUNT = int(os.getenv("FHIR_MAX_COUNT", 100))
 FHIR_STRICT_SEARCH = os.getenv("FHIR_STRICT_SEARCH", "False") == "True"
 FHIR_INCLUDE_NARRATIVE = os.getenv("FHIR_INCLUDE_NARRATIVE", "True") == "True"
 FHIR_BUNDLE_TOTAL_MODE = os.getenv("FHIR_BUNDLE_TOTAL_MODE", "accurate")
+# Largest batch/transaction Bundle accepted by POST /api/fhir.
+FHIR_BUNDLE_MAX_ENTRIES = int(os.getenv("FHIR_BUNDLE_MAX_ENTRIES", 1000))
 
 SITE_ID = 1
 ACCOUNT_EMAIL_VERIFICATION = "none"  # Disable email verification for social auth
@@ -492,6 +504,18 @@ CELERY_BEAT_SCHEDULE = {
         "task": "consultations.tasks.resolve_appointment_outcomes",
         "schedule": crontab(minute="*/10"),
     },
+    "probe_mediaservers": {
+        "task": "mediaserver.tasks.probe_mediaservers",
+        "schedule": crontab(minute="*", hour="*"),
+    },
+    "refill_keypair_pool": {
+        "task": "encryption_admin.tasks.refill_keypair_pool",
+        "schedule": crontab(minute="*", hour="*"),
+    },
+    "prune_sync_changes": {
+        "task": "dav.tasks.prune_sync_changes",
+        "schedule": crontab(minute=30, hour=3),
+    },
 }
 
 FIREBASE_APP = initialize_app()
@@ -509,6 +533,14 @@ WEBPUSH_VAPID_CLAIMS_EMAIL = os.getenv(
     "WEBPUSH_VAPID_CLAIMS_EMAIL", "mailto:admin@hcw-at-home.com"
 )
 
+# HTTP calls of the messaging providers (SMS, WhatsApp, Web Push): timeout in
+# seconds, retry budget of failed connections, and the number of messages a
+# provider sends concurrently.
+MESSAGING_HTTP_TIMEOUT = float(os.getenv("MESSAGING_HTTP_TIMEOUT", 10))
+MESSAGING_HTTP_RETRIES = int(os.getenv("MESSAGING_HTTP_RETRIES", 3))
+MESSAGING_HTTP_BACKOFF = float(os.getenv("MESSAGING_HTTP_BACKOFF", 0.5))
+MESSAGING_SEND_CONCURRENCY = int(os.getenv("MESSAGING_SEND_CONCURRENCY", 8))
+
 ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
 
 CHANNEL_LAYERS = {
@@ -1542,6 +1574,15 @@ LIVEKIT_S3_ACCESS_KEY = os.getenv("LIVEKIT_S3_ACCESS_KEY", S3_ACCESS_KEY)
 LIVEKIT_S3_SECRET_KEY = os.getenv("LIVEKIT_S3_SECRET_KEY", S3_SECRET_KEY)
 LIVEKIT_S3_REGION = os.getenv("LIVEKIT_S3_REGION", S3_REGION)
 
+# How recordings are delivered once access is checked: "proxy" streams them
+# through Django (with Range support), "redirect" sends a presigned S3 URL valid
+# for RECORDING_PRESIGNED_URL_TTL seconds.
+RECORDING_DELIVERY = os.getenv("RECORDING_DELIVERY", "proxy")
+RECORDING_PRESIGNED_URL_TTL = int(os.getenv("RECORDING_PRESIGNED_URL_TTL", 60))
+RECORDING_S3_MAX_POOL_CONNECTIONS = int(
+    os.getenv("RECORDING_S3_MAX_POOL_CONNECTIONS", 20)
+)
+
 # Recording task configuration
 RECORDING_CHECK_INITIAL_DELAY = int(
     os.getenv("RECORDING_CHECK_INITIAL_DELAY", 120)
@@ -1556,6 +1597,17 @@ RECORDING_CHECK_RETRY_DELAY = int(
 # Media server room pinning: how long to keep the room -> server mapping in cache.
 # Must outlast the longest possible call (including recording).
 ROOM_SERVER_PIN_TTL = int(os.getenv("ROOM_SERVER_PIN_TTL", 24 * 3600))
+# How long a participant counts as in a call without joining again; joins and
+# leaves within a presence are not announced again (consultations.joins).
+CALL_PRESENCE_TTL = int(os.getenv("CALL_PRESENCE_TTL", 6 * 3600))
+# How long a media server probe result is trusted; should span a few runs of
+# the probe_mediaservers beat task.
+MEDIASERVER_HEALTH_TTL = int(os.getenv("MEDIASERVER_HEALTH_TTL", 3 * 60))
+
+# Stock of pre-generated RSA keypairs kept per tenant with encryption enabled,
+# and how many the refill_keypair_pool beat task generates per run at most.
+KEYPAIR_POOL_SIZE = int(os.getenv("KEYPAIR_POOL_SIZE", 20))
+KEYPAIR_POOL_REFILL_BATCH = int(os.getenv("KEYPAIR_POOL_REFILL_BATCH", 10))
 
 # Whisper-live transcription server
 WHISPER_LIVE_URL = os.getenv("WHISPER_LIVE_URL", "ws://127.0.0.1:9090")
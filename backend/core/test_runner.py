@@ -44,7 +44,9 @@ def _install_tenant_test_case_patches():
        per-test transaction wrapping resets the connection's search_path
        between tests, so the second test in a class ends up looking at the
        public schema (where TENANT_APPS tables do NOT live) and dies with
-       "relation users_user does not exist".
+       "relation users_user does not exist". It also drops the constance
+       settings and branding snapshots: rolled back values do not
+       invalidate them.
 
     Both patches are idempotent.
     """
@@ -82,8 +84,13 @@ def _install_tenant_test_case_patches():
     if not getattr(original_pre_setup, "_hcw_patched", False):
         @classmethod
         def patched_pre_setup(cls):
+            from core.constance_backend import reset_snapshots
+            from messaging import branding
+
             if getattr(cls, "tenant", None) is not None:
                 connection.set_tenant(cls.tenant)
+            reset_snapshots()
+            branding.reset()
             original_pre_setup.__func__(cls)
 
         patched_pre_setup.__func__._hcw_patched = True
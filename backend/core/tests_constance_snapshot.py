@@ -0,0 +1,67 @@
+from constance import config
+from constance.codecs import dumps
+from constance.models import Constance
+from django.test import override_settings
+from django_tenants.test.cases import TenantTestCase
+
+from core.constance_backend import bump_version, pinned_config
+
+
+def _write_elsewhere(key, value):
+    """Change a value the way another process would: no local signal."""
+    Constance.objects.filter(key=config._backend.add_prefix(key)).update(
+        value=dumps(value)
+    )
+    bump_version()
+
+
+# override_settings is applied per method: TenantTestCase ignores it on the
+# class.
+class ConstanceSnapshotTests(TenantTestCase):
+    @override_settings(CONSTANCE_SNAPSHOT_MAX_AGE=60)
+    def test_reads_are_served_from_the_snapshot(self):
+        config.site_name = "Clinic"
+        # First reads store the defaults of the keys not set yet.
+        config.appointment_early_join_minutes
+        config.enable_registration
+        self.assertEqual(config.site_name, "Clinic")
+        with self.assertNumQueries(0):
+            config.site_name
+            config.appointment_early_join_minutes
+            config.enable_registration
+
+    @override_settings(CONSTANCE_SNAPSHOT_MAX_AGE=60)
+    def test_local_writes_are_visible_immediately(self):
+        config.site_name = "Before"
+        self.assertEqual(config.site_name, "Before")
+        config.site_name = "After"
+        self.assertEqual(config.site_name, "After")
+        with pinned_config():
+            self.assertEqual(config.site_name, "After")
+            config.site_name = "Pinned"
+            self.assertEqual(config.site_name, "Pinned")
+
+    @override_settings(CONSTANCE_SNAPSHOT_MAX_AGE=60)
+    def test_pinned_block_checks_version_once(self):
+        config.site_name = "Before"
+        self.assertEqual(config.site_name, "Before")
+        _write_elsewhere("site_name", "After")
+
+        # Unpinned reads trust the snapshot for CONSTANCE_SNAPSHOT_MAX_AGE.
+        self.assertEqual(config.site_name, "Before")
+        with pinned_config():
+            self.assertEqual(config.site_name, "After")
+            # Defaults stored on a first read leave the pinned values alone.
+            config.enable_registration
+            _write_elsewhere("site_name", "Later")
+            # A block keeps seeing one consistent snapshot.
+            self.assertEqual(config.site_name, "After")
+        with pinned_config():
+            self.assertEqual(config.site_name, "Later")
+
+    @override_settings(CONSTANCE_SNAPSHOT_MAX_AGE=0)
+    def test_unpinned_reads_recheck_after_max_age(self):
+        config.site_name = "Before"
+        self.assertEqual(config.site_name, "Before")
+        _write_elsewhere("site_name", "After")
+        self.assertEqual(config.site_name, "After")
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class CarddavConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "dav"
-    verbose_name = "DAV"
\ No newline at end of file
+    verbose_name = "DAV"
+
+    def ready(self):
+        from . import signals
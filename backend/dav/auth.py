@@ -0,0 +1,109 @@
+"""HTTP Basic authentication for the CalDAV and CardDAV endpoints.
+
+DAV clients send the credentials with every request, and a sync burst is a
+handful of PROPFIND and REPORT requests in a row. Verifying them each time
+costs a password hash (slow by design) and an app password lookup, so
+verified credentials are cached for ``DAV_AUTH_CACHE_TTL`` seconds.
+
+Entries are keyed on an HMAC of the Authorization header, never on the
+credentials themselves, and scoped to the tenant. A cached entry is dropped
+when the user's password changes, the user is deactivated, or one of their
+app passwords is saved or deleted (through a per-user version).
+"""
+
+import base64
+
+from django.contrib.auth import authenticate
+from django.core.cache import cache
+from django.db import connection
+from django.utils.crypto import salted_hmac
+
+from users.models import DAVAppPassword, User
+
+DAV_AUTH_CACHE_TTL = 5 * 60
+
+
+def _credentials_key(auth_header):
+    digest = salted_hmac("dav.auth.credentials", auth_header).hexdigest()
+    return f"dav:auth:{connection.schema_name}:{digest}"
+
+
+def _version_key(user_pk):
+    return f"dav:auth:version:{connection.schema_name}:{user_pk}"
+
+
+def _password_marker(user):
+    return salted_hmac("dav.auth.password", user.password or "").hexdigest()
+
+
+def invalidate_user(user_pk):
+    """Drop every cached credential of a user."""
+    key = _version_key(user_pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def _parse_basic(auth_header):
+    if not auth_header.startswith("Basic "):
+        return None, None
+    try:
+        decoded = base64.b64decode(auth_header[6:]).decode("utf-8")
+    except Exception:
+        return None, None
+    username, _, password = decoded.partition(":")
+    if not password:
+        return None, None
+    return username, password
+
+
+def _from_cache(key):
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    if entry["version"] != cache.get(_version_key(entry["user"]), 0):
+        return None
+    user = User.objects.filter(pk=entry["user"], is_active=True).first()
+    if user is None or _password_marker(user) != entry["password"]:
+        return None
+    if entry["app_password"]:
+        DAVAppPassword.touch(entry["app_password"])
+    return user
+
+
+def get_user_from_request(request):
+    """Authenticate via Basic Auth with email:password or DAVAppPassword."""
+    auth_header = request.META.get("HTTP_AUTHORIZATION", "")
+    username, password = _parse_basic(auth_header)
+    if username is None:
+        return None
+
+    key = _credentials_key(auth_header)
+    user = _from_cache(key)
+    if user is not None:
+        return user
+
+    # App passwords first: DAV clients mostly use them, and the indexed token
+    # lookup spares them the password hash of a failed authenticate().
+    app_password = DAVAppPassword.lookup(username, password)
+    if app_password is not None:
+        DAVAppPassword.touch(app_password.pk)
+        user, app_password_pk = app_password.user, app_password.pk
+    else:
+        user = authenticate(request, username=username, password=password)
+        app_password_pk = None
+    if user is None or not user.is_active:
+        return None
+
+    cache.set(
+        key,
+        {
+            "user": user.pk,
+            "app_password": app_password_pk,
+            "version": cache.get(_version_key(user.pk), 0),
+            "password": _password_marker(user),
+        },
+        DAV_AUTH_CACHE_TTL,
+    )
+    return user
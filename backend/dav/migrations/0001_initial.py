@@ -0,0 +1,33 @@
+# Generated by Django 5.2.11 on 2026-10-17 12:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('collection', models.CharField(choices=[('calendar', 'Calendar'), ('addressbook', 'Address book')], max_length=20, verbose_name='collection')),
+                ('resource_id', models.BigIntegerField(verbose_name='resource id')),
+                ('deleted', models.BooleanField(default=False, verbose_name='deleted')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dav_sync_changes', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'DAV sync change',
+                'verbose_name_plural': 'DAV sync changes',
+                'indexes': [models.Index(fields=['user', 'collection', 'id'], name='dav_change_user_coll_idx'), models.Index(fields=['created_at'], name='dav_change_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-17 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dav', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='syncchange',
+            name='collection',
+            field=models.CharField(choices=[('calendar', 'Calendar')], max_length=20, verbose_name='collection'),
+        ),
+    ]
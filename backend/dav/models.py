@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class SyncCollection(models.TextChoices):
+    calendar = "calendar", _("Calendar")
+
+
+class SyncChange(models.Model):
+    """One change of a resource in a user's DAV collection.
+
+    The primary key is the sync token of RFC 6578 ``sync-collection``: a client
+    holding token N is sent the resources changed by the rows after N.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="dav_sync_changes",
+        verbose_name=_("user"),
+    )
+    collection = models.CharField(
+        _("collection"), max_length=20, choices=SyncCollection.choices
+    )
+    resource_id = models.BigIntegerField(_("resource id"))
+    deleted = models.BooleanField(_("deleted"), default=False)
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("DAV sync change")
+        verbose_name_plural = _("DAV sync changes")
+        indexes = [
+            models.Index(
+                fields=["user", "collection", "id"], name="dav_change_user_coll_idx"
+            ),
+            models.Index(fields=["created_at"], name="dav_change_created_idx"),
+        ]
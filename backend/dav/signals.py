@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import DAVAppPassword
+
+from .auth import invalidate_user
+
+
+@receiver(post_save, sender=DAVAppPassword)
+@receiver(post_delete, sender=DAVAppPassword)
+def app_password_changed(sender, instance, **kwargs):
+    # A revoked or deleted app password must stop authenticating right away.
+    # Saves from DAVAppPassword.touch go through update() and do not land here.
+    invalidate_user(instance.user_id)
@@ -0,0 +1,180 @@
+"""Change log behind the DAV collection tags and RFC 6578 sync tokens.
+
+Every change to a resource of a user's calendar is recorded as a
+``SyncChange`` row. A sync token carries a position and the time it was
+issued; for the calendar the position is the id of the last row the client
+has seen, and a ``sync-collection`` REPORT only returns the resources changed
+by the rows after it. (The address book, shared by every practitioner, uses
+an ``updated_at`` watermark as position instead. Contacts entering or leaving
+an address book without being updated themselves don't move that watermark,
+so such changes refuse the address book tokens issued before them.) Rows
+older than ``SYNC_CHANGE_RETENTION`` are pruned, so tokens older than that
+are refused and the client falls back to a full sync.
+"""
+
+import time
+from datetime import timedelta
+from xml.etree import ElementTree as ET
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.http import HttpResponse
+from django.utils import timezone
+
+from .models import SyncChange
+
+DAV = "DAV:"
+
+SYNC_TOKEN_PREFIX = "http://hcw-at-home.com/ns/sync/"
+SYNC_CHANGE_RETENTION = timedelta(days=30)
+
+# Tenant-scoped through django_tenants.cache.make_key; one per audience of
+# the address book ("practitioner" or "patient"), and one per user whose own
+# address book changed.
+ADDRESSBOOK_RESET_CACHE_KEY = "dav:addressbook:reset:{audience}"
+USER_ADDRESSBOOK_RESET_CACHE_KEY = "dav:addressbook:reset:user:{user_pk}"
+
+
+def record_changes(collection, resource_id, users):
+    """Record a change of ``resource_id`` for each ``{user_pk: deleted}``.
+
+    The rows are inserted once the transaction making the change commits:
+    ids are allocated at insert time, and a row inserted early in a long
+    transaction would otherwise become visible after clients were handed a
+    token past its id, and never be synced to them.
+    """
+    changes = [
+        SyncChange(
+            user_id=user_pk,
+            collection=collection,
+            resource_id=resource_id,
+            deleted=deleted,
+        )
+        for user_pk, deleted in users.items()
+        if user_pk
+    ]
+    if not changes:
+        return
+
+    def record():
+        # Users deleted by the same transaction have no collection left.
+        existing = set(
+            get_user_model()
+            .objects.filter(pk__in=[change.user_id for change in changes])
+            .values_list("pk", flat=True)
+        )
+        SyncChange.objects.bulk_create(
+            [change for change in changes if change.user_id in existing]
+        )
+
+    transaction.on_commit(record)
+
+
+def latest_change_id(user, collection):
+    return (
+        SyncChange.objects.filter(user=user, collection=collection).aggregate(
+            last=Max("id")
+        )["last"]
+        or 0
+    )
+
+
+def changes_since(user, collection, change_id):
+    """Return ``({resource_id: deleted}, last_change_id)`` after ``change_id``.
+
+    Only the latest change of each resource is kept.
+    """
+    changes = {}
+    last = change_id
+    rows = SyncChange.objects.filter(
+        user=user, collection=collection, id__gt=change_id
+    ).order_by("id").values_list("id", "resource_id", "deleted")
+    for pk, resource_id, deleted in rows:
+        changes[resource_id] = deleted
+        last = pk
+    return changes, last
+
+
+def _now_us():
+    return int(time.time() * 1_000_000)
+
+
+def addressbook_reset_at(audience, user_pk=None):
+    """Time, in microseconds, before which address book tokens are refused.
+
+    The latest reset of the ``audience`` or of the address book of
+    ``user_pk``. An unknown audience reset time (cache flushed) counts as now.
+    """
+    key = ADDRESSBOOK_RESET_CACHE_KEY.format(audience=audience)
+    user_key = USER_ADDRESSBOOK_RESET_CACHE_KEY.format(user_pk=user_pk)
+    resets = cache.get_many([key, user_key])
+    if key not in resets:
+        cache.add(key, _now_us(), None)
+        resets[key] = cache.get(key)
+    return max(resets[key], resets.get(user_key, 0))
+
+
+def reset_addressbook(*audiences, users=()):
+    """Refuse the address book tokens issued so far, once committed.
+
+    Either for every address book of ``audiences``, or only for those of the
+    ``users`` pks.
+    """
+
+    def reset():
+        now = _now_us()
+        keys = [
+            ADDRESSBOOK_RESET_CACHE_KEY.format(audience=audience)
+            for audience in audiences
+        ] + [
+            USER_ADDRESSBOOK_RESET_CACHE_KEY.format(user_pk=user_pk)
+            for user_pk in users
+        ]
+        cache.set_many(dict.fromkeys(keys, now), None)
+
+    transaction.on_commit(reset)
+
+
+def make_token(position):
+    return f"{SYNC_TOKEN_PREFIX}{position}-{int(time.time())}"
+
+
+def parse_token(token):
+    """Return the position of ``token``, or None if it is not valid anymore."""
+    if not token.startswith(SYNC_TOKEN_PREFIX):
+        return None
+    position, _, issued_at = token[len(SYNC_TOKEN_PREFIX):].partition("-")
+    try:
+        position, issued_at = int(position), int(issued_at)
+    except ValueError:
+        return None
+    if issued_at < time.time() - SYNC_CHANGE_RETENTION.total_seconds():
+        return None
+    return position
+
+
+def parse_sync_collection(root):
+    """Return the sync token of a ``sync-collection`` body ("" on first sync)."""
+    token_el = root.find(f"{{{DAV}}}sync-token")
+    if token_el is None or not token_el.text:
+        return ""
+    return token_el.text.strip()
+
+
+def invalid_token_response():
+    """403 with the ``valid-sync-token`` precondition (RFC 6578 §3.2)."""
+    error = ET.Element(f"{{{DAV}}}error")
+    ET.SubElement(error, f"{{{DAV}}}valid-sync-token")
+    xml_str = ET.tostring(error, encoding="unicode", xml_declaration=True)
+    return HttpResponse(
+        xml_str, content_type="application/xml; charset=utf-8", status=403
+    )
+
+
+def prune_changes():
+    """Delete the changes no valid token can refer to anymore."""
+    cutoff = timezone.now() - SYNC_CHANGE_RETENTION - timedelta(days=1)
+    deleted, _ = SyncChange.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,20 @@
+import logging
+
+from core.celery import app, for_each_tenant, tenant_task
+
+from .sync import prune_changes
+
+logger = logging.getLogger(__name__)
+
+
+@app.task
+def prune_sync_changes():
+    for_each_tenant(prune_sync_changes_for_tenant)
+
+
+@tenant_task()
+def prune_sync_changes_for_tenant():
+    """Drop DAV sync changes older than any token still accepted."""
+    deleted = prune_changes()
+    if deleted:
+        logger.info("Pruned %s DAV sync changes", deleted)
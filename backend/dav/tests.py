@@ -0,0 +1,53 @@
+import base64
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory
+from django_tenants.test.cases import TenantTestCase
+
+from dav.auth import get_user_from_request
+from users.models import DAVAppPassword, User
+
+
+class DAVAuthCacheTests(TenantTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="doc@example.com")
+        self.app_password = DAVAppPassword.objects.create(user=self.user, label="phone")
+
+    def tearDown(self):
+        cache.clear()
+
+    def _request(self, password=None):
+        credentials = base64.b64encode(
+            f"{self.user.email}:{password or self.app_password.token}".encode()
+        ).decode()
+        return RequestFactory().generic(
+            "PROPFIND", "/dav/", HTTP_AUTHORIZATION=f"Basic {credentials}"
+        )
+
+    def test_verified_credentials_are_cached(self):
+        self.assertEqual(get_user_from_request(self._request()), self.user)
+        with mock.patch.object(DAVAppPassword, "lookup") as lookup:
+            self.assertEqual(get_user_from_request(self._request()), self.user)
+        lookup.assert_not_called()
+
+    def test_last_used_at_is_written_once_per_interval(self):
+        get_user_from_request(self._request())
+        self.app_password.refresh_from_db()
+        first_used = self.app_password.last_used_at
+        self.assertIsNotNone(first_used)
+
+        get_user_from_request(self._request())
+        self.app_password.refresh_from_db()
+        self.assertEqual(self.app_password.last_used_at, first_used)
+
+    def test_revoked_app_password_is_refused(self):
+        self.assertEqual(get_user_from_request(self._request()), self.user)
+        self.app_password.is_active = False
+        self.app_password.save()
+        self.assertIsNone(get_user_from_request(self._request()))
+
+    def test_wrong_password_is_not_cached(self):
+        self.assertIsNone(get_user_from_request(self._request("wrong")))
+        self.assertIsNone(get_user_from_request(self._request("wrong")))
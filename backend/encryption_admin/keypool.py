@@ -0,0 +1,152 @@
+"""Pool of pre-generated RSA keypairs.
+
+Generating an RSA-4096 keypair costs from a few hundred milliseconds to a few
+seconds of CPU, and consultations, queues and users are provisioned while a
+request or an assignment task waits. The ``refill_keypair_pool`` task keeps a
+stock of ``KEYPAIR_POOL_SIZE`` keypairs per tenant with encryption enabled, and
+``take_rsa_keypair`` hands one out with a single indexed row lock, falling
+back to inline generation when the pool is empty.
+
+Pooled private keys are stored AES-GCM encrypted under a key derived from
+``settings.ENCRYPTION_KEY`` (``SECRET_KEY`` when unset), so a database dump
+alone does not reveal them.
+
+Depth, hits, misses and refill rate are logged and kept in the cache (see
+``pool_stats``), and shown on the encryption admin page.
+"""
+
+import base64
+import hashlib
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from core.encryption import AES_NONCE_BYTES, generate_rsa_keypair
+
+from .models import PooledKeypair
+
+logger = logging.getLogger(__name__)
+
+STATS_TIMEOUT = 24 * 60 * 60
+
+
+def _server_key() -> bytes:
+    secret = settings.ENCRYPTION_KEY or settings.SECRET_KEY
+    return hashlib.sha256(f"hcw.keypool:{secret}".encode()).digest()
+
+
+def _seal(private_pem: bytes) -> str:
+    nonce = os.urandom(AES_NONCE_BYTES)
+    ciphertext = AESGCM(_server_key()).encrypt(nonce, private_pem, None)
+    return base64.b64encode(nonce + ciphertext).decode("ascii")
+
+
+def _unseal(sealed: str) -> bytes:
+    data = base64.b64decode(sealed)
+    nonce, ciphertext = data[:AES_NONCE_BYTES], data[AES_NONCE_BYTES:]
+    return AESGCM(_server_key()).decrypt(nonce, ciphertext, None)
+
+
+def _stats_key(name):
+    return f"keypool:{name}:{connection.schema_name}"
+
+
+def _count(name):
+    key = _stats_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, STATS_TIMEOUT)
+
+
+def take_rsa_keypair() -> tuple[bytes, bytes]:
+    """Returns (private_pkcs8_pem, public_spki_pem), from the pool if possible.
+
+    Same contract as ``core.encryption.generate_rsa_keypair``. Concurrent
+    callers skip each other's locked rows, so each keypair is handed out once.
+    """
+    with transaction.atomic():
+        pooled = (
+            PooledKeypair.objects.select_for_update(skip_locked=True)
+            .order_by("pk")
+            .first()
+        )
+        if pooled is not None:
+            pooled.delete()
+
+    if pooled is None:
+        _count("misses")
+        logger.info("Keypair pool empty in %s; generating inline", connection.schema_name)
+        return generate_rsa_keypair()
+
+    try:
+        private_pem = _unseal(pooled.encrypted_private_key)
+    except Exception:
+        # Sealed under another server key (rotated ENCRYPTION_KEY).
+        _count("misses")
+        logger.warning("Discarding unreadable pooled keypair %s", pooled.pk)
+        return generate_rsa_keypair()
+    _count("hits")
+    return private_pem, pooled.public_key.encode("utf-8")
+
+
+def refill(size=None, batch=None) -> int:
+    """Generate keypairs until the pool holds ``size``; at most ``batch`` per run.
+
+    Returns the number of keypairs generated.
+    """
+    size = settings.KEYPAIR_POOL_SIZE if size is None else size
+    batch = settings.KEYPAIR_POOL_REFILL_BATCH if batch is None else batch
+    missing = min(size - PooledKeypair.objects.count(), batch)
+
+    started = time.monotonic()
+    generated = 0
+    for _ in range(max(missing, 0)):
+        private_pem, public_pem = generate_rsa_keypair()
+        PooledKeypair.objects.create(
+            public_key=public_pem.decode("utf-8"),
+            encrypted_private_key=_seal(private_pem),
+        )
+        del private_pem
+        generated += 1
+    duration = time.monotonic() - started
+
+    depth = PooledKeypair.objects.count()
+    cache.set(
+        _stats_key("refill"),
+        {
+            "generated": generated,
+            "duration": duration,
+            "rate": generated / duration if generated and duration else None,
+            "depth": depth,
+            "finished_at": timezone.now().isoformat(),
+        },
+        STATS_TIMEOUT,
+    )
+    if generated:
+        logger.info(
+            "Keypair pool of %s refilled: %s generated in %.1fs, depth %s/%s",
+            connection.schema_name, generated, duration, depth, size,
+        )
+    return generated
+
+
+def pool_stats() -> dict:
+    """Current depth plus the counters and last refill of this tenant's pool."""
+    values = cache.get_many(
+        [_stats_key("hits"), _stats_key("misses"), _stats_key("refill")]
+    )
+    return {
+        "depth": PooledKeypair.objects.count(),
+        "size": settings.KEYPAIR_POOL_SIZE,
+        "hits": values.get(_stats_key("hits"), 0),
+        "misses": values.get(_stats_key("misses"), 0),
+        "last_refill": values.get(_stats_key("refill")),
+    }
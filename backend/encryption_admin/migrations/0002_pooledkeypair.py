@@ -0,0 +1,27 @@
+# Generated by Django 5.2.11 on 2026-10-17 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("encryption_admin", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PooledKeypair",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("public_key", models.TextField()),
+                ("encrypted_private_key", models.TextField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "pooled keypair",
+                "verbose_name_plural": "pooled keypairs",
+                "default_permissions": (),
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.11 on 2026-10-17 13:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("encryption_admin", "0002_pooledkeypair"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProvisioningRun",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("started_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("total_users", models.PositiveIntegerField(default=0)),
+                ("processed_users", models.PositiveIntegerField(default=0)),
+                ("failed_users", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "provisioning run",
+                "verbose_name_plural": "provisioning runs",
+                "default_permissions": (),
+                "ordering": ["-started_at"],
+            },
+        ),
+    ]
@@ -14,3 +14,58 @@ class EncryptionSettings(models.Model):
         verbose_name = "Encryption"
         verbose_name_plural = "Encryption"
         default_permissions = ()
+
+
+class PooledKeypair(models.Model):
+    """RSA keypair generated ahead of time by the keypair pool refill task.
+
+    The private key is stored AES-GCM encrypted under a server key (see
+    encryption_admin.keypool) and the row is deleted when the keypair is
+    handed out, so a keypair is never used twice.
+    """
+
+    public_key = models.TextField()
+    encrypted_private_key = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "pooled keypair"
+        verbose_name_plural = "pooled keypairs"
+        default_permissions = ()
+
+
+class ProvisioningRun(models.Model):
+    """Progress of a bulk keypair provisioning run in this tenant.
+
+    User keypairs are provisioned in chunks by separate Celery tasks, which
+    bump the counters as they finish. A run that did not finish is resumed
+    by the next one instead of starting over.
+    """
+
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    total_users = models.PositiveIntegerField(default=0)
+    processed_users = models.PositiveIntegerField(default=0)
+    failed_users = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "provisioning run"
+        verbose_name_plural = "provisioning runs"
+        default_permissions = ()
+        ordering = ["-started_at"]
+
+    @property
+    def percent(self):
+        if not self.total_users:
+            return 100
+        return min(100, round(100 * self.processed_users / self.total_users))
+
+    @property
+    def eta(self):
+        """Estimated end, extrapolated from the pace so far."""
+        if self.finished_at or not self.processed_users:
+            return None
+        remaining = max(self.total_users - self.processed_users, 0)
+        elapsed = self.updated_at - self.started_at
+        return self.updated_at + elapsed * (remaining / self.processed_users)
@@ -3,16 +3,16 @@
 import logging
 from typing import Iterable
 
-import jinja2
 from constance import config
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
-from django.template.defaultfilters import register
+from django.db import connection, transaction
+from django.db.models import F
 from django.utils import timezone, translation
 from django_tenants.utils import get_tenant_model, tenant_context
 
 from consultations.models import Queue, QueueMembership
-from core.celery import app
+from core.celery import app, for_each_tenant, tenant_task
 from core.encryption import (
     encrypt_private_key_with_passphrase,
     fingerprint_public_key,
@@ -21,11 +21,17 @@ from core.encryption import (
     rsa_encrypt,
     rsa_envelope_encrypt,
 )
+from encryption_admin.keypool import refill, take_rsa_keypair
+from encryption_admin.models import ProvisioningRun
+from messaging.rendering import compiled_templates
 from messaging.template import DEFAULT_NOTIFICATION_MESSAGES
 from users.models import User
 
 logger = logging.getLogger(__name__)
 
+# Users provisioned by one provision_user_chunk task.
+PROVISION_CHUNK_SIZE = 25
+
 
 def _render_messaging_template(
     template_key: str, language: str, context: dict
@@ -40,54 +46,53 @@ def _render_messaging_template(
     """
     template_data = DEFAULT_NOTIFICATION_MESSAGES[template_key]
     with translation.override(language):
-
-        def make_env(autoescape: bool) -> jinja2.Environment:
-            env = jinja2.Environment(
-                extensions=["jinja2.ext.i18n"], autoescape=autoescape
-            )
-            env.install_gettext_callables(
-                translation.gettext, translation.ngettext, newstyle=True
-            )
-            env.filters["localtime"] = timezone.localtime
-            env.filters.update(register.filters)
-            return env
-
         # Plain-text fields keep values literal; only the HTML body escapes
         # interpolated values to prevent injection.
-        text_env = make_env(autoescape=False)
-        html_env = make_env(autoescape=True)
         full_context = {"config": config, **context}
-        subject = text_env.from_string(str(template_data["template_subject"])).render(
-            full_context
-        )
-        content = text_env.from_string(str(template_data["template_content"])).render(
-            full_context
-        )
-        content_html = html_env.from_string(
-            str(template_data["template_content_html"])
+        subject = compiled_templates.get(
+            template_data["template_subject"],
+            event_type=template_key,
+            field="template_subject",
+        ).render(full_context)
+        content = compiled_templates.get(
+            template_data["template_content"],
+            event_type=template_key,
+            field="template_content",
+        ).render(full_context)
+        content_html = compiled_templates.get(
+            template_data["template_content_html"],
+            autoescape=True,
+            event_type=template_key,
+            field="template_content_html",
         ).render(full_context)
     return subject, content, content_html
 
 
-def _send_passphrase_via_messaging(
-    recipient: User, template_key: str, context: dict
-) -> None:
-    """Build an EphemeralMessage carrying the rendered passphrase content
-    and dispatch it through the platform's existing messaging providers
+def _passphrase_message(recipient: User, template_key: str, context: dict):
+    """Build an EphemeralMessage carrying the rendered passphrase content,
+    to be dispatched through the platform's existing messaging providers
     based on recipient.communication_method.
 
     EphemeralMessage.save() is a no-op, so the passphrase never lands in
     the messaging.Message table and the post_save signal never fires
     (which would otherwise queue send_message and duplicate the dispatch).
+
+    Returns None when the recipient has no communication method.
     """
-    from messaging.models import EphemeralMessage, MessagingProvider
+    from messaging.models import EphemeralMessage
+
+    if not recipient.communication_method:
+        logger.warning(
+            "Recipient %s has no communication_method; passphrase undelivered",
+            recipient.pk,
+        )
+        return None
 
     language = recipient.preferred_language or settings.LANGUAGE_CODE
     subject, content, content_html = _render_messaging_template(
         template_key, language, context,
     )
-
-    msg = EphemeralMessage(
+    return EphemeralMessage(
         sent_to=recipient,
         subject=subject,
         content=content,
@@ -95,46 +100,19 @@ def _send_passphrase_via_messaging(
         in_notification=False,
     )
 
-    method = recipient.communication_method
-    if not method:
-        logger.warning(
-            "Recipient %s has no communication_method; passphrase undelivered",
-            recipient.pk,
-        )
-        return
 
-    providers_qs = MessagingProvider.objects.filter(
-        communication_method=method, is_active=True,
-    ).order_by("priority", "id")
+def _deliver_passphrases(passphrase_messages) -> None:
+    """Send passphrase messages in one batch (providers resolved once)."""
+    from messaging.tasks import send_ephemeral_messages
 
-    if not providers_qs.exists():
+    passphrase_messages = [msg for msg in passphrase_messages if msg is not None]
+    if not passphrase_messages:
+        return
+    for msg in send_ephemeral_messages(passphrase_messages):
         logger.error(
-            "No active provider for communication_method=%s; cannot deliver "
-            "passphrase to user %s",
-            method, recipient.pk,
+            "All providers failed for passphrase to user %s (%s)",
+            msg.sent_to_id, msg.validated_communication_method,
         )
-        return
-
-    last_error: Exception | None = None
-    for mp in providers_qs:
-        try:
-            mp.instance.send(msg)
-            logger.info(
-                "Passphrase delivered to user %s via %s (%s)",
-                recipient.pk, mp.name, method,
-            )
-            return
-        except Exception as exc:
-            last_error = exc
-            logger.warning(
-                "Provider %s failed for passphrase to user %s: %s",
-                mp.name, recipient.pk, exc,
-            )
-
-    logger.error(
-        "All providers failed for passphrase to user %s; last error: %s",
-        recipient.pk, last_error,
-    )
 
 
 def _has_usable_channel(user: User) -> bool:
@@ -150,9 +128,8 @@ def _has_usable_channel(user: User) -> bool:
     return False
 
 
-def _email_passphrase(user: User, passphrase: str) -> None:
-    """Send the one-time passphrase via the existing Message + provider
-    pipeline, in-memory only (no row persisted).
+def _passphrase_delivery(user: User, passphrase: str):
+    """Build the message carrying a user's one-time passphrase, or None.
 
     Routing:
       - User reachable on their declared channel (email/sms/whatsapp/push) →
@@ -163,16 +140,15 @@ def _email_passphrase(user: User, passphrase: str) -> None:
         patient identification so the practitioner can hand it over.
     """
     if user.communication_method != "manual" and _has_usable_channel(user):
-        _send_passphrase_via_messaging(
+        return _passphrase_message(
             user,
             "encryption_passphrase",
             {"passphrase": passphrase, "user": user, "obj": user},
         )
-        return
 
     creator = user.created_by
     if creator and creator.communication_method and _has_usable_channel(creator):
-        _send_passphrase_via_messaging(
+        return _passphrase_message(
             creator,
             "encryption_passphrase_for_practitioner",
             {
@@ -184,35 +160,52 @@ def _email_passphrase(user: User, passphrase: str) -> None:
                 "obj": user,
             },
         )
-        return
 
     logger.warning(
         "Cannot deliver passphrase for user %s: not reachable directly nor via creator",
         user.pk,
     )
+    return None
 
 
-def _provision_user_keypair(user: User) -> None:
-    """Generate a keypair for a user, email them their passphrase, save."""
-    private_pem, public_pem = generate_rsa_keypair()
+def _email_passphrase(user: User, passphrase: str) -> None:
+    """Send the one-time passphrase via the existing Message + provider
+    pipeline, in-memory only (no row persisted)."""
+    _deliver_passphrases([_passphrase_delivery(user, passphrase)])
+
+
+USER_KEY_FIELDS = [
+    "public_key",
+    "public_key_fingerprint",
+    "encrypted_private_key",
+    "encryption_passphrase_pending",
+    "encryption_key_lost",
+]
+
+
+def _set_user_keypair(user: User, private_pem: bytes, public_pem: bytes) -> str:
+    """Wrap a keypair under a fresh passphrase and set it on ``user``.
+
+    Returns the passphrase; the caller saves ``USER_KEY_FIELDS``.
+    """
     passphrase = generate_passphrase()
-    encrypted_private = encrypt_private_key_with_passphrase(private_pem, passphrase)
     public_pem_str = public_pem.decode("utf-8")
 
     user.public_key = public_pem_str
     user.public_key_fingerprint = fingerprint_public_key(public_pem_str)
-    user.encrypted_private_key = encrypted_private
+    user.encrypted_private_key = encrypt_private_key_with_passphrase(
+        private_pem, passphrase
+    )
     user.encryption_passphrase_pending = True
     user.encryption_key_lost = False
-    user.save(
-        update_fields=[
-            "public_key",
-            "public_key_fingerprint",
-            "encrypted_private_key",
-            "encryption_passphrase_pending",
-            "encryption_key_lost",
-        ]
-    )
+    return passphrase
+
+
+def _provision_user_keypair(user: User) -> None:
+    """Generate a keypair for a user, email them their passphrase, save."""
+    private_pem, public_pem = take_rsa_keypair()
+    passphrase = _set_user_keypair(user, private_pem, public_pem)
+    user.save(update_fields=USER_KEY_FIELDS)
 
     try:
         _email_passphrase(user, passphrase)
@@ -230,7 +223,7 @@ def _provision_queue_keypair(queue: Queue, master_public_key: str) -> None:
     The queue's PEM private key is too large to fit in a single RSA-OAEP
     block, so we use envelope encryption (AES-GCM + RSA-wrapped CEK).
     """
-    private_pem, public_pem = generate_rsa_keypair()
+    private_pem, public_pem = take_rsa_keypair()
     public_pem_str = public_pem.decode("utf-8")
 
     queue.public_key = public_pem_str
@@ -271,39 +264,147 @@ def provision_encryption_for_all(master_public_key_pem: str):
     for each member's pubkey). Idempotent: users/queues that already have
     a public_key are skipped, so re-running the task only fills the gaps.
     """
-    TenantModel = get_tenant_model()
-    for tenant in TenantModel.objects.exclude(schema_name="public"):
-        with tenant_context(tenant):
-            users_to_provision = User.objects.filter(
-                is_active=True, public_key__isnull=True
-            )
-            for user in users_to_provision:
-                try:
-                    _provision_user_keypair(user)
-                except Exception:
-                    logger.exception(
-                        "Failed to provision keypair for user %s", user.pk
-                    )
-
-            queues_to_provision = Queue.objects.filter(public_key__isnull=True)
-            for queue in queues_to_provision:
-                try:
-                    _provision_queue_keypair(queue, master_public_key_pem)
-                except Exception:
-                    logger.exception(
-                        "Failed to provision keypair for queue %s", queue.pk
-                    )
-
-            queues_with_unwrapped_members = Queue.objects.filter(
-                public_key__isnull=False,
-                queuemembership__encrypted_queue_private_key__isnull=True,
-            ).distinct()
-            if queues_with_unwrapped_members.exists():
-                logger.warning(
-                    "Some queue memberships still lack wrapped private keys "
-                    "in tenant %s; re-run after users finish provisioning.",
-                    tenant.schema_name,
-                )
+    for_each_tenant(provision_encryption_for_tenant, master_public_key_pem)
+
+
+@tenant_task()
+def provision_encryption_for_tenant(master_public_key_pem: str):
+    """Split the tenant's users without a keypair into provisioning chunks.
+
+    Each chunk is a separate task, so the keygen and PBKDF2 work is spread
+    over every worker process. An unfinished run is resumed: it keeps its
+    counters and only the users still without a keypair are dispatched.
+    Queues are provisioned by the last chunk, once members have their keys.
+    """
+    user_ids = list(
+        User.objects.filter(is_active=True, public_key__isnull=True)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+    run = ProvisioningRun.objects.filter(finished_at__isnull=True).first()
+    if run is None:
+        run = ProvisioningRun.objects.create(total_users=len(user_ids))
+    else:
+        # Users that failed are still without a keypair and dispatched again:
+        # count them as not processed yet.
+        run.processed_users -= run.failed_users
+        run.failed_users = 0
+        run.total_users = run.processed_users + len(user_ids)
+        run.save(
+            update_fields=[
+                "processed_users", "failed_users", "total_users", "updated_at"
+            ]
+        )
+
+    if not user_ids:
+        _finish_run(run.pk, master_public_key_pem)
+        return
+
+    for i in range(0, len(user_ids), PROVISION_CHUNK_SIZE):
+        provision_user_chunk.delay(
+            run.pk, user_ids[i : i + PROVISION_CHUNK_SIZE], master_public_key_pem
+        )
+
+
+@app.task(acks_late=True)
+def provision_user_chunk(run_id: int, user_ids: list, master_public_key_pem: str):
+    """Provision the keypairs of a chunk of users and send their passphrases.
+
+    Acknowledged only once done, so a chunk lost with its worker is redelivered;
+    users provisioned meanwhile are skipped.
+    """
+    provisioned, passphrases, failed = [], [], 0
+    with transaction.atomic():
+        # Rows stay locked until the keys are saved: a chunk dispatched twice
+        # (resumed run, redelivery) skips them instead of issuing a second
+        # passphrase.
+        users = list(
+            User.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(pk__in=user_ids, is_active=True, public_key__isnull=True)
+            .select_related("created_by")
+        )
+        for user in users:
+            try:
+                # Straight from the generator: a bulk run would only drain the
+                # pool kept for interactive provisioning.
+                private_pem, public_pem = generate_rsa_keypair()
+                passphrases.append(_set_user_keypair(user, private_pem, public_pem))
+                provisioned.append(user)
+            except Exception:
+                failed += 1
+                logger.exception("Failed to provision keypair for user %s", user.pk)
+
+        User.objects.bulk_update(provisioned, USER_KEY_FIELDS)
+
+    try:
+        _deliver_passphrases(
+            _passphrase_delivery(user, passphrase)
+            for user, passphrase in zip(provisioned, passphrases)
+        )
+    except Exception:
+        logger.exception("Failed to deliver encryption passphrases of chunk")
+    finally:
+        del passphrases
+
+    # Only the users this chunk handled: the others were skipped because
+    # another chunk holds or already provisioned them, and are counted there.
+    ProvisioningRun.objects.filter(pk=run_id).update(
+        processed_users=F("processed_users") + len(users),
+        failed_users=F("failed_users") + failed,
+        updated_at=timezone.now(),
+    )
+    run = ProvisioningRun.objects.filter(pk=run_id).first()
+    if run is None or run.processed_users < run.total_users:
+        return
+    # The counter alone can be ahead of the keys: queues must only be
+    # provisioned once every member that can have a key has one.
+    remaining = User.objects.filter(is_active=True, public_key__isnull=True).count()
+    if remaining > run.failed_users:
+        logger.warning(
+            "Provisioning run %s counted every user but %s still lack a "
+            "keypair in tenant %s; re-run provisioning to finish it.",
+            run_id, remaining - run.failed_users, connection.schema_name,
+        )
+        return
+    _finish_run(run_id, master_public_key_pem)
+
+
+def _finish_run(run_id: int, master_public_key_pem: str) -> None:
+    """Provision the queues and close the run, once, from the last chunk."""
+    if not ProvisioningRun.objects.filter(
+        pk=run_id, finished_at__isnull=True
+    ).update(finished_at=timezone.now()):
+        return
+
+    for queue in Queue.objects.filter(public_key__isnull=True):
+        try:
+            _provision_queue_keypair(queue, master_public_key_pem)
+        except Exception:
+            logger.exception("Failed to provision keypair for queue %s", queue.pk)
+
+    if Queue.objects.filter(
+        public_key__isnull=False,
+        queuemembership__encrypted_queue_private_key__isnull=True,
+    ).exists():
+        logger.warning(
+            "Some queue memberships still lack wrapped private keys "
+            "in tenant %s; re-run after users finish provisioning.",
+            connection.schema_name,
+        )
+
+
+@app.task
+def refill_keypair_pool():
+    for_each_tenant(refill_keypair_pool_for_tenant)
+
+
+@tenant_task()
+def refill_keypair_pool_for_tenant():
+    """Top up the tenant's keypair pool while encryption is enabled."""
+    if not config.encryption_enabled:
+        return
+    refill()
 
 
 def _run_in_tenant(schema_name: str, fn):
@@ -0,0 +1,126 @@
+import itertools
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+from django_tenants.test.cases import TenantTestCase
+
+from encryption_admin import keypool
+from encryption_admin.models import PooledKeypair
+
+
+_counter = itertools.count()
+
+
+def fake_keypair():
+    n = next(_counter)
+    return f"private-{n}".encode(), f"public-{n}".encode()
+
+
+@mock.patch("encryption_admin.keypool.generate_rsa_keypair", fake_keypair)
+class KeypairPoolTests(TenantTestCase):
+    def setUp(self):
+        # Class-level override_settings is not applied on TenantTestCase.
+        settings_override = override_settings(
+            KEYPAIR_POOL_SIZE=3, KEYPAIR_POOL_REFILL_BATCH=2
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_refill_is_bounded_by_batch_and_size(self):
+        self.assertEqual(keypool.refill(), 2)
+        self.assertEqual(keypool.refill(), 1)
+        self.assertEqual(keypool.refill(), 0)
+        self.assertEqual(PooledKeypair.objects.count(), 3)
+
+    def test_private_keys_are_sealed_at_rest(self):
+        keypool.refill()
+        pooled = PooledKeypair.objects.first()
+        self.assertNotIn("private", pooled.encrypted_private_key)
+
+    def test_take_pops_from_pool_then_falls_back(self):
+        keypool.refill(size=1)
+        pooled = PooledKeypair.objects.get()
+
+        private_pem, public_pem = keypool.take_rsa_keypair()
+        self.assertEqual(public_pem.decode(), pooled.public_key)
+        self.assertTrue(private_pem.startswith(b"private-"))
+        self.assertFalse(PooledKeypair.objects.exists())
+
+        keypool.take_rsa_keypair()
+        stats = keypool.pool_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+
+@mock.patch("encryption_admin.tasks.generate_rsa_keypair", fake_keypair)
+@mock.patch("encryption_admin.tasks.encrypt_private_key_with_passphrase", lambda pem, _: pem.decode())
+@mock.patch("encryption_admin.tasks.fingerprint_public_key", lambda pem: f"fp-{pem}")
+class ProvisionUserChunkTests(TenantTestCase):
+    def setUp(self):
+        from users.models import User
+
+        self.users = [
+            User.objects.create_user(email=f"user{i}@example.com") for i in range(3)
+        ]
+        User.objects.filter(pk__in=[u.pk for u in self.users]).update(public_key=None)
+
+    @mock.patch("encryption_admin.tasks._deliver_passphrases")
+    def test_chunks_provision_users_and_close_the_run(self, deliver):
+        from encryption_admin.models import ProvisioningRun
+        from encryption_admin.tasks import provision_user_chunk
+
+        ids = [u.pk for u in self.users]
+        run = ProvisioningRun.objects.create(total_users=len(ids))
+
+        provision_user_chunk(run.pk, ids[:2], "master")
+        run.refresh_from_db()
+        self.assertEqual(run.processed_users, 2)
+        self.assertIsNone(run.finished_at)
+        deliver.assert_called_once()
+
+        provision_user_chunk(run.pk, ids[2:], "master")
+        run.refresh_from_db()
+        self.assertEqual(run.processed_users, 3)
+        self.assertIsNotNone(run.finished_at)
+
+        for user in self.users:
+            user.refresh_from_db()
+            self.assertTrue(user.public_key.startswith("public-"))
+            self.assertTrue(user.encryption_passphrase_pending)
+
+    @mock.patch("encryption_admin.tasks._deliver_passphrases")
+    def test_duplicate_chunk_does_not_finish_the_run_early(self, deliver):
+        from encryption_admin.models import ProvisioningRun
+        from encryption_admin.tasks import provision_user_chunk
+
+        ids = [u.pk for u in self.users]
+        run = ProvisioningRun.objects.create(total_users=len(ids))
+
+        provision_user_chunk(run.pk, ids[:2], "master")
+        # Dispatched again by a resumed run: already provisioned, not counted.
+        provision_user_chunk(run.pk, ids[:2], "master")
+        run.refresh_from_db()
+        self.assertEqual(run.processed_users, 2)
+        self.assertIsNone(run.finished_at)
+
+        provision_user_chunk(run.pk, ids[2:], "master")
+        run.refresh_from_db()
+        self.assertIsNotNone(run.finished_at)
+
+    @mock.patch("encryption_admin.tasks._deliver_passphrases")
+    def test_run_stays_open_while_users_lack_a_keypair(self, deliver):
+        from encryption_admin.models import ProvisioningRun
+        from encryption_admin.tasks import provision_user_chunk
+
+        ids = [u.pk for u in self.users]
+        # A counter ahead of the keys.
+        run = ProvisioningRun.objects.create(total_users=2)
+
+        provision_user_chunk(run.pk, ids[:2], "master")
+        run.refresh_from_db()
+        self.assertEqual(run.processed_users, 2)
+        self.assertIsNone(run.finished_at)
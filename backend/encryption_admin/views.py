@@ -17,6 +17,9 @@ from django.urls import reverse
 from consultations.models import Consultation
 from core.encryption import fingerprint_public_key, normalize_pem
 
+from .keypool import pool_stats
+from .models import ProvisioningRun
+
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
@@ -39,6 +42,8 @@ def settings_view_factory(admin_site):
             master_public_key=config.master_public_key,
             master_public_key_fingerprint=config.master_public_key_fingerprint,
             encrypted_consultations_count=encrypted_consultations_count,
+            keypair_pool=pool_stats(),
+            provisioning_run=ProvisioningRun.objects.first(),
         )
         return TemplateResponse(
             request, "admin/encryption/settings.html", context
@@ -116,7 +121,8 @@ def enable_view_factory(admin_site):
         messages.success(
             request,
             "Encryption enabled. A background job is provisioning user and queue "
-            "keypairs; users will receive their passphrases by email.",
+            "keypairs; users will receive their passphrases by email. Progress "
+            "is shown below.",
         )
         return redirect(reverse("admin:encryption_settings"))
 
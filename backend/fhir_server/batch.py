@@ -0,0 +1,298 @@
+"""Processing of `batch` and `transaction` Bundles posted to `/api/fhir`.
+
+Each entry is dispatched as a sub-request to the `/api/fhir/<ResourceType>`
+route its `request.url` resolves to, on behalf of the caller. Permissions,
+querysets, conditional operations and mappers therefore behave exactly as
+for a standalone request, without re-running authentication or tenant
+resolution per entry.
+
+- `batch`: entries are independent; each runs in its own savepoint and a
+  failure only fails its own response entry.
+- `transaction`: entries run in one database transaction, in the FHIR
+  processing order (DELETE, POST, PUT, PATCH, GET), and `urn:uuid:`
+  references to resources created by the Bundle are rewritten to their
+  `ResourceType/id` before dispatch. The first failing entry rolls back the
+  whole Bundle and its OperationOutcome is returned.
+
+Response entries are in the order of the request entries.
+"""
+from __future__ import annotations
+
+import io
+import json
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import Resolver404, resolve
+from django.utils.http import parse_http_date_safe
+from rest_framework import status
+
+from .bundle import (
+    build_operation_outcome_bundle_entry,
+    build_response_bundle,
+    build_response_entry,
+)
+from .exceptions import (
+    FHIR_MEDIA_TYPE,
+    FhirOperationError,
+    _build_operation_outcome,
+    _issue,
+)
+from .references import build_absolute_url
+
+# FHIR transaction processing order (R4 §3.1.0.11.2).
+METHOD_ORDER = {"DELETE": 0, "POST": 1, "PUT": 2, "PATCH": 3, "GET": 4, "HEAD": 4}
+URN_PREFIX = "urn:uuid:"
+
+# Conditional headers of the Bundle request itself must not leak into entries.
+_ENTRY_HEADERS = {
+    "ifMatch": "HTTP_IF_MATCH",
+    "ifNoneMatch": "HTTP_IF_NONE_MATCH",
+    "ifModifiedSince": "HTTP_IF_MODIFIED_SINCE",
+    "ifNoneExist": "HTTP_IF_NONE_EXIST",
+}
+
+
+class _EntryFailed(Exception):
+    def __init__(self, index, response):
+        super().__init__(index)
+        self.index = index
+        self.response = response
+
+
+def process_bundle(request, bundle) -> tuple[dict, int]:
+    """Process a posted Bundle; returns `(response body, status code)`."""
+    if not isinstance(bundle, dict) or bundle.get("resourceType") != "Bundle":
+        raise FhirOperationError(
+            "Expected a Bundle resource.", code="structure",
+        )
+    bundle_type = bundle.get("type")
+    if bundle_type not in ("batch", "transaction"):
+        raise FhirOperationError(
+            "Only batch and transaction Bundles can be posted.",
+            code="not-supported",
+            location=["Bundle.type"],
+        )
+    entries = bundle.get("entry") or []
+    max_entries = getattr(settings, "FHIR_BUNDLE_MAX_ENTRIES", 1000)
+    if len(entries) > max_entries:
+        raise FhirOperationError(
+            f"A Bundle may hold at most {max_entries} entries.",
+            code="too-costly",
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+
+    if bundle_type == "transaction":
+        return _process_transaction(request, entries)
+    return _process_batch(request, entries), status.HTTP_200_OK
+
+
+def _process_batch(request, entries) -> dict:
+    response_entries = []
+    for index, entry in enumerate(entries):
+        try:
+            method, url = _entry_target(entry, index)
+            with transaction.atomic():
+                response = _dispatch(request, method, url, entry)
+                if response.status_code >= 400:
+                    transaction.set_rollback(True)
+        except FhirOperationError as exc:
+            response_entries.append(_error_entry(exc))
+            continue
+        response_entries.append(_response_entry(request, response))
+    return build_response_bundle("batch", response_entries)
+
+
+def _process_transaction(request, entries) -> tuple[dict, int]:
+    targets = [_entry_target(entry, index) for index, entry in enumerate(entries)]
+    created = {}  # urn:uuid fullUrl -> "ResourceType/id"
+    responses = [None] * len(entries)
+    try:
+        with transaction.atomic():
+            for index in _processing_order(entries, targets):
+                method, url = targets[index]
+                entry = entries[index]
+                resource = _resolve_references(entry.get("resource"), created)
+                response = _dispatch(request, method, url, entry, resource=resource)
+                if response.status_code >= 400:
+                    raise _EntryFailed(index, response)
+                full_url = entry.get("fullUrl") or ""
+                if method == "POST" and full_url.startswith(URN_PREFIX):
+                    reference = _reference_of(response)
+                    if reference:
+                        created[full_url] = reference
+                responses[index] = response
+    except _EntryFailed as failed:
+        outcome = dict(getattr(failed.response, "data", None) or {})
+        outcome.setdefault("resourceType", "OperationOutcome")
+        for issue in outcome.get("issue", []):
+            issue.setdefault("expression", [f"Bundle.entry[{failed.index}]"])
+        return outcome, failed.response.status_code
+
+    response_entries = [_response_entry(request, response) for response in responses]
+    return build_response_bundle("transaction", response_entries), status.HTTP_200_OK
+
+
+def _entry_target(entry, index) -> tuple[str, str]:
+    request = entry.get("request") if isinstance(entry, dict) else None
+    method = ((request or {}).get("method") or "").upper()
+    url = ((request or {}).get("url") or "").strip().lstrip("/")
+    if method not in METHOD_ORDER or not url:
+        raise FhirOperationError(
+            "Bundle entries need a request.method and a relative request.url.",
+            code="invalid",
+            location=[f"Bundle.entry[{index}].request"],
+        )
+    if "://" in url:
+        raise FhirOperationError(
+            "Bundle entry URLs must be relative to the FHIR base.",
+            code="not-supported",
+            location=[f"Bundle.entry[{index}].request.url"],
+        )
+    return method, url
+
+
+def _urn_references(value) -> set[str]:
+    if isinstance(value, dict):
+        found = set()
+        reference = value.get("reference")
+        if isinstance(reference, str) and reference.startswith(URN_PREFIX):
+            found.add(reference)
+        for item in value.values():
+            found |= _urn_references(item)
+        return found
+    if isinstance(value, list):
+        return set().union(*(_urn_references(item) for item in value))
+    return set()
+
+
+def _processing_order(entries, targets) -> list[int]:
+    """Entry indexes in FHIR order, POSTs after the POSTs they reference."""
+    order = sorted(range(len(entries)), key=lambda i: METHOD_ORDER[targets[i][0]])
+    posts = [i for i in order if targets[i][0] == "POST"]
+    if not posts:
+        return order
+
+    post_urls = {entries[i].get("fullUrl"): i for i in posts if entries[i].get("fullUrl")}
+    pending = {
+        i: {
+            urn for urn in _urn_references(entries[i].get("resource"))
+            if urn in post_urls and post_urls[urn] != i
+        }
+        for i in posts
+    }
+    sorted_posts, done = [], set()
+    while pending:
+        ready = [i for i in posts if i in pending and pending[i] <= done]
+        if not ready:
+            raise FhirOperationError(
+                "The Bundle's urn:uuid references form a cycle.",
+                code="invalid",
+            )
+        for i in ready:
+            sorted_posts.append(i)
+            done.add(entries[i].get("fullUrl"))
+            del pending[i]
+
+    first = order.index(posts[0])
+    return order[:first] + sorted_posts + order[first + len(posts):]
+
+
+def _resolve_references(value, created):
+    if isinstance(value, dict):
+        resolved = {key: _resolve_references(item, created) for key, item in value.items()}
+        reference = resolved.get("reference")
+        if isinstance(reference, str) and reference in created:
+            resolved["reference"] = created[reference]
+        return resolved
+    if isinstance(value, list):
+        return [_resolve_references(item, created) for item in value]
+    return value
+
+
+def _dispatch(request, method, url, entry, *, resource=None):
+    """Run the entry through the view serving `url`, as the caller."""
+    path, _, query = url.partition("?")
+    path = f"{request._request.path_info.rstrip('/')}/{path}"
+    try:
+        match = resolve(path, urlconf=getattr(request._request, "urlconf", None))
+    except Resolver404:
+        match = None
+    url_name = (match.url_name or "") if match else ""
+    if not (url_name.startswith("fhir-") and url_name.endswith(("-collection", "-item"))):
+        raise FhirOperationError(
+            f"No FHIR endpoint serves {url}.",
+            code="not-found",
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+
+    if resource is None:
+        resource = entry.get("resource")
+    body = json.dumps(resource).encode() if resource is not None else b""
+
+    # A regular WSGI request, so that DRF parses the entry's body as usual.
+    environ = {
+        key: value for key, value in request.META.items()
+        if key not in _ENTRY_HEADERS.values() and not key.startswith("wsgi.")
+    }
+    environ.update({
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "CONTENT_TYPE": FHIR_MEDIA_TYPE,
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.url_scheme": request.scheme,
+    })
+    for field, header in _ENTRY_HEADERS.items():
+        if entry["request"].get(field):
+            environ[header] = entry["request"][field]
+    sub = WSGIRequest(environ)
+    for attr in ("tenant", "urlconf"):
+        if hasattr(request._request, attr):
+            setattr(sub, attr, getattr(request._request, attr))
+    # Reuse the Bundle request's authentication (DRF's forced authentication).
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    return match.func(sub, *match.args, **match.kwargs)
+
+
+def _reference_of(response) -> str | None:
+    location = response.get("Location")
+    if location:
+        return location
+    data = getattr(response, "data", None) or {}
+    if data.get("resourceType") and data.get("id"):
+        return f"{data['resourceType']}/{data['id']}"
+    return None
+
+
+def _response_entry(request, response) -> dict:
+    data = getattr(response, "data", None)
+    if response.status_code >= 400:
+        return build_operation_outcome_bundle_entry(data, response.status_code)
+
+    full_url = None
+    if isinstance(data, dict) and data.get("resourceType") and data.get("id"):
+        full_url = build_absolute_url(request, data["resourceType"], data["id"])
+    last_modified = None
+    timestamp = parse_http_date_safe(response.get("Last-Modified") or "")
+    if timestamp is not None:
+        last_modified = datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+    return build_response_entry(
+        response.status_code,
+        resource=data if isinstance(data, dict) else None,
+        full_url=full_url,
+        location=response.get("Location"),
+        etag=response.get("ETag"),
+        last_modified=last_modified,
+    )
+
+
+def _error_entry(exc: FhirOperationError) -> dict:
+    outcome = _build_operation_outcome([
+        _issue(exc.fhir_severity, exc.fhir_code, str(exc.detail), exc.fhir_location)
+    ])
+    return build_operation_outcome_bundle_entry(outcome, exc.status_code)
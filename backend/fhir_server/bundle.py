@@ -1,4 +1,6 @@
 """FHIR Bundle builders."""
+from http import HTTPStatus
+
 from django.conf import settings
 
 from .references import build_absolute_url
@@ -77,9 +79,46 @@ def build_searchset_bundle(*, request, mapper, instances, paginator=None,
     return bundle
 
 
+def status_line(status_code: int) -> str:
+    """`Bundle.entry.response.status`: the HTTP code and its reason phrase."""
+    try:
+        return f"{status_code} {HTTPStatus(status_code).phrase}"
+    except ValueError:
+        return str(status_code)
+
+
+def build_response_entry(status_code: int, *, resource: dict | None = None,
+                         outcome: dict | None = None, full_url: str | None = None,
+                         location: str | None = None, etag: str | None = None,
+                         last_modified: str | None = None) -> dict:
+    """Build an entry of a `batch-response`/`transaction-response` Bundle."""
+    response: dict = {"status": status_line(status_code)}
+    if location:
+        response["location"] = location
+    if etag:
+        response["etag"] = etag
+    if last_modified:
+        response["lastModified"] = last_modified
+    if outcome is not None:
+        response["outcome"] = outcome
+    entry: dict = {}
+    if full_url:
+        entry["fullUrl"] = full_url
+    if resource is not None:
+        entry["resource"] = resource
+    entry["response"] = response
+    return entry
+
+
 def build_operation_outcome_bundle_entry(outcome: dict, status_code: int) -> dict:
-    """Helper for transaction-response bundles (future use)."""
+    """Response entry of a Bundle entry that failed with `outcome`."""
+    return build_response_entry(status_code, outcome=outcome)
+
+
+def build_response_bundle(bundle_type: str, entries: list[dict]) -> dict:
+    """Build the `batch-response` or `transaction-response` Bundle."""
     return {
-        "response": {"status": str(status_code)},
-        "resource": outcome,
+        "resourceType": "Bundle",
+        "type": f"{bundle_type}-response",
+        "entry": entries,
     }
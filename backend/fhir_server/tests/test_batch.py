@@ -0,0 +1,154 @@
+"""Tests for `POST /api/fhir` batch and transaction Bundles."""
+import json
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from rest_framework.test import APIClient
+
+from consultations.models import Appointment, Participant
+from users.models import User
+
+PATIENT_URN = "urn:uuid:6f1c1d1e-0000-4000-8000-000000000001"
+
+
+def _patient(email, family="Martin"):
+    return {
+        "resourceType": "Patient",
+        "active": True,
+        "name": [{"family": family, "given": ["Pierre"]}],
+        "telecom": [{"system": "email", "value": email}],
+    }
+
+
+def _appointment(patient_reference):
+    start = timezone.now() + timedelta(days=5)
+    return {
+        "resourceType": "Appointment",
+        "status": "booked",
+        "start": start.isoformat(),
+        "end": (start + timedelta(minutes=30)).isoformat(),
+        "description": "Synced slot",
+        "participant": [
+            {"actor": {"reference": patient_reference}, "status": "accepted"},
+        ],
+    }
+
+
+class FhirBundleTests(TenantTestCase):
+
+    def setUp(self):
+        self.practitioner = User.objects.create_user(
+            email="doc@example.com", is_practitioner=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.practitioner)
+        self.url = reverse("fhir-bundle")
+
+    def _post(self, bundle):
+        return self.client.post(
+            self.url,
+            data=json.dumps(bundle),
+            content_type="application/fhir+json",
+        )
+
+    def test_transaction_resolves_urn_references(self):
+        response = self._post({
+            "resourceType": "Bundle",
+            "type": "transaction",
+            "entry": [
+                # Listed first, but processed after the Patient it references.
+                {
+                    "resource": _appointment(PATIENT_URN),
+                    "request": {"method": "POST", "url": "Appointment"},
+                },
+                {
+                    "fullUrl": PATIENT_URN,
+                    "resource": _patient("pierre@example.com"),
+                    "request": {"method": "POST", "url": "Patient"},
+                },
+            ],
+        })
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["type"], "transaction-response")
+        appointment_entry, patient_entry = response.data["entry"]
+        self.assertTrue(appointment_entry["response"]["status"].startswith("201"))
+        self.assertTrue(patient_entry["response"]["status"].startswith("201"))
+
+        patient = User.objects.get(email="pierre@example.com")
+        self.assertEqual(patient_entry["response"]["location"], f"Patient/{patient.pk}")
+        appointment = Appointment.objects.get(title="Synced slot")
+        self.assertTrue(
+            Participant.objects.filter(appointment=appointment, user=patient).exists()
+        )
+
+    def test_transaction_rolls_back_on_failure(self):
+        response = self._post({
+            "resourceType": "Bundle",
+            "type": "transaction",
+            "entry": [
+                {
+                    "resource": _patient("pierre@example.com"),
+                    "request": {"method": "POST", "url": "Patient"},
+                },
+                {
+                    "resource": _appointment("Patient/999999"),
+                    "request": {"method": "POST", "url": "Appointment"},
+                },
+            ],
+        })
+        self.assertGreaterEqual(response.status_code, 400)
+        self.assertEqual(response.data["resourceType"], "OperationOutcome")
+        self.assertFalse(User.objects.filter(email="pierre@example.com").exists())
+
+    def test_batch_entries_are_independent(self):
+        response = self._post({
+            "resourceType": "Bundle",
+            "type": "batch",
+            "entry": [
+                {
+                    "resource": _patient("pierre@example.com"),
+                    "request": {"method": "POST", "url": "Patient"},
+                },
+                {
+                    "resource": _appointment("Patient/999999"),
+                    "request": {"method": "POST", "url": "Appointment"},
+                },
+                {"request": {"method": "GET", "url": "Unknown/1"}},
+            ],
+        })
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["type"], "batch-response")
+        created, failed, unknown = response.data["entry"]
+        self.assertTrue(created["response"]["status"].startswith("201"))
+        self.assertEqual(created["resource"]["resourceType"], "Patient")
+        self.assertGreaterEqual(int(failed["response"]["status"][:3]), 400)
+        self.assertEqual(
+            failed["response"]["outcome"]["resourceType"], "OperationOutcome"
+        )
+        self.assertTrue(unknown["response"]["status"].startswith("404"))
+        self.assertTrue(User.objects.filter(email="pierre@example.com").exists())
+
+    def test_batch_read(self):
+        response = self._post({
+            "resourceType": "Bundle",
+            "type": "batch",
+            "entry": [
+                {"request": {"method": "GET", "url": f"Practitioner/{self.practitioner.pk}"}},
+            ],
+        })
+        entry = response.data["entry"][0]
+        self.assertTrue(entry["response"]["status"].startswith("200"))
+        self.assertEqual(entry["resource"]["id"], str(self.practitioner.pk))
+        self.assertTrue(entry["fullUrl"].endswith(f"/api/fhir/Practitioner/{self.practitioner.pk}"))
+
+    def test_rejects_other_bundle_types(self):
+        response = self._post({"resourceType": "Bundle", "type": "collection"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["resourceType"], "OperationOutcome")
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self._post({"resourceType": "Bundle", "type": "batch", "entry": []})
+        self.assertEqual(response.status_code, 401)
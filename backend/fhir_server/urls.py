@@ -2,7 +2,7 @@ from django.urls import path
 
 from .fhir_routes import get_fhir_viewsets
 from .force import ForceFhirMixin
-from .views import CapabilityStatementView
+from .views import BundleView, CapabilityStatementView
 
 
 def _force_fhir_class(viewset_cls: type) -> type:
@@ -16,6 +16,7 @@ def _build_fhir_urlpatterns():
     # Since no slashed variant is registered, APPEND_SLASH never redirects.
     patterns = [
         path("fhir/metadata", CapabilityStatementView.as_view(), name="fhir-metadata"),
+        path("fhir", BundleView.as_view(), name="fhir-bundle"),
     ]
     for resource_type, viewset_cls in get_fhir_viewsets().items():
         forced = _force_fhir_class(viewset_cls)
@@ -1,11 +1,14 @@
-"""FHIR metadata/CapabilityStatement view."""
+"""FHIR metadata/CapabilityStatement and batch/transaction Bundle views."""
 from __future__ import annotations
 
 from django.utils import timezone
-from rest_framework.permissions import AllowAny
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .batch import process_bundle
+from .parsers import FhirJsonParser
 from .registry import get_registry
 from .renderers import FhirJsonRenderer
 
@@ -58,6 +61,23 @@ class CapabilityStatementView(APIView):
             "rest": [{
                 "mode": "server",
                 "resource": resources,
+                "interaction": [{"code": "batch"}, {"code": "transaction"}],
             }],
         }
         return Response(capability)
+
+
+class BundleView(APIView):
+    """Accept `batch` and `transaction` Bundles at `POST /api/fhir`.
+
+    Entries are dispatched to the `/api/fhir/<ResourceType>` routes on behalf
+    of the caller (see `batch.py`), so a bulk sync is one HTTP request.
+    """
+
+    permission_classes = [IsAuthenticated]
+    parser_classes = [FhirJsonParser, JSONParser]
+    renderer_classes = [FhirJsonRenderer]
+
+    def post(self, request, *args, **kwargs):
+        body, status_code = process_bundle(request, request.data)
+        return Response(body, status=status_code)
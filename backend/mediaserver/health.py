@@ -0,0 +1,89 @@
+"""Cached media server health, filled by the background prober.
+
+Probing a server costs a remote round trip (and a full connect timeout when it
+is down), so the join path never probes. ``mediaserver.tasks.probe_mediaservers``
+checks every active server periodically and stores its health, round-trip time
+and load here; placement only reads these entries.
+
+Rooms pinned to a server since its last probe are counted separately, so a
+burst of joins between two probes is spread instead of landing on the server
+that happened to be the least loaded at probe time.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+
+def _current_schema() -> str:
+    return getattr(getattr(connection, "tenant", None), "schema_name", None) or "public"
+
+
+def _health_cache_key(server_pk) -> str:
+    return f"mediaserver:health:{_current_schema()}:{server_pk}"
+
+
+def _pending_cache_key(server_pk) -> str:
+    return f"mediaserver:pending:{_current_schema()}:{server_pk}"
+
+
+def health_ttl() -> int:
+    # A few probe intervals: a prober that stopped running makes the entries
+    # expire and placement falls back to treating servers as unknown.
+    return getattr(settings, "MEDIASERVER_HEALTH_TTL", 3 * 60)
+
+
+def record_health(server_pk, healthy, rtt=None, rooms=None, participants=None, error=None):
+    """Store the outcome of a probe and reset the server's pending pins."""
+    cache.set(
+        _health_cache_key(server_pk),
+        {
+            "healthy": healthy,
+            "rtt": rtt,
+            "rooms": rooms,
+            "participants": participants,
+            "error": error,
+            "checked_at": time.time(),
+        },
+        health_ttl(),
+    )
+    cache.delete(_pending_cache_key(server_pk))
+
+
+def get_health_many(server_pks):
+    """Return ``(health, pending)`` for ``server_pks`` with one cache read.
+
+    ``health`` maps each server with a fresh probe to its last probe result;
+    ``pending`` maps servers to the number of rooms pinned since that probe.
+    """
+    server_pks = list(server_pks)
+    keys = {_health_cache_key(pk): pk for pk in server_pks}
+    pending_keys = {_pending_cache_key(pk): pk for pk in server_pks}
+    cached = cache.get_many([*keys, *pending_keys])
+    health = {pk: cached[key] for key, pk in keys.items() if key in cached}
+    pending = {pk: cached[key] for key, pk in pending_keys.items() if key in cached}
+    return health, pending
+
+
+def add_pending(server_pk):
+    """Count a room pinned to ``server_pk`` until its next probe."""
+    key = _pending_cache_key(server_pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, health_ttl()):
+            cache.incr(key)
+
+
+def load_score(server, health, pending):
+    """Sort key for placement: lower is better.
+
+    Load is the share of ``max_session_number`` taken by the rooms reported
+    at the last probe plus the rooms pinned since; ties go to the lowest RTT.
+    """
+    rooms = (health or {}).get("rooms") or 0
+    capacity = max(server.max_session_number or 1, 1)
+    rtt = (health or {}).get("rtt")
+    return ((rooms + pending) / capacity, rtt if rtt is not None else float("inf"))
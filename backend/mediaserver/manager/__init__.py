@@ -14,6 +14,10 @@ __all__: List[str] = []
 class BaseMediaserver(ABC):
     name: str = ""
     display_name: str = ""
+    # Seconds the join info of a participant may be handed out again on
+    # reconnect (see consultations.joins); 0 issues new info on every join.
+    # Must leave the token enough validity to connect with.
+    join_info_ttl: int = 0
 
     def __init__(self, server: "Server"):
         self.server: "Server" = server
@@ -28,6 +32,16 @@ class BaseMediaserver(ABC):
             - raises Exception otherwise (callers catch broadly)
         """
 
+    def probe(self) -> dict:
+        """Health check run by the background prober (mediaserver.tasks).
+
+        Raises like test_connection when the server is unreachable. Returns
+        the load the provider reports, as a dict with ``rooms`` and
+        ``participants`` counts; providers that expose no load return {}.
+        """
+        self.test_connection()
+        return {}
+
     @abstractmethod
     def appointment_participant_info(self, appointment: Appointment, user: User) -> dict:
         """Return join info for an appointment participant.
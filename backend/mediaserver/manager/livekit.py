@@ -1,6 +1,7 @@
 import time
 import asyncio
 import uuid
+from datetime import timedelta
 from typing import Optional
 
 from django.conf import settings
@@ -28,10 +29,15 @@ from consultations.models import RecordingModeChoices
 from . import BaseMediaserver
 from ..exceptions import RemoteUnmuteDisabled
 
+# Lifetime of the access tokens handed to participants.
+TOKEN_TTL = timedelta(hours=6)
+
 
 class Main(BaseMediaserver):
     name = "livekit"
     display_name = "LiveKit"
+    # Reconnects reuse a token while it still has an hour left.
+    join_info_ttl = int((TOKEN_TTL - timedelta(hours=1)).total_seconds())
 
     def __init__(self, server):
         super().__init__(server)
@@ -70,6 +76,13 @@ class Main(BaseMediaserver):
         """Synchronous wrapper for test_connection"""
         return asyncio.run(self._test_connection_async())
 
+    def probe(self):
+        rooms = self.test_connection().rooms
+        return {
+            "rooms": len(rooms),
+            "participants": sum(room.num_participants for room in rooms),
+        }
+
     async def _get_create_room(self, room_name: str):
         async with LiveKitAPI(
             url=self.server.url,
@@ -100,6 +113,7 @@ class Main(BaseMediaserver):
                 api_key=self.server.api_token,
                 api_secret=self.server.api_secret,
             )
+            .with_ttl(TOKEN_TTL)
             .with_grants(video_grants)
             .with_identity(self._build_identity(user))
             .with_name(user.name)
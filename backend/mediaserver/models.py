@@ -10,6 +10,7 @@ from django.utils.translation import gettext_lazy as _
 
 from . import manager
 from .exceptions import NoMediaServerAvailable
+from .health import add_pending, get_health_many, load_score
 from .manager import BaseMediaserver
 
 logger = logging.getLogger(__name__)
@@ -23,10 +24,6 @@ def _room_pin_cache_key(room_uuid) -> str:
     return f"mediaserver:room:{_current_schema()}:{room_uuid}"
 
 
-def _round_robin_cache_key() -> str:
-    return f"mediaserver:rr_index:{_current_schema()}"
-
-
 # Create your models here.
 class Server(models.Model):
     url = models.URLField(_("URL"))
@@ -52,41 +49,46 @@ class Server(models.Model):
         return self.module.Main(self)
 
     @classmethod
-    def _round_robin_pick(cls) -> Optional["Server"]:
-        """Pick the next reachable active server using a tenant-scoped round-robin index.
+    def _pick(cls) -> Optional["Server"]:
+        """Pick the least-loaded healthy active server.
 
-        Returns None if no reachable server is found.
-        """
-        cache_key = _round_robin_cache_key()
-        current_index = cache.get(cache_key, 0)
+        Health and load come from the cache filled by the background prober
+        (see mediaserver.health); nothing is probed here. Servers that have
+        not been probed yet (prober not run, cache flushed) are only used when
+        no server is known to be healthy.
 
+        Returns None if no usable server is found.
+        """
         active_servers = list(cls.objects.filter(is_active=True))
-        active_server_count = len(active_servers)
-        if active_server_count == 0:
+        if not active_servers:
             return None
 
-        for i in range(active_server_count):
-            next_index = (1 + i + current_index) % active_server_count
-            candidate = active_servers[next_index]
-            try:
-                candidate.instance.test_connection()
-            except Exception:
-                logger.warning("Server unreachable or misconfigured: %s", candidate)
-                continue
-            cache.set(cache_key, next_index)
-            return candidate
+        health, pending = get_health_many(server.pk for server in active_servers)
+        candidates = [
+            server for server in active_servers if health.get(server.pk, {}).get("healthy")
+        ] or [server for server in active_servers if server.pk not in health]
+        if not candidates:
+            return None
+        return min(
+            candidates,
+            key=lambda server: load_score(
+                server, health.get(server.pk), pending.get(server.pk, 0)
+            ),
+        )
 
-        return None
+    def _is_known_unhealthy(self) -> bool:
+        health, _ = get_health_many([self.pk])
+        return self.pk in health and not health[self.pk]["healthy"]
 
     @classmethod
     def get_server(cls) -> "Server":
-        """Get an active and reachable server using round robin.
+        """Get the least-loaded healthy active server.
 
-        Raises NoMediaServerAvailable if none is reachable.
+        Raises NoMediaServerAvailable if none is usable.
         Intended for room-less flows (e.g. self test). For room-bound flows
         (consultations, appointments), use get_or_pin_for_room instead.
         """
-        server = cls._round_robin_pick()
+        server = cls._pick()
         if server is None:
             raise NoMediaServerAvailable("No reachable media server available")
         return server
@@ -96,13 +98,13 @@ class Server(models.Model):
         """Return the server pinned to a given room, or pick one and pin it.
 
         The pin is tenant-scoped and survives across requests via the cache.
-        If the pinned server is no longer reachable, the pin is cleared and
+        If the last probe of the pinned server failed, the pin is cleared and
         a new server is picked.
 
         Atomicity: uses cache.add() to claim the pin so concurrent first joins
         on the same room converge on the same server.
 
-        Raises NoMediaServerAvailable if no reachable server can be found.
+        Raises NoMediaServerAvailable if no usable server can be found.
         """
         cache_key = _room_pin_cache_key(room_uuid)
         pinned_pk = cache.get(cache_key)
@@ -110,23 +112,22 @@ class Server(models.Model):
         if pinned_pk is not None:
             server = cls.objects.filter(pk=pinned_pk, is_active=True).first()
             if server is not None:
-                try:
-                    server.instance.test_connection()
+                if not server._is_known_unhealthy():
                     return server
-                except Exception:
-                    logger.warning(
-                        "Pinned server %s for room %s is unreachable, repicking",
-                        server,
-                        room_uuid,
-                    )
+                logger.warning(
+                    "Pinned server %s for room %s is unhealthy, repicking",
+                    server,
+                    room_uuid,
+                )
             cache.delete(cache_key)
 
-        candidate = cls._round_robin_pick()
+        candidate = cls._pick()
         if candidate is None:
             raise NoMediaServerAvailable("No reachable media server available")
 
         ttl = getattr(settings, "ROOM_SERVER_PIN_TTL", 24 * 3600)
         if cache.add(cache_key, candidate.pk, timeout=ttl):
+            add_pending(candidate.pk)
             return candidate
 
         winner_pk = cache.get(cache_key)
@@ -138,6 +139,7 @@ class Server(models.Model):
         # Cache was evicted between add() and get(), or the winner is no longer
         # active. Fall back to our own candidate and force-write the pin.
         cache.set(cache_key, candidate.pk, timeout=ttl)
+        add_pending(candidate.pk)
         return candidate
 
     @classmethod
@@ -0,0 +1,53 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.celery import app, for_each_tenant, tenant_task
+
+from .health import record_health
+from .models import Server
+
+logger = logging.getLogger(__name__)
+
+# Servers are probed concurrently so a dead one costs its connect timeout once
+# per run instead of delaying the others.
+PROBE_MAX_WORKERS = 8
+
+
+def _probe(server):
+    started = time.monotonic()
+    try:
+        load = server.instance.probe() or {}
+    except Exception as exc:
+        return False, time.monotonic() - started, {}, str(exc)
+    return True, time.monotonic() - started, load, None
+
+
+@app.task
+def probe_mediaservers():
+    for_each_tenant(probe_mediaservers_for_tenant)
+
+
+@tenant_task(lock_timeout=60)
+def probe_mediaservers_for_tenant():
+    """Probe every active media server and cache its health and load."""
+    servers = list(Server.objects.filter(is_active=True))
+    if not servers:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(PROBE_MAX_WORKERS, len(servers))) as pool:
+        results = list(pool.map(_probe, servers))
+
+    # Cache writes stay on this thread: the tenant-aware cache key function
+    # reads the schema from the connection, which is per thread.
+    for server, (healthy, rtt, load, error) in zip(servers, results):
+        if not healthy:
+            logger.warning("Media server %s unreachable: %s", server, error)
+        record_health(
+            server.pk,
+            healthy,
+            rtt=rtt,
+            rooms=load.get("rooms"),
+            participants=load.get("participants"),
+            error=error,
+        )
@@ -6,23 +6,21 @@ from django_tenants.test.cases import TenantTestCase
 
 from .exceptions import NoMediaServerAvailable
 from .factories import ServerFactory
+from .health import get_health_many, record_health
 from .models import Server
+from .tasks import probe_mediaservers_for_tenant
 
 
 class _AlwaysOK:
-    def test_connection(self):
-        return True, True
+    def probe(self):
+        return {"rooms": 2, "participants": 3}
 
 
 class _AlwaysFail:
-    def test_connection(self):
+    def probe(self):
         raise RuntimeError("unreachable")
 
 
-def _all_ok_property():
-    return property(lambda self: _AlwaysOK())
-
-
 def _selective_property(failing_pk):
     def _getter(self):
         return _AlwaysFail() if self.pk == failing_pk else _AlwaysOK()
@@ -38,27 +36,41 @@ class ServerPinningTests(TenantTestCase):
     def tearDown(self):
         cache.clear()
 
+    def test_pinning_never_probes(self):
+        with patch.object(
+            Server, "instance", new_callable=lambda: property(lambda self: _AlwaysFail())
+        ):
+            server = Server.get_or_pin_for_room(uuid.uuid4())
+        self.assertIn(server.pk, {self.s1.pk, self.s2.pk})
+
     def test_pinning_returns_same_server_for_same_room(self):
         room_uuid = uuid.uuid4()
-        with patch.object(Server, "instance", new_callable=_all_ok_property):
-            first = Server.get_or_pin_for_room(room_uuid)
-            second = Server.get_or_pin_for_room(room_uuid)
+        first = Server.get_or_pin_for_room(room_uuid)
+        second = Server.get_or_pin_for_room(room_uuid)
         self.assertEqual(first.pk, second.pk)
 
-    def test_pinning_distinct_rooms_advance_round_robin(self):
-        with patch.object(Server, "instance", new_callable=_all_ok_property):
-            a = Server.get_or_pin_for_room(uuid.uuid4())
-            b = Server.get_or_pin_for_room(uuid.uuid4())
+    def test_pinning_distinct_rooms_spread_between_probes(self):
+        a = Server.get_or_pin_for_room(uuid.uuid4())
+        b = Server.get_or_pin_for_room(uuid.uuid4())
         self.assertNotEqual(a.pk, b.pk)
 
-    def test_pinned_server_becomes_unreachable_triggers_repick(self):
+    def test_least_loaded_healthy_server_is_picked(self):
+        record_health(self.s1.pk, True, rtt=0.01, rooms=8)
+        record_health(self.s2.pk, True, rtt=0.05, rooms=1)
+        self.assertEqual(Server.get_or_pin_for_room(uuid.uuid4()).pk, self.s2.pk)
+
+    def test_unhealthy_server_is_skipped(self):
+        record_health(self.s1.pk, True, rtt=0.01, rooms=9)
+        record_health(self.s2.pk, False, error="unreachable")
+        for _ in range(3):
+            self.assertEqual(Server.get_or_pin_for_room(uuid.uuid4()).pk, self.s1.pk)
+
+    def test_pinned_server_becomes_unhealthy_triggers_repick(self):
         room_uuid = uuid.uuid4()
-        with patch.object(Server, "instance", new_callable=_all_ok_property):
-            pinned = Server.get_or_pin_for_room(room_uuid)
+        pinned = Server.get_or_pin_for_room(room_uuid)
 
-        prop = _selective_property(pinned.pk)
-        with patch.object(Server, "instance", new_callable=lambda: prop):
-            repick = Server.get_or_pin_for_room(room_uuid)
+        record_health(pinned.pk, False, error="unreachable")
+        repick = Server.get_or_pin_for_room(room_uuid)
         self.assertNotEqual(repick.pk, pinned.pk)
 
     def test_no_active_server_raises(self):
@@ -66,19 +78,17 @@ class ServerPinningTests(TenantTestCase):
         with self.assertRaises(NoMediaServerAvailable):
             Server.get_or_pin_for_room(uuid.uuid4())
 
-    def test_get_server_raises_when_all_unreachable(self):
-        with patch.object(
-            Server, "instance", new_callable=lambda: property(lambda self: _AlwaysFail())
-        ):
-            with self.assertRaises(NoMediaServerAvailable):
-                Server.get_server()
+    def test_get_server_raises_when_all_unhealthy(self):
+        record_health(self.s1.pk, False)
+        record_health(self.s2.pk, False)
+        with self.assertRaises(NoMediaServerAvailable):
+            Server.get_server()
 
     def test_clear_room_pin_releases_lock(self):
         room_uuid = uuid.uuid4()
-        with patch.object(Server, "instance", new_callable=_all_ok_property):
-            pinned = Server.get_or_pin_for_room(room_uuid)
-            Server.clear_room_pin(room_uuid)
-            repick = Server.get_or_pin_for_room(room_uuid)
+        pinned = Server.get_or_pin_for_room(room_uuid)
+        Server.clear_room_pin(room_uuid)
+        repick = Server.get_or_pin_for_room(room_uuid)
         self.assertNotEqual(pinned.pk, repick.pk)
 
     def test_get_pinned_for_room_returns_none_when_unpinned(self):
@@ -86,9 +96,45 @@ class ServerPinningTests(TenantTestCase):
 
     def test_get_pinned_for_room_returns_pinned_without_repinning(self):
         room_uuid = uuid.uuid4()
-        with patch.object(Server, "instance", new_callable=_all_ok_property):
-            pinned = Server.get_or_pin_for_room(room_uuid)
-        # No connection test / round-robin advance: it just reads the pin.
+        pinned = Server.get_or_pin_for_room(room_uuid)
+        # No pick: it just reads the pin.
         found = Server.get_pinned_for_room(room_uuid)
         self.assertIsNotNone(found)
         self.assertEqual(found.pk, pinned.pk)
+
+
+class ServerProbeTests(TenantTestCase):
+    def setUp(self):
+        cache.clear()
+        self.s1 = ServerFactory()
+        self.s2 = ServerFactory()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_probe_records_health_and_load(self):
+        prop = _selective_property(self.s2.pk)
+        with patch.object(Server, "instance", new_callable=lambda: prop):
+            probe_mediaservers_for_tenant()
+
+        health, _ = get_health_many([self.s1.pk, self.s2.pk])
+        self.assertTrue(health[self.s1.pk]["healthy"])
+        self.assertEqual(health[self.s1.pk]["rooms"], 2)
+        self.assertEqual(health[self.s1.pk]["participants"], 3)
+        self.assertIsNotNone(health[self.s1.pk]["rtt"])
+        self.assertFalse(health[self.s2.pk]["healthy"])
+        self.assertEqual(Server.get_server().pk, self.s1.pk)
+
+    def test_probe_resets_pending_pins(self):
+        record_health(self.s1.pk, True, rooms=0)
+        record_health(self.s2.pk, True, rooms=0)
+        Server.get_or_pin_for_room(uuid.uuid4())
+        _, pending = get_health_many([self.s1.pk, self.s2.pk])
+        self.assertEqual(sum(pending.values()), 1)
+
+        with patch.object(
+            Server, "instance", new_callable=lambda: property(lambda self: _AlwaysOK())
+        ):
+            probe_mediaservers_for_tenant()
+        _, pending = get_health_many([self.s1.pk, self.s2.pk])
+        self.assertEqual(pending, {})
@@ -30,7 +30,11 @@ from .models import (
     TemplateValidation,
     TemplateValidationStatus,
 )
-from .tasks import send_message, template_messaging_provider_task
+from .tasks import (
+    DISPATCH_BATCH_SIZE,
+    send_messages,
+    template_messaging_provider_task,
+)
 from .template import DEFAULT_NOTIFICATION_MESSAGES, NOTIFICATION_CHOICES
 
 # admin.site.register(MessagingProvider, ModelAdmin)
@@ -244,10 +248,11 @@ class MessageAdmin(ModelAdmin):
         return str(instance.template_is_valid)
 
     def send_message(self, request, queryset):
-        """Resend failed messages via Celery"""
+        """Resend failed messages via Celery, in batches"""
 
-        for message in queryset.all():
-            send_message.delay(message.pk)
+        message_ids = list(queryset.values_list("pk", flat=True))
+        for i in range(0, len(message_ids), DISPATCH_BATCH_SIZE):
+            send_messages.delay(message_ids[i : i + DISPATCH_BATCH_SIZE])
 
     @display(description=_("Rendered subject"))
     def display_render_subject(self, instance):
@@ -0,0 +1,199 @@
+"""Branding of the main organisation, cached per process.
+
+Every email used to look the main organisation up twice, read its logo from
+storage (often S3) and encode it into a MIME part again. The branding of a
+tenant -- a snapshot of the main organisation, the logo bytes and the inline
+MIME part built from them -- is now kept per process and shared by email
+rendering, the email provider and the API.
+
+Snapshots are checked against a per-tenant version in the cache, bumped when
+an Organisation is saved or deleted (see signals). Logo bytes are loaded on
+first use and keyed on the logo file name and that version: a logo uploaded
+again under the same name (storages overwriting files) comes with a new
+version, so a stale image is never attached. A logo that fails to load is not
+cached and is tried again by the next email.
+"""
+
+import copy
+import logging
+import mimetypes
+import threading
+from email import encoders as Encoders
+from email.mime.base import MIMEBase
+from email.mime.image import MIMEImage
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.functional import LazyObject, empty
+
+logger = logging.getLogger(__name__)
+
+# Tenant-scoped through django_tenants.cache.make_key.
+VERSION_CACHE_KEY = "branding:version"
+
+_brandings = {}  # schema -> Branding
+# schema -> [(logo name, branding version), data, mime type, MIME part].
+_logos = {}
+_logos_lock = threading.Lock()
+
+
+class Branding:
+    """Main organisation of a tenant, with its email logo."""
+
+    def __init__(self, schema, organisation, version):
+        self.schema = schema
+        self.organisation = organisation
+        self.version = version
+        self.logo = self._logo_file(organisation)
+
+    @staticmethod
+    def _logo_file(organisation):
+        """The FieldFile used as the email logo, or None.
+
+        The email header has a coloured background, so the white logo is the
+        preferred variant, but many installations only upload the coloured
+        one. Falling back to logo_color is much better than silently dropping
+        the logo and showing the plain text branding instead.
+        """
+        if not organisation:
+            logger.warning("No main organisation found, email logo disabled")
+            return None
+
+        logo = organisation.logo_white or organisation.logo_color
+        if not logo:
+            logger.warning(
+                "Main organisation %s has neither logo_white nor logo_color, "
+                "email logo disabled",
+                organisation.pk,
+            )
+            return None
+        return logo
+
+    def _cached_logo(self):
+        """The ``[key, data, mime_type, part]`` entry of the logo, or None."""
+        if not self.logo:
+            return None
+        key = (self.logo.name, self.version)
+        with _logos_lock:
+            entry = _logos.get(self.schema)
+            if entry is None or entry[0] != key:
+                loaded = self._read_logo()
+                if loaded is None:
+                    return None
+                entry = _logos[self.schema] = [key, *loaded, None]
+            return entry
+
+    def logo_data(self):
+        """(data, mime_type) of the email logo, or None when unavailable."""
+        entry = self._cached_logo()
+        return None if entry is None else (entry[1], entry[2])
+
+    def logo_part(self):
+        """A new inline (``cid:logo``) MIME part of the logo, or None."""
+        entry = self._cached_logo()
+        if entry is None:
+            return None
+        with _logos_lock:
+            if entry[3] is None:
+                entry[3] = self._build_part(entry[1], entry[2])
+            # Parts are mutable and belong to one email each: hand out copies
+            # of the encoded part rather than encoding the image again.
+            return copy.deepcopy(entry[3])
+
+    def _read_logo(self):
+        logo = self.logo
+        try:
+            with logo.open("rb") as fh:
+                data = fh.read()
+        except Exception:
+            # Log loudly with the resolved path AND the storage backend so
+            # the real cause surfaces instead of being silently swallowed
+            # into a missing logo. The backend matters: emails are rendered
+            # by the Celery worker, and if it does not receive the same S3_*
+            # environment as the web process it silently falls back to local
+            # filesystem storage and cannot find any uploaded file.
+            storage = logo.storage
+            # default_storage is a lazy proxy, unwrap it to report the
+            # backend actually in use.
+            if isinstance(storage, LazyObject) and storage._wrapped is not empty:
+                storage = storage._wrapped
+            logger.exception(
+                "Failed to load email logo (name=%s, storage=%s)",
+                logo.name,
+                type(storage).__name__,
+            )
+            return None
+        if not data:
+            logger.warning("Email logo %s is empty, skipping", logo.name)
+            return None
+        return data, mimetypes.guess_type(logo.name)[0] or "image/png"
+
+    @staticmethod
+    def _build_part(data, mime_type):
+        maintype, subtype = mime_type.split("/", 1)
+
+        if maintype == "image" and subtype not in ("svg+xml",):
+            part = MIMEImage(data, _subtype=subtype)  # auto base64
+        else:
+            # SVG and other non-standard image types must be base64
+            # encoded explicitly, like Django does for attachments.
+            if subtype == "svg+xml":
+                logger.warning(
+                    "Organisation logo is an SVG: most email clients "
+                    "(Gmail, Outlook) cannot render it, use a PNG instead"
+                )
+            part = MIMEBase(maintype, subtype)
+            part.set_payload(data)
+            Encoders.encode_base64(part)
+
+        part.add_header("Content-ID", "<logo>")
+        # Some clients (Outlook in particular) refuse to render an inline
+        # part whose filename has no extension, so derive one from the
+        # MIME type instead of using a bare "logo".
+        filename = "logo" + (mimetypes.guess_extension(mime_type) or ".png")
+        part.add_header("Content-Disposition", "inline", filename=filename)
+        return part
+
+
+def _schema():
+    return getattr(connection, "schema_name", None) or "public"
+
+
+def get_branding():
+    """Branding of the current tenant."""
+    from users.models import Organisation
+
+    schema = _schema()
+    version = cache.get(VERSION_CACHE_KEY)
+    branding = _brandings.get(schema)
+    if branding is None or branding.version != version:
+        branding = Branding(
+            schema, Organisation.objects.filter(is_main=True).first(), version
+        )
+        _brandings[schema] = branding
+    return branding
+
+
+def _bump_version():
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        if not cache.add(VERSION_CACHE_KEY, 1, timeout=None):
+            cache.incr(VERSION_CACHE_KEY)
+
+
+def invalidate():
+    """Drop the branding of the current tenant, in every process.
+
+    Other processes reload it once the change is committed.
+    """
+    schema = _schema()
+    _brandings.pop(schema, None)
+    _logos.pop(schema, None)
+    transaction.on_commit(_bump_version)
+
+
+def reset():
+    """Drop every branding of this process (tests roll back without signals)."""
+    _brandings.clear()
+    _logos.clear()
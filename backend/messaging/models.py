@@ -1,7 +1,6 @@
 from datetime import timedelta
 import hashlib
 import logging
-import mimetypes
 import uuid
 from importlib import import_module
 from typing import Dict, Optional, Sequence, Tuple
@@ -22,7 +21,7 @@ from django.db import models
 from django.template.defaultfilters import register
 from django.template.loader import render_to_string
 from django.utils import timezone, translation
-from django.utils.functional import LazyObject, empty
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from factory.django import DjangoModelFactory
 from modeltranslation.utils import get_translation_fields
@@ -30,6 +29,7 @@ from modeltranslation.utils import get_translation_fields
 from . import providers
 from .abstracts import ModelCeleryAbstract
 from .providers import BaseMessagingProvider
+from .rendering import compiled_templates
 from .template import DEFAULT_NOTIFICATION_MESSAGES, NOTIFICATION_CHOICES
 
 logger = logging.getLogger(__name__)
@@ -432,17 +432,20 @@ class Template(models.Model):
             render_context["obj"] = obj
 
         # Plain-text render only (subject + text body), so no HTML autoescape.
-        env = jinja2.Environment(autoescape=False)
-        env.filters.update(register.filters)
-
         # Render template text
-        text_template = env.from_string(self.template_content)
+        text_template = compiled_templates.get(
+            self.template_content, event_type=self.event_type, field="template_content"
+        )
         rendered_text = text_template.render(render_context)
 
         # Render template subject
         rendered_subject = ""
         if self.template_subject:
-            subject_template = env.from_string(self.template_subject)
+            subject_template = compiled_templates.get(
+                self.template_subject,
+                event_type=self.event_type,
+                field="template_subject",
+            )
             rendered_subject = subject_template.render(render_context)
 
         return rendered_subject, rendered_text
@@ -883,98 +886,47 @@ class Message(ModelCeleryAbstract):
             logger.exception("render_content_html failed for message_id=%s: %s", self.pk, e)
             return ""
 
-    @staticmethod
-    def get_email_logo_file(main_org=None):
-        """Return the FieldFile to use as the email logo, or None.
+    @cached_property
+    def branding(self):
+        """Branding of the main organisation (see messaging.branding).
 
-        The email header has a coloured background, so the white logo is the
-        preferred variant, but many installations only upload the coloured one.
-        Falling back to logo_color is much better than silently dropping the
-        logo and showing the plain text branding instead.
+        Memoized on the instance so that render_full_html (which decides
+        whether to emit the cid:logo <img>) and the email provider (which
+        attaches the inline image) always share the exact same snapshot.
         """
-        from users.models import Organisation
-
-        if main_org is None:
-            main_org = Organisation.objects.filter(is_main=True).first()
-
-        if not main_org:
-            logger.warning("No main organisation found, email logo disabled")
-            return None
-
-        logo = main_org.logo_white or main_org.logo_color
-        if not logo:
-            logger.warning(
-                "Main organisation %s has neither logo_white nor logo_color, "
-                "email logo disabled",
-                main_org.pk,
-            )
-            return None
+        from .branding import get_branding
 
-        return logo
+        return get_branding()
 
     def get_email_logo(self):
         """Return (data, mime_type) for the main organisation's email logo, or
         None when there is no logo or it cannot be read.
 
-        Memoized on the instance so it is read only once per send and, more
-        importantly, so render_full_html (which decides whether to emit the
-        cid:logo <img>) and the email provider (which attaches the inline
-        image) always share the exact same decision. Without this, the HTML
-        could reference cid:logo while no attachment was produced, rendering
-        as a broken image.
+        Memoized on the instance so render_full_html and the email provider
+        always share the exact same decision. Without this, the HTML could
+        reference cid:logo while no attachment was produced, rendering as a
+        broken image.
         """
-        if hasattr(self, "_email_logo"):
-            return self._email_logo
-
-        result = None
-        logo = self.get_email_logo_file()
-        if logo:
-            try:
-                with logo.open("rb") as fh:
-                    data = fh.read()
-                mime_type = mimetypes.guess_type(logo.name)[0] or "image/png"
-                if not data:
-                    logger.warning("Email logo %s is empty, skipping", logo.name)
-                else:
-                    result = (data, mime_type)
-            except Exception:
-                # Log loudly with the resolved path AND the storage backend so
-                # the real cause surfaces instead of being silently swallowed
-                # into a missing logo. The backend matters: emails are rendered
-                # by the Celery worker, and if it does not receive the same S3_*
-                # environment as the web process it silently falls back to local
-                # filesystem storage and cannot find any uploaded file.
-                storage = logo.storage
-                # default_storage is a lazy proxy, unwrap it to report the
-                # backend actually in use.
-                if isinstance(storage, LazyObject) and storage._wrapped is not empty:
-                    storage = storage._wrapped
-                logger.exception(
-                    "Failed to load email logo (name=%s, storage=%s)",
-                    logo.name,
-                    type(storage).__name__,
-                )
-
-        self._email_logo = result
-        return result
+        if not hasattr(self, "_email_logo"):
+            self._email_logo = self.branding.logo_data()
+        return self._email_logo
 
     @property
     def render_full_html(self):
         """Render the complete HTML email with base template"""
         try:
             from constance import config as constance_config
-            from users.models import Organisation
 
             content_html = self.render_content_html
             subject = self.render_subject
-            main_org = Organisation.objects.filter(is_main=True).first()
+            main_org = self.branding.organisation
 
             logo_mode = getattr(constance_config, "email_logo_mode", "embed")
             logo_url = None
             if logo_mode == "url":
                 # URL mode: the mail client fetches the logo over HTTP, so it is
                 # enough that a logo file is configured.
-                logo_file = self.get_email_logo_file(main_org)
+                logo_file = self.branding.logo
                 has_logo = logo_file is not None
                 if has_logo:
                     logo_url = logo_file.url
@@ -1128,28 +1080,22 @@ class Message(ModelCeleryAbstract):
                 translation.override(self.language),
                 timezone.override(self.sent_to.user_tz),
             ):
-                # Only escape interpolated values for HTML output; plain-text
-                # fields (subject, text body for SMS/WhatsApp) must stay literal
-                # so values like "O'Brien" are not turned into HTML entities.
-                env = jinja2.Environment(
-                    extensions=['jinja2.ext.i18n'],
-                    autoescape=field == "template_content_html",
-                )
-                env.install_gettext_callables(
-                    translation.gettext,
-                    translation.ngettext,
-                    newstyle=True,
-                )
-                env.filters['localtime'] = timezone.localtime
-                env.filters.update(register.filters)
-
                 template_str = str(getattr(self.template, field))
                 logger.debug(
                     "render: template_str for field=%s length=%d",
                     field, len(template_str) if template_str else 0,
                 )
 
-                text_template = env.from_string(template_str)
+                # Only escape interpolated values for HTML output; plain-text
+                # fields (subject, text body for SMS/WhatsApp) must stay literal
+                # so values like "O'Brien" are not turned into HTML entities.
+                text_template = compiled_templates.get(
+                    template_str,
+                    autoescape=field == "template_content_html",
+                    event_type=self.template_system_name,
+                    communication_method=self.validated_communication_method,
+                    field=field,
+                )
                 result = text_template.render(
                     {
                         "obj": obj,
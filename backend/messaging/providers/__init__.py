@@ -1,7 +1,11 @@
 from abc import ABC, abstractmethod
 from importlib import import_module
 from pkgutil import iter_modules
-from typing import TYPE_CHECKING, Any, Dict, List, Tuple, Type
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Type
+
+from django.conf import settings
+
+from ._transport import run_concurrently, session_for
 
 if TYPE_CHECKING:
     from ..models import (
@@ -22,10 +26,43 @@ class BaseMessagingProvider(ABC):
     display_name: str = ""
     communication_method: "CommunicationMethod"
     required_fields: List[str] = []
+    # Concurrent sends of send_many; MESSAGING_SEND_CONCURRENCY when None.
+    max_workers: Optional[int] = None
 
     def __init__(self, messaging_provider: "MessagingProvider"):
         self.messaging_provider = messaging_provider
 
+    @property
+    def http(self):
+        """Pooled session shared by every instance of this provider."""
+        return session_for(type(self).__module__)
+
+    def request(self, method: str, url: str, **kwargs):
+        """Send an HTTP request over the pooled session, with a timeout."""
+        kwargs.setdefault("timeout", settings.MESSAGING_HTTP_TIMEOUT)
+        return self.http.request(method, url, **kwargs)
+
+    def send_many(self, messages: List["Message"]) -> List[Optional[Exception]]:
+        """
+        Send several messages concurrently
+
+        Returns, in order, the exception raised for each message, or None
+        when it was sent.
+        """
+
+        def send_one(message):
+            try:
+                self.send(message)
+            except Exception as e:
+                return e
+            return None
+
+        return run_concurrently(
+            send_one,
+            messages,
+            self.max_workers or settings.MESSAGING_SEND_CONCURRENCY,
+        )
+
     @abstractmethod
     def send(self, message: "Message"):
         """
@@ -33,6 +70,8 @@ class BaseMessagingProvider(ABC):
 
         The provider will determine how to send the message based on the
         message's communication_method field (SMS, WhatsApp, Email, etc.)
+        Providers only record what happened on ``message`` (``task_logs``):
+        the caller saves it, so a batch is written back at once.
 
         Args:
             message (Message): The message to send
@@ -0,0 +1,112 @@
+"""HTTP transport shared by the messaging providers.
+
+Each provider module gets one ``requests.Session`` per process, with a
+keep-alive connection pool sized for ``MESSAGING_SEND_CONCURRENCY``
+concurrent sends, so consecutive sends reuse warm TLS connections.
+
+Failed connections are retried with exponential backoff within a budget of
+``MESSAGING_HTTP_RETRIES`` attempts. Reads and 429/5xx responses are only
+retried for GET and HEAD: retrying a POST that may have reached the provider
+could send the same SMS twice.
+"""
+
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.db import connection, connections
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def _new_session():
+    retries = settings.MESSAGING_HTTP_RETRIES
+    adapter = HTTPAdapter(
+        pool_maxsize=settings.MESSAGING_SEND_CONCURRENCY,
+        max_retries=Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=settings.MESSAGING_HTTP_BACKOFF,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        ),
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def session_for(name):
+    """The process-wide session of the provider ``name``."""
+    session = _sessions.get(name)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(name)
+            if session is None:
+                session = _sessions[name] = _new_session()
+    return session
+
+
+def _bind_tenant(tenant):
+    if tenant is not None:
+        connection.set_tenant(tenant)
+
+
+def _close_connections(opened):
+    # The worker threads are gone: their connections are closed from here.
+    for conn in opened:
+        conn.inc_thread_sharing()
+        try:
+            conn.close()
+        finally:
+            conn.dec_thread_sharing()
+
+
+def run_concurrently(func, items, max_workers):
+    """``[func(item) for item in items]``, on up to ``max_workers`` threads.
+
+    Workers run in the caller's tenant and context (pinned constance
+    settings). Each worker thread binds the tenant once and keeps its
+    database connection for all the items it handles; the connections are
+    closed once the pool is shut down. Exceptions are raised by the result
+    they belong to.
+    """
+    items = list(items)
+    max_workers = min(max_workers, len(items))
+    if max_workers <= 1:
+        return [func(item) for item in items]
+
+    tenant = getattr(connection, "tenant", None)
+    opened = set()
+    opened_lock = threading.Lock()
+
+    def call(item):
+        try:
+            return func(item)
+        finally:
+            with opened_lock:
+                opened.update(connections.all(initialized_only=True))
+
+    try:
+        with ThreadPoolExecutor(
+            max_workers=max_workers, initializer=_bind_tenant, initargs=(tenant,)
+        ) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, call, item)
+                for item in items
+            ]
+            return [future.result() for future in futures]
+    finally:
+        _close_connections(opened)
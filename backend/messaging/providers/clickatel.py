@@ -1,6 +1,5 @@
 from . import BaseMessagingProvider
 from typing import TYPE_CHECKING, Tuple, Any
-import requests
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,7 +20,6 @@ class Main(BaseMessagingProvider):
             error_msg = "Missing recipient phone number"
             logger.error(error_msg)
             message.task_logs += f"{error_msg}\n"
-            message.save()
             raise Exception(error_msg)
 
         api_key = self.messaging_provider.api_key
@@ -29,7 +27,6 @@ class Main(BaseMessagingProvider):
             error_msg = "Missing Clickatel API key"
             logger.error(error_msg)
             message.task_logs += f"{error_msg}\n"
-            message.save()
             raise Exception(error_msg)
 
         from_number = self.messaging_provider.from_phone
@@ -37,7 +34,6 @@ class Main(BaseMessagingProvider):
             error_msg = "Missing from_phone configuration"
             logger.error(error_msg)
             message.task_logs += f"{error_msg}\n"
-            message.save()
             raise Exception(error_msg)
 
         url = "https://platform.clickatell.com/messages"
@@ -56,12 +52,11 @@ class Main(BaseMessagingProvider):
         }
 
         logger.info(f"Sending POST request to Clickatel SMS API: {url}")
-        response = requests.post(url, json=data, headers=headers)
+        response = self.request("POST", url, json=data, headers=headers)
         logger.info(f"Clickatel response status: {response.status_code}")
 
         message.task_logs += f"Clickatel API response: {response.status_code}\n"
         message.task_logs += f"Response body: {response.text}\n"
-        message.save()
 
         if response.status_code in [200, 201, 202]:
             response_data = response.json()
@@ -92,7 +87,7 @@ class Main(BaseMessagingProvider):
             url = "https://platform.clickatell.com/account/balance"
             headers = {'Authorization': f"Bearer {api_key}"}
             
-            response = requests.get(url, headers=headers)
+            response = self.request("GET", url, headers=headers)
             
             if response.status_code == 200:
                 return (True, True)
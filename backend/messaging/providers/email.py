@@ -1,8 +1,8 @@
 import logging
-import mimetypes
-from email import encoders as Encoders
-from email.mime.base import MIMEBase
-from email.mime.image import MIMEImage
+import os
+import smtplib
+import threading
+import time
 from typing import TYPE_CHECKING, Any, Tuple
 
 from constance import config
@@ -56,10 +56,88 @@ class EmailWithInlineImages(EmailMultiAlternatives):
         return self._create_attachments(msg)
 
 
+class SharedConnection:
+    """The email backend connection of the process, reused across sends.
+
+    Opening an SMTP connection costs a TCP and TLS handshake plus the
+    authentication, so the connection stays open between messages, batches
+    and tasks. It is reopened after ``EMAIL_CONNECTION_IDLE_TIMEOUT`` seconds
+    without use (servers drop idle clients) or once it sent
+    ``EMAIL_CONNECTION_MAX_MESSAGES`` messages, and a message that fails
+    because the server dropped the connection is retried once on a new one.
+    Sends are serialized: an SMTP session handles one message at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._last_used = 0.0
+        self._sent = 0
+
+    def _close(self):
+        connection, self._connection = self._connection, None
+        if connection is not None and self._pid == os.getpid():
+            try:
+                connection.close()
+            except Exception:
+                logger.debug("Error closing the email connection", exc_info=True)
+
+    def _open(self):
+        stale = (
+            self._connection is None
+            # A forked worker must not talk over its parent's socket.
+            or self._pid != os.getpid()
+            or time.monotonic() - self._last_used > settings.EMAIL_CONNECTION_IDLE_TIMEOUT
+            or self._sent >= settings.EMAIL_CONNECTION_MAX_MESSAGES
+        )
+        if stale:
+            self._close()
+            self._connection = get_connection(fail_silently=False)
+            self._connection.open()
+            self._pid = os.getpid()
+            self._sent = 0
+        return self._connection
+
+    def send(self, email):
+        """Send ``email`` over the shared connection; returns the sent count."""
+        with self._lock:
+            for attempt in range(2):
+                connection = self._open()
+                try:
+                    result = connection.send_messages([email])
+                except (smtplib.SMTPServerDisconnected, ConnectionError):
+                    self._close()
+                    if attempt:
+                        raise
+                    logger.info("Email connection lost, reconnecting")
+                    continue
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException):
+                    # Refused by the server: the session is still usable.
+                    raise
+                except Exception:
+                    # The session may be in any state: start a new one.
+                    self._close()
+                    raise
+                self._sent += 1
+                self._last_used = time.monotonic()
+                return result
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+shared_connection = SharedConnection()
+
+
 class Main(BaseMessagingProvider):
     display_name = _("Email over Django SMTP")
     communication_method = "email"
     required_fields = ["from_email"]
+    # Messages of a batch go out one after the other over the shared
+    # connection rather than over one connection per thread.
+    max_workers = 1
 
     def send(self, message: "Message"):
         from_email = self.messaging_provider.from_email or settings.DEFAULT_FROM_EMAIL
@@ -93,37 +171,16 @@ class Main(BaseMessagingProvider):
         # call succeeds, so the HTML and the attachment can never disagree.
         logo_mode = getattr(config, "email_logo_mode", "embed")
         logo = message.get_email_logo() if logo_mode == "embed" else None
-        if logo:
-            logo_data, mime_type = logo
-            maintype, subtype = mime_type.split("/", 1)
-
-            if maintype == "image" and subtype not in ("svg+xml",):
-                img = MIMEImage(logo_data, _subtype=subtype)  # auto base64
-            else:
-                # SVG and other non-standard image types must be base64
-                # encoded explicitly, like Django does for attachments.
-                if subtype == "svg+xml":
-                    logger.warning(
-                        "Organisation logo is an SVG: most email clients "
-                        "(Gmail, Outlook) cannot render it, use a PNG instead"
-                    )
-                img = MIMEBase(maintype, subtype)
-                img.set_payload(logo_data)
-                Encoders.encode_base64(img)
-
-            img.add_header("Content-ID", "<logo>")
-            # Some clients (Outlook in particular) refuse to render an inline
-            # part whose filename has no extension, so derive one from the
-            # MIME type instead of using a bare "logo".
-            filename = "logo" + (mimetypes.guess_extension(mime_type) or ".png")
-            img.add_header("Content-Disposition", "inline", filename=filename)
+        logo_part = message.branding.logo_part() if logo else None
+        if logo_part:
             # Inline image -> goes into the multipart/related group so the
             # cid:logo reference in the HTML resolves. Real attachments
-            # (ICS below) stay in the outer multipart/mixed.
-            email.attach_inline(img)
+            # (ICS below) stay in the outer multipart/mixed. The part is
+            # built once per logo and copied (see messaging.branding).
+            email.attach_inline(logo_part)
             logger.info(
                 "Attached inline logo message_id=%s type=%s size=%d",
-                message.pk, mime_type, len(logo_data),
+                message.pk, logo[1], len(logo[0]),
             )
         elif logo_mode == "embed":
             logger.warning(
@@ -146,7 +203,7 @@ class Main(BaseMessagingProvider):
             getattr(settings, "EMAIL_PORT", None),
             getattr(settings, "EMAIL_USE_SSL", None),
         )
-        result = email.send()
+        result = shared_connection.send(email)
         logger.info("Email send result for message_id=%s: %s", message.pk, result)
 
     def test_connection(self):
@@ -57,7 +57,6 @@ class Main(BaseMessagingProvider):
             error_msg = "Recipient phone number is required"
             logger.error(error_msg)
             message.task_logs += f"{error_msg}\n"
-            message.save()
             raise Exception(error_msg)
 
         application_key = self.messaging_provider.application_key
@@ -70,7 +69,6 @@ class Main(BaseMessagingProvider):
             error_msg = "Missing OVH configuration fields (application_key, consumer_key, or service_name)"
             logger.error(error_msg)
             message.task_logs += f"{error_msg}\n"
-            message.save()
             raise Exception(error_msg)
 
         url = f"https://eu.api.ovh.com/1.0/sms/{service_name}/jobs"
@@ -104,12 +102,11 @@ class Main(BaseMessagingProvider):
         # Send the exact bytes the signature was computed over (body_json), not a
         # re-serialized copy: passing json=body would let requests re-serialize the
         # dict, producing a different byte string and an INVALID_SIGNATURE error.
-        response = requests.post(url, data=body_json, headers=headers)
+        response = self.request("POST", url, data=body_json, headers=headers)
         logger.info(f"OVH response status: {response.status_code}")
 
         message.task_logs += f"OVH API response: {response.status_code}\n"
         message.task_logs += f"Response body: {response.text}\n"
-        message.save()
 
         try:
             response.raise_for_status()
@@ -142,7 +139,7 @@ class Main(BaseMessagingProvider):
             "X-Ovh-Signature": signature,
         }
 
-        response = requests.get(url, headers=headers)
+        response = self.request("GET", url, headers=headers)
         response.raise_for_status()
 
         services = response.json()
@@ -1,6 +1,5 @@
 from . import BaseMessagingProvider
 from typing import TYPE_CHECKING, Tuple, Any
-import requests
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,7 +20,6 @@ class Main(BaseMessagingProvider):
             error_msg = "Missing recipient phone number"
             logger.error(error_msg)
             message.task_logs += f"{error_msg}\n"
-            message.save()
             raise Exception(error_msg)
 
         api_key = self.messaging_provider.api_key
@@ -29,7 +27,6 @@ class Main(BaseMessagingProvider):
             error_msg = "Missing smsmode API key"
             logger.error(error_msg)
             message.task_logs += f"{error_msg}\n"
-            message.save()
             raise Exception(error_msg)
 
         # smsmode expects the phone number without leading "+" (e.g. 33600000001)
@@ -52,12 +49,11 @@ class Main(BaseMessagingProvider):
             data["sender"] = {"value": self.messaging_provider.sender_id}
 
         logger.info(f"Sending POST request to smsmode SMS API: {url}")
-        response = requests.post(url, json=data, headers=headers)
+        response = self.request("POST", url, json=data, headers=headers)
         logger.info(f"smsmode response status: {response.status_code}")
 
         message.task_logs += f"smsmode API response: {response.status_code}\n"
         message.task_logs += f"Response body: {response.text}\n"
-        message.save()
 
         if response.status_code in [200, 201, 202]:
             logger.info("SMS sent successfully via smsmode")
@@ -79,7 +75,7 @@ class Main(BaseMessagingProvider):
                 "Accept": "application/json",
             }
 
-            response = requests.get(url, headers=headers)
+            response = self.request("GET", url, headers=headers)
 
             if response.status_code == 200:
                 return (True, True)
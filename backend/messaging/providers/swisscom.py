@@ -1,6 +1,5 @@
 from . import BaseMessagingProvider
 from typing import TYPE_CHECKING, Tuple, Any
-import requests
 import base64
 import logging
 
@@ -37,7 +36,7 @@ class Main(BaseMessagingProvider):
         data = {'grant_type': 'client_credentials'}
         
         try:
-            response = requests.post(url, headers=headers, data=data)
+            response = self.request("POST", url, headers=headers, data=data)
             if response.status_code == 200:
                 return response.json().get('access_token')
         except Exception:
@@ -51,7 +50,6 @@ class Main(BaseMessagingProvider):
             error_msg = "Missing recipient phone number"
             logger.error(error_msg)
             message.task_logs += f"{error_msg}\n"
-            message.save()
             raise Exception(error_msg)
 
         access_token = self._get_access_token()
@@ -59,7 +57,6 @@ class Main(BaseMessagingProvider):
             error_msg = "Failed to obtain Swisscom access token"
             logger.error(error_msg)
             message.task_logs += f"{error_msg}\n"
-            message.save()
             raise Exception(error_msg)
 
         sender = self.messaging_provider.sender_id
@@ -67,7 +64,6 @@ class Main(BaseMessagingProvider):
             error_msg = "Missing sender_id configuration"
             logger.error(error_msg)
             message.task_logs += f"{error_msg}\n"
-            message.save()
             raise Exception(error_msg)
 
         url = "https://api.swisscom.com/messaging/sms"
@@ -84,12 +80,11 @@ class Main(BaseMessagingProvider):
         }
 
         logger.info(f"Sending POST request to Swisscom SMS API: {url}")
-        response = requests.post(url, json=data, headers=headers)
+        response = self.request("POST", url, json=data, headers=headers)
         logger.info(f"Swisscom response status: {response.status_code}")
 
         message.task_logs += f"Swisscom API response: {response.status_code}\n"
         message.task_logs += f"Response body: {response.text}\n"
-        message.save()
 
         if response.status_code in [200, 201, 202]:
             logger.info("SMS sent successfully via Swisscom")
@@ -1,6 +1,5 @@
 from . import BaseMessagingProvider
 from typing import TYPE_CHECKING, Tuple, Any
-import requests
 import base64
 import logging
 
@@ -31,7 +30,6 @@ class Main(BaseMessagingProvider):
             error_msg = "Missing recipient phone number"
             logger.error(error_msg)
             message.task_logs += f"{error_msg}\n"
-            message.save()
             raise Exception(error_msg)
 
         auth_header = self._get_auth_header()
@@ -39,7 +37,6 @@ class Main(BaseMessagingProvider):
             error_msg = "Missing Twilio credentials (account_sid or auth_token)"
             logger.error(error_msg)
             message.task_logs += f"{error_msg}\n"
-            message.save()
             raise Exception(error_msg)
 
         account_sid = self.messaging_provider.account_sid
@@ -48,7 +45,6 @@ class Main(BaseMessagingProvider):
             error_msg = "Missing from_phone configuration"
             logger.error(error_msg)
             message.task_logs += f"{error_msg}\n"
-            message.save()
             raise Exception(error_msg)
 
         url = f"https://api.twilio.com/2010-04-01/Accounts/{account_sid}/Messages.json"
@@ -65,12 +61,11 @@ class Main(BaseMessagingProvider):
         }
 
         logger.info(f"Sending POST request to Twilio SMS API: {url}")
-        response = requests.post(url, data=data, headers=headers)
+        response = self.request("POST", url, data=data, headers=headers)
         logger.info(f"Twilio response status: {response.status_code}")
 
         message.task_logs += f"Twilio API response: {response.status_code}\n"
         message.task_logs += f"Response body: {response.text}\n"
-        message.save()
 
         if response.status_code == 201:
             logger.info("SMS sent successfully via Twilio")
@@ -90,7 +85,7 @@ class Main(BaseMessagingProvider):
             url = f"https://api.twilio.com/2010-04-01/Accounts/{account_sid}.json"
             
             headers = {'Authorization': auth_header}
-            response = requests.get(url, headers=headers)
+            response = self.request("GET", url, headers=headers)
             
             if response.status_code == 200:
                 return (True, True)
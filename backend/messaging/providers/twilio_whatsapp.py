@@ -4,8 +4,6 @@ import logging
 import re
 from typing import TYPE_CHECKING, Any, Dict, Tuple
 
-import requests
-
 from . import BaseMessagingProvider
 
 logger = logging.getLogger(__name__)
@@ -178,7 +176,7 @@ class Main(BaseMessagingProvider):
             "Content-Type": "application/x-www-form-urlencoded",
         }
 
-        response = requests.post(url, data=data, headers=headers)
+        response = self.request("POST", url, data=data, headers=headers)
 
         message.task_logs += response.text
 
@@ -196,7 +194,7 @@ class Main(BaseMessagingProvider):
             url = f"https://api.twilio.com/2010-04-01/Accounts/{account_sid}.json"
 
             headers = {"Authorization": auth_header}
-            response = requests.get(url, headers=headers)
+            response = self.request("GET", url, headers=headers)
 
             if response.status_code == 200:
                 return (True, True)
@@ -338,7 +336,7 @@ class Main(BaseMessagingProvider):
         headers = {"Authorization": auth_header, "Content-Type": "application/json"}
 
         logger.info(f"Sending POST request to Twilio Content API: {url}")
-        response = requests.post(url, json=content_data, headers=headers)
+        response = self.request("POST", url, json=content_data, headers=headers)
         logger.info(f"Twilio response status: {response.status_code}")
         logger.debug(f"Twilio response content: {response.text}")
 
@@ -397,7 +395,7 @@ class Main(BaseMessagingProvider):
         logger.info(f"WhatsApp submission payload: {json.dumps(payload, indent=2)}")
 
         try:
-            response = requests.post(url, json=payload, headers=headers)
+            response = self.request("POST", url, json=payload, headers=headers)
             logger.info(f"WhatsApp submission response status: {response.status_code}")
             logger.debug(f"WhatsApp submission response content: {response.text}")
 
@@ -449,7 +447,7 @@ class Main(BaseMessagingProvider):
         url = f"https://content.twilio.com/v1/Content/{template_validation.external_template_id}"
 
         headers = {"Authorization": auth_header}
-        response = requests.get(url, headers=headers)
+        response = self.request("GET", url, headers=headers)
         response_data = response.json() if response.content else {}
 
         logger.info(f"Check validation response: {json.dumps(response_data, indent=2)}")
@@ -463,7 +461,7 @@ class Main(BaseMessagingProvider):
         if approval_fetch_url:
             # Fetch approval requests to get WhatsApp status
             logger.info(f"Fetching approval requests from: {approval_fetch_url}")
-            approval_response = requests.get(approval_fetch_url, headers=headers)
+            approval_response = self.request("GET", approval_fetch_url, headers=headers)
             approval_data = approval_response.json() if approval_response.content else {}
             logger.info(f"Approval requests response: {json.dumps(approval_data, indent=2)}")
 
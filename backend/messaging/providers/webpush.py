@@ -6,6 +6,7 @@ from django.conf import settings
 from pywebpush import WebPushException, webpush
 
 from . import BaseMessagingProvider
+from ._transport import run_concurrently
 
 if TYPE_CHECKING:
     from ..models import Message
@@ -24,11 +25,11 @@ class Main(BaseMessagingProvider):
         if not message.sent_to:
             raise Exception("Web Push requires a sent_to user")
 
-        subscriptions = WebPushSubscription.objects.filter(
-            user=message.sent_to, is_active=True
+        subscriptions = list(
+            WebPushSubscription.objects.filter(user=message.sent_to, is_active=True)
         )
 
-        if not subscriptions.exists():
+        if not subscriptions:
             raise Exception(
                 f"No active Web Push subscriptions for user {message.sent_to.pk}"
             )
@@ -49,28 +50,43 @@ class Main(BaseMessagingProvider):
         vapid_private_key = settings.WEBPUSH_VAPID_PRIVATE_KEY
         vapid_claims = {"sub": settings.WEBPUSH_VAPID_CLAIMS_EMAIL}
 
-        sent_count = 0
-        errors = []
-
-        for subscription in subscriptions:
+        def push(subscription):
+            # Each push service call is independent: the subscriptions of
+            # the user are pushed to concurrently.
             try:
                 webpush(
                     subscription_info=subscription.subscription_info,
                     data=payload,
                     vapid_private_key=vapid_private_key,
-                    vapid_claims=vapid_claims,
+                    # webpush() stores the push service's "aud" in the
+                    # claims: each subscription needs its own copy.
+                    vapid_claims=dict(vapid_claims),
+                    timeout=settings.MESSAGING_HTTP_TIMEOUT,
+                    requests_session=self.http,
                 )
-                sent_count += 1
             except WebPushException as e:
-                logger.warning(
-                    f"WebPush failed for subscription {subscription.pk}: {e}"
-                )
-                if e.response and e.response.status_code in (404, 410):
-                    subscription.is_active = False
-                    subscription.save(update_fields=["is_active"])
-                errors.append(str(e))
+                return e
+            return None
+
+        errors = []
+        expired = []
+        results = run_concurrently(
+            push, subscriptions, self.max_workers or settings.MESSAGING_SEND_CONCURRENCY
+        )
+        for subscription, error in zip(subscriptions, results):
+            if error is None:
+                continue
+            logger.warning(
+                f"WebPush failed for subscription {subscription.pk}: {error}"
+            )
+            if error.response is not None and error.response.status_code in (404, 410):
+                expired.append(subscription.pk)
+            errors.append(str(error))
+
+        if expired:
+            WebPushSubscription.objects.filter(pk__in=expired).update(is_active=False)
 
-        if sent_count == 0:
+        if len(errors) == len(subscriptions):
             raise Exception(
                 f"All Web Push subscriptions failed: {'; '.join(errors)}"
             )
@@ -0,0 +1,111 @@
+"""Shared Jinja environments and compiled template cache for notifications.
+
+Building a ``jinja2.Environment`` and compiling a template source is far more
+expensive than rendering it, and notification runs render the same handful of
+templates thousands of times. Two environments (plain text and HTML
+autoescape) are built once per process, and compiled templates are kept in a
+bounded LRU cache.
+
+The gettext callables and the ``localtime`` filter resolve the active language
+and timezone when the template renders, so the environments are safe to share
+between messages rendered under different ``translation.override`` /
+``timezone.override`` blocks.
+
+Entries are keyed on a hash of the template source, so an edited template is
+never served stale even by a process that did not see the edit; the
+``Template`` post_save signal still drops the entries of the edited event type
+so they do not linger until evicted.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import jinja2
+from django.template.defaultfilters import register
+from django.utils import timezone, translation
+
+COMPILED_TEMPLATE_CACHE_SIZE = 512
+
+_environments = {}
+_environments_lock = threading.Lock()
+
+
+def get_environment(autoescape: bool) -> jinja2.Environment:
+    """Process-wide environment with the i18n extension and Django filters."""
+    env = _environments.get(autoescape)
+    if env is None:
+        with _environments_lock:
+            env = _environments.get(autoescape)
+            if env is None:
+                env = jinja2.Environment(
+                    extensions=["jinja2.ext.i18n"], autoescape=autoescape
+                )
+                env.install_gettext_callables(
+                    translation.gettext,
+                    translation.ngettext,
+                    newstyle=True,
+                )
+                env.filters["localtime"] = timezone.localtime
+                env.filters.update(register.filters)
+                _environments[autoescape] = env
+    return env
+
+
+class CompiledTemplateCache:
+    """LRU cache of compiled templates.
+
+    Keyed on (event_type, communication_method, field, autoescape, source
+    hash); the first three only scope the entries so they can be invalidated
+    per event type.
+    """
+
+    def __init__(self, maxsize=COMPILED_TEMPLATE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        source,
+        autoescape=False,
+        event_type=None,
+        communication_method=None,
+        field=None,
+    ) -> jinja2.Template:
+        source = str(source)
+        digest = hashlib.sha256(source.encode()).hexdigest()
+        key = (event_type, communication_method, field, autoescape, digest)
+
+        with self._lock:
+            template = self._entries.get(key)
+            if template is not None:
+                self._entries.move_to_end(key)
+                return template
+
+        # Compile outside the lock: two threads may compile the same source
+        # concurrently, which only costs a redundant compilation.
+        template = get_environment(autoescape).from_string(source)
+
+        with self._lock:
+            self._entries[key] = template
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return template
+
+    def invalidate(self, event_type):
+        """Drop every entry compiled for ``event_type``."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == event_type]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+compiled_templates = CompiledTemplateCache()
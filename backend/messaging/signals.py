@@ -2,9 +2,12 @@ from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from core.channel_groups import user_group
 from django.db import transaction
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from users.models import Organisation
+
+from . import branding
 from .models import (
     Message,
     MessageStatus,
@@ -12,9 +15,26 @@ from .models import (
     TemplateValidation,
     TemplateValidationStatus,
 )
+from .rendering import compiled_templates
 from .tasks import send_message
 
 
+def notification_event(instance: Message):
+    """WebSocket event announcing a new notification to its recipient."""
+    return {
+        "type": "notification",
+        "id": instance.id,
+        "render_content_html": str(instance.render_content_html or ""),
+        "render_subject": str(instance.render_subject or ""),
+        "access_link": str(instance.access_link or ""),
+        "action_label": str(instance.action_label or ""),
+        "action": str(instance.action_label or ""),
+        "created_at": instance.created_at.isoformat()
+        if instance.created_at
+        else None,
+    }
+
+
 @receiver(post_save, sender=Message)
 def notify_message_recipient(sender, instance: Message, created, **kwargs):
     """
@@ -23,25 +43,19 @@ def notify_message_recipient(sender, instance: Message, created, **kwargs):
     if created and instance.sent_to and instance.in_notification:
         channel_layer = get_channel_layer()
         async_to_sync(channel_layer.group_send)(
-            user_group(instance.sent_to.id),
-            {
-                "type": "notification",
-                "id": instance.id,
-                "render_content_html": str(instance.render_content_html or ""),
-                "render_subject": str(instance.render_subject or ""),
-                "access_link": str(instance.access_link or ""),
-                "action_label": str(instance.action_label or ""),
-                "action": str(instance.action_label or ""),
-                "created_at": instance.created_at.isoformat()
-                if instance.created_at
-                else None,
-            },
+            user_group(instance.sent_to.id), notification_event(instance)
         )
 
     if created and instance.sent_to:
         transaction.on_commit(lambda: send_message.delay(instance.pk))
 
 
+@receiver(post_save, sender=Template)
+def invalidate_compiled_templates(sender, instance: Template, **kwargs):
+    """Drop the compiled templates of the edited event type."""
+    compiled_templates.invalidate(instance.event_type)
+
+
 @receiver(post_save, sender=Template)
 def mark_validations_outdated(sender, instance: Template, **kwargs):
     """Mark related TemplateValidation entries as outdated when template content changes."""
@@ -56,3 +70,10 @@ def mark_validations_outdated(sender, instance: Template, **kwargs):
         if validation.is_outdated:
             validation.status = TemplateValidationStatus.outdated
             validation.save(update_fields=["status"])
+
+
+@receiver(post_save, sender=Organisation)
+@receiver(post_delete, sender=Organisation)
+def invalidate_branding(sender, instance: Organisation, **kwargs):
+    """Reload the cached main organisation and logo once it may have changed."""
+    branding.invalidate()
@@ -1,11 +1,14 @@
 import io
 import logging
-import traceback
+from collections import defaultdict
 from datetime import timedelta
 from core.celery import app
+from core.channel_groups import user_group
+from core.fanout import publish_each
 
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 from django.utils import timezone
 from modeltranslation.utils import get_translation_fields
 
@@ -23,6 +26,74 @@ from .models import (
 logger = logging.getLogger(__name__)
 
 
+# Number of messages handled by one send_messages task.
+DISPATCH_BATCH_SIZE = 100
+
+
+def _active_providers(communication_methods):
+    """Active providers per communication method, ordered by priority."""
+    messaging_providers = defaultdict(list)
+    for messaging_provider in MessagingProvider.objects.filter(
+        communication_method__in=set(communication_methods), is_active=True
+    ).order_by("priority", "id"):
+        messaging_providers[messaging_provider.communication_method].append(
+            messaging_provider
+        )
+    return messaging_providers
+
+
+def _by_method(messages):
+    by_method = defaultdict(list)
+    for message in messages:
+        by_method[message.validated_communication_method].append(message)
+    return by_method
+
+
+def _send_with_providers(messages, messaging_providers):
+    """Try each provider in order and record the outcome on ``messages``.
+
+    Each provider sends the messages still pending concurrently, over its
+    pooled connections (``send_many``); the ones it failed to send are
+    handed to the next provider. Only sets fields on the instances: the
+    caller persists them.
+    """
+    if not messaging_providers:
+        for message in messages:
+            message.status = MessageStatus.failed
+            message.error_message = f"Unable to find active communication for {message.validated_communication_method}"
+        return
+
+    pending = list(messages)
+    logger.info(
+        f"Found {len(messaging_providers)} providers for {len(pending)} message(s)"
+    )
+
+    # Try each provider in order
+    for messaging_provider in messaging_providers:
+        if not pending:
+            return
+        logger.info(
+            f"Trying provider: {messaging_provider.name} (priority: {messaging_provider.priority})"
+        )
+
+        errors = messaging_provider.instance.send_many(pending)
+        failed = []
+        for message, error in zip(pending, errors):
+            if error is None:
+                message.status = MessageStatus.sent
+                continue
+            error_msg = f"Exception with provider {messaging_provider.name}: {str(error)}\n"
+            message.task_logs += error_msg
+            logger.error(error_msg, exc_info=error)
+            failed.append(message)
+        pending = failed
+
+    # All providers failed
+    for message in pending:
+        message.task_logs += f"All providers failed for communication method: {message.communication_method}\n"
+        message.status = MessageStatus.failed
+
+
 @app.task(bind=True)
 def send_message(self, message_id):
     """
@@ -38,46 +109,92 @@ def send_message(self, message_id):
     message.error_message = None
     message.save()
 
-    # Get all active providers for this communication method, ordered by priority
-    messaging_providers = MessagingProvider.objects.filter(
-        communication_method=message.validated_communication_method, is_active=True
-    ).order_by("priority", "id")
+    method = message.validated_communication_method
+    _send_with_providers([message], _active_providers([method])[method])
+    message.save()
 
-    if not messaging_providers.exists():
-        message.status = MessageStatus.failed
-        message.error_message = f"Unable to find active communication for {message.validated_communication_method}"
-        message.save()
-        return
 
-    logger.info(
-        f"Found {messaging_providers.count()} providers for {message.validated_communication_method}"
+@app.task(bind=True)
+def send_messages(self, message_ids):
+    """
+    Batched counterpart of send_message.
+
+    Messages are loaded and marked as sending in one query each, providers are
+    resolved once for the whole batch, and the outcome of every message is
+    written back with a single bulk_update.
+
+    Args:
+        message_ids (list[int]): IDs of the messages to send
+    """
+    Message.objects.filter(id__in=message_ids).update(
+        status=MessageStatus.sending,
+        celery_task_id=self.request.id or "",
+        error_message=None,
+    )
+    messages = list(
+        Message.objects.filter(id__in=message_ids).select_related("sent_to")
+    )
+    messaging_providers = _active_providers(
+        message.validated_communication_method for message in messages
     )
 
-    # Try each provider in order
-    for messaging_provider in messaging_providers:
-        logger.info(
-            f"Trying provider: {messaging_provider.name} (priority: {messaging_provider.priority})"
-        )
+    for method, method_messages in _by_method(messages).items():
+        _send_with_providers(method_messages, messaging_providers[method])
+    now = timezone.now()
+    for message in messages:
+        # bulk_update skips auto_now fields
+        message.updated_at = now
 
-        try:
-            # Get the provider class
-            messaging_provider.instance.send(message)
-            message.status = MessageStatus.sent
-            message.save()
-            return
+    Message.objects.bulk_update(
+        messages, ["status", "error_message", "task_logs", "updated_at"]
+    )
 
-        except Exception as e:
-            error_msg = f"Exception with provider {messaging_provider.name}: {str(e)}\n"
-            message.task_logs += error_msg
-            message.save()
-            logger.error(error_msg)
-            logger.error(traceback.format_exc())
-            continue
 
-    # All providers failed
-    message.task_logs += f"All providers failed for communication method: {message.communication_method}\n"
-    message.status = MessageStatus.failed
-    message.save()
+def create_messages(messages):
+    """Bulk counterpart of ``Message.objects.create`` for notification runs.
+
+    Inserts every message with one query, then replays what the post_save
+    signal does for a single message: the WebSocket notification to each
+    recipient, and the dispatch, enqueued as one send_messages task per
+    communication method and batch instead of one send_message per message.
+    Dispatch happens once the surrounding transaction commits.
+    """
+    from .signals import notification_event
+
+    messages = Message.objects.bulk_create(messages)
+
+    publish_each(
+        (user_group(message.sent_to_id), notification_event(message))
+        for message in messages
+        if message.sent_to_id and message.in_notification
+    )
+
+    ids_by_method = defaultdict(list)
+    for message in messages:
+        if message.sent_to_id:
+            ids_by_method[message.validated_communication_method].append(message.pk)
+
+    for message_ids in ids_by_method.values():
+        for i in range(0, len(message_ids), DISPATCH_BATCH_SIZE):
+            batch = message_ids[i : i + DISPATCH_BATCH_SIZE]
+            transaction.on_commit(lambda batch=batch: send_messages.delay(batch))
+
+    return messages
+
+
+def send_ephemeral_messages(messages):
+    """Send unsaved messages (e.g. EphemeralMessage) right away.
+
+    Same provider fallback as send_messages, with providers resolved once for
+    the whole batch; nothing is persisted. Returns the messages that could not
+    be delivered.
+    """
+    messaging_providers = _active_providers(
+        message.validated_communication_method for message in messages
+    )
+    for method, method_messages in _by_method(messages).items():
+        _send_with_providers(method_messages, messaging_providers[method])
+    return [message for message in messages if message.status == MessageStatus.failed]
 
 
 # class TaskLogCapture:
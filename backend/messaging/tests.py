@@ -1,11 +1,31 @@
+import hashlib
+import smtplib
 from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import connections
+from django.test import SimpleTestCase, override_settings
 from django_tenants.test.cases import TenantTestCase
 from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 
 from users.models import User, Organisation
 from consultations.models import Consultation, Appointment, Participant
-from messaging.models import Message, CommunicationMethod
+from messaging.models import (
+    CommunicationMethod,
+    Message,
+    MessageStatus,
+    MessagingProvider,
+)
+from messaging.branding import Branding, _bump_version, get_branding
+from messaging.providers._transport import run_concurrently
+from messaging.providers.email import SharedConnection
+from messaging.rendering import CompiledTemplateCache
+from messaging.tasks import create_messages, send_messages
+
+
+def _digest(source):
+    return hashlib.sha256(source.encode()).hexdigest()
 
 
 class MessageICSAttachmentTestCase(TenantTestCase):
@@ -136,3 +156,230 @@ class MessageICSAttachmentTestCase(TenantTestCase):
 
         ics_data = message.ics_attachment
         self.assertIsNone(ics_data)
+
+
+class BulkMessageDispatchTestCase(TenantTestCase):
+    """Bulk creation and batched dispatch of notification messages."""
+
+    def setUp(self):
+        self.patient = User.objects.create_user(
+            email="patient@example.com",
+            communication_method=CommunicationMethod.email,
+        )
+        MessagingProvider.objects.create(name="email", from_email="noreply@example.com")
+
+    def _messages(self, count):
+        return create_messages(
+            [
+                Message(
+                    subject=f"Subject {i}",
+                    content=f"Content {i}",
+                    communication_method=CommunicationMethod.email,
+                    sent_to=self.patient,
+                    in_notification=False,
+                )
+                for i in range(count)
+            ]
+        )
+
+    def test_create_messages_enqueues_one_batch(self):
+        with patch("messaging.tasks.send_messages.delay") as mock_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                messages = self._messages(3)
+
+        self.assertEqual(Message.objects.filter(sent_to=self.patient).count(), 3)
+        mock_delay.assert_called_once_with([m.pk for m in messages])
+
+    def test_send_messages_updates_every_status(self):
+        messages = self._messages(2)
+        with patch("messaging.providers.email.Main.send") as mock_send:
+            send_messages.run([m.pk for m in messages])
+
+        self.assertEqual(mock_send.call_count, 2)
+        self.assertEqual(
+            set(
+                Message.objects.filter(sent_to=self.patient).values_list(
+                    "status", flat=True
+                )
+            ),
+            {MessageStatus.sent},
+        )
+
+    def test_send_messages_without_provider_fails(self):
+        MessagingProvider.objects.all().delete()
+        messages = self._messages(1)
+        send_messages.run([messages[0].pk])
+
+        messages[0].refresh_from_db()
+        self.assertEqual(messages[0].status, MessageStatus.failed)
+
+    def test_failed_messages_fall_back_to_next_provider(self):
+        MessagingProvider.objects.create(
+            name="email", from_email="backup@example.com", priority=1
+        )
+        messages = self._messages(2)
+
+        def send(provider, message):
+            if (
+                provider.messaging_provider.from_email == "noreply@example.com"
+                and message.subject == "Subject 0"
+            ):
+                raise Exception("mailbox unavailable")
+
+        with patch(
+            "messaging.providers.email.Main.send", autospec=True, side_effect=send
+        ) as mock_send:
+            send_messages.run([m.pk for m in messages])
+
+        self.assertEqual(mock_send.call_count, 3)
+        first = Message.objects.get(subject="Subject 0")
+        self.assertEqual(first.status, MessageStatus.sent)
+        self.assertIn("mailbox unavailable", first.task_logs)
+        self.assertEqual(
+            Message.objects.get(subject="Subject 1").status, MessageStatus.sent
+        )
+
+
+class BrandingCacheTestCase(TenantTestCase):
+    def setUp(self):
+        self.organisation = Organisation.objects.create(
+            name="Clinic", is_main=True, logo_color="organisations/logo.png"
+        )
+
+    def test_snapshot_is_reused_until_organisation_is_saved(self):
+        self.assertEqual(get_branding().organisation.name, "Clinic")
+        with self.assertNumQueries(0):
+            self.assertEqual(get_branding().organisation.name, "Clinic")
+
+        self.organisation.name = "Renamed"
+        self.organisation.save()
+        self.assertEqual(get_branding().organisation.name, "Renamed")
+
+    def test_logo_is_read_and_encoded_once(self):
+        with patch.object(
+            Branding, "_read_logo", autospec=True, return_value=(b"\x89PNG", "image/png")
+        ) as read_logo:
+            first = get_branding().logo_part()
+            second = get_branding().logo_part()
+
+        read_logo.assert_called_once()
+        self.assertIsNot(first, second)
+        self.assertEqual(first.get_payload(), second.get_payload())
+        self.assertEqual(first["Content-ID"], "<logo>")
+
+    def test_new_logo_is_loaded(self):
+        with patch.object(
+            Branding, "_read_logo", autospec=True, return_value=(b"\x89PNG", "image/png")
+        ) as read_logo:
+            get_branding().logo_data()
+            self.organisation.logo_color = "organisations/other.png"
+            self.organisation.save()
+            get_branding().logo_data()
+        self.assertEqual(read_logo.call_count, 2)
+
+    def test_logo_uploaded_under_same_name_is_loaded(self):
+        with patch.object(
+            Branding, "_read_logo", autospec=True, return_value=(b"\x89PNG", "image/png")
+        ) as read_logo:
+            get_branding().logo_data()
+            # Saved with the same file name, as storages overwriting files do.
+            self.organisation.save()
+            get_branding().logo_data()
+            # Saved by another process: only the version moves.
+            _bump_version()
+            get_branding().logo_data()
+        self.assertEqual(read_logo.call_count, 3)
+
+    def test_failed_logo_is_not_cached(self):
+        with patch.object(
+            Branding, "_read_logo", autospec=True, side_effect=[None, (b"\x89PNG", "image/png")]
+        ):
+            self.assertIsNone(get_branding().logo_data())
+            self.assertEqual(get_branding().logo_data(), (b"\x89PNG", "image/png"))
+
+
+class ProviderTransportTestCase(SimpleTestCase):
+    def test_run_concurrently_keeps_order(self):
+        self.assertEqual(
+            run_concurrently(lambda n: n * n, range(20), max_workers=4),
+            [n * n for n in range(20)],
+        )
+
+    def test_run_concurrently_closes_connections_once_per_thread(self):
+        wrapper = type(connections["default"])
+        with patch.object(wrapper, "close", autospec=True) as close:
+            run_concurrently(
+                lambda n: connections["default"].alias, range(20), max_workers=4
+            )
+        self.assertTrue(1 <= close.call_count <= 4)
+
+    def test_provider_requests_use_pooled_session_with_timeout(self):
+        provider = MessagingProvider(name="twilio_sms").instance
+        self.assertIs(provider.http, MessagingProvider(name="twilio_sms").instance.http)
+        with patch.object(provider.http, "request") as mock_request:
+            provider.request("GET", "https://api.example.com")
+        self.assertIsNotNone(mock_request.call_args.kwargs["timeout"])
+
+
+@override_settings(EMAIL_CONNECTION_IDLE_TIMEOUT=60, EMAIL_CONNECTION_MAX_MESSAGES=3)
+class SharedEmailConnectionTestCase(SimpleTestCase):
+    def setUp(self):
+        patcher = patch("messaging.providers.email.get_connection")
+        self.get_connection = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.get_connection.return_value.send_messages.return_value = 1
+        self.shared = SharedConnection()
+
+    def test_emails_share_one_connection(self):
+        for _ in range(3):
+            self.assertEqual(self.shared.send("email"), 1)
+        self.assertEqual(self.get_connection.call_count, 1)
+        self.get_connection.return_value.open.assert_called_once_with()
+
+    def test_connection_is_renewed_after_max_messages(self):
+        for _ in range(4):
+            self.shared.send("email")
+        self.assertEqual(self.get_connection.call_count, 2)
+        self.get_connection.return_value.close.assert_called_once_with()
+
+    def test_dropped_connection_is_reopened_once(self):
+        backend = self.get_connection.return_value
+        backend.send_messages.side_effect = [smtplib.SMTPServerDisconnected(), 1]
+        self.assertEqual(self.shared.send("email"), 1)
+        self.assertEqual(self.get_connection.call_count, 2)
+
+        backend.send_messages.side_effect = smtplib.SMTPServerDisconnected()
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            self.shared.send("email")
+
+
+class CompiledTemplateCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        self.cache = CompiledTemplateCache(maxsize=2)
+
+    def test_same_source_is_compiled_once(self):
+        first = self.cache.get("Hello {{ name }}", event_type="reminder")
+        second = self.cache.get("Hello {{ name }}", event_type="reminder")
+        self.assertIs(first, second)
+        self.assertEqual(first.render({"name": "O'Brien"}), "Hello O'Brien")
+
+    def test_autoescape_is_part_of_the_key(self):
+        text = self.cache.get("{{ name }}")
+        html = self.cache.get("{{ name }}", autoescape=True)
+        self.assertEqual(text.render({"name": "<b>"}), "<b>")
+        self.assertEqual(html.render({"name": "<b>"}), "&lt;b&gt;")
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.get("a")
+        self.cache.get("b")
+        self.cache.get("a")
+        self.cache.get("c")
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNotNone(self.cache._entries.get((None, None, None, False, _digest("a"))))
+        self.assertIsNone(self.cache._entries.get((None, None, None, False, _digest("b"))))
+
+    def test_invalidate_drops_event_type(self):
+        self.cache.get("a", event_type="reminder")
+        self.cache.get("b", event_type="appointment_cancelled")
+        self.cache.invalidate("reminder")
+        self.assertEqual(len(self.cache), 1)
@@ -33,8 +33,8 @@ from core.encryption import (
     encrypt_private_key_with_passphrase,
     fingerprint_public_key,
     generate_passphrase,
-    generate_rsa_keypair,
 )
+from encryption_admin.keypool import take_rsa_keypair
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -160,7 +160,7 @@ class RegenerateUserKeyView(APIView):
 
 
 def _regenerate_keypair(user, mark_lost: bool):
-    private_pem, public_pem = generate_rsa_keypair()
+    private_pem, public_pem = take_rsa_keypair()
     passphrase = generate_passphrase()
     public_pem_str = public_pem.decode("utf-8")
 
@@ -0,0 +1,75 @@
+"""Map helpers over the indexed latitude/longitude columns.
+
+Bounding boxes are filtered in SQL and, when zoomed out, markers are
+aggregated per grid cell in SQL too, so a map pan never loads every
+practitioner of an imported directory into Python.
+"""
+
+from django.db.models import Avg, Count, F, FloatField, Q
+from django.db.models.functions import Floor
+
+# Grid cells per 256px map tile edge: at zoom z a tile spans 360 / 2**z
+# degrees of longitude, so a cell is about 64px wide whatever the zoom.
+CLUSTER_CELLS_PER_TILE = 4
+MAX_ZOOM = 22
+
+
+def parse_bounds(query_params):
+    """Return ``(lat_min, lat_max, lng_min, lng_max)`` or None."""
+    values = [query_params.get(key) for key in ("lat_min", "lat_max", "lng_min", "lng_max")]
+    if any(value is None for value in values):
+        return None
+    try:
+        return tuple(float(value) for value in values)
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_zoom(value):
+    try:
+        zoom = int(value)
+    except (ValueError, TypeError):
+        return None
+    return min(max(zoom, 0), MAX_ZOOM)
+
+
+def bounds_q(bounds, lat_field="latitude", lng_field="longitude"):
+    """``Q`` keeping rows whose coordinates fall in ``bounds``."""
+    lat_min, lat_max, lng_min, lng_max = bounds
+    return Q(
+        **{
+            f"{lat_field}__gte": lat_min,
+            f"{lat_field}__lte": lat_max,
+            f"{lng_field}__gte": lng_min,
+            f"{lng_field}__lte": lng_max,
+        }
+    )
+
+
+def cell_size(zoom):
+    """Edge of a clustering grid cell, in degrees, at ``zoom``."""
+    return 360 / (2**zoom) / CLUSTER_CELLS_PER_TILE
+
+
+def cluster(queryset, zoom, lat_field="latitude", lng_field="longitude"):
+    """Aggregate ``queryset`` per grid cell.
+
+    Returns ``[{"lat", "lng", "count"}]``; the position of a cluster is the
+    mean position of its members rather than the cell centre, so a lone
+    marker stays where it is.
+    """
+    size = cell_size(zoom)
+    cells = (
+        queryset.filter(**{f"{lat_field}__isnull": False, f"{lng_field}__isnull": False})
+        .annotate(
+            cell_y=Floor(F(lat_field) / size, output_field=FloatField()),
+            cell_x=Floor(F(lng_field) / size, output_field=FloatField()),
+        )
+        .order_by()
+        .values("cell_y", "cell_x")
+        .annotate(lat=Avg(lat_field), lng=Avg(lng_field), count=Count("pk"))
+    )
+    return [
+        {"lat": cell["lat"], "lng": cell["lng"], "count": cell["count"]}
+        for cell in cells
+    ]
@@ -1,14 +1,20 @@
 import csv
+import functools
 import logging
+import multiprocessing
 import os
 import re
 import tempfile
 import zipfile
+from collections import deque
 
 import requests as http_requests
+from constance import config
+from django.contrib.auth.hashers import make_password
 from django.contrib.contenttypes.models import ContentType
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
+from django.db import connection, connections, transaction
+from django.utils import timezone
 
 from consultations.models import CustomField, CustomFieldValue
 from users.models import Organisation, Speciality, User
@@ -54,6 +60,132 @@ ORGANISATION_CUSTOM_FIELDS = [
     ("FINESS", "short_text"),
 ]
 
+ORGANISATION_UPDATE_FIELDS = ["street", "city", "postal_code", "country", "phone"]
+USER_UPDATE_FIELDS = [
+    "first_name",
+    "last_name",
+    "job_title",
+    "is_practitioner",
+    "imported",
+    "main_organisation",
+    "updated_at",
+]
+
+# (record key, model, field) checked against the column length before writing.
+LENGTH_CHECKS = [
+    ("first_name", User, "first_name"),
+    ("last_name", User, "last_name"),
+    ("job_title", User, "job_title"),
+    ("email", User, "email"),
+    ("raison_sociale", Organisation, "name"),
+    ("street", Organisation, "street"),
+    ("city", Organisation, "city"),
+    ("postal_code", Organisation, "postal_code"),
+    ("country", Organisation, "country"),
+    ("phone", Organisation, "phone"),
+    ("speciality", Speciality, "name"),
+]
+
+
+# ── Parsing (runs in the --workers processes) ───────────────────────────
+
+
+@functools.cache
+def _max_lengths():
+    return [
+        (key, model._meta.get_field(field).max_length)
+        for key, model, field in LENGTH_CHECKS
+    ]
+
+
+def build_street(row):
+    parts = []
+    numero = row[COL_NUMERO_VOIE].strip()
+    type_voie = row[COL_TYPE_VOIE].strip()
+    libelle = row[COL_LIBELLE_VOIE].strip()
+    if numero:
+        parts.append(numero)
+    if type_voie:
+        parts.append(type_voie)
+    if libelle:
+        parts.append(libelle)
+    return " ".join(parts)
+
+
+def clean_phone(phone):
+    if not phone:
+        return None
+    cleaned = re.sub(r"[^\d+]", "", phone)
+    return cleaned or None
+
+
+def clean_city(city):
+    """Remove postal code prefix from city field (e.g. '97130 CAPESTERRE BELLE EAU' -> 'Capesterre Belle Eau')."""
+    city = re.sub(r"^\d{5}\s*", "", city)
+    return city.title() if city else None
+
+
+def parse_row(row):
+    """Normalised record of an RPPS row, or raise ValueError with the reason."""
+    if len(row) < COL_EMAIL + 1:
+        raise ValueError(f"expected at least {COL_EMAIL + 1} columns, got {len(row)}")
+    rpps = row[COL_RPPS].strip()
+    if not rpps:
+        raise ValueError("missing RPPS identifier")
+
+    job_title = row[COL_PROFESSION].strip()
+    savoir_faire = row[COL_SAVOIR_FAIRE].strip()
+    record = {
+        "rpps": rpps,
+        "last_name": row[COL_NOM].strip().title(),
+        "first_name": row[COL_PRENOM].strip().title(),
+        "job_title": job_title,
+        "email": row[COL_EMAIL].strip().lower() or None,
+        "phone": clean_phone(row[COL_TELEPHONE].strip()),
+        "street": build_street(row),
+        "postal_code": row[COL_CODE_POSTAL].strip(),
+        "city": clean_city(row[COL_COMMUNE].strip()),
+        "country": row[COL_PAYS].strip(),
+        "id_structure": row[COL_ID_STRUCTURE].strip(),
+        "raison_sociale": row[COL_RAISON_SOCIALE].strip(),
+        # Speciality: savoir-faire if available, otherwise the profession
+        "speciality": savoir_faire or job_title,
+        "mode_exercice": row[COL_MODE_EXERCICE].strip(),
+        "siret": row[COL_SIRET].strip(),
+        "finess": row[COL_FINESS].strip(),
+    }
+    for key, max_length in _max_lengths():
+        if record[key] and len(record[key]) > max_length:
+            raise ValueError(f"{key} longer than {max_length} characters")
+    return record
+
+
+def parse_chunk(job):
+    """Parse the lines of a chunk of the file.
+
+    Returns ``(records, rejects)``: records carry their line number and raw
+    row, rejects are ``(line number, reason, raw row)``.
+    """
+    first_line, lines, profession_filter = job
+    records, rejects = [], []
+    reader = csv.reader(lines, delimiter="|")
+    for line_num, row in enumerate(reader, start=first_line):
+        if (
+            profession_filter
+            and len(row) > COL_CODE_PROFESSION
+            and row[COL_CODE_PROFESSION].strip() != profession_filter
+        ):
+            continue
+        raw = "|".join(row)
+        try:
+            record = parse_row(row)
+        except ValueError as exc:
+            rejects.append((line_num, str(exc), raw))
+            continue
+        record["line"], record["raw"] = line_num, raw
+        records.append(record)
+    return records, rejects
+
 
 class Command(BaseCommand):
     help = "Import practitioners from the RPPS dataset (data.gouv.fr)"
@@ -72,6 +204,17 @@ class Command(BaseCommand):
         parser.add_argument(
             "--batch-size", type=int, default=500, help="Transaction batch size"
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes parsing the file in parallel",
+        )
+        parser.add_argument(
+            "--reject-file",
+            help="CSV file receiving the rows that could not be imported "
+            "(default: next to the imported file)",
+        )
         parser.add_argument(
             "--dry-run",
             action="store_true",
@@ -178,105 +321,55 @@ class Command(BaseCommand):
     # ── Import logic ────────────────────────────────────────────────────
 
     def _import_file(self, file_path, custom_fields, options):
-        profession_filter = options.get("profession_code")
         batch_size = options["batch_size"]
+        workers = max(options["workers"], 1)
         dry_run = options["dry_run"]
 
-        # Pre-load existing RPPS -> user_pk mapping
-        rpps_field = custom_fields.get("RPPS")
-        existing_rpps = {}
-        if rpps_field:
-            ct = ContentType.objects.get_for_model(User)
-            existing_rpps = dict(
-                CustomFieldValue.objects.filter(
-                    custom_field=rpps_field, content_type=ct
-                ).values_list("value", "object_id")
-            )
-
-        # Pre-load existing structure ID -> organisation_pk mapping
-        id_struct_field = custom_fields.get("Identifiant structure")
-        existing_orgs = {}
-        if id_struct_field:
-            org_ct = ContentType.objects.get_for_model(Organisation)
-            existing_orgs = dict(
-                CustomFieldValue.objects.filter(
-                    custom_field=id_struct_field, content_type=org_ct
-                ).values_list("value", "object_id")
-            )
+        self._custom_fields = custom_fields
+        self._user_ct = ContentType.objects.get_for_model(User)
+        self._org_ct = ContentType.objects.get_for_model(Organisation)
+        self._load_existing(custom_fields)
 
-        # Pre-load specialities
-        speciality_cache = {s.name: s for s in Speciality.objects.all()}
-
-        # Pre-load existing emails for deduplication. Compared lowercased: the
-        # database uniqueness is case-sensitive but every lookup in the app is
-        # not, so "John@x.org" next to "john@x.org" would create an account
-        # nobody can log into.
-        self._existing_emails = set(
-            User.objects.filter(email__isnull=False)
-            .values_list("email", flat=True)
+        self._reject_path = options.get("reject_file") or (
+            f"{os.path.splitext(file_path)[0]}.rejects.csv"
         )
-        self._existing_emails = {email.lower() for email in self._existing_emails}
+        self._reject_file = self._reject_writer = None
 
         stats = {"created": 0, "updated": 0, "skipped": 0, "errors": 0}
+        self._stats = stats
         seen_rpps = set()
-        batch = []
 
         self.stdout.write(f"Parsing {file_path}...")
 
         # Detect encoding
         encoding = self._detect_encoding(file_path)
 
-        with open(file_path, "r", encoding=encoding, errors="replace") as f:
-            reader = csv.reader(f, delimiter="|")
-            header = next(reader, None)
-            if not header:
-                raise CommandError("Empty file")
-
-            for line_num, row in enumerate(reader, start=2):
-                if len(row) < COL_EMAIL + 1:
-                    continue
-
-                rpps = row[COL_RPPS].strip()
-                if not rpps:
-                    continue
-
-                if profession_filter and row[COL_CODE_PROFESSION].strip() != profession_filter:
-                    continue
-
-                if rpps in seen_rpps:
-                    stats["skipped"] += 1
-                    continue
-                seen_rpps.add(rpps)
-
-                batch.append(row)
-
-                if len(batch) >= batch_size:
-                    if not dry_run:
-                        self._process_batch(
-                            batch,
-                            custom_fields,
-                            existing_rpps,
-                            existing_orgs,
-                            speciality_cache,
-                            stats,
-                        )
-                    else:
-                        self._dry_run_batch(batch, existing_rpps, stats)
-                    batch = []
+        try:
+            with open(file_path, "r", encoding=encoding, errors="replace") as f:
+                if not f.readline():
+                    raise CommandError("Empty file")
+                jobs = self._read_chunks(f, batch_size, options.get("profession_code"))
+                for records, rejects in self._parse(jobs, workers):
+                    for line_num, reason, raw in rejects:
+                        self._reject(line_num, reason, raw)
 
-            # Process remaining
-            if batch:
-                if not dry_run:
-                    self._process_batch(
-                        batch,
-                        custom_fields,
-                        existing_rpps,
-                        existing_orgs,
-                        speciality_cache,
-                        stats,
-                    )
-                else:
-                    self._dry_run_batch(batch, existing_rpps, stats)
+                    batch = []
+                    for record in records:
+                        if record["rpps"] in seen_rpps:
+                            stats["skipped"] += 1
+                            continue
+                        seen_rpps.add(record["rpps"])
+                        batch.append(record)
+
+                    if not batch:
+                        continue
+                    if dry_run:
+                        self._dry_run_batch(batch)
+                    else:
+                        self._write_batch(batch)
+        finally:
+            if self._reject_file:
+                self._reject_file.close()
 
         total = sum(stats.values())
         self.stdout.write(
@@ -288,6 +381,52 @@ class Command(BaseCommand):
                 f"  Errors: {stats['errors']}"
             )
         )
+        if stats["errors"]:
+            self.stdout.write(f"Rejected rows written to {self._reject_path}")
+
+        if not dry_run and stats["created"]:
+            self._provision_encryption()
+
+    def _load_existing(self, custom_fields):
+        """Pre-load the RPPS -> user and structure -> organisation mappings.
+
+        Values left behind by deleted users or organisations are ignored, so
+        those rows are imported again.
+        """
+        self._existing_rpps = {}
+        rpps_field = custom_fields.get("RPPS")
+        if rpps_field:
+            self._existing_rpps = dict(
+                CustomFieldValue.objects.filter(
+                    custom_field=rpps_field,
+                    content_type=self._user_ct,
+                    object_id__in=User.objects.values("pk"),
+                ).values_list("value", "object_id")
+            )
+
+        self._existing_orgs = {}
+        id_struct_field = custom_fields.get("Identifiant structure")
+        if id_struct_field:
+            self._existing_orgs = dict(
+                CustomFieldValue.objects.filter(
+                    custom_field=id_struct_field,
+                    content_type=self._org_ct,
+                    object_id__in=Organisation.objects.values("pk"),
+                ).values_list("value", "object_id")
+            )
+
+        self._specialities = dict(Speciality.objects.values_list("name", "pk"))
+
+        # Pre-load existing emails for deduplication. Compared lowercased: the
+        # database uniqueness is case-sensitive but every lookup in the app is
+        # not, so "John@x.org" next to "john@x.org" would create an account
+        # nobody can log into.
+        self._existing_emails = {
+            email.lower()
+            for email in User.objects.filter(email__isnull=False).values_list(
+                "email", flat=True
+            )
+        }
 
     def _detect_encoding(self, file_path):
         with open(file_path, "rb") as f:
@@ -300,187 +439,251 @@ class Command(BaseCommand):
         except UnicodeDecodeError:
             return "latin-1"
 
-    def _dry_run_batch(self, rows, existing_rpps, stats):
-        for row in rows:
-            rpps = row[COL_RPPS].strip()
-            if rpps in existing_rpps:
-                stats["updated"] += 1
+    def _read_chunks(self, f, size, profession_filter):
+        """Yield ``(first line number, lines, profession filter)`` jobs."""
+        lines, first_line = [], 2
+        for line_num, line in enumerate(f, start=2):
+            if not lines:
+                first_line = line_num
+            lines.append(line)
+            if len(lines) >= size:
+                yield first_line, lines, profession_filter
+                lines = []
+        if lines:
+            yield first_line, lines, profession_filter
+
+    def _parse(self, jobs, workers):
+        """Parse the chunks in order, in ``workers`` processes when above 1.
+
+        At most two chunks per worker are in flight, so a slow database does
+        not make the whole file pile up in memory.
+        """
+        if workers == 1:
+            yield from map(parse_chunk, jobs)
+            return
+
+        # Workers only parse; they must not share the parent's connections.
+        connections.close_all()
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            pending = deque()
+            for job in jobs:
+                pending.append(pool.apply_async(parse_chunk, (job,)))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+
+    def _reject(self, line_num, reason, raw):
+        if self._reject_writer is None:
+            self._reject_file = open(self._reject_path, "w", newline="", encoding="utf-8")
+            self._reject_writer = csv.writer(self._reject_file)
+            self._reject_writer.writerow(["line", "reason", "row"])
+        self._reject_writer.writerow([line_num, reason, raw])
+        self._stats["errors"] += 1
+
+    def _dry_run_batch(self, records):
+        for record in records:
+            if record["rpps"] in self._existing_rpps:
+                self._stats["updated"] += 1
             else:
-                stats["created"] += 1
-
-    def _process_batch(self, rows, custom_fields, existing_rpps, existing_orgs, speciality_cache, stats):
-        user_ct = ContentType.objects.get_for_model(User)
-        org_ct = ContentType.objects.get_for_model(Organisation)
-
-        with transaction.atomic():
-            for row in rows:
-                try:
-                    with transaction.atomic():
-                        self._process_row(
-                            row, custom_fields, existing_rpps, existing_orgs,
-                            speciality_cache, user_ct, org_ct, stats,
-                        )
-                except Exception as exc:
-                    rpps = row[COL_RPPS].strip()
-                    logger.warning(f"Error processing RPPS {rpps}: {exc}")
-                    stats["errors"] += 1
-
-    def _process_row(self, row, custom_fields, existing_rpps, existing_orgs,
-                     speciality_cache, user_ct, org_ct, stats):
-        rpps = row[COL_RPPS].strip()
-        last_name = row[COL_NOM].strip().title()
-        first_name = row[COL_PRENOM].strip().title()
-        job_title = row[COL_PROFESSION].strip()
-        email = row[COL_EMAIL].strip().lower() or None
-        phone = self._clean_phone(row[COL_TELEPHONE].strip())
-        street = self._build_street(row)
-        postal_code = row[COL_CODE_POSTAL].strip()
-        city = self._clean_city(row[COL_COMMUNE].strip())
-        country = row[COL_PAYS].strip() if len(row) > COL_PAYS else None
-        id_structure = row[COL_ID_STRUCTURE].strip() if len(row) > COL_ID_STRUCTURE else None
-        raison_sociale = row[COL_RAISON_SOCIALE].strip() if len(row) > COL_RAISON_SOCIALE else None
-        savoir_faire = row[COL_SAVOIR_FAIRE].strip()
-        mode_exercice = row[COL_MODE_EXERCICE].strip()
-        siret = row[COL_SIRET].strip()
-        finess = row[COL_FINESS].strip()
-
-        # ── Organisation ────────────────────────────────────────────────
-        organisation = None
-        if raison_sociale and id_structure:
-            if id_structure in existing_orgs:
-                organisation = Organisation.objects.filter(pk=existing_orgs[id_structure]).first()
-                if organisation:
-                    Organisation.objects.filter(pk=organisation.pk).update(
-                        street=street or None,
-                        city=city or None,
-                        postal_code=postal_code or None,
-                        country=country or None,
-                        phone=phone or None,
-                    )
+                self._stats["created"] += 1
+
+    def _write_batch(self, records):
+        """Upsert a batch in one transaction.
+
+        When the batch fails, its rows are retried one by one so that only
+        the faulty ones end up in the reject file.
+        """
+        try:
+            with transaction.atomic():
+                result = self._upsert(records)
+        except Exception as exc:
+            if len(records) == 1:
+                record = records[0]
+                logger.warning(f"Error processing RPPS {record['rpps']}: {exc}")
+                self._reject(record["line"], str(exc), record["raw"])
+                return
+            for record in records:
+                self._write_batch([record])
+            return
+
+        # Only remembered once committed.
+        new_orgs, new_users, new_specialities, new_emails = result
+        self._existing_orgs.update(new_orgs)
+        self._existing_rpps.update(new_users)
+        self._specialities.update(new_specialities)
+        self._existing_emails.update(new_emails)
+        self._stats["created"] += len(new_users)
+        self._stats["updated"] += len(records) - len(new_users)
+
+    def _upsert(self, records):
+        # ── Organisations ───────────────────────────────────────────────
+        # The last row of a structure wins, as when rows were applied in order.
+        structures = {
+            record["id_structure"]: record
+            for record in records
+            if record["raison_sociale"] and record["id_structure"]
+        }
+        updated_orgs, created_orgs = [], {}
+        for id_structure, record in structures.items():
+            organisation = Organisation(
+                name=record["raison_sociale"],
+                street=record["street"] or None,
+                city=record["city"] or None,
+                postal_code=record["postal_code"] or None,
+                country=record["country"] or None,
+                phone=record["phone"] or None,
+                imported=True,
+            )
+            if id_structure in self._existing_orgs:
+                organisation.pk = self._existing_orgs[id_structure]
+                updated_orgs.append(organisation)
             else:
-                organisation = Organisation.objects.create(
-                    name=raison_sociale,
-                    street=street or None,
-                    city=city or None,
-                    postal_code=postal_code or None,
-                    country=country or None,
-                    phone=phone or None,
-                    imported=True,
-                )
-                existing_orgs[id_structure] = organisation.pk
+                created_orgs[id_structure] = organisation
+        Organisation.objects.bulk_update(updated_orgs, ORGANISATION_UPDATE_FIELDS)
+        Organisation.objects.bulk_create(created_orgs.values())
+        new_orgs = {key: org.pk for key, org in created_orgs.items()}
+        org_pks = {
+            key: new_orgs.get(key) or self._existing_orgs[key] for key in structures
+        }
+
+        # ── Users ───────────────────────────────────────────────────────
+        now = timezone.now()
+        new_emails = set()
+        updated_users, created_users = [], {}
+        for record in records:
+            user = User(
+                first_name=record["first_name"],
+                last_name=record["last_name"],
+                job_title=record["job_title"],
+                is_practitioner=True,
+                imported=True,
+                main_organisation_id=org_pks.get(record["id_structure"]),
+            )
+            if record["rpps"] in self._existing_rpps:
+                user.pk = self._existing_rpps[record["rpps"]]
+                user.updated_at = now
+                updated_users.append(user)
+            else:
+                user.email = self._deduplicate_email(record["email"], new_emails)
+                user.password = make_password(None)
+                created_users[record["rpps"]] = user
+        User.objects.bulk_update(updated_users, USER_UPDATE_FIELDS)
+        User.objects.bulk_create(created_users.values())
+        new_users = {rpps: user.pk for rpps, user in created_users.items()}
+        user_pks = {
+            record["rpps"]: new_users.get(record["rpps"])
+            or self._existing_rpps[record["rpps"]]
+            for record in records
+        }
 
-            # Organisation custom fields
+        # ── Custom field values ─────────────────────────────────────────
+        values = []
+        for id_structure, record in structures.items():
             for cf_name, cf_value in [
                 ("Identifiant structure", id_structure),
-                ("SIRET", siret),
-                ("FINESS", finess),
+                ("SIRET", record["siret"]),
+                ("FINESS", record["finess"]),
             ]:
-                cf = custom_fields.get(cf_name)
-                if cf and cf_value and organisation:
-                    CustomFieldValue.objects.update_or_create(
-                        custom_field=cf,
-                        content_type=org_ct,
-                        object_id=organisation.pk,
-                        defaults={"value": cf_value},
-                    )
-
-        # ── User ────────────────────────────────────────────────────────
-        user_data = {
-            "first_name": first_name,
-            "last_name": last_name,
-            "job_title": job_title,
-            "is_practitioner": True,
-            "imported": True,
-        }
-
-        if rpps in existing_rpps:
-            user_pk = existing_rpps[rpps]
-            user = User.objects.filter(pk=user_pk).first()
-            if user:
-                User.objects.filter(pk=user_pk).update(
-                    **user_data,
-                    main_organisation=organisation,
+                values.append(
+                    (cf_name, self._org_ct, org_pks[id_structure], cf_value)
                 )
-                user.refresh_from_db()
-                stats["updated"] += 1
-            else:
-                # User was deleted since last import, remove stale reference
-                del existing_rpps[rpps]
+        for record in records:
+            for cf_name, cf_value in [
+                ("RPPS", record["rpps"]),
+                ("Mode d'exercice", record["mode_exercice"]),
+            ]:
+                values.append(
+                    (cf_name, self._user_ct, user_pks[record["rpps"]], cf_value)
+                )
+        CustomFieldValue.objects.bulk_create(
+            [
+                CustomFieldValue(
+                    custom_field=self._custom_fields[cf_name],
+                    content_type=content_type,
+                    object_id=object_id,
+                    value=value,
+                )
+                for cf_name, content_type, object_id, value in values
+                if value and self._custom_fields.get(cf_name)
+            ],
+            update_conflicts=True,
+            unique_fields=["custom_field", "content_type", "object_id"],
+            update_fields=["value"],
+        )
 
-        if rpps not in existing_rpps:
-            unique_email = self._deduplicate_email(email)
-            user = User(
-                email=unique_email,
-                main_organisation=organisation,
-                **user_data,
-            )
-            user.set_unusable_password()
-            user.save()
-            existing_rpps[rpps] = user.pk
-            stats["created"] += 1
-
-        if organisation:
-            user.organisations.add(organisation)
-
-        # User custom fields (RPPS, Mode d'exercice)
-        for cf_name, cf_value in [("RPPS", rpps), ("Mode d'exercice", mode_exercice)]:
-            cf = custom_fields.get(cf_name)
-            if cf and cf_value:
-                CustomFieldValue.objects.update_or_create(
-                    custom_field=cf,
-                    content_type=user_ct,
-                    object_id=user.pk,
-                    defaults={"value": cf_value},
+        # ── Specialities and M2M links ──────────────────────────────────
+        missing = {
+            record["speciality"]
+            for record in records
+            if record["speciality"] and record["speciality"] not in self._specialities
+        }
+        created_specialities = Speciality.objects.bulk_create(
+            [Speciality(name=name) for name in sorted(missing)]
+        )
+        new_specialities = {spec.name: spec.pk for spec in created_specialities}
+        speciality_pks = {**self._specialities, **new_specialities}
+
+        UserOrganisation = User.organisations.through
+        UserOrganisation.objects.bulk_create(
+            [
+                UserOrganisation(
+                    user_id=user_pks[record["rpps"]],
+                    organisation_id=org_pks[record["id_structure"]],
+                )
+                for record in records
+                if record["id_structure"] in org_pks
+            ],
+            ignore_conflicts=True,
+        )
+        UserSpeciality = User.specialities.through
+        UserSpeciality.objects.bulk_create(
+            [
+                UserSpeciality(
+                    user_id=user_pks[record["rpps"]],
+                    speciality_id=speciality_pks[record["speciality"]],
                 )
+                for record in records
+                if record["speciality"]
+            ],
+            ignore_conflicts=True,
+        )
 
-        # Speciality: use savoir-faire if available, otherwise fall back to profession
-        spec_name = savoir_faire or job_title
-        if spec_name:
-            if spec_name not in speciality_cache:
-                spec, _ = Speciality.objects.get_or_create(name=spec_name)
-                speciality_cache[spec_name] = spec
-            user.specialities.add(speciality_cache[spec_name])
-
-    def _build_street(self, row):
-        parts = []
-        numero = row[COL_NUMERO_VOIE].strip()
-        type_voie = row[COL_TYPE_VOIE].strip()
-        libelle = row[COL_LIBELLE_VOIE].strip()
-        if numero:
-            parts.append(numero)
-        if type_voie:
-            parts.append(type_voie)
-        if libelle:
-            parts.append(libelle)
-        return " ".join(parts)
-
-    def _clean_phone(self, phone):
-        if not phone:
-            return None
-        cleaned = re.sub(r"[^\d+]", "", phone)
-        return cleaned or None
+        return new_orgs, new_users, new_specialities, new_emails
+
+    def _provision_encryption(self):
+        """Bulk inserts skip the post_save signal provisioning keypairs."""
+        if getattr(connection, "schema_name", "public") == "public":
+            return
+        if not config.encryption_enabled or not config.master_public_key:
+            return
+        from encryption_admin.tasks import provision_encryption_for_tenant
 
-    def _clean_city(self, city):
-        """Remove postal code prefix from city field (e.g. '97130 CAPESTERRE BELLE EAU' -> 'Capesterre Belle Eau')."""
-        city = re.sub(r"^\d{5}\s*", "", city)
-        return city.title() if city else None
+        provision_encryption_for_tenant.delay(config.master_public_key)
+        self.stdout.write("Keypair provisioning of the imported users enqueued")
 
-    def _deduplicate_email(self, email):
+    def _deduplicate_email(self, email, new_emails):
         """Add +N suffix to email local part if it already exists.
 
         Existing addresses are tracked lowercased, so a case variant of a known
         address is treated as a duplicate rather than a new account.
+        ``new_emails`` collects the addresses taken by the current batch.
         """
         if not email:
             return None
-        if email.lower() not in self._existing_emails:
-            self._existing_emails.add(email.lower())
+
+        def taken(candidate):
+            candidate = candidate.lower()
+            return candidate in self._existing_emails or candidate in new_emails
+
+        if not taken(email):
+            new_emails.add(email.lower())
             return email
         local, domain = email.rsplit("@", 1)
         counter = 1
         while True:
             candidate = f"{local}+{counter}@{domain}"
-            if candidate.lower() not in self._existing_emails:
-                self._existing_emails.add(candidate.lower())
+            if not taken(candidate):
+                new_emails.add(candidate.lower())
                 return candidate
             counter += 1
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.11 on 2026-10-17 09:40
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def parse_location(value):
+    if not value:
+        return None, None
+    try:
+        lat, lng = (float(x) for x in value.split(","))
+    except (ValueError, AttributeError):
+        return None, None
+    return lat, lng
+
+
+def backfill_coordinates(apps, schema_editor):
+    """Fill latitude/longitude from the existing "lat,lng" location strings."""
+    for model_name in ("Organisation", "User"):
+        model = apps.get_model("users", model_name)
+        batch = []
+        for obj in (
+            model.objects.exclude(location__isnull=True)
+            .exclude(location="")
+            .only("pk", "location")
+            .iterator(chunk_size=BATCH_SIZE)
+        ):
+            obj.latitude, obj.longitude = parse_location(obj.location)
+            if obj.latitude is None:
+                continue
+            batch.append(obj)
+            if len(batch) >= BATCH_SIZE:
+                model.objects.bulk_update(batch, ["latitude", "longitude"])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ["latitude", "longitude"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0049_organisation_footer_patient_ar_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organisation',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='organisation',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='organisation',
+            index=models.Index(fields=['latitude', 'longitude'], name='org_lat_lng_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['latitude', 'longitude'], name='user_lat_lng_idx'),
+        ),
+        migrations.RunPython(backfill_coordinates, migrations.RunPython.noop),
+    ]
@@ -29,6 +29,36 @@ import secrets
 # Create your models here.
 
 
+def parse_location(value):
+    """Return ``(latitude, longitude)`` from a ``"lat,lng"`` location string.
+
+    Returns ``(None, None)`` when the value is empty or malformed.
+    """
+    if not value:
+        return None, None
+    try:
+        lat, lng = (float(x) for x in value.split(","))
+    except (ValueError, AttributeError):
+        return None, None
+    return lat, lng
+
+
+def sync_coordinates(instance, kwargs):
+    """Mirror ``instance.location`` into its numeric latitude/longitude.
+
+    The text location stays the source of truth (it is what the admin map
+    widget edits); the numeric columns are indexed so the map can filter and
+    cluster in SQL. ``kwargs`` are the ``save()`` kwargs: a save restricted to
+    ``location`` also writes the coordinates.
+    """
+    instance.latitude, instance.longitude = parse_location(instance.location)
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and "location" in update_fields:
+        kwargs["update_fields"] = list(
+            dict.fromkeys([*update_fields, "latitude", "longitude"])
+        )
+
+
 class Term(models.Model):
     name = models.CharField()
     content = models.TextField()
@@ -64,6 +94,8 @@ class Organisation(models.Model):
         Term, on_delete=models.SET_NULL, null=True, blank=True
     )
     location = PlainLocationField(based_fields=["city"], zoom=7, blank=True, null=True)
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
     street = models.CharField(max_length=200, blank=True, null=True)
     city = models.CharField(max_length=50, blank=True, null=True)
     postal_code = models.CharField(max_length=10, blank=True, null=True)
@@ -90,8 +122,14 @@ class Organisation(models.Model):
             )
             domain_list.update(is_main=False)
 
+        sync_coordinates(self, kwargs)
         return super().save(*args, **kwargs)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["latitude", "longitude"], name="org_lat_lng_idx"),
+        ]
+
 
 class Language(models.Model):
     name = models.CharField(max_length=100)
@@ -239,6 +277,8 @@ class User(AbstractUser):
     location = PlainLocationField(
         based_fields=["city"], zoom=7, blank=True, null=True
     )
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
     street = models.CharField(max_length=200, blank=True, null=True)
     city = models.CharField(max_length=50, blank=True, null=True)
     postal_code = models.CharField(max_length=10, blank=True, null=True)
@@ -305,6 +345,9 @@ class User(AbstractUser):
 
     @property
     def is_online(self):
+        # Primed in bulk by UserOnlineStatusService.prime_users for lists.
+        if hasattr(self, "_is_online"):
+            return self._is_online
         from .services import user_online_service
         return user_online_service.is_user_online(self.pk)
 
@@ -373,11 +416,16 @@ class User(AbstractUser):
         self.mobile_phone_number = self.normalize_phone_number(
             self.mobile_phone_number
         )
+        sync_coordinates(self, kwargs)
 
         super().save(*args, **kwargs)
 
     class Meta:
         ordering = ["first_name", "last_name", "email"]
+        indexes = [
+            models.Index(fields=["latitude", "longitude"], name="user_lat_lng_idx"),
+            models.Index(fields=["updated_at"], name="user_updated_at_idx"),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=["external_id"],
@@ -451,6 +499,9 @@ class HealthMetric(models.Model):
     acknowledged_at = models.DateTimeField(blank=True, null=True)
 
 
+DAV_APP_PASSWORD_TOUCH_INTERVAL = 60
+
+
 class DAVAppPassword(models.Model):
     """
     App password for CalDAV/CardDAV access.
@@ -494,21 +545,43 @@ class DAVAppPassword(models.Model):
             self.token = secrets.token_urlsafe(48)
         super().save(*args, **kwargs)
 
+    @classmethod
+    def lookup(cls, username: str, password: str):
+        """Return the active app password matching the credentials, or None."""
+        # Look the token up through its unique index; the email is checked
+        # afterwards instead of joining on a case-insensitive match.
+        app_pw = (
+            cls.objects.select_related("user")
+            .filter(token=password, is_active=True)
+            .first()
+        )
+        if app_pw is None or (app_pw.user.email or "").lower() != username.lower():
+            return None
+        return app_pw
+
     @classmethod
     def authenticate(cls, username: str, password: str):
         """
         Try to authenticate via app password.
         Returns the User if valid, None otherwise.
         """
-        try:
-            app_pw = cls.objects.select_related("user").get(
-                user__email__iexact=username,
-                token=password,
-                is_active=True,
-            )
-        except cls.DoesNotExist:
+        app_pw = cls.lookup(username, password)
+        if app_pw is None:
             return None
 
-        app_pw.last_used_at = timezone.now()
-        app_pw.save(update_fields=["last_used_at"])
-        return app_pw.user
\ No newline at end of file
+        cls.touch(app_pw.pk)
+        return app_pw.user
+
+    @classmethod
+    def touch(cls, pk):
+        """Update ``last_used_at``, at most once per ``DAV_APP_PASSWORD_TOUCH_INTERVAL``.
+
+        A sync burst from one device would otherwise write the row on every
+        request.
+        """
+        from django.core.cache import cache
+        from django.db import connection
+
+        key = f"dav-app-password:touched:{connection.schema_name}:{pk}"
+        if cache.add(key, 1, DAV_APP_PASSWORD_TOUCH_INTERVAL):
+            cls.objects.filter(pk=pk).update(last_used_at=timezone.now())
\ No newline at end of file
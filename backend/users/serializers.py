@@ -4,7 +4,11 @@ from allauth.account.utils import setup_user_email
 from allauth.socialaccount.models import EmailAddress
 from constance import config as constance_config
 from consultations.models import Participant
-from consultations.serializers import AppointmentDetailSerializer, CustomFieldsMixin
+from consultations.serializers import (
+    AppointmentDetailSerializer,
+    CustomFieldsMixin,
+    OnlineStatusListSerializer,
+)
 from dj_rest_auth.serializers import PasswordResetSerializer
 from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model
@@ -132,6 +136,7 @@ class UserDetailsSerializer(CustomFieldsMixin, serializers.ModelSerializer):
             "encryption_passphrase_pending",
             "encryption_key_lost",
         ]
+        list_serializer_class = OnlineStatusListSerializer
 
     def get_encrypted_private_key(self, obj):
         request = self.context.get("request")
@@ -34,6 +34,35 @@ class UserOnlineStatusService:
     def refresh_online(self, user_id, schema_name=None):
         cache.set(self._get_cache_key(user_id, schema_name), True, ONLINE_CACHE_TIMEOUT)
 
+    def online_user_ids(self, user_ids, schema_name=None):
+        """Return the subset of ``user_ids`` currently online.
+
+        All presence keys are fetched with a single ``get_many`` (one MGET on
+        Redis), so answering "who is online" for a whole consultation or a
+        page of users costs one round trip instead of one per user.
+        """
+        keys = {
+            self._get_cache_key(user_id, schema_name): user_id
+            for user_id in set(user_ids)
+            if user_id is not None
+        }
+        if not keys:
+            return set()
+        found = cache.get_many(keys.keys())
+        return {keys[key] for key, value in found.items() if value}
+
+    def prime_users(self, users, schema_name=None):
+        """Resolve and store the online status on each user of ``users``.
+
+        ``User.is_online`` then reads the primed value instead of hitting the
+        cache once per user while a list is serialized.
+        """
+        users = [user for user in users if user is not None]
+        online = self.online_user_ids((user.pk for user in users), schema_name)
+        for user in users:
+            user._is_online = user.pk in online
+        return users
+
 
 class AsyncUserOnlineStatusService:
     """Async wrapper for WebSocket consumers.
@@ -66,6 +95,11 @@ class AsyncUserOnlineStatusService:
         with tenant_scope(schema_name):
             return self.sync_service.refresh_online(user_id, schema_name)
 
+    @sync_to_async
+    def online_user_ids(self, user_ids, schema_name=None):
+        with tenant_scope(schema_name):
+            return self.sync_service.online_user_ids(user_ids, schema_name)
+
 
 # Global instances
 user_online_service = UserOnlineStatusService()
@@ -8,7 +8,7 @@ from django_tenants.utils import get_tenant_model, tenant_context
 from constance import config
 from django.db.models import F, Q
 from django.utils import timezone
-from core.celery import app
+from core.celery import app, for_each_tenant, tenant_task
 
 from .models import User
 
@@ -60,39 +60,43 @@ def geocode_location(self, app_label, model_name, object_id, schema_name):
         lat = results[0]["lat"]
         lon = results[0]["lon"]
         obj.location = f"{lat},{lon}"
-        obj.save(update_fields=["location"])
+        # save() mirrors the location into the indexed latitude/longitude
+        # columns the map filters on.
+        obj.save(update_fields=["location", "latitude", "longitude"])
         logger.info(f"Geocoded {app_label}.{model_name} pk={object_id}: {lat},{lon}")
 
 
 @app.task
 def auto_delete_temporary_users():
-    TenantModel = get_tenant_model()
-    for tenant in TenantModel.objects.exclude(schema_name='public'):
-        with tenant_context(tenant):
-            if not config.temporary_user_auto_delete:
-                logger.info("Auto-delete of temporary users is disabled")
-                return
-
-            from consultations.utils import appointment_active_q
-
-            now = timezone.now()
-            one_hour_ago = now - timedelta(hours=1)
-            users = User.objects.filter(
-                temporary=True,
-                date_joined__lt=one_hour_ago
-            ).exclude(
-                appointment_active_q("appointments_participating")
-                & Q(appointments_participating__status="scheduled"),
-            ).exclude(
-                # Keep users who still have an active reminder addressed to them
-                # whose schedule isn't exhausted yet (recurrence_end_at is the
-                # last occurrence; equals scheduled_at for non-recurring ones).
-                reminders__is_active=True,
-                reminders__recurrence_end_at__gte=now,
-            ).exclude(
-                Q(consultation__isnull=False) |
-                Q(consultation_created__isnull=False) |
-                Q(consultation_owned__isnull=False)
-            )
-            count, _ = users.delete()
-            logger.info(f"Auto-deleted {count} temporary user(s) with no future appointments, no future reminders and no consultations")
+    for_each_tenant(auto_delete_temporary_users_for_tenant)
+
+
+@tenant_task()
+def auto_delete_temporary_users_for_tenant():
+    if not config.temporary_user_auto_delete:
+        logger.info("Auto-delete of temporary users is disabled")
+        return
+
+    from consultations.utils import appointment_active_q
+
+    now = timezone.now()
+    one_hour_ago = now - timedelta(hours=1)
+    users = User.objects.filter(
+        temporary=True,
+        date_joined__lt=one_hour_ago
+    ).exclude(
+        appointment_active_q("appointments_participating")
+        & Q(appointments_participating__status="scheduled"),
+    ).exclude(
+        # Keep users who still have an active reminder addressed to them
+        # whose schedule isn't exhausted yet (recurrence_end_at is the
+        # last occurrence; equals scheduled_at for non-recurring ones).
+        reminders__is_active=True,
+        reminders__recurrence_end_at__gte=now,
+    ).exclude(
+        Q(consultation__isnull=False) |
+        Q(consultation_created__isnull=False) |
+        Q(consultation_owned__isnull=False)
+    )
+    count, _ = users.delete()
+    logger.info(f"Auto-deleted {count} temporary user(s) with no future appointments, no future reminders and no consultations")
@@ -1,12 +1,20 @@
 from datetime import timedelta
 
+from unittest.mock import patch
+
 from constance.test import override_config
+from django.core.cache import cache
+from django.db import connection
 from django.utils import timezone
 from django_tenants.test.cases import TenantTestCase
 
 from consultations.models import Reminder
 from users.models import User
-from users.tasks import auto_delete_temporary_users
+from core.celery import tenant_task_lock_key, tenant_task_stats_key
+from users.tasks import (
+    auto_delete_temporary_users,
+    auto_delete_temporary_users_for_tenant,
+)
 
 
 @override_config(temporary_user_auto_delete=True)
@@ -32,7 +40,7 @@ class AutoDeleteTemporaryUsersReminderTests(TenantTestCase):
             created_by=self.practitioner,
             scheduled_at=timezone.now() + timedelta(days=2),
         )
-        auto_delete_temporary_users()
+        auto_delete_temporary_users_for_tenant()
         self.assertTrue(User.objects.filter(pk=u.pk).exists())
 
     def test_temp_user_with_active_recurring_reminder_is_kept(self):
@@ -47,7 +55,7 @@ class AutoDeleteTemporaryUsersReminderTests(TenantTestCase):
             recurrence_period="week",
             recurrence_count=4,
         )
-        auto_delete_temporary_users()
+        auto_delete_temporary_users_for_tenant()
         self.assertTrue(User.objects.filter(pk=u.pk).exists())
 
     def test_temp_user_with_past_reminder_is_deleted(self):
@@ -63,10 +71,66 @@ class AutoDeleteTemporaryUsersReminderTests(TenantTestCase):
             recurrence_end_at=timezone.now() - timedelta(days=1),
             is_active=False,
         )
-        auto_delete_temporary_users()
+        auto_delete_temporary_users_for_tenant()
         self.assertFalse(User.objects.filter(pk=u.pk).exists())
 
     def test_temp_user_without_reminder_is_deleted(self):
         u = self._make_temp_user("temp_none@example.com")
-        auto_delete_temporary_users()
+        auto_delete_temporary_users_for_tenant()
         self.assertFalse(User.objects.filter(pk=u.pk).exists())
+
+
+@override_config(temporary_user_auto_delete=True)
+class TenantFanOutTests(TenantTestCase):
+    def setUp(self):
+        cache.clear()
+        self.temp_user = User.objects.create_user(
+            email="temp@example.com", temporary=True
+        )
+        User.objects.filter(pk=self.temp_user.pk).update(
+            date_joined=timezone.now() - timedelta(hours=2)
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_parent_dispatches_one_subtask_per_tenant(self):
+        with patch.object(
+            auto_delete_temporary_users_for_tenant, "apply_async"
+        ) as mock_apply:
+            auto_delete_temporary_users()
+        # The test tenant is the only one besides public.
+        self.assertEqual(mock_apply.call_count, 1)
+        self.assertTrue(User.objects.filter(pk=self.temp_user.pk).exists())
+
+    def test_run_is_skipped_while_tenant_is_locked(self):
+        name = auto_delete_temporary_users_for_tenant.name
+        lock_key = tenant_task_lock_key(name, connection.schema_name)
+        cache.add(lock_key, 1)
+
+        auto_delete_temporary_users_for_tenant()
+        self.assertTrue(User.objects.filter(pk=self.temp_user.pk).exists())
+
+        cache.delete(lock_key)
+        auto_delete_temporary_users_for_tenant()
+        self.assertFalse(User.objects.filter(pk=self.temp_user.pk).exists())
+        self.assertIsNone(cache.get(lock_key))
+        stats = cache.get(tenant_task_stats_key(name, connection.schema_name))
+        self.assertFalse(stats["failed"])
+
+    def test_expired_run_keeps_the_lock_of_a_newer_run(self):
+        from consultations.utils import appointment_active_q
+
+        name = auto_delete_temporary_users_for_tenant.name
+        lock_key = tenant_task_lock_key(name, connection.schema_name)
+
+        def lock_expired_and_taken(*args):
+            cache.set(lock_key, "newer-run")
+            return appointment_active_q(*args)
+
+        with patch(
+            "consultations.utils.appointment_active_q",
+            side_effect=lock_expired_and_taken,
+        ):
+            auto_delete_temporary_users_for_tenant()
+        self.assertEqual(cache.get(lock_key), "newer-run")
@@ -0,0 +1,113 @@
+import csv
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django_tenants.test.cases import TenantTestCase
+
+from consultations.models import CustomField, CustomFieldValue
+from users.management.commands import import_rpps
+from users.management.commands.import_rpps import parse_chunk
+from users.models import Organisation, User
+
+
+def rpps_line(rpps, last_name="DUPONT", email="", structure="S1", **columns):
+    row = [""] * (import_rpps.COL_EMAIL + 1)
+    row[import_rpps.COL_RPPS] = rpps
+    row[import_rpps.COL_NOM] = last_name
+    row[import_rpps.COL_PRENOM] = "JEAN"
+    row[import_rpps.COL_CODE_PROFESSION] = "10"
+    row[import_rpps.COL_PROFESSION] = "Médecin"
+    row[import_rpps.COL_ID_STRUCTURE] = structure
+    row[import_rpps.COL_RAISON_SOCIALE] = f"Cabinet {structure}" if structure else ""
+    row[import_rpps.COL_CODE_POSTAL] = "75001"
+    row[import_rpps.COL_COMMUNE] = "75001 PARIS"
+    row[import_rpps.COL_EMAIL] = email
+    for index, value in columns.items():
+        row[int(index.lstrip("c"))] = value
+    return "|".join(row) + "\n"
+
+
+class ImportRppsTests(TenantTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        self.path = os.path.join(self.tmpdir, "rpps.txt")
+        self.rejects = os.path.join(self.tmpdir, "rejects.csv")
+
+    def _import(self, *lines, **options):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("header\n")
+            f.writelines(lines)
+        call_command(
+            "import_rpps",
+            file=self.path,
+            reject_file=self.rejects,
+            stdout=StringIO(),
+            **options,
+        )
+
+    def _user(self, rpps):
+        field = CustomField.objects.get(name="RPPS")
+        value = CustomFieldValue.objects.get(
+            custom_field=field,
+            content_type=ContentType.objects.get_for_model(User),
+            value=rpps,
+        )
+        return User.objects.get(pk=value.object_id)
+
+    def test_creates_then_updates(self):
+        self._import(
+            rpps_line("1001", email="jean@example.com"),
+            rpps_line("1002", last_name="MARTIN", email="JEAN@example.com"),
+            batch_size=1,
+        )
+        first, second = self._user("1001"), self._user("1002")
+        self.assertEqual(first.email, "jean@example.com")
+        self.assertEqual(second.email, "jean+1@example.com")
+        self.assertTrue(first.imported and first.is_practitioner)
+        self.assertFalse(first.has_usable_password())
+        self.assertEqual(first.main_organisation, second.main_organisation)
+        self.assertEqual(Organisation.objects.filter(imported=True).count(), 1)
+        self.assertEqual(first.main_organisation.city, "Paris")
+        self.assertEqual(list(first.organisations.all()), [first.main_organisation])
+        self.assertEqual(first.specialities.get().name, "Médecin")
+
+        self._import(rpps_line("1001", last_name="DURAND", structure="S2"))
+        first.refresh_from_db()
+        self.assertEqual(first.last_name, "Durand")
+        self.assertEqual(first.main_organisation.name, "Cabinet S2")
+        self.assertEqual(User.objects.filter(imported=True).count(), 2)
+
+    def test_rejected_rows_go_to_reject_file(self):
+        self._import(
+            rpps_line("1001"),
+            rpps_line(""),
+            "too|short\n",
+            rpps_line("1002", c37="X" * 80),
+        )
+        with open(self.rejects, encoding="utf-8") as f:
+            rejects = list(csv.DictReader(f))
+        self.assertEqual([r["line"] for r in rejects], ["3", "4", "5"])
+        self.assertIn("missing RPPS", rejects[0]["reason"])
+        self.assertIn("city longer than", rejects[2]["reason"])
+        self.assertEqual(User.objects.filter(imported=True).count(), 1)
+
+    def test_duplicate_rpps_is_skipped(self):
+        self._import(rpps_line("1001"), rpps_line("1001", last_name="OTHER"))
+        self.assertEqual(self._user("1001").last_name, "Dupont")
+        self.assertEqual(User.objects.filter(imported=True).count(), 1)
+
+    def test_dry_run_writes_nothing(self):
+        self._import(rpps_line("1001"), dry_run=True)
+        self.assertFalse(User.objects.filter(imported=True).exists())
+
+    def test_parse_chunk_applies_profession_filter(self):
+        lines = [rpps_line("1001"), rpps_line("1002", c9="40")]
+        records, rejects = parse_chunk((2, lines, "40"))
+        self.assertEqual([r["rpps"] for r in records], ["1002"])
+        self.assertEqual(records[0]["line"], 3)
+        self.assertEqual(rejects, [])
@@ -0,0 +1,73 @@
+from constance.test import override_config
+from django.urls import reverse
+from django_tenants.test.cases import TenantTestCase
+from rest_framework.test import APIClient
+
+from users.models import Organisation, User
+
+
+@override_config(public_organisations=True)
+class MapViewTests(TenantTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.paris = Organisation.objects.create(name="Paris", location="48.85,2.35")
+        self.lyon = Organisation.objects.create(name="Lyon", location="45.76,4.83")
+        # Placed at their organisation.
+        self.doc_paris = User.objects.create_user(
+            email="paris@example.com", is_practitioner=True, main_organisation=self.paris
+        )
+        # Own location wins over the organisation's.
+        self.doc_nice = User.objects.create_user(
+            email="nice@example.com",
+            is_practitioner=True,
+            main_organisation=self.paris,
+            location="43.70,7.26",
+        )
+
+    def test_location_is_mirrored_to_coordinates(self):
+        self.assertEqual((self.paris.latitude, self.paris.longitude), (48.85, 2.35))
+        self.paris.location = "bogus"
+        self.paris.save(update_fields=["location"])
+        self.paris.refresh_from_db()
+        self.assertIsNone(self.paris.latitude)
+
+    def test_bounding_box(self):
+        response = self.client.get(
+            reverse("map"),
+            {"lat_min": 48, "lat_max": 49, "lng_min": 2, "lng_max": 3},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data["clustered"])
+        self.assertEqual(
+            [org["id"] for org in response.data["organisations"]], [self.paris.pk]
+        )
+        self.assertEqual(
+            [user["pk"] for user in response.data["practitioners"]],
+            [self.doc_paris.pk],
+        )
+
+    def test_clusters_count_per_cell(self):
+        Organisation.objects.create(name="Paris 2", location="48.86,2.36")
+
+        response = self.client.get(reverse("map"), {"cluster": "true", "zoom": 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["clustered"])
+        counts = sorted(cell["count"] for cell in response.data["organisations"])
+        self.assertEqual(counts, [1, 2])
+        self.assertEqual(
+            sorted(cell["count"] for cell in response.data["practitioners"]), [1, 1]
+        )
+
+    def test_clustered_bounding_box_places_practitioners_like_markers(self):
+        response = self.client.get(
+            reverse("map"),
+            {
+                "cluster": "true", "zoom": 10,
+                "lat_min": 43, "lat_max": 44, "lng_min": 7, "lng_max": 8,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["organisations"], [])
+        self.assertEqual(
+            [cell["count"] for cell in response.data["practitioners"]], [1]
+        )
@@ -0,0 +1,34 @@
+from django.core.cache import cache
+from django_tenants.test.cases import TenantTestCase
+
+from users.models import User
+from users.services import user_online_service
+
+
+class OnlineUserIdsTests(TenantTestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(email="alice@example.com")
+        self.bob = User.objects.create_user(email="bob@example.com")
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_returns_only_online_users(self):
+        user_online_service.set_user_online(self.alice.pk)
+        online = user_online_service.online_user_ids([self.alice.pk, self.bob.pk])
+        self.assertEqual(online, {self.alice.pk})
+
+    def test_offline_user_is_dropped(self):
+        user_online_service.set_user_online(self.alice.pk)
+        user_online_service.set_user_offline(self.alice.pk)
+        self.assertEqual(user_online_service.online_user_ids([self.alice.pk]), set())
+
+    def test_empty_input_skips_cache(self):
+        self.assertEqual(user_online_service.online_user_ids([]), set())
+
+    def test_prime_users_sets_is_online(self):
+        user_online_service.set_user_online(self.bob.pk)
+        alice, bob = user_online_service.prime_users([self.alice, self.bob])
+        self.assertFalse(alice.is_online)
+        self.assertTrue(bob.is_online)
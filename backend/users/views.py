@@ -17,6 +17,7 @@ from allauth.socialaccount.providers.openid_connect.views import (
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from core.channel_groups import user_group
+from consultations import joins
 from consultations.models import (
     Appointment,
     Consultation,
@@ -47,6 +48,7 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
 from django.db.models import Q
+from django.db.models.functions import Coalesce
 from django.http import FileResponse
 from django.shortcuts import render
 from django.utils import timezone, translation
@@ -81,6 +83,7 @@ from constance import config as constance_config
 from allauth.socialaccount.models import SocialApp
 
 from .filters import UserFilter
+from .geo import bounds_q, cluster, parse_bounds, parse_zoom
 from .models import HealthMetric, Language, Organisation, Speciality, Term, User, WebPushSubscription, DAVAppPassword
 from .serializers import (
     HealthMetricSerializer,
@@ -207,7 +210,7 @@ class SpecialityViewSet(viewsets.ReadOnlyModelViewSet):
             specialities=specialty, main_organisation__isnull=False
         ).select_related("main_organisation")
         doctors = self._filter_by_bounding_box(
-            doctors, request, location_field="main_organisation__location"
+            doctors, request, coordinates_prefix="main_organisation__"
         )
         serializer = UserDetailsSerializer(doctors, many=True)
         return Response(serializer.data)
@@ -237,73 +240,26 @@ class SpecialityViewSet(viewsets.ReadOnlyModelViewSet):
     def organisations(self, request, pk=None):
         """Get organisations based on users with this specialty"""
         specialty = self.get_object()
-        users_with_specialty = User.objects.filter(
-            specialities=specialty, main_organisation__isnull=False
-        ).select_related("main_organisation")
-
-        # Extract unique organizations
-        organisations = []
-        seen_org_ids = set()
-        for user in users_with_specialty:
-            if user.main_organisation.id not in seen_org_ids:
-                organisations.append(user.main_organisation)
-                seen_org_ids.add(user.main_organisation.id)
-
-        # Apply bounding box filter
-        organisations = self._filter_orgs_by_bounding_box(organisations, request)
+        organisations = Organisation.objects.filter(
+            users_mainorganisation__specialities=specialty
+        ).distinct()
+        organisations = self._filter_by_bounding_box(organisations, request)
 
         serializer = OrganisationSerializer(organisations, many=True)
         return Response(serializer.data)
 
     @staticmethod
-    def _parse_bounding_box(request):
-        lat_min = request.query_params.get("lat_min")
-        lat_max = request.query_params.get("lat_max")
-        lng_min = request.query_params.get("lng_min")
-        lng_max = request.query_params.get("lng_max")
-        if not all(v is not None for v in (lat_min, lat_max, lng_min, lng_max)):
-            return None
-        try:
-            return float(lat_min), float(lat_max), float(lng_min), float(lng_max)
-        except (ValueError, TypeError):
-            return None
-
-    @staticmethod
-    def _location_in_bounds(location, bounds):
-        if not location:
-            return False
-        try:
-            lat, lng = (float(x) for x in location.split(","))
-            return bounds[0] <= lat <= bounds[1] and bounds[2] <= lng <= bounds[3]
-        except (ValueError, AttributeError):
-            return False
-
-    def _filter_by_bounding_box(self, queryset, request, location_field):
-        bounds = self._parse_bounding_box(request)
+    def _filter_by_bounding_box(queryset, request, coordinates_prefix=""):
+        bounds = parse_bounds(request.query_params)
         if not bounds:
             return queryset
-        queryset = queryset.exclude(**{f"{location_field}__isnull": True}).exclude(
-            **{location_field: ""}
+        return queryset.filter(
+            bounds_q(
+                bounds,
+                f"{coordinates_prefix}latitude",
+                f"{coordinates_prefix}longitude",
+            )
         )
-        ids = []
-        for obj in queryset:
-            loc = obj
-            for attr in location_field.split("__"):
-                loc = getattr(loc, attr, None)
-                if loc is None:
-                    break
-            if self._location_in_bounds(loc, bounds):
-                ids.append(obj.id)
-        return queryset.filter(id__in=ids)
-
-    def _filter_orgs_by_bounding_box(self, organisations, request):
-        bounds = self._parse_bounding_box(request)
-        if not bounds:
-            return organisations
-        return [
-            org for org in organisations
-            if self._location_in_bounds(org.location, bounds)
-        ]
 
 
 class OrganisationViewSet(viewsets.ReadOnlyModelViewSet):
@@ -358,6 +314,12 @@ class MapView(APIView):
       - `search`: free-text search across practitioner/org name, address
         and main organisation. When provided the bounding box is
         ignored, matching the previous per-endpoint behavior.
+      - `cluster` + `zoom`: when `cluster` is truthy and `zoom` is given
+        (and no search), both lists hold `{lat, lng, count}` grid cells
+        sized for that zoom level instead of individual entries.
+
+    Bounding boxes and clusters are computed in SQL on the indexed
+    latitude/longitude columns.
     """
 
     def get_permissions(self):
@@ -366,67 +328,71 @@ class MapView(APIView):
         return [IsAuthenticated()]
 
     def get(self, request):
-        bounds = self._parse_bounds(request)
+        bounds = parse_bounds(request.query_params)
         search = request.query_params.get("search") or None
         location = request.query_params.get("location") or None
         speciality = request.query_params.get("speciality") or None
         has_slots_raw = request.query_params.get("has_slots") or ""
         has_slots = has_slots_raw.lower() in ("true", "1")
- 
+        cluster_raw = request.query_params.get("cluster") or ""
+        zoom = parse_zoom(request.query_params.get("zoom"))
+
+        if cluster_raw.lower() in ("true", "1") and zoom is not None and not (
+            search or location
+        ):
+            organisations = self._organisations_queryset()
+            practitioners = User.objects.filter(
+                pk__in=self._practitioners_queryset(speciality, has_slots).values("pk")
+            ).annotate(**self._practitioner_coordinates())
+            if bounds is not None:
+                organisations = organisations.filter(bounds_q(bounds))
+                practitioners = practitioners.filter(
+                    self._practitioner_bounds_q(bounds)
+                )
+            return Response({
+                "clustered": True,
+                "organisations": cluster(organisations, zoom),
+                "practitioners": cluster(
+                    practitioners, zoom, "map_latitude", "map_longitude"
+                ),
+            })
+
         organisations = self._build_organisations(bounds, search, location)
         practitioners = self._build_practitioners(
             bounds, search, speciality, has_slots, location
         )
- 
+
         return Response({
+            "clustered": False,
             "organisations": OrganisationSerializer(organisations, many=True).data,
             "practitioners": PublicPractitionerSerializer(practitioners, many=True).data,
         })
 
     @staticmethod
-    def _parse_bounds(request):
-        lat_min = request.query_params.get("lat_min")
-        lat_max = request.query_params.get("lat_max")
-        lng_min = request.query_params.get("lng_min")
-        lng_max = request.query_params.get("lng_max")
-        if not all(v is not None for v in (lat_min, lat_max, lng_min, lng_max)):
-            return None
-        try:
-            return float(lat_min), float(lat_max), float(lng_min), float(lng_max)
-        except (ValueError, TypeError):
-            return None
+    def _practitioner_coordinates():
+        # A practitioner without a location of their own is placed at their
+        # main organisation.
+        return {
+            "map_latitude": Coalesce("latitude", "main_organisation__latitude"),
+            "map_longitude": Coalesce("longitude", "main_organisation__longitude"),
+        }
 
     @staticmethod
-    def _location_in_bounds(location: str | None, bounds) -> bool:
-        if not location:
-            return False
-        try:
-            lat, lng = (float(x) for x in location.split(","))
-        except (ValueError, AttributeError):
-            return False
-        return bounds[0] <= lat <= bounds[1] and bounds[2] <= lng <= bounds[3]
+    def _practitioner_bounds_q(bounds):
+        # Same placement as _practitioner_coordinates, but on the raw columns
+        # so that both branches can use the latitude/longitude indexes.
+        return bounds_q(bounds) | Q(latitude__isnull=True) & bounds_q(
+            bounds, "main_organisation__latitude", "main_organisation__longitude"
+        )
 
-    def _build_organisations(self, bounds, search, location):
-        qs = Organisation.objects.exclude(
+    @staticmethod
+    def _organisations_queryset():
+        return Organisation.objects.exclude(
             location__isnull=True
         ).exclude(location="")
-        if search or location:
-            if location:
-                qs = qs.filter(
-                    Q(city__icontains=location)
-                    | Q(street__icontains=location)
-                    | Q(postal_code__icontains=location)
-                    | Q(country__icontains=location)
-                )
-            if search:
-                qs = qs.filter(Q(name__icontains=search))
-            return list(qs)
-        if bounds is None:
-            return list(qs)
-        return [org for org in qs if self._location_in_bounds(org.location, bounds)]
 
-
-    def _build_practitioners(self, bounds, search, speciality, has_slots, location):
+    @staticmethod
+    def _practitioners_queryset(speciality, has_slots):
         qs = User.objects.filter(
             is_active=True,
             is_practitioner=True,
@@ -444,7 +410,29 @@ class MapView(APIView):
                 Q(slots__isnull=False)
                 & (Q(slots__valid_until__isnull=True) | Q(slots__valid_until__gte=today))
             ).distinct()
- 
+        return qs
+
+    def _build_organisations(self, bounds, search, location):
+        qs = self._organisations_queryset()
+        if search or location:
+            if location:
+                qs = qs.filter(
+                    Q(city__icontains=location)
+                    | Q(street__icontains=location)
+                    | Q(postal_code__icontains=location)
+                    | Q(country__icontains=location)
+                )
+            if search:
+                qs = qs.filter(Q(name__icontains=search))
+            return list(qs)
+        if bounds is None:
+            return list(qs)
+        return list(qs.filter(bounds_q(bounds)))
+
+
+    def _build_practitioners(self, bounds, search, speciality, has_slots, location):
+        qs = self._practitioners_queryset(speciality, has_slots)
+
         if search or location:
             if location:
                 qs = qs.filter(
@@ -471,14 +459,7 @@ class MapView(APIView):
  
         if bounds is None:
             return list(qs)
-        kept = []
-        for user in qs:
-            loc = user.location or (
-                user.main_organisation.location if user.main_organisation else None
-            )
-            if self._location_in_bounds(loc, bounds):
-                kept.append(user)
-        return kept
+        return list(qs.filter(self._practitioner_bounds_q(bounds)))
 
 
 class PublicPractitionerView(APIView):
@@ -575,7 +556,9 @@ class UserConsultationsViewSet(viewsets.ReadOnlyModelViewSet):
                     appointments__participant__is_consultation_visible=True,
                 )
             ).distinct()
-        return annotate_unread_count(qs, user)
+        return ConsultationSerializer.prefetch_queryset(
+            annotate_unread_count(qs, user), user
+        )
 
     @extend_schema(
         responses={
@@ -595,14 +578,10 @@ class UserConsultationsViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=True, methods=["post"])
     def mark_read(self, request, pk=None):
         """Mark all messages in a consultation as read for the current user."""
-        from consultations.models import ConsultationReadStatus
+        from consultations import unread
 
         consultation = self.get_object()
-        ConsultationReadStatus.objects.update_or_create(
-            consultation=consultation,
-            user=request.user,
-            defaults={"last_read_at": timezone.now()},
-        )
+        unread.mark_read(consultation, request.user)
         return Response({"status": "ok"})
 
     @extend_schema(
@@ -1013,6 +992,7 @@ class UserAppointmentsViewSet(viewsets.ReadOnlyModelViewSet):
             Appointment.objects.filter(
                 participant__user=self.request.user, participant__is_active=True
             )
+            .select_related("consultation")
             .distinct()
             .order_by("-scheduled_at")
         )
@@ -1086,18 +1066,28 @@ class UserAppointmentsViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_503_SERVICE_UNAVAILABLE,
             )
 
+        # `join` is called again on every reconnect: the media token is
+        # reused and only an actual arrival is recorded and announced.
         try:
-            call_info = server.instance.appointment_participant_info(appointment, request.user)
+            call_info = joins.join_info(
+                server,
+                appointment.room_uuid,
+                request.user,
+                lambda: server.instance.appointment_participant_info(
+                    appointment, request.user
+                ),
+            )
         except Exception as e:
             logger.exception("Failed to join appointment %s: %s", pk, e)
             return Response(
                 {"detail": _("No media server available.")},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+        if not joins.mark_joined(appointment.room_uuid, request.user.pk):
+            return Response(call_info)
 
-        # The participant actually joined the call: record their arrival once.
-        # `join` is called again on every reconnect, so keep the first arrival
-        # and stay on a single UPDATE that doesn't fan out through post_save.
+        # The participant actually joined the call: record their arrival once,
+        # with a single UPDATE that doesn't fan out through post_save.
         Participant.objects.filter(
             appointment=appointment,
             user=request.user,
@@ -1105,27 +1095,14 @@ class UserAppointmentsViewSet(viewsets.ReadOnlyModelViewSet):
             arrived_at__isnull=True,
         ).update(arrived_at=timezone.now())
 
-        # Send websocket notification to all active participants except the user who joined
-        channel_layer = get_channel_layer()
-        active_participants = appointment.participant_set.filter(is_active=True)
-
-        for participant in active_participants:
-            if participant.user.pk == request.user.pk:
-                continue
-
-            async_to_sync(channel_layer.group_send)(
-                user_group(participant.user.pk),
-                {
-                    "type": "appointment",
-                    "consultation_id": appointment.consultation.pk if appointment.consultation else None,
-                    "appointment_id": appointment.pk,
-                    "state": "participant_joined",
-                    "data": {
-                        "user_id": request.user.pk,
-                        "user_name": request.user.name or request.user.email,
-                    },
-                },
-            )
+        joins.announce(
+            appointment,
+            request.user,
+            "participant_joined",
+            appointment.participant_set.filter(is_active=True).values_list(
+                "user_id", flat=True
+            ),
+        )
 
         # Create a system message for participant joined
         # The message_saved signal will automatically send WebSocket notifications
@@ -1158,6 +1135,11 @@ class UserAppointmentsViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        # Only announce a participant who was in the call: repeated leaves
+        # of a flapping client are not.
+        if not joins.mark_left(appointment.room_uuid, request.user.pk):
+            return Response({"detail": _("Left successfully")})
+
         # Créer message système "participant left"
         user_name = request.user.name or request.user.email
         consultation_id = str(appointment.consultation.id).zfill(6)
@@ -1169,26 +1151,14 @@ class UserAppointmentsViewSet(viewsets.ReadOnlyModelViewSet):
         )
 
         # Notifier les autres participants via WebSocket
-        channel_layer = get_channel_layer()
-        active_participants = appointment.participant_set.filter(is_active=True)
-
-        for participant in active_participants:
-            if participant.user.pk == request.user.pk:
-                continue
-
-            async_to_sync(channel_layer.group_send)(
-                user_group(participant.user.pk),
-                {
-                    "type": "appointment",
-                    "consultation_id": appointment.consultation.pk,
-                    "appointment_id": appointment.pk,
-                    "state": "participant_left",
-                    "data": {
-                        "user_id": request.user.pk,
-                        "user_name": user_name,
-                    },
-                },
-            )
+        joins.announce(
+            appointment,
+            request.user,
+            "participant_left",
+            appointment.participant_set.filter(is_active=True).values_list(
+                "user_id", flat=True
+            ),
+        )
 
         return Response({"detail": _("Left successfully")})
 
@@ -1559,7 +1529,9 @@ class AppConfigView(APIView):
             }
 
         # Main organization
-        main_org = Organisation.objects.filter(is_main=True).first()
+        from messaging.branding import get_branding
+
+        main_org = get_branding().organisation
         main_organization = OrganisationSerializer(main_org, context={"request": request}).data if main_org else None
 
         def _image_url(image_field):
@@ -1947,7 +1919,9 @@ class UserDashboardView(APIView):
                     user_requests, many=True, context=serializer_context
                 ).data,
                 "consultations": ConsultationSerializer(
-                    consultations, many=True, context=serializer_context
+                    ConsultationSerializer.prefetch_queryset(consultations, user),
+                    many=True,
+                    context=serializer_context,
                 ).data,
                 "appointments": AppointmentSerializer(
                     appointments, many=True, context=serializer_context
@@ -1,6 +1,6 @@
 import { inject, Injectable } from '@angular/core';
 import { HttpClient, HttpContext, HttpParams } from '@angular/common/http';
-import { Observable } from 'rxjs';
+import { Observable, of, switchMap, throwError, timer } from 'rxjs';
 import { environment } from '../../../environments/environment';
 import { SKIP_ERROR_TOAST } from '../interceptors/auth.interceptor';
 import {
@@ -33,6 +33,17 @@ import {
 import { PaginatedResponse } from '../models/global';
 import { VideoCallConfig } from './video-call.types';
 
+const PDF_EXPORT_POLL_INTERVAL = 2000;
+// Give up after two minutes of polling.
+const PDF_EXPORT_MAX_ATTEMPTS = 60;
+
+export class PdfExportTimeoutError extends Error {
+  constructor() {
+    super('The PDF export is taking too long');
+    this.name = 'PdfExportTimeoutError';
+  }
+}
+
 export interface ConsultationQueryParams {
   page?: number;
   page_size?: number;
@@ -523,13 +534,28 @@ export class ConsultationService {
     });
   }
 
-  exportConsultationPdf(consultationId: number): Observable<Blob> {
-    return this.http.get(
-      `${this.apiUrl}/consultations/${consultationId}/export/pdf/`,
-      {
+  exportConsultationPdf(consultationId: number, attempt = 1): Observable<Blob> {
+    // The PDF is rendered in the background: 202 until it is ready.
+    return this.http
+      .get(`${this.apiUrl}/consultations/${consultationId}/export/pdf/`, {
+        observe: 'response',
         responseType: 'blob',
-      }
-    );
+      })
+      .pipe(
+        switchMap(response => {
+          if (response.status !== 202) {
+            return of(response.body as Blob);
+          }
+          if (attempt >= PDF_EXPORT_MAX_ATTEMPTS) {
+            return throwError(() => new PdfExportTimeoutError());
+          }
+          return timer(PDF_EXPORT_POLL_INTERVAL).pipe(
+            switchMap(() =>
+              this.exportConsultationPdf(consultationId, attempt + 1)
+            )
+          );
+        })
+      );
   }
 
   getDashboard(): Observable<DashboardResponse> {
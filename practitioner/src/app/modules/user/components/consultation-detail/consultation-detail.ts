@@ -14,7 +14,10 @@ import { FormBuilder, FormControl, FormGroup, ReactiveFormsModule } from '@angul
 import { Observable, Subject, of, takeUntil, map, switchMap } from 'rxjs';
 import { trigger, transition, style, animate, query, stagger } from '@angular/animations';
 
-import { ConsultationService } from '../../../../core/services/consultation.service';
+import {
+  ConsultationService,
+  PdfExportTimeoutError,
+} from '../../../../core/services/consultation.service';
 import { ConfirmationService } from '../../../../core/services/confirmation.service';
 import { ToasterService } from '../../../../core/services/toaster.service';
 import { ConsultationWebSocketService } from '../../../../core/services/consultation-websocket.service';
@@ -1420,7 +1423,9 @@ export class ConsultationDetail implements OnInit, OnDestroy {
           this.toasterService.show(
             'error',
             this.t.instant('consultationDetail.exportFailed'),
-            getErrorMessage(error)
+            error instanceof PdfExportTimeoutError
+              ? this.t.instant('consultationDetail.pdfExportTimeout')
+              : getErrorMessage(error)
           );
         },
       });